@@ -0,0 +1,81 @@
+"""
+🔬 Admin API Routes
+Diagnóstico sob demanda do processo (profiling do loop de processamento)
+"""
+
+import secrets
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+from loguru import logger
+
+from core.config import settings
+from core.profiler import FORMATS, THREAD_ROLES, profiler
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+def require_admin(authorization: Optional[str]):
+    """Endpoints de admin: PROFILER_ENABLED e 'Authorization: Bearer <API_SECRET_KEY>'"""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler desabilitado (PROFILER_ENABLED)")
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.API_SECRET_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Credencial de admin inválida")
+
+
+@router.post("/profile")
+async def run_profile(
+    seconds: float = Query(10.0, gt=0, description="Duração da janela de amostragem"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Intervalo entre amostras"),
+    format: str = Query("speedscope", description="speedscope | collapsed | summary"),
+    threads: List[str] = Query(list(THREAD_ROLES), description="event_loop, capture, executor ou all"),
+    memory: bool = Query(False, description="Incluir alocações (tracemalloc) na janela"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    🔬 Amostrar as pilhas do processo por alguns segundos
+
+    Retorna um arquivo speedscope (abrir em https://www.speedscope.app),
+    pilhas colapsadas (flamegraph.pl/inferno) ou um resumo JSON.
+    A resposta só sai ao fim da janela (limitada a PROFILER_MAX_SECONDS).
+    """
+    require_admin(authorization)
+
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {format} (use {', '.join(FORMATS)})")
+    invalid = [t for t in threads if t not in THREAD_ROLES and t != "all"]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Threads inválidas: {', '.join(invalid)}")
+
+    try:
+        result = await profiler.profile(
+            seconds=min(seconds, settings.PROFILER_MAX_SECONDS),
+            interval=interval_ms / 1000,
+            threads=threads,
+            memory=memory
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao executar profile: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    content, media_type = result.render(format)
+    extension = {"speedscope": "speedscope.json", "collapsed": "collapsed.txt", "summary": "json"}[format]
+    filename = f"shopflow-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/profile/status")
+async def profile_status(authorization: Optional[str] = Header(None)):
+    """Profile em andamento e resumo da última execução"""
+    require_admin(authorization)
+    return profiler.get_stats()
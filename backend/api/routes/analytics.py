@@ -3,22 +3,62 @@ Analytics API Routes - Rotas para análises inteligentes do ShopFlow
 Fornece endpoints para métricas avançadas, predições e insights
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date, timedelta
 # Updated analytics endpoints
 import asyncio
+from collections import deque
 from loguru import logger
 
 from core.ai.smart_analytics_engine import SmartAnalyticsEngine, SmartMetrics
 from core.ai.privacy_config import privacy_manager
+from core.ai.trajectory_codec import decode_trajectory
 from core.database import SupabaseManager
+from core.streaming import TableQuery
 from core.config import settings
 from models.api_models import ApiResponse
 from core.app_state import get_smart_engine as get_global_engine, get_supabase_manager
+from core.response_cache import response_cache
+from core.live_state import live_state
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
+# TTL (segundos) do cache de resposta dos endpoints de leitura mais consultados
+CACHE_TTL = {
+    "metrics": 2.0,      # Invalidado por novos camera_events (no máx. 1x por TTL)
+    "real_time": 2.0,    # Invalidado por novos camera_events/people_events
+    "dashboard": 10.0,   # Invalidado por novos people_events
+    "history": 30.0,
+    "flow_data": 60.0
+}
+
+# Idade máxima (s) do estado ao vivo antes de cair para o banco
+LIVE_STATE_MAX_AGE = 10.0
+
+# Granularidades aceitas pela agregação no banco (get_camera_event_buckets)
+BUCKET_PATTERN = "^(1m|5m|1h|1d)$"
+
+
+def default_bucket(hours: float) -> str:
+    """Granularidade padrão para manter o gráfico em poucas centenas de pontos"""
+    if hours <= 6:
+        return "1m"
+    if hours <= 24:
+        return "5m"
+    if hours <= 24 * 14:
+        return "1h"
+    return "1d"
+
+
+async def _get_db() -> SupabaseManager:
+    """Instância global do banco (cria uma nova só se não houver)"""
+    db = get_supabase_manager()
+    if db is None:
+        db = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        await db.initialize()
+    return db
+
 async def get_smart_engine() -> SmartAnalyticsEngine:
     """Dependency para obter instância do Smart Analytics Engine"""
     engine = get_global_engine()
@@ -35,12 +75,61 @@ async def get_smart_engine() -> SmartAnalyticsEngine:
 # ============================================
 
 @router.get("/metrics", response_model=Dict[str, Any])
-async def get_mvp_metrics():
+async def get_mvp_metrics(
+    request: Request,
+    camera_id: Optional[str] = Query(None, description="Câmera (padrão: mais recente)")
+):
     """
     MVP: Obter métricas atuais simplificadas
 
-    Retorna dados do último evento processado da câmera
+    Retorna dados do último frame processado (memória); consulta o último
+    evento no banco só se a câmera não é processada neste processo.
+    """
+    snapshot = (
+        live_state.get(camera_id, max_age=LIVE_STATE_MAX_AGE) if camera_id
+        else live_state.latest(max_age=LIVE_STATE_MAX_AGE)
+    )
+    if snapshot is not None:
+        metrics = snapshot.metrics
+        return {
+            "total_people": metrics.get("total_people", 0),
+            "potential_customers": metrics.get("potential_customers", 0),
+            "employees_count": metrics.get("employees_count", 0),
+            "groups_count": metrics.get("groups_count", 0),
+            "timestamp": metrics.get("timestamp")
+        }
+
+    return await response_cache.respond(
+        request, lambda: _load_mvp_metrics(camera_id), ttl=CACHE_TTL["metrics"], tags=("camera_events",)
+    )
+
+
+@router.get("/live", response_model=Dict[str, Any])
+async def get_live_state(
+    camera_id: Optional[str] = Query(None, description="Câmera (padrão: mais recente)"),
+    samples: int = Query(60, ge=0, le=300, description="Últimas N amostras")
+):
+    """
+    Estado ao vivo da câmera: últimas métricas, stats de processamento e
+    amostras recentes (sem acesso ao banco)
     """
+    snapshot = live_state.get(camera_id) if camera_id else live_state.latest()
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Nenhum estado ao vivo para a câmera")
+
+    return {
+        "status": "success",
+        "camera_id": snapshot.camera_id,
+        "origin": snapshot.origin,
+        "age_seconds": round(snapshot.age, 3),
+        "stale": not snapshot.is_fresh(LIVE_STATE_MAX_AGE),
+        "metrics": snapshot.metrics,
+        "stats": snapshot.stats,
+        "samples": live_state.samples(snapshot.camera_id, samples) if samples else []
+    }
+
+
+async def _load_mvp_metrics(camera_id: Optional[str] = None) -> Dict[str, Any]:
     try:
         # Usar instância global
         db = get_supabase_manager()
@@ -55,8 +144,10 @@ async def get_mvp_metrics():
             }
 
         # Buscar último evento da câmera
-        response = await db.client.table("camera_events") \
-            .select("*") \
+        query = db.client.table("camera_events").select("*")
+        if camera_id:
+            query = query.eq("camera_id", camera_id)
+        response = await query \
             .order("timestamp", desc=True) \
             .limit(1) \
             .execute()
@@ -94,16 +185,29 @@ async def get_mvp_metrics():
 
 @router.get("/history", response_model=Dict[str, Any])
 async def get_mvp_history(
-    hours: int = Query(24, ge=1, le=168, description="Últimas N horas")
+    request: Request,
+    hours: int = Query(24, ge=1, le=168, description="Últimas N horas"),
+    bucket: Optional[str] = Query(None, pattern=BUCKET_PATTERN, description="Granularidade (1m, 5m, 1h, 1d)")
 ):
     """
     MVP: Obter histórico simplificado para gráfico
 
     Args:
         hours: Últimas N horas (padrão 24)
+        bucket: Granularidade; padrão escolhido pelo período (1m até 6h, 5m até 24h, 1h acima)
 
-    Retorna dados agrupados por hora para o gráfico temporal
+    Retorna um ponto por bucket (agregado no banco) para o gráfico temporal
     """
+    bucket = bucket or default_bucket(hours)
+    return await response_cache.respond(
+        request,
+        lambda: _load_mvp_history(hours, bucket),
+        ttl=CACHE_TTL["history"],
+        cache_if=lambda payload: payload.get("status") != "error"
+    )
+
+
+async def _load_mvp_history(hours: int, bucket: str) -> Dict[str, Any]:
     try:
         # Usar instância global
         db = get_supabase_manager()
@@ -118,21 +222,19 @@ async def get_mvp_history(
         # Calcular timestamp de início
         start_time = datetime.now() - timedelta(hours=hours)
 
-        # Buscar eventos no período
-        response = await db.client.table("camera_events") \
-            .select("timestamp, total_people") \
-            .gte("timestamp", start_time.isoformat()) \
-            .order("timestamp", desc=False) \
-            .execute()
+        # Agregação por bucket feita no banco (poucas linhas, qualquer volume de eventos)
+        buckets = await db.get_camera_event_buckets(start_time, datetime.now(), bucket)
 
         # Garantir sempre retornar array
         history_data = []
 
-        if response.data and len(response.data) > 0:
-            for event in response.data:
+        if buckets:
+            for row in buckets:
                 history_data.append({
-                    "timestamp": event.get("timestamp"),
-                    "total_people": event.get("total_people", 0)
+                    "timestamp": row.get("bucket_start"),
+                    "total_people": round(float(row.get("avg_people") or 0)),
+                    "max_people": row.get("max_people", 0),
+                    "samples": row.get("samples", 0)
                 })
         else:
             # Gerar dados dummy se vazio
@@ -140,6 +242,7 @@ async def get_mvp_history(
 
         return {
             "data": history_data,  # ✅ Sempre array, nunca None
+            "bucket": bucket,
             "status": "success"
         }
 
@@ -233,6 +336,32 @@ async def get_smart_metrics(
             detail=f"Erro interno: {str(e)}"
         )
 
+def _zone_visit_counts(zone_visits: Any) -> Dict[str, int]:
+    """
+    Visitas por zona de um registro de behavior_analytics.
+
+    Tracks gravam a lista de zonas visitadas (1 visita cada); snapshots
+    periódicos gravam contadores acumulados em 'zone_stats', que não são
+    somados (já estão contados pelos tracks).
+    """
+    if isinstance(zone_visits, list):
+        return {zone: 1 for zone in zone_visits}
+    if isinstance(zone_visits, dict) and 'zone_stats' not in zone_visits:
+        return {zone: visits for zone, visits in zone_visits.items() if isinstance(visits, (int, float))}
+    return {}
+
+def _record_trajectory(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Trajetória de um resumo de visita (float16 simplificado ou JSON legado)"""
+    if not record.get('trajectory'):
+        return record.get('trajectory_data') or []
+
+    trajectory_format = (record.get('metadata') or {}).get('trajectory_format') or {}
+    width, height = trajectory_format.get('frame') or (640, 480)
+    start = trajectory_format.get('start') or record['timestamp']
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    return decode_trajectory(record['trajectory'], width, height, start)
+
 @router.get("/behavior-patterns", response_model=Dict[str, Any])
 async def get_behavior_patterns(
     date_filter: Optional[date] = Query(None, description="Filtrar por data específica"),
@@ -265,20 +394,46 @@ async def get_behavior_patterns(
         else:
             start_time = end_time - timedelta(hours=hours)
         
-        # Buscar dados comportamentais
-        query = """
-            SELECT * FROM behavior_analytics 
-            WHERE timestamp BETWEEN %s AND %s
-            ORDER BY timestamp DESC
-        """
-        
+        # Agregar dados comportamentais em streaming (memória por zona/padrão,
+        # não por registro)
+        query = TableQuery(
+            "behavior_analytics",
+            "id, timestamp, zone_visits, dwell_time_minutes, trajectory, trajectory_data, behavior_pattern, metadata"
+        ).gte("timestamp", start_time).lte("timestamp", end_time)
+
+        total_records = 0
+        zones: Dict[str, Dict[str, Any]] = {}
+        flow_patterns = {}
+        total_dwell = 0
+        recent_trajectories = deque(maxlen=10)
+
         try:
-            behavior_data = await db.fetch_all(query, (start_time, end_time))
-        except Exception:
-            # Se tabela não existe, retornar dados mock
-            behavior_data = []
-        
-        if not behavior_data:
+            async for record in db.stream(query):
+                total_records += 1
+
+                # Zonas quentes
+                for zone, visits in _zone_visit_counts(record.get('zone_visits')).items():
+                    entry = zones.setdefault(zone, {"zone": zone, "visits": 0, "timestamp": record['timestamp']})
+                    entry["visits"] += visits
+                    entry["timestamp"] = max(entry["timestamp"], record['timestamp'])
+
+                # Acumular tempo de permanência
+                if record.get('dwell_time_minutes'):
+                    total_dwell += record['dwell_time_minutes']
+
+                # Trajetórias mais recentes (decodificadas só no fim)
+                if record.get('trajectory') or record.get('trajectory_data'):
+                    recent_trajectories.append(record)
+
+                # Padrões de fluxo
+                pattern = record.get('behavior_pattern') or 'normal'
+                flow_patterns[pattern] = flow_patterns.get(pattern, 0) + 1
+        except Exception as e:
+            # Se tabela não existe, retornar resposta vazia
+            logger.warning(f"Dados comportamentais indisponíveis: {e}")
+            total_records = 0
+
+        if not total_records:
             return {
                 "status": "success",
                 "message": "Nenhum dado comportamental encontrado para o período",
@@ -291,52 +446,22 @@ async def get_behavior_patterns(
                     "trajectories": []
                 }
             }
-        
-        # Processar dados
-        hot_zones = []
-        flow_patterns = {}
-        total_dwell = 0
-        trajectories = []
-        
-        for record in behavior_data:
-            # Extrair zonas quentes
-            if record.get('zone_visits'):
-                for zone, visits in record['zone_visits'].items():
-                    hot_zones.append({
-                        "zone": zone,
-                        "visits": visits,
-                        "timestamp": record['timestamp']
-                    })
-            
-            # Acumular tempo de permanência
-            if record.get('dwell_time_minutes'):
-                total_dwell += record['dwell_time_minutes']
-            
-            # Extrair trajetórias
-            if record.get('trajectory_data'):
-                trajectories.append(record['trajectory_data'])
-            
-            # Padrões de fluxo
-            pattern = record.get('behavior_pattern', 'normal')
-            flow_patterns[pattern] = flow_patterns.get(pattern, 0) + 1
-        
-        avg_dwell = total_dwell / len(behavior_data) if behavior_data else 0
+
+        hot_zones = sorted(zones.values(), key=lambda x: x['visits'], reverse=True)
+        trajectories = [_record_trajectory(record) for record in reversed(recent_trajectories)]
+        avg_dwell = total_dwell / total_records
         
         return {
             "status": "success",
             "data": {
                 "period": f"{start_time.isoformat()} to {end_time.isoformat()}",
-                "total_records": len(behavior_data),
+                "total_records": total_records,
                 "hot_zones": hot_zones,
                 "flow_patterns": flow_patterns,
                 "avg_dwell_time": round(avg_dwell, 2),
-                "trajectories": trajectories[:10],  # Limitar a 10 trajetórias
+                "trajectories": trajectories,  # 10 mais recentes
                 "summary": {
-                    "most_visited_zones": sorted(
-                        hot_zones, 
-                        key=lambda x: x['visits'], 
-                        reverse=True
-                    )[:5],
+                    "most_visited_zones": hot_zones[:5],
                     "dominant_flow_pattern": max(flow_patterns, key=flow_patterns.get) if flow_patterns else "normal"
                 }
             }
@@ -600,13 +725,18 @@ async def get_realtime_analytics():
 
 @router.get("/flow-visualization", response_model=Dict[str, Any])
 async def get_flow_visualization(
-    hours: int = Query(24, ge=1, le=168, description="Período em horas")
+    hours: int = Query(24, ge=1, le=168, description="Período em horas"),
+    camera_id: str = Query("camera1", description="Câmera do heatmap"),
+    start: Optional[datetime] = Query(None, description="Início do período (ISO, sobrepõe hours)"),
+    end: Optional[datetime] = Query(None, description="Fim do período (ISO, padrão agora)")
 ):
     """
     Obter dados reais para visualização de fluxo de clientes do Supabase
     
     Args:
         hours: Período em horas para análise
+        camera_id: Câmera usada no mapa de calor
+        start/end: Período explícito; o heatmap soma tiles de minuto/hora/dia
     
     Retorna:
         - Mapa de calor de zonas
@@ -619,12 +749,14 @@ async def get_flow_visualization(
         await db.initialize()
         
         # Usar método específico para dados de flow
-        flow_data = await db.get_flow_visualization_data(hours)
+        flow_data = await db.get_flow_visualization_data(hours, camera_id=camera_id, start=start, end=end)
         
         return {
             "status": "success",
             "data": flow_data,
             "period_hours": hours,
+            "period_start": start.isoformat() if start else None,
+            "period_end": end.isoformat() if end else None,
             "generated_at": datetime.now().isoformat()
         }
         
@@ -753,16 +885,21 @@ async def get_industry_benchmarks(
         )
 
 @router.get("/dashboard", response_model=Dict[str, Any])
-async def get_dashboard_metrics():
+async def get_dashboard_metrics(request: Request):
     """
     Obter métricas do dashboard em tempo real
 
     Retorna dados reais do Supabase para uso no frontend
     """
+    return await response_cache.respond(
+        request, _load_dashboard_metrics, ttl=CACHE_TTL["dashboard"], tags=("people_events", "camera_rollups")
+    )
+
+
+async def _load_dashboard_metrics() -> Dict[str, Any]:
     try:
         # Obter dados reais do banco
-        db = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        await db.initialize()
+        db = await _get_db()
 
         # Buscar métricas do dashboard
         dashboard_data = await db.get_dashboard_metrics()
@@ -790,16 +927,24 @@ async def get_dashboard_metrics():
         )
 
 @router.get("/real-time", response_model=Dict[str, Any])
-async def get_real_time_analytics():
+async def get_real_time_analytics(request: Request):
     """
     Obter analytics em tempo real incluindo funcionários ativos e métricas anteriores
 
     Retorna dados para comparação de trends
     """
+    return await response_cache.respond(
+        request,
+        _load_real_time_analytics,
+        ttl=CACHE_TTL["real_time"],
+        tags=("camera_events", "people_events", "camera_rollups")
+    )
+
+
+async def _load_real_time_analytics() -> Dict[str, Any]:
     try:
         # Obter dados reais do banco
-        db = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        await db.initialize()
+        db = await _get_db()
 
         # Buscar dados atuais
         current_stats = await db.get_current_stats()
@@ -838,9 +983,12 @@ async def get_real_time_analytics():
 
 @router.get("/flow-data", response_model=Dict[str, Any])
 async def get_flow_data(
+    request: Request,
     start: str = Query(..., description="Data/hora de início (ISO format)"),
     end: str = Query(..., description="Data/hora de fim (ISO format)"),
-    period: str = Query("24h", description="Período (24h, 7d, 30d)")
+    period: str = Query("24h", description="Período (24h, 7d, 30d)"),
+    bucket: str = Query("1h", pattern=BUCKET_PATTERN, description="Granularidade (1m, 5m, 1h, 1d)"),
+    camera_id: Optional[str] = Query(None, description="Câmera (padrão: todas)")
 ):
     """
     Obter dados de fluxo em tempo real para gráficos
@@ -849,58 +997,60 @@ async def get_flow_data(
         start: Data/hora de início
         end: Data/hora de fim
         period: Período de agregação
+        bucket: Granularidade dos pontos (padrão 1h)
+        camera_id: Filtrar câmera
 
-    Retorna dados históricos reais de fluxo por hora
+    Retorna um ponto por bucket, agregado no banco
     """
+    return await response_cache.respond(
+        request,
+        lambda: _load_flow_data(start, end, period, bucket, camera_id),
+        ttl=CACHE_TTL["flow_data"]
+    )
+
+
+async def _load_flow_data(
+    start: str,
+    end: str,
+    period: str,
+    bucket: str,
+    camera_id: Optional[str]
+) -> Dict[str, Any]:
     try:
-        # Obter dados reais do banco
-        db = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-        await db.initialize()
-
-        # Buscar eventos de câmera no período
-        camera_events = await db.get_camera_events(
-            camera_id=None,  # Todas as câmeras
-            start_date=start,
-            end_date=end
-        )
-
-        # Agrupar por hora
-        from collections import defaultdict
-        hourly_data = defaultdict(lambda: {"customers": 0, "employees": 0, "total": 0})
-
-        for event in camera_events:
-            timestamp = event.get("timestamp", "")
-            try:
-                event_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-                hour_key = event_time.strftime("%Y-%m-%d %H:00:00")
-
-                customers = event.get("customers_count", 0)
-                employees = event.get("employees_count", 0)
+        start_time = datetime.fromisoformat(start.replace("Z", "+00:00"))
+        end_time = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start/end devem estar em formato ISO")
 
-                hourly_data[hour_key]["customers"] += customers
-                hourly_data[hour_key]["employees"] += employees
-                hourly_data[hour_key]["total"] += customers + employees
+    try:
+        # Obter dados reais do banco
+        db = await _get_db()
 
-            except ValueError:
-                continue
+        # Contagens por bucket calculadas no banco
+        buckets = await db.get_camera_event_buckets(start_time, end_time, bucket, camera_id)
 
-        # Converter para formato esperado pelo frontend
+        # Converter para formato esperado pelo frontend (médias do bucket)
         flow_data = []
-        for hour_key, data in sorted(hourly_data.items()):
+        for row in buckets:
+            customers = round(float(row.get("avg_customers") or 0))
+            employees = round(float(row.get("avg_employees") or 0))
             flow_data.append({
-                "timestamp": hour_key,
-                "customers_count": data["customers"],
-                "employees_count": data["employees"],
-                "total_count": data["total"]
+                "timestamp": row.get("bucket_start"),
+                "customers_count": customers,
+                "employees_count": employees,
+                "total_count": round(float(row.get("avg_people") or 0)),
+                "peak_count": row.get("max_people", 0),
+                "samples": row.get("samples", 0)
             })
 
         return {
             "status": "success",
             "flow_data": flow_data,
             "period": period,
+            "bucket": bucket,
             "start_time": start,
             "end_time": end,
-            "total_events": len(camera_events),
+            "total_events": sum(row.get("samples", 0) for row in buckets),
             "generated_at": datetime.now().isoformat()
         }
 
@@ -911,6 +1061,16 @@ async def get_flow_data(
             detail=f"Erro interno: {str(e)}"
         )
 
+@router.get("/cache-stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """Estatísticas do cache de respostas (hit rate, consultas economizadas)"""
+    return {
+        "status": "success",
+        "cache": response_cache.get_stats(),
+        "ttl": CACHE_TTL,
+        "generated_at": datetime.now().isoformat()
+    }
+
 from fastapi import BackgroundTasks
 from fastapi.responses import StreamingResponse
 import json
@@ -921,8 +1081,52 @@ async def stream_real_time_events():
     """
     Stream de eventos em tempo real via Server-Sent Events (SSE)
 
-    Conecta ao Supabase real-time e transmite eventos para o frontend
+    Assina as métricas das câmeras no event hub (sem consultas ao banco por
+    cliente); sem hub, consulta eventos recentes no Supabase a cada 5s.
     """
+    from core.app_state import get_event_hub
+
+    def to_event_data(event: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"event_{event.get('id', 'unknown')}",
+            "camera_id": event.get("camera_id", "cam_1"),
+            "person_type": "customer" if event.get("customers_count", 0) > 0 else "employee",
+            "confidence": 0.9,
+            "timestamp": event.get("timestamp", datetime.now().isoformat()),
+            "bbox": {"x": 100, "y": 100, "width": 50, "height": 50},
+            "people_count": event.get("people_count", 0),
+            "customers_count": event.get("customers_count", 0),
+            "employees_count": event.get("employees_count", 0)
+        }
+
+    async def hub_event_generator(hub):
+        subscription = hub.subscribe('cameras.*.metrics', replay=5, max_queue=50)
+        try:
+            while True:
+                hub_event = await subscription.get(timeout=15.0)
+                if hub_event is None:
+                    yield ": keepalive\n\n"
+                    continue
+
+                metrics = hub_event.data
+                event_data = to_event_data({
+                    "id": hub_event.seq,
+                    "camera_id": metrics.get("camera_id"),
+                    "timestamp": metrics.get("timestamp"),
+                    "people_count": metrics.get("total_people", 0),
+                    "customers_count": metrics.get("potential_customers", 0),
+                    "employees_count": metrics.get("employees_count", 0)
+                })
+                yield f"data: {json.dumps(event_data)}\n\n"
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro fatal no stream: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            subscription.close()
+
     async def event_generator():
         try:
             # Configurar conexão com dados reais
@@ -943,17 +1147,7 @@ async def stream_real_time_events():
 
                     # Enviar eventos se houver
                     for event in recent_events:
-                        event_data = {
-                            "id": f"event_{event.get('id', 'unknown')}",
-                            "camera_id": event.get("camera_id", "cam_1"),
-                            "person_type": "customer" if event.get("customers_count", 0) > 0 else "employee",
-                            "confidence": 0.9,
-                            "timestamp": event.get("timestamp", datetime.now().isoformat()),
-                            "bbox": {"x": 100, "y": 100, "width": 50, "height": 50},
-                            "people_count": event.get("people_count", 0),
-                            "customers_count": event.get("customers_count", 0),
-                            "employees_count": event.get("employees_count", 0)
-                        }
+                        event_data = to_event_data(event)
 
                         yield f"data: {json.dumps(event_data)}\n\n"
 
@@ -968,8 +1162,10 @@ async def stream_real_time_events():
             logger.error(f"Erro fatal no stream: {e}")
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
+    hub = get_event_hub()
+
     return StreamingResponse(
-        event_generator(),
+        hub_event_generator(hub) if hub is not None else event_generator(),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
@@ -13,9 +13,10 @@ from loguru import logger
 from core.detector import YOLOPersonDetector
 from core.ai.smart_analytics_engine import SmartAnalyticsEngine  # DESCOMENTAR
 from core.database import SupabaseManager
-from core.app_state import get_smart_engine  # ADICIONAR
+from core.app_state import get_smart_engine, get_rtsp_processor  # ADICIONAR
 from core.config import settings
-from models.api_models import CameraConfigData
+from core.perspective import PerspectiveCalibration
+from models.api_models import CameraConfigData, CameraCalibrationRequest
 
 router = APIRouter(prefix="/api/camera", tags=["camera"])
 
@@ -80,7 +81,8 @@ async def camera_stream():
 
     # Importar a função de stream do main
     # Como está no main.py, vamos usar o processador RTSP diretamente
-    from core.app_state import get_rtsp_processor
+    from core.app_state import get_rtsp_processor, get_event_hub
+    from core.event_hub import frames_topic
 
     async def generate_with_headers():
         """Gera frames do stream MJPEG"""
@@ -90,6 +92,27 @@ async def camera_stream():
             yield b''
             return
 
+        hub = get_event_hub()
+        if hub is not None:
+            # Um frame por frame processado, JPEG codificado uma vez para todos
+            subscription = hub.subscribe(frames_topic(processor.camera_id), replay=1, conflate=True)
+            try:
+                while True:
+                    event = await subscription.get(timeout=5.0)
+                    if event is None:
+                        continue
+
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n\r\n' + event.data + b'\r\n')
+
+            except asyncio.CancelledError:
+                logger.info("Stream cancelado pelo cliente")
+            except Exception as e:
+                logger.error(f"Erro no stream: {e}")
+            finally:
+                subscription.close()
+            return
+
         try:
             while True:
                 # get_latest_frame() já retorna bytes JPEG
@@ -284,6 +307,73 @@ async def test_camera_connection(camera_id: str):
         logger.error(f"❌ Erro ao testar conexão: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{camera_id}/calibration")
+async def get_camera_calibration(camera_id: str):
+    """📐 Obter calibração de perspectiva da câmera (camera_id do processador, ex: camera1)"""
+    try:
+        supabase = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        await supabase.initialize()
+        
+        calibration = await supabase.get_camera_calibration(camera_id)
+        
+        processor = get_rtsp_processor()
+        live = processor.perspective.get_stats() if processor and processor.camera_id == camera_id else None
+        
+        return {
+            'success': True,
+            'camera_id': camera_id,
+            'calibration': calibration,
+            'live': live
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter calibração: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/{camera_id}/calibration")
+async def set_camera_calibration(camera_id: str, request: CameraCalibrationRequest):
+    """
+    📐 Calibrar perspectiva a partir de pontos marcados (pixel -> metros no chão)
+
+    camera_id é o do processador (ex: camera1); a calibração é aplicada na hora
+    se essa câmera estiver em execução.
+    """
+    try:
+        try:
+            calibration = PerspectiveCalibration.from_points(
+                request.image_points,
+                request.ground_points,
+                request.frame_width,
+                request.frame_height
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        supabase = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        await supabase.initialize()
+        
+        success = await supabase.update_camera_calibration(camera_id, calibration.to_dict())
+        if not success:
+            raise HTTPException(status_code=500, detail="Falha ao salvar calibração")
+        
+        # Aplicar imediatamente no processador em execução
+        processor = get_rtsp_processor()
+        if processor and processor.camera_id == camera_id:
+            processor.apply_calibration(calibration)
+        
+        logger.info(f"📐 Calibração atualizada: {camera_id}")
+        
+        return {
+            'success': True,
+            'calibration': calibration.to_dict()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro ao calibrar câmera: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{camera_id}/events")
 async def get_camera_events(
     camera_id: str,
@@ -11,17 +11,26 @@ from datetime import datetime, timedelta
 from collections import deque, defaultdict
 import json
 import math
+import time
 from loguru import logger
-from scipy import ndimage
-from scipy.spatial.distance import euclidean
 from sklearn.cluster import DBSCAN
 import pandas as pd
 
 from ..config import get_settings
 from ..database import DatabaseManager
+from .heatmap_accumulator import SparseHeatmapAccumulator
+from .trajectory_codec import TRAJECTORY_FIELDS, encode_trajectory, simplify_visit_path
+from ..perspective import PerspectiveMap
 
 settings = get_settings()
 
+# Resumos de tracks e snapshots periódicos (gravados em lote)
+_INSERT_BEHAVIOR_ROW = """
+INSERT INTO behavior_analytics
+(timestamp, person_id, person_type, dwell_time_minutes, trajectory, zone_visits, behavior_pattern, metadata)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+
 @dataclass
 class PersonTrack:
     """Dados de rastreamento de uma pessoa"""
@@ -36,14 +45,32 @@ class PersonTrack:
     total_distance: float = 0.0
     avg_speed: float = 0.0
     max_speed: float = 0.0
+    total_distance_m: float = 0.0  # Só com calibração de perspectiva
+    avg_speed_mps: float = 0.0
+    max_speed_mps: float = 0.0
     dwell_time: float = 0.0  # minutos
     stops_count: int = 0
     zones_visited: List[str] = None
     trajectory_complexity: float = 0.0
+
+    # Acumuladores das métricas (atualizados a cada posição, O(1))
+    start_point: Optional[Tuple[float, float]] = None
+    speed_sum: float = 0.0
+    speed_sum_mps: float = 0.0
+    speed_samples: int = 0
+    low_speed_run: int = 0  # amostras lentas consecutivas (paradas)
+
+    # Trajetória da visita inteira (o deque só guarda as últimas posições):
+    # pontos com deslocamento mínimo, compactados por Douglas-Peucker ao crescer
+    entry: Optional[Tuple[float, float, datetime]] = None
+    visit_path: List[Tuple[float, float, datetime]] = None
+    positions_seen: int = 0
     
     def __post_init__(self):
         if self.zones_visited is None:
             self.zones_visited = []
+        if self.visit_path is None:
+            self.visit_path = []
 
 @dataclass
 class ZoneInfo:
@@ -78,9 +105,18 @@ class BehaviorAnalyzer:
         self.frame_width = 640
         self.frame_height = 480
         
-        # Heatmap de movimento
-        self.heatmap = None
-        self.heatmap_alpha = 0.1
+        # Heatmap de movimento (grade reduzida com decaimento por janela)
+        self.heatmap: Optional[SparseHeatmapAccumulator] = None
+        
+        # Calibração de perspectiva (pixels -> metros), definida pela câmera
+        self.perspective: Optional[PerspectiveMap] = None
+
+        # Rollups da câmera (histograma de permanência), definidos pelo processador
+        self.rollups = None
+        self.camera_id = 'camera1'
+
+        # Histórico colunar local (visitas finalizadas), definido no startup
+        self.analytics_store = None
         
         # Estatísticas em tempo real
         self.current_stats = {
@@ -93,6 +129,19 @@ class BehaviorAnalyzer:
         
         # Cache de análises
         self.behavior_cache = {}
+
+        # Persistência: estado por frame fica em memória; o banco recebe um
+        # resumo por visita finalizada e um snapshot agregado por intervalo,
+        # gravados em lote
+        self.summary_batch_size = 200
+        self.summary_flush_interval = 30.0  # segundos
+        self.snapshot_interval = 60.0  # segundos por snapshot agregado
+        self.trajectory_epsilon = 2.0  # pixels (Douglas-Peucker)
+        self.max_visit_points = 2000  # acima disso a trajetória da visita é simplificada
+        self.max_pending_rows = 5000  # sem banco, descarta os mais antigos
+        self._pending_rows: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._snapshot: Optional[Dict[str, Any]] = None
         
         logger.info("🔍 Behavior Analyzer inicializado")
     
@@ -146,7 +195,32 @@ class BehaviorAnalyzer:
     
     def _initialize_heatmap(self):
         """Inicializar heatmap de movimento"""
-        self.heatmap = np.zeros((self.frame_height, self.frame_width), dtype=np.float32)
+        self.heatmap = SparseHeatmapAccumulator(
+            frame_width=self.frame_width,
+            frame_height=self.frame_height
+        )
+
+    def set_frame_size(self, frame_width: int, frame_height: int):
+        """
+        Ajustar à resolução real da câmera (primeiro frame ou reconexão).
+
+        Heatmap, área da densidade e normalização das trajetórias usam estas
+        dimensões; as zonas padrão são reescaladas proporcionalmente.
+        """
+        if frame_width == self.frame_width and frame_height == self.frame_height:
+            return
+
+        scale_x = frame_width / float(self.frame_width)
+        scale_y = frame_height / float(self.frame_height)
+        for zone in self.zones.values():
+            zone.polygon = [(int(round(x * scale_x)), int(round(y * scale_y))) for x, y in zone.polygon]
+
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        if self.heatmap is not None:
+            self.heatmap.set_frame_size(frame_width, frame_height)
+
+        logger.info(f"📐 Behavior Analyzer ajustado para {frame_width}x{frame_height}")
     
     async def analyze(
         self,
@@ -185,7 +259,7 @@ class BehaviorAnalyzer:
             flow_analysis = await self._analyze_flow_patterns()
             
             # Atualizar heatmap
-            self._update_heatmap(detections)
+            self._update_heatmap(detections, timestamp)
             
             # Compilar resultados
             behavior_data = {
@@ -258,6 +332,7 @@ class BehaviorAnalyzer:
                 track = self.person_tracks[person_id]
                 track.last_seen = timestamp
                 track.positions.append((center_x, center_y, timestamp))
+                self._record_visit_point(track, (center_x, center_y, timestamp))
                 
                 # Calcular métricas de movimento
                 await self._calculate_movement_metrics(track)
@@ -280,107 +355,96 @@ class BehaviorAnalyzer:
         except Exception as e:
             logger.error(f"Erro ao atualizar tracks: {e}")
     
+    def _record_visit_point(self, track: PersonTrack, point: Tuple[float, float, datetime]):
+        """
+        Guardar a posição na trajetória da visita inteira (usada no resumo).
+
+        Só entram posições a mais de trajectory_epsilon do último ponto guardado
+        (pessoa parada não cresce o buffer); passando de max_visit_points a
+        trajetória é simplificada com a mesma tolerância do encoder.
+        """
+        track.positions_seen += 1
+        if track.entry is None:
+            track.entry = point
+            track.visit_path.append(point)
+            return
+
+        last_x, last_y, _ = track.visit_path[-1]
+        if math.hypot(point[0] - last_x, point[1] - last_y) < self.trajectory_epsilon:
+            return
+
+        track.visit_path.append(point)
+        if len(track.visit_path) > self.max_visit_points:
+            track.visit_path = simplify_visit_path(track.visit_path, self.trajectory_epsilon)
+
     async def _calculate_movement_metrics(self, track: PersonTrack):
-        """Calcular métricas de movimento para uma pessoa"""
+        """
+        Atualizar as métricas de movimento com a última posição da pessoa.
+
+        Incremental: só o último segmento é processado (somas e contadores no
+        PersonTrack), O(1) por pessoa por frame. As métricas cobrem a visita
+        inteira, não só as posições mantidas no deque.
+        """
         try:
+            curr_x, curr_y, curr_time = track.positions[-1]
+
+            if track.start_point is None:
+                track.start_point = (curr_x, curr_y)
+
+            # Tempo de permanência (dwell time)
+            track.dwell_time = (track.last_seen - track.first_seen).total_seconds() / 60  # minutos
+
             if len(track.positions) < 2:
                 return
-            
-            positions = list(track.positions)
-            total_distance = 0
-            speeds = []
-            
-            for i in range(1, len(positions)):
-                prev_x, prev_y, prev_time = positions[i-1]
-                curr_x, curr_y, curr_time = positions[i]
-                
-                # Distância euclidiana
-                distance = euclidean((prev_x, prev_y), (curr_x, curr_y))
-                total_distance += distance
-                
-                # Velocidade (pixels por segundo)
-                time_diff = (curr_time - prev_time).total_seconds()
-                if time_diff > 0:
-                    speed = distance / time_diff
-                    speeds.append(speed)
-            
-            track.total_distance = total_distance
-            
-            if speeds:
-                track.avg_speed = np.mean(speeds)
-                track.max_speed = max(speeds)
-            
-            # Tempo de permanência (dwell time)
-            time_diff = (track.last_seen - track.first_seen).total_seconds() / 60  # minutos
-            track.dwell_time = time_diff
-            
-            # Complexidade da trajetória (sinuosidade)
-            if len(positions) >= 3:
-                track.trajectory_complexity = self._calculate_trajectory_complexity(positions)
-            
-            # Contar paradas (baixa velocidade por período prolongado)
-            track.stops_count = self._count_stops(positions)
+
+            prev_x, prev_y, prev_time = track.positions[-2]
+
+            # Distância euclidiana
+            distance = math.hypot(curr_x - prev_x, curr_y - prev_y)
+            track.total_distance += distance
+
+            # Distância real no chão (se a câmera estiver calibrada)
+            distance_m = 0.0
+            if self.perspective is not None:
+                distance_m = self.perspective.distance_m((prev_x, prev_y), (curr_x, curr_y))
+                track.total_distance_m += distance_m
+
+            # Velocidade (pixels por segundo)
+            time_diff = (curr_time - prev_time).total_seconds()
+            if time_diff > 0:
+                speed = distance / time_diff
+                track.speed_samples += 1
+                track.speed_sum += speed
+                track.avg_speed = track.speed_sum / track.speed_samples
+                track.max_speed = max(track.max_speed, speed)
+
+                if self.perspective is not None:
+                    speed_mps = distance_m / time_diff
+                    track.speed_sum_mps += speed_mps
+                    track.avg_speed_mps = track.speed_sum_mps / track.speed_samples
+                    track.max_speed_mps = max(track.max_speed_mps, speed_mps)
+
+                # Paradas: sequência de amostras lentas encerrada por movimento
+                if speed < self.movement_threshold:
+                    track.low_speed_run += 1
+                else:
+                    if track.low_speed_run >= self.stop_threshold:
+                        track.stops_count += 1
+                    track.low_speed_run = 0
+
+            # Complexidade da trajetória (sinuosidade): 0 = linha reta, 1 = muito complexa
+            if len(track.positions) >= 3:
+                direct_distance = math.hypot(curr_x - track.start_point[0], curr_y - track.start_point[1])
+                if direct_distance == 0:
+                    track.trajectory_complexity = 1.0  # Pessoa não se moveu
+                else:
+                    track.trajectory_complexity = min(
+                        (track.total_distance - direct_distance) / track.total_distance, 1.0
+                    )
             
         except Exception as e:
             logger.error(f"Erro ao calcular métricas de movimento: {e}")
     
-    def _calculate_trajectory_complexity(self, positions: List[Tuple]) -> float:
-        """Calcular complexidade da trajetória (0 = linha reta, 1 = muito complexa)"""
-        try:
-            if len(positions) < 3:
-                return 0.0
-            
-            # Distância total percorrida vs distância direta
-            total_distance = 0
-            for i in range(1, len(positions)):
-                prev_x, prev_y, _ = positions[i-1]
-                curr_x, curr_y, _ = positions[i]
-                total_distance += euclidean((prev_x, prev_y), (curr_x, curr_y))
-            
-            # Distância direta (primeiro ao último ponto)
-            first_x, first_y, _ = positions[0]
-            last_x, last_y, _ = positions[-1]
-            direct_distance = euclidean((first_x, first_y), (last_x, last_y))
-            
-            if direct_distance == 0:
-                return 1.0  # Pessoa não se moveu
-            
-            complexity = (total_distance - direct_distance) / total_distance
-            return min(complexity, 1.0)
-            
-        except Exception as e:
-            logger.error(f"Erro ao calcular complexidade: {e}")
-            return 0.0
-    
-    def _count_stops(self, positions: List[Tuple]) -> int:
-        """Contar número de paradas significativas"""
-        try:
-            stops = 0
-            consecutive_low_speed = 0
-            
-            for i in range(1, len(positions)):
-                prev_x, prev_y, prev_time = positions[i-1]
-                curr_x, curr_y, curr_time = positions[i]
-                
-                distance = euclidean((prev_x, prev_y), (curr_x, curr_y))
-                time_diff = (curr_time - prev_time).total_seconds()
-                
-                if time_diff > 0:
-                    speed = distance / time_diff
-                    
-                    if speed < self.movement_threshold:  # Movimento muito lento
-                        consecutive_low_speed += 1
-                    else:
-                        if consecutive_low_speed >= self.stop_threshold:
-                            stops += 1
-                        consecutive_low_speed = 0
-            
-            return stops
-            
-        except Exception as e:
-            logger.error(f"Erro ao contar paradas: {e}")
-            return 0
-    
     async def _check_zone_visits(self, track: PersonTrack, x: float, y: float):
         """Verificar se pessoa está em alguma zona específica"""
         try:
@@ -652,37 +716,13 @@ class BehaviorAnalyzer:
             logger.error(f"Erro na análise de fluxo: {e}")
             return {'pattern': 'normal', 'flow_direction': 'neutral'}
     
-    def _update_heatmap(self, detections: List[Dict]):
-        """Atualizar heatmap de movimento"""
+    def _update_heatmap(self, detections: List[Dict], timestamp: datetime):
+        """Atualizar heatmap de movimento (splat apenas nos centros das pessoas)"""
         try:
-            # Criar máscara temporária
-            temp_heatmap = np.zeros_like(self.heatmap)
-            
-            for detection in detections:
-                bbox = detection['bbox']
-                x1, y1, x2, y2 = bbox
-                center_x = int((x1 + x2) / 2)
-                center_y = int((y1 + y2) / 2)
-                
-                # Adicionar gaussian blur em torno do centro
-                if 0 <= center_x < self.frame_width and 0 <= center_y < self.frame_height:
-                    # Criar gaussian kernel pequeno
-                    kernel_size = 21
-                    sigma = 7
-                    
-                    y_min = max(0, center_y - kernel_size//2)
-                    y_max = min(self.frame_height, center_y + kernel_size//2 + 1)
-                    x_min = max(0, center_x - kernel_size//2)
-                    x_max = min(self.frame_width, center_x + kernel_size//2 + 1)
-                    
-                    temp_heatmap[y_min:y_max, x_min:x_max] += 1
-            
-            # Aplicar blur
-            if np.sum(temp_heatmap) > 0:
-                temp_heatmap = ndimage.gaussian_filter(temp_heatmap, sigma=10)
-            
-            # Atualizar heatmap principal com decay
-            self.heatmap = (1 - self.heatmap_alpha) * self.heatmap + self.heatmap_alpha * temp_heatmap
+            if self.heatmap is None:
+                self._initialize_heatmap()
+
+            self.heatmap.add_detections(detections, timestamp.timestamp())
             
         except Exception as e:
             logger.error(f"Erro ao atualizar heatmap: {e}")
@@ -699,29 +739,74 @@ class BehaviorAnalyzer:
                 oldest_key = min(self.behavior_cache.keys())
                 del self.behavior_cache[oldest_key]
             
-            # Salvar principais métricas no banco
-            query = """
-            INSERT INTO behavior_analytics 
-            (timestamp, dwell_time_minutes, zone_visits, behavior_pattern, metadata)
-            VALUES ($1, $2, $3, $4, $5)
-            """
-            
-            await self.db.execute(
-                query,
-                timestamp,
-                behavior_data.get('avg_dwell_time', 0),
-                json.dumps(behavior_data.get('zone_interactions', {})),
-                behavior_data.get('flow_pattern', 'normal'),
-                json.dumps({
-                    'crowd_density': behavior_data.get('crowd_density', 0),
-                    'group_rate': behavior_data.get('group_rate', 0),
-                    'movement_intensity': behavior_data.get('movement_intensity', 0),
-                    'total_tracks': behavior_data.get('total_tracks', 0)
-                })
-            )
+            # Banco recebe só o snapshot agregado do intervalo (não cada frame)
+            self._accumulate_snapshot(timestamp, behavior_data)
+            await self._flush_if_due()
             
         except Exception as e:
             logger.error(f"Erro ao salvar dados comportamentais: {e}")
+
+    def _accumulate_snapshot(self, timestamp: datetime, behavior_data: Dict):
+        """Somar o frame no snapshot em andamento; fecha a cada snapshot_interval"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = {
+                'start': timestamp,
+                'frames': 0,
+                'avg_dwell_time': 0.0,
+                'crowd_density': 0.0,
+                'group_rate': 0.0,
+                'movement_intensity': 0.0,
+                'max_tracks': 0
+            }
+
+        snapshot['frames'] += 1
+        for key in ('avg_dwell_time', 'crowd_density', 'group_rate', 'movement_intensity'):
+            snapshot[key] += behavior_data.get(key, 0) or 0
+        snapshot['max_tracks'] = max(snapshot['max_tracks'], behavior_data.get('total_tracks', 0))
+
+        if (timestamp - snapshot['start']).total_seconds() < self.snapshot_interval:
+            return
+
+        frames = snapshot['frames']
+        self._pending_rows.append((
+            timestamp,
+            None,
+            None,
+            snapshot['avg_dwell_time'] / frames,
+            None,
+            json.dumps(behavior_data.get('zone_interactions', {})),
+            behavior_data.get('flow_pattern', 'normal'),
+            json.dumps({
+                'crowd_density': snapshot['crowd_density'] / frames,
+                'group_rate': snapshot['group_rate'] / frames,
+                'movement_intensity': snapshot['movement_intensity'] / frames,
+                'total_tracks': snapshot['max_tracks'],
+                'frames': frames,
+                'period_start': snapshot['start'].isoformat()
+            })
+        ))
+        self._snapshot = None
+
+    async def _flush_if_due(self):
+        if (len(self._pending_rows) >= self.summary_batch_size
+                or time.monotonic() - self._last_flush >= self.summary_flush_interval):
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Gravar resumos e snapshots pendentes numa única operação"""
+        rows, self._pending_rows = self._pending_rows, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+
+        if self.db is not None and await self.db.executemany(_INSERT_BEHAVIOR_ROW, rows):
+            logger.debug(f"✅ {len(rows)} registros comportamentais gravados")
+            return len(rows)
+
+        # Falhou: mantém para a próxima tentativa, limitado a max_pending_rows
+        self._pending_rows = (rows + self._pending_rows)[-self.max_pending_rows:]
+        return 0
     
     def _update_current_stats(self, behavior_data: Dict):
         """Atualizar estatísticas em tempo real"""
@@ -736,36 +821,61 @@ class BehaviorAnalyzer:
     async def _finalize_person_track(self, track: PersonTrack):
         """Finalizar track de pessoa quando ela sai de cena"""
         try:
-            # Salvar dados finais da pessoa no banco
-            query = """
-            INSERT INTO behavior_analytics 
-            (timestamp, person_id, person_type, dwell_time_minutes, trajectory_data, zone_visits, behavior_pattern, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-            """
-            
-            trajectory_data = [
-                {'x': pos[0], 'y': pos[1], 'timestamp': pos[2].isoformat()}
-                for pos in list(track.positions)
-            ]
-            
-            await self.db.execute(
-                query,
+            if self.rollups is not None:
+                self.rollups.add_dwell(self.camera_id, track.dwell_time * 60, track.last_seen)
+
+            if self.analytics_store is not None:
+                await self.analytics_store.add_track(self.camera_id, {
+                    'person_id': track.person_id,
+                    'person_type': track.person_type,
+                    'dwell_seconds': track.dwell_time * 60,
+                    'total_distance_m': track.total_distance_m,
+                    'avg_speed_mps': track.avg_speed_mps,
+                    'zones_visited': len(track.zones_visited)
+                }, track.last_seen)
+
+            # Resumo da visita com trajetória simplificada (float16), gravado em lote.
+            # A trajetória cobre a visita inteira (entrada real até a última posição)
+            positions = list(track.visit_path)
+            if track.positions and (not positions or positions[-1] != track.positions[-1]):
+                positions.append(track.positions[-1])
+            entry = track.entry or (positions[0] if positions else None)
+            trajectory, points = encode_trajectory(
+                positions, self.frame_width, self.frame_height, self.trajectory_epsilon
+            )
+
+            self._pending_rows.append((
                 track.last_seen,
                 str(track.person_id),
                 track.person_type,
                 track.dwell_time,
-                json.dumps(trajectory_data),
+                trajectory or None,
                 json.dumps(track.zones_visited),
                 'completed',
                 json.dumps({
                     'total_distance': track.total_distance,
                     'avg_speed': track.avg_speed,
                     'max_speed': track.max_speed,
+                    'total_distance_m': track.total_distance_m,
+                    'avg_speed_mps': track.avg_speed_mps,
                     'stops_count': track.stops_count,
                     'trajectory_complexity': track.trajectory_complexity,
-                    'identity_id': track.identity_id
+                    'identity_id': track.identity_id,
+                    'first_seen': track.first_seen.isoformat(),
+                    'entry_point': [entry[0], entry[1]] if entry else None,
+                    'exit_point': [positions[-1][0], positions[-1][1]] if positions else None,
+                    # Decodificação de trajectory (trajectory_codec.decode_trajectory)
+                    'trajectory_format': {
+                        'dtype': 'float16',
+                        'fields': list(TRAJECTORY_FIELDS),
+                        'frame': [self.frame_width, self.frame_height],
+                        'start': positions[0][2].isoformat() if positions else None,
+                        'points': points,
+                        'raw_points': track.positions_seen
+                    }
                 })
-            )
+            ))
+            await self._flush_if_due()
             
             logger.debug(f"✅ Track finalizado: Pessoa {track.person_id} ({track.dwell_time:.1f}min)")
             
@@ -782,12 +892,25 @@ class BehaviorAnalyzer:
             'heatmap_available': self.heatmap is not None
         }
     
-    async def get_heatmap_data(self) -> Optional[np.ndarray]:
-        """Obter dados do heatmap atual"""
+    async def get_heatmap_data(
+        self,
+        window: str = 'hour',
+        full_resolution: bool = True
+    ) -> Optional[np.ndarray]:
+        """
+        Obter dados do heatmap atual
+        
+        Args:
+            window: Janela temporal ('5min', 'hour', 'day')
+            full_resolution: Redimensionar para a resolução do frame
+        """
         if self.heatmap is not None:
             # Normalizar heatmap para visualização
-            normalized = (self.heatmap / np.max(self.heatmap) * 255).astype(np.uint8) if np.max(self.heatmap) > 0 else self.heatmap.astype(np.uint8)
-            return normalized
+            return self.heatmap.get_normalized(
+                window,
+                now=datetime.now().timestamp(),
+                full_resolution=full_resolution
+            )
         return None
     
     def configure_zones(self, zones_config: Dict[str, Any]):
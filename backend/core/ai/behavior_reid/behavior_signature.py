@@ -20,7 +20,7 @@ import cv2
 class GaitPattern:
     """Padrão de caminhada único"""
     step_frequency: float  # passos por segundo
-    stride_length: float   # comprimento da passada
+    stride_length: float   # comprimento da passada (metros se calibrado, senão pixels)
     body_sway: float      # oscilação lateral
     speed_variation: float # variação de velocidade
     symmetry: float       # simetria da caminhada
@@ -133,9 +133,10 @@ class BehaviorSignature:
 class GaitAnalyzer:
     """Analisador de padrão de caminhada"""
     
-    def __init__(self):
+    def __init__(self, perspective=None):
         self.min_track_points = 10
         self.fps = 25  # frames por segundo
+        self.perspective = perspective  # PerspectiveMap opcional (pixels -> metros)
         
     def extract_pattern(self, person_track: List[Dict]) -> GaitPattern:
         """Extrai padrão de caminhada de um tracking"""
@@ -210,6 +211,9 @@ class GaitAnalyzer:
         
         total_distance = 0
         for i in range(1, len(positions)):
+            if self.perspective is not None:
+                total_distance += self.perspective.distance_m(positions[i-1], positions[i])
+                continue
             dx = positions[i][0] - positions[i-1][0]
             dy = positions[i][1] - positions[i-1][1]
             total_distance += np.sqrt(dx*dx + dy*dy)
@@ -274,14 +278,23 @@ class BehaviorReID:
     Re-identifica pessoas por padrões comportamentais únicos
     """
     
-    def __init__(self, similarity_threshold: float = 0.75):
+    def __init__(self, similarity_threshold: float = 0.75, perspective=None):
         self.behavior_signatures: Dict[str, BehaviorSignature] = {}
-        self.gait_analyzer = GaitAnalyzer()
+        self.gait_analyzer = GaitAnalyzer(perspective=perspective)
         self.similarity_threshold = similarity_threshold
         self.scaler = StandardScaler()
         self.next_customer_id = 1
         
         logger.info("Behavior ReID inicializado")
+
+    @property
+    def perspective(self):
+        """PerspectiveMap usado pela análise de caminhada (pixels -> metros)"""
+        return self.gait_analyzer.perspective
+
+    @perspective.setter
+    def perspective(self, perspective):
+        self.gait_analyzer.perspective = perspective
     
     def extract_behavior_signature(self, person_track: List[Dict]) -> BehaviorSignature:
         """
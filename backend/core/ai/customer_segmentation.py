@@ -140,7 +140,9 @@ class CustomerSegmentation:
             self.customer_profiles.clear()
             
             for row in results:
-                profile_data = json.loads(row['profile_data'] or '{}')
+                profile_data = row['profile_data'] or {}
+                if isinstance(profile_data, str):
+                    profile_data = json.loads(profile_data)
                 
                 profile = CustomerProfile(
                     customer_id=row['customer_id'],
@@ -198,7 +198,9 @@ class FaceRecognitionManager:
             
             for row in results:
                 employee_id = row['employee_id']
-                face_encoding = json.loads(row['face_encoding']) if row['face_encoding'] else None
+                face_encoding = row['face_encoding']
+                if isinstance(face_encoding, str):
+                    face_encoding = json.loads(face_encoding)
                 
                 if face_encoding:
                     self.employee_embeddings[employee_id] = {
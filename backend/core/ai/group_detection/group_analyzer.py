@@ -9,11 +9,13 @@ from typing import Dict, List, Any, Optional, Tuple, Set
 from dataclasses import dataclass, field
 from enum import Enum
 import json
+from collections import deque
 from loguru import logger
-from sklearn.cluster import DBSCAN
 from sklearn.metrics.pairwise import euclidean_distances
 import cv2
 
+from .spatial_clustering import adaptive_eps, grid_dbscan
+
 class GroupType(Enum):
     FAMILIA = "familia"
     CASAL = "casal"
@@ -116,19 +118,150 @@ class Group:
         if len(self.position_history) > 50:
             self.position_history = self.position_history[-50:]
 
+class GroupRegistry:
+    """
+    Registro de grupos com índice invertido pessoa -> grupos ativos.
+
+    - Casar um cluster com grupos existentes só toca os grupos dos seus membros
+    - Grupos dissolvidos vão para um histórico limitado (deque)
+    - Estatísticas do dia são mantidas em contadores cumulativos
+    
+    O custo por frame depende só dos grupos ativos, não de quantos grupos
+    já existiram no dia.
+    """
+    
+    def __init__(self, history_size: int = 500):
+        self.active: Dict[str, Group] = {}
+        self.history: deque = deque(maxlen=history_size)
+        self.person_index: Dict[str, Set[str]] = {}
+        self.last_seen: Dict[str, datetime] = {}
+        
+        # Contadores cumulativos (sobrevivem à saída do histórico)
+        self.total_created = 0
+        self.type_counts: Dict[str, int] = {}
+        self.dissolved_count = 0
+        self.dissolved_duration_total = 0.0
+    
+    def __len__(self) -> int:
+        return len(self.active)
+    
+    def get(self, group_id: str) -> Optional[Group]:
+        """Busca grupo ativo ou no histórico"""
+        group = self.active.get(group_id)
+        if group is not None:
+            return group
+        for old_group in reversed(self.history):
+            if old_group.group_id == group_id:
+                return old_group
+        return None
+    
+    def add(self, group: Group, now: Optional[datetime] = None):
+        """Registra novo grupo ativo"""
+        self.active[group.group_id] = group
+        self.last_seen[group.group_id] = now or datetime.now()
+        self._index(group.group_id, group.get_member_ids())
+        
+        self.total_created += 1
+        group_type = group.group_type.value
+        self.type_counts[group_type] = self.type_counts.get(group_type, 0) + 1
+    
+    def touch(self, group_id: str, now: Optional[datetime] = None):
+        """Marca grupo como visto neste frame"""
+        if group_id in self.active:
+            self.last_seen[group_id] = now or datetime.now()
+    
+    def update_members(self, group_id: str, joined: Set[str], left: Set[str]):
+        """Atualiza o índice após mudança de membros"""
+        self._unindex(group_id, left)
+        self._index(group_id, joined)
+    
+    def find_match(self, person_ids: Set[str], min_overlap: float = 0.7) -> Optional[Group]:
+        """
+        Grupo ativo com maior sobreposição (Jaccard) com os IDs informados.
+        
+        Só grupos que compartilham ao menos um membro são candidatos.
+        """
+        candidates: Set[str] = set()
+        for person_id in person_ids:
+            candidates.update(self.person_index.get(person_id, ()))
+        
+        best_group, best_overlap = None, min_overlap
+        for group_id in candidates:
+            group = self.active[group_id]
+            existing_ids = group.get_member_ids()
+            union = len(person_ids | existing_ids)
+            overlap = len(person_ids & existing_ids) / union if union else 0.0
+            if overlap >= best_overlap:
+                best_group, best_overlap = group, overlap
+        
+        return best_group
+    
+    def dissolve(self, group_id: str, now: Optional[datetime] = None) -> Optional[Group]:
+        """Move grupo ativo para o histórico"""
+        group = self.active.pop(group_id, None)
+        if group is None:
+            return None
+        
+        self._unindex(group_id, group.get_member_ids())
+        self.last_seen.pop(group_id, None)
+        group.dissolution_time = now or datetime.now()
+        
+        self.dissolved_count += 1
+        self.dissolved_duration_total += (group.dissolution_time - group.formation_time).total_seconds()
+        self.history.append(group)
+        return group
+    
+    def dissolve_unseen(self, timeout_seconds: float, now: Optional[datetime] = None) -> List[Group]:
+        """Dissolve grupos ativos sem detecção há mais de `timeout_seconds`"""
+        now = now or datetime.now()
+        expired = [
+            group_id for group_id, seen in self.last_seen.items()
+            if (now - seen).total_seconds() > timeout_seconds
+        ]
+        return [self.dissolve(group_id, now) for group_id in expired]
+    
+    def prune_history(self, cutoff: datetime) -> int:
+        """Remove do histórico grupos dissolvidos antes de `cutoff`"""
+        removed = 0
+        while self.history and self.history[0].dissolution_time < cutoff:
+            self.history.popleft()
+            removed += 1
+        return removed
+    
+    def _index(self, group_id: str, person_ids: Set[str]):
+        for person_id in person_ids:
+            self.person_index.setdefault(person_id, set()).add(group_id)
+    
+    def _unindex(self, group_id: str, person_ids: Set[str]):
+        for person_id in person_ids:
+            group_ids = self.person_index.get(person_id)
+            if group_ids is None:
+                continue
+            group_ids.discard(group_id)
+            if not group_ids:
+                del self.person_index[person_id]
+
 class GroupDetector:
     """
     Detecta e analisa grupos de pessoas
     """
     
-    def __init__(self, proximity_threshold: float = 1.5, min_group_size: int = 2):
+    def __init__(
+        self,
+        proximity_threshold: float = 1.5,
+        min_group_size: int = 2,
+        reference_height_meters: float = 1.7,
+        dissolve_after_seconds: float = 30.0,
+        history_size: int = 500
+    ):
         self.proximity_threshold = proximity_threshold  # metros (em coordenadas da imagem)
         self.min_group_size = min_group_size
-        self.groups: Dict[str, Group] = {}
+        self.registry = GroupRegistry(history_size=history_size)
+        self.dissolve_after_seconds = dissolve_after_seconds
         self.next_group_id = 1
         
-        # Configurações de clustering
-        self.dbscan = DBSCAN(eps=proximity_threshold, min_samples=min_group_size)
+        # Configurações de clustering (eps por pessoa a partir da altura estimada)
+        self.reference_height_meters = reference_height_meters
         
         # Thresholds para análise
         self.age_height_mapping = {
@@ -152,14 +285,15 @@ class GroupDetector:
             Lista de grupos identificados
         """
         if len(people_in_frame) < self.min_group_size:
+            self._update_existing_groups([])
             return []
         
         # Extrair posições para clustering
         positions = np.array([list(person.position) for person in people_in_frame])
         person_ids = [person.person_id for person in people_in_frame]
         
-        # Aplicar clustering DBSCAN
-        cluster_labels = self.dbscan.fit_predict(positions)
+        # Aplicar clustering (mesmos rótulos do DBSCAN, eps ajustado à perspectiva)
+        cluster_labels = grid_dbscan(positions, self._clustering_eps(people_in_frame), self.min_group_size)
         
         detected_groups = []
         
@@ -183,6 +317,13 @@ class GroupDetector:
         
         return detected_groups
     
+    def _clustering_eps(self, people: List[Person]):
+        """eps por pessoa em pixels; sem altura estimada usa o limiar fixo"""
+        heights = [person.height_estimate for person in people]
+        if not all(height > 0 for height in heights):
+            return self.proximity_threshold
+        return adaptive_eps(heights, self.proximity_threshold, self.reference_height_meters)
+    
     async def _create_or_update_group(self, people: List[Person]) -> Optional[Group]:
         """Cria novo grupo ou atualiza existente"""
         person_ids = {person.person_id for person in people}
@@ -199,21 +340,8 @@ class GroupDetector:
             return await self._create_new_group(people)
     
     def _find_existing_group(self, person_ids: Set[str]) -> Optional[Group]:
-        """Encontra grupo existente com sobreposição de membros"""
-        for group in self.groups.values():
-            if group.dissolution_time:  # Grupo já dissolvido
-                continue
-                
-            existing_ids = group.get_member_ids()
-            
-            # Se há 70%+ de sobreposição, considerar mesmo grupo
-            overlap = len(person_ids.intersection(existing_ids))
-            union = len(person_ids.union(existing_ids))
-            
-            if union > 0 and (overlap / union) >= 0.7:
-                return group
-        
-        return None
+        """Encontra grupo ativo com sobreposição de membros (70%+, via índice invertido)"""
+        return self.registry.find_match(person_ids, min_overlap=0.7)
     
     async def _create_new_group(self, people: List[Person]) -> Group:
         """Cria novo grupo"""
@@ -245,7 +373,7 @@ class GroupDetector:
         group.stability_score = 1.0  # Novo grupo é estável
         
         # Armazenar
-        self.groups[group_id] = group
+        self.registry.add(group)
         
         logger.info(f"Novo grupo criado: {group_id} ({group.group_type.value}, {group.size} pessoas)")
         
@@ -270,6 +398,8 @@ class GroupDetector:
             group.remove_member(person_id)
             logger.debug(f"Pessoa {person_id} deixou o grupo {group.group_id}")
         
+        self.registry.update_members(group.group_id, new_members, left_members)
+        
         # Registrar splits/merges se significativos
         if len(left_members) > 0:
             group.splits.append({
@@ -494,11 +624,10 @@ class GroupDetector:
     
     async def track_group_dynamics(self, group_id: str) -> Optional[Dict[str, Any]]:
         """Acompanha mudanças dinâmicas no grupo"""
-        if group_id not in self.groups:
+        group = self.registry.get(group_id)
+        if group is None:
             return None
         
-        group = self.groups[group_id]
-        
         # Analisar histórico de posições
         if len(group.position_history) < 2:
             return None
@@ -583,73 +712,54 @@ class GroupDetector:
         else:
             return AgeGroup.JOVEM
     
-    async def _update_existing_groups(self, detected_groups: List[Group]):
-        """Atualiza lista de grupos, removendo grupos dissolvidos"""
+    def _update_existing_groups(self, detected_groups: List[Group]):
+        """Atualiza grupos ativos, movendo os dissolvidos para o histórico"""
         current_time = datetime.now()
         
-        # Marcar grupos que não foram detectados como dissolvidos
-        active_group_ids = {group.group_id for group in detected_groups}
+        for group in detected_groups:
+            self.registry.touch(group.group_id, current_time)
         
-        for group_id, group in self.groups.items():
-            if (group_id not in active_group_ids and 
-                group.dissolution_time is None):
-                
-                # Marcar como dissolvido se não foi visto por um tempo
-                time_since_formation = (current_time - group.formation_time).total_seconds()
-                if time_since_formation > 30:  # 30 segundos sem detecção
-                    group.dissolution_time = current_time
-                    logger.debug(f"Grupo {group_id} marcado como dissolvido")
+        # Dissolver grupos sem detecção há mais de 30 segundos
+        for group in self.registry.dissolve_unseen(self.dissolve_after_seconds, current_time):
+            logger.debug(f"Grupo {group.group_id} marcado como dissolvido")
     
     def get_active_groups(self) -> List[Group]:
         """Retorna grupos atualmente ativos"""
-        return [
-            group for group in self.groups.values()
-            if group.dissolution_time is None
-        ]
+        return list(self.registry.active.values())
     
     def get_group_statistics(self) -> Dict[str, Any]:
         """Estatísticas gerais dos grupos"""
+        registry = self.registry
         active_groups = self.get_active_groups()
-        all_groups = list(self.groups.values())
         
-        if not all_groups:
+        if registry.total_created == 0:
             return {'total_groups': 0, 'active_groups': 0}
         
-        # Análise por tipo
-        type_counts = {}
-        for group in all_groups:
-            group_type = group.group_type.value
-            type_counts[group_type] = type_counts.get(group_type, 0) + 1
-        
         # Tamanhos de grupo
         sizes = [group.size for group in active_groups]
         
+        # Duração média: dissolvidos (cumulativo) + ativos até agora
+        now = datetime.now()
+        total_duration = registry.dissolved_duration_total + sum(
+            (now - group.formation_time).total_seconds() for group in active_groups
+        )
+        
         return {
-            'total_groups_detected': len(all_groups),
+            'total_groups_detected': registry.total_created,
             'active_groups': len(active_groups),
-            'group_types': type_counts,
+            'group_types': dict(registry.type_counts),
             'avg_group_size': np.mean(sizes) if sizes else 0,
             'max_group_size': max(sizes) if sizes else 0,
-            'avg_duration': np.mean([
-                (group.dissolution_time or datetime.now() - group.formation_time).total_seconds()
-                for group in all_groups
-            ]) if all_groups else 0
+            'avg_duration': total_duration / registry.total_created
         }
     
     def cleanup_old_groups(self, max_age_hours: int = 24):
-        """Remove grupos antigos da memória"""
+        """Remove grupos antigos do histórico"""
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
         
-        to_remove = []
-        for group_id, group in self.groups.items():
-            dissolution_time = group.dissolution_time or datetime.now()
-            if dissolution_time < cutoff_time:
-                to_remove.append(group_id)
-        
-        for group_id in to_remove:
-            del self.groups[group_id]
+        removed = self.registry.prune_history(cutoff_time)
         
-        if to_remove:
-            logger.info(f"Removidos {len(to_remove)} grupos antigos")
+        if removed:
+            logger.info(f"Removidos {removed} grupos antigos")
         
-        return len(to_remove)
\ No newline at end of file
+        return removed
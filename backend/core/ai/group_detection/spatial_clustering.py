@@ -0,0 +1,154 @@
+"""
+🧩 CLUSTERING ESPACIAL - Substituto leve do DBSCAN para grupos
+Clustering por vizinhança com union-find, compartilhado pelos detectores de grupo.
+
+Para as 2-30 pessoas típicas de um frame, o custo de montar o DBSCAN do sklearn
+domina o tempo de clustering. Aqui a vizinhança é calculada direto em numpy
+(matriz densa para poucos pontos, hash espacial em grade para muitos).
+
+Semântica (igual ao DBSCAN):
+- Ponto core: tem >= min_samples vizinhos (incluindo ele mesmo) a até eps
+- Cores vizinhos pertencem ao mesmo cluster
+- Ponto de borda recebe o menor rótulo entre os clusters dos cores vizinhos
+- Demais pontos são ruído (-1)
+- Rótulos numerados na ordem do primeiro ponto core de cada cluster
+
+Com eps único o resultado é idêntico a DBSCAN(eps, min_samples).fit_predict.
+Com eps por pessoa (perspectiva), i e j são vizinhos se
+dist(i, j) <= (eps_i + eps_j) / 2.
+"""
+
+from typing import List, Sequence, Union
+
+import numpy as np
+
+# Acima disso a vizinhança usa hash espacial em vez da matriz densa
+_DENSE_MAX_POINTS = 64
+
+
+def adaptive_eps(
+    heights: Sequence[float],
+    max_distance: float,
+    reference_height_meters: float = 1.7,
+    clamp: float = 2.0
+) -> np.ndarray:
+    """
+    eps em pixels por pessoa, usando a altura da bbox como escala local.
+
+    Args:
+        heights: Alturas das bounding boxes em pixels
+        max_distance: Distância máxima em metros
+        reference_height_meters: Altura assumida de uma pessoa
+        clamp: Limita cada altura a [mediana/clamp, mediana*clamp]
+               (bboxes cortadas/oclusas não encolhem o eps demais)
+
+    Returns:
+        Array float64 com o eps de cada pessoa
+    """
+    heights = np.asarray(heights, dtype=np.float64)
+    if heights.size == 0:
+        return heights
+
+    median = float(np.median(heights))
+    if median > 0 and clamp > 0:
+        heights = np.clip(heights, median / clamp, median * clamp)
+
+    return heights * (max_distance / reference_height_meters)
+
+
+def _neighbors_dense(positions: np.ndarray, eps: np.ndarray) -> List[np.ndarray]:
+    """Vizinhança via matriz de distâncias (rápido para poucos pontos)"""
+    diff = positions[:, None, :] - positions[None, :, :]
+    dist_sq = np.einsum('ijk,ijk->ij', diff, diff)
+    radius = (eps[:, None] + eps[None, :]) * 0.5
+    adjacency = dist_sq <= radius * radius
+    return [np.flatnonzero(row) for row in adjacency]
+
+
+def _neighbors_grid(positions: np.ndarray, eps: np.ndarray) -> List[np.ndarray]:
+    """Vizinhança via hash espacial (células do tamanho do maior eps)"""
+    cell_size = float(eps.max()) or 1.0
+    cells = np.floor(positions / cell_size).astype(np.int64)
+
+    buckets = {}
+    for index, (cx, cy) in enumerate(cells.tolist()):
+        buckets.setdefault((cx, cy), []).append(index)
+
+    neighbors = []
+    for index, (cx, cy) in enumerate(cells.tolist()):
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates.extend(buckets.get((cx + dx, cy + dy), ()))
+        candidates = np.array(sorted(candidates), dtype=np.int64)
+
+        delta = positions[candidates] - positions[index]
+        dist_sq = np.einsum('ij,ij->i', delta, delta)
+        radius = (eps[candidates] + eps[index]) * 0.5
+        neighbors.append(candidates[dist_sq <= radius * radius])
+
+    return neighbors
+
+
+def grid_dbscan(
+    positions: Union[np.ndarray, Sequence[Sequence[float]]],
+    eps: Union[float, Sequence[float], np.ndarray],
+    min_samples: int = 2
+) -> np.ndarray:
+    """
+    Clustering com a mesma saída do DBSCAN.
+
+    Args:
+        positions: Posições (N, 2) em pixels
+        eps: Raio de vizinhança único ou um por ponto
+        min_samples: Vizinhos mínimos (incluindo o próprio ponto) para ser core
+
+    Returns:
+        Array int64 (N,) com rótulos de cluster (-1 = ruído)
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    count = len(positions)
+    labels = np.full(count, -1, dtype=np.int64)
+    if count == 0:
+        return labels
+
+    eps = np.broadcast_to(np.asarray(eps, dtype=np.float64), (count,))
+
+    if count <= _DENSE_MAX_POINTS:
+        neighbors = _neighbors_dense(positions, eps)
+    else:
+        neighbors = _neighbors_grid(positions, eps)
+
+    is_core = np.array([len(n) >= min_samples for n in neighbors], dtype=bool)
+
+    # Union-find entre pontos core vizinhos
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in np.flatnonzero(is_core).tolist():
+        for j in neighbors[i].tolist():
+            if j > i and is_core[j]:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Rótulos na ordem do primeiro core de cada componente
+    root_label = {}
+    for i in np.flatnonzero(is_core).tolist():
+        root = find(i)
+        if root not in root_label:
+            root_label[root] = len(root_label)
+        labels[i] = root_label[root]
+
+    # Bordas: menor rótulo entre os cores vizinhos
+    for i in np.flatnonzero(~is_core).tolist():
+        core_neighbors = [labels[j] for j in neighbors[i].tolist() if is_core[j]]
+        if core_neighbors:
+            labels[i] = min(core_neighbors)
+
+    return labels
@@ -0,0 +1,242 @@
+"""
+Heatmap Accumulator - Heatmap esparso com decaimento exponencial
+Acumula posições de pessoas em uma grade reduzida usando kernels gaussianos
+pré-calculados, aplicados apenas nos centros das detecções.
+
+Decaimento:
+- Cada janela (5 min, hora, dia) mantém um fator de escala global
+- O decaimento é aplicado de forma preguiçosa multiplicando apenas a escala
+- Novas contribuições são somadas divididas pela escala
+- A grade só é renormalizada quando a escala fica muito pequena
+"""
+
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+# Janelas padrão: nome -> constante de tempo do decaimento (segundos)
+DEFAULT_WINDOWS: Dict[str, float] = {
+    '5min': 300.0,
+    'hour': 3600.0,
+    'day': 86400.0,
+}
+
+# Abaixo deste fator de escala a grade é renormalizada (evita overflow)
+_RENORMALIZE_BELOW = 1e-9
+
+
+def gaussian_kernel(sigma: float) -> np.ndarray:
+    """Kernel gaussiano 2D normalizado (soma = 1) com raio de 3 sigmas"""
+    radius = max(1, int(math.ceil(3 * sigma)))
+    axis = np.arange(-radius, radius + 1, dtype=np.float64)
+    gauss = np.exp(-(axis ** 2) / (2 * sigma * sigma))
+    kernel = np.outer(gauss, gauss)
+    return kernel / kernel.sum()
+
+
+class _DecayingGrid:
+    """Grade de uma janela temporal com decaimento via fator de escala"""
+
+    __slots__ = ('grid', 'scale', 'time_constant', 'last_update')
+
+    def __init__(self, shape: Tuple[int, int], time_constant: float):
+        self.grid = np.zeros(shape, dtype=np.float64)
+        self.scale = 1.0
+        self.time_constant = time_constant
+        self.last_update: Optional[float] = None
+
+    def decay_to(self, now: float):
+        """Avança o decaimento até `now` alterando apenas a escala"""
+        if self.last_update is None:
+            self.last_update = now
+            return
+
+        elapsed = now - self.last_update
+        if elapsed <= 0:
+            return
+
+        self.scale *= math.exp(-elapsed / self.time_constant)
+        self.last_update = now
+
+        if self.scale < _RENORMALIZE_BELOW:
+            self.renormalize()
+
+    def renormalize(self):
+        """Incorpora a escala na grade (operação rara, O(células))"""
+        self.grid *= self.scale
+        self.scale = 1.0
+
+    def values(self) -> np.ndarray:
+        """Valores reais (já decaídos) da grade"""
+        return self.grid * self.scale
+
+
+class SparseHeatmapAccumulator:
+    """
+    Heatmap de movimento barato o suficiente para ficar ligado em produção.
+
+    Usage:
+        heatmap = SparseHeatmapAccumulator(frame_width=640, frame_height=480)
+        heatmap.add_points([(320, 240), (100, 80)], timestamp=time.time())
+        grid = heatmap.get_grid('5min')
+    """
+
+    def __init__(
+        self,
+        frame_width: int = 640,
+        frame_height: int = 480,
+        grid_width: int = 64,
+        grid_height: int = 48,
+        sigma_cells: float = 1.0,
+        windows: Optional[Dict[str, float]] = None
+    ):
+        """
+        Inicializa o acumulador.
+
+        Args:
+            frame_width: Largura do frame em pixels
+            frame_height: Altura do frame em pixels
+            grid_width: Colunas da grade reduzida
+            grid_height: Linhas da grade reduzida
+            sigma_cells: Desvio padrão do kernel gaussiano (em células)
+            windows: Janelas temporais {nome: constante de tempo em segundos}
+        """
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.set_frame_size(frame_width, frame_height)
+
+        self.kernel = gaussian_kernel(sigma_cells)
+        self.kernel_radius = self.kernel.shape[0] // 2
+
+        self.windows: Dict[str, _DecayingGrid] = {
+            name: _DecayingGrid((grid_height, grid_width), time_constant)
+            for name, time_constant in (windows or DEFAULT_WINDOWS).items()
+        }
+
+        self.total_points = 0
+
+    def set_frame_size(self, frame_width: int, frame_height: int):
+        """Atualiza a resolução do frame (mantém a grade)"""
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self._cell_scale_x = self.grid_width / float(frame_width)
+        self._cell_scale_y = self.grid_height / float(frame_height)
+
+    def add_points(self, points: Iterable[Tuple[float, float]], timestamp: Optional[float] = None):
+        """
+        Adiciona posições (em pixels) ao heatmap.
+
+        Cada ponto contribui com massa 1 distribuída pelo kernel gaussiano,
+        tocando apenas as células em volta do centro.
+        """
+        now = timestamp if timestamp is not None else time.time()
+
+        for window in self.windows.values():
+            window.decay_to(now)
+
+        radius = self.kernel_radius
+        size = self.kernel.shape[0]
+
+        for x, y in points:
+            if not (0 <= x < self.frame_width and 0 <= y < self.frame_height):
+                continue
+
+            cx = int(x * self._cell_scale_x)
+            cy = int(y * self._cell_scale_y)
+
+            # Recorte do kernel nas bordas da grade
+            y0, y1 = cy - radius, cy + radius + 1
+            x0, x1 = cx - radius, cx + radius + 1
+            ky0, kx0 = max(0, -y0), max(0, -x0)
+            ky1 = size - max(0, y1 - self.grid_height)
+            kx1 = size - max(0, x1 - self.grid_width)
+            y0, x0 = max(0, y0), max(0, x0)
+            y1, x1 = min(self.grid_height, y1), min(self.grid_width, x1)
+
+            patch = self.kernel[ky0:ky1, kx0:kx1]
+            for window in self.windows.values():
+                window.grid[y0:y1, x0:x1] += patch / window.scale
+
+            self.total_points += 1
+
+    def add_detections(self, detections: List[Dict], timestamp: Optional[float] = None):
+        """Adiciona detecções no formato {'bbox': [x1, y1, x2, y2]}"""
+        points = []
+        for detection in detections:
+            x1, y1, x2, y2 = detection['bbox']
+            points.append(((x1 + x2) / 2, (y1 + y2) / 2))
+        self.add_points(points, timestamp)
+
+    def _get_window(self, window: str) -> _DecayingGrid:
+        if window not in self.windows:
+            raise ValueError(f"Janela de heatmap desconhecida: {window} (disponíveis: {list(self.windows)})")
+        return self.windows[window]
+
+    def get_grid(self, window: str = 'hour', now: Optional[float] = None) -> np.ndarray:
+        """
+        Retorna a grade de densidade da janela, decaída até `now`.
+
+        Returns:
+            Array float32 (grid_height, grid_width)
+        """
+        grid = self._get_window(window)
+        if now is not None:
+            grid.decay_to(now)
+        return grid.values().astype(np.float32)
+
+    def get_normalized(
+        self,
+        window: str = 'hour',
+        now: Optional[float] = None,
+        full_resolution: bool = False
+    ) -> np.ndarray:
+        """
+        Retorna o heatmap normalizado para 0-255 (uint8).
+
+        Args:
+            window: Janela temporal
+            now: Timestamp de referência para o decaimento
+            full_resolution: Se True, redimensiona para a resolução do frame
+        """
+        grid = self.get_grid(window, now)
+        peak = float(grid.max())
+        if peak > 0:
+            normalized = (grid * (255.0 / peak)).astype(np.uint8)
+        else:
+            normalized = np.zeros(grid.shape, dtype=np.uint8)
+
+        if full_resolution:
+            normalized = cv2.resize(
+                normalized, (self.frame_width, self.frame_height),
+                interpolation=cv2.INTER_LINEAR
+            )
+
+        return normalized
+
+    def reset(self):
+        """Zera todas as janelas"""
+        for window in self.windows.values():
+            window.grid.fill(0.0)
+            window.scale = 1.0
+            window.last_update = None
+        self.total_points = 0
+        logger.debug("Heatmap reiniciado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do acumulador"""
+        return {
+            'grid_shape': (self.grid_height, self.grid_width),
+            'total_points': self.total_points,
+            'windows': {
+                name: {
+                    'time_constant_s': window.time_constant,
+                    'scale': window.scale,
+                    'mass': float(window.grid.sum() * window.scale)
+                }
+                for name, window in self.windows.items()
+            }
+        }
@@ -21,6 +21,7 @@ warnings.filterwarnings('ignore')
 
 from ..config import get_settings
 from ..database import DatabaseManager
+from ..app_state import get_analytics_store
 
 settings = get_settings()
 
@@ -138,11 +139,19 @@ class PredictiveEngine:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=90)
             
-            # Dados de contagem por hora
+            # Dados de contagem por hora: histórico local (Parquet/DuckDB) quando
+            # habilitado, senão agregado no Postgres
+            flow_data = []
+            analytics_store = get_analytics_store()
+            if analytics_store:
+                flow_data = await analytics_store.hourly_flow(start_date, end_date)
+
+            # Visitas = resumos de tracks (person_id); densidade e intensidade
+            # vêm dos snapshots agregados
             flow_query = """
             SELECT 
                 DATE_TRUNC('hour', timestamp) as hour,
-                COUNT(*) as visitor_count,
+                COUNT(*) FILTER (WHERE person_id IS NOT NULL) as visitor_count,
                 AVG(CAST(metadata->>'crowd_density' as float)) as avg_crowd_density,
                 AVG(CAST(metadata->>'movement_intensity' as float)) as avg_movement_intensity
             FROM behavior_analytics 
@@ -151,7 +160,8 @@ class PredictiveEngine:
             ORDER BY hour
             """
             
-            flow_data = await self.db.fetch_all(flow_query, start_date, end_date)
+            if not flow_data:
+                flow_data = await self.db.fetch_all(flow_query, start_date, end_date)
             
             # Dados de predições anteriores (para validação)
             predictions_query = """
@@ -230,11 +240,14 @@ class PredictiveEngine:
             processed = []
             
             for record in raw_data:
+                # JSONB chega decodificado pelo pool SQL; texto em bancos antigos
+                predicted = record['prediction_value']
+                actual = record['actual_value']
                 processed.append({
                     'timestamp': record['timestamp'],
                     'type': record['prediction_type'],
-                    'predicted': json.loads(record['prediction_value']),
-                    'actual': json.loads(record['actual_value']) if record['actual_value'] else None,
+                    'predicted': json.loads(predicted) if isinstance(predicted, str) else predicted,
+                    'actual': json.loads(actual) if isinstance(actual, str) else actual,
                     'confidence': record['confidence_score'] or 0,
                     'accuracy': record['accuracy_score'] or 0
                 })
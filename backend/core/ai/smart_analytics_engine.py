@@ -20,6 +20,7 @@ from .behavior_analyzer import BehaviorAnalyzer
 from .customer_segmentation import CustomerSegmentation
 from .predictive_insights import PredictiveEngine
 from .privacy_config import PrivacyManager
+from .stage_scheduler import Stage, StageScheduler
 
 class PersonType(Enum):
     CUSTOMER = "customer"
@@ -67,13 +68,17 @@ class SmartAnalyticsEngine:
         enable_face_recognition: bool = True,
         enable_behavior_analyzer: bool = False,
         enable_customer_segmentation: bool = False,
-        enable_predictive_insights: bool = False
+        enable_predictive_insights: bool = False,
+        segmentation_interval: float = 60.0,
+        prediction_interval: float = 300.0
     ):
         self.enabled = True
         self.enable_face_recognition = enable_face_recognition
         self.enable_behavior_analyzer = enable_behavior_analyzer
         self.enable_customer_segmentation = enable_customer_segmentation
         self.enable_predictive_insights = enable_predictive_insights
+        self.segmentation_interval = segmentation_interval
+        self.prediction_interval = prediction_interval
 
         # Inicializar módulos (apenas se habilitados)
         self.face_manager = None
@@ -86,6 +91,9 @@ class SmartAnalyticsEngine:
         self.person_registry = {}  # ID -> PersonData
         self.employee_faces = {}  # employee_id -> face_encoding
         self.last_metrics = None
+
+        # Pipeline de estágios (montado em initialize com os módulos habilitados)
+        self.scheduler: Optional[StageScheduler] = None
         
         logger.info("🧠 Smart Analytics Engine inicializado")
     
@@ -120,6 +128,8 @@ class SmartAnalyticsEngine:
             # Privacy Manager (sempre inicializar)
             self.privacy = PrivacyManager()
 
+            self.scheduler = StageScheduler(self._build_stages())
+
             # Log dos módulos habilitados
             enabled_modules = []
             if self.enable_face_recognition:
@@ -136,6 +146,94 @@ class SmartAnalyticsEngine:
         except Exception as e:
             logger.error(f"❌ Erro ao inicializar IA: {e}")
             raise
+
+    async def close(self):
+        """Gravar dados pendentes dos módulos (resumos de visitas em lote)"""
+        if self.scheduler:
+            await self.scheduler.close()
+        if self.behavior_analyzer:
+            await self.behavior_analyzer.flush()
+
+    def _build_stages(self) -> List[Stage]:
+        """
+        Estágios do pipeline e suas cadências.
+
+        Identificação, comportamento, anomalias e recomendações precisam do
+        frame atual; segmentação e predições mudam na escala de minutos e
+        reaproveitam o último resultado entre execuções.
+        """
+        stages = [
+            Stage('identify', self._stage_identify, default={}),
+        ]
+
+        if self.behavior_analyzer:
+            stages.append(Stage('behavior', self._stage_behavior, depends_on=['identify'], default={}))
+
+        behavior_deps = ['behavior'] if self.behavior_analyzer else []
+
+        if self.segmentation:
+            # Também roda quando surge uma pessoa nova (no máximo a cada 5s)
+            stages.append(Stage(
+                'segmentation', self._stage_segmentation,
+                depends_on=behavior_deps,
+                every_frames=None,
+                interval_seconds=self.segmentation_interval,
+                events={'new_person'},
+                min_interval_seconds=5.0,
+                default={}
+            ))
+
+        if self.predictive:
+            # Consulta o banco: roda em background sem segurar o frame
+            stages.append(Stage(
+                'predictions', self._stage_predictions,
+                depends_on=behavior_deps,
+                every_frames=None,
+                interval_seconds=self.prediction_interval,
+                blocking=False,
+                default={}
+            ))
+
+        stages.append(Stage('anomalies', self._stage_anomalies, depends_on=behavior_deps, default=[]))
+
+        recommendation_deps = behavior_deps + ['anomalies']
+        if self.predictive:
+            recommendation_deps.append('predictions')
+        stages.append(Stage('recommendations', self._stage_recommendations, depends_on=recommendation_deps, default=[]))
+
+        return stages
+
+    async def _stage_identify(self, ctx: Dict[str, Any]) -> Dict[int, PersonType]:
+        return await self._identify_people(ctx['frame'], ctx['detections'])
+
+    async def _stage_behavior(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.behavior_analyzer.analyze(
+            ctx['detections'], ctx['results']['identify'], ctx['timestamp']
+        )
+
+    async def _stage_segmentation(self, ctx: Dict[str, Any]) -> Dict[str, int]:
+        return await self.segmentation.segment_customers(
+            self.person_registry, ctx['results'].get('behavior') or {}
+        )
+
+    async def _stage_predictions(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        historical_data = await self._get_historical_data()
+        return await self.predictive.generate_predictions(
+            historical_data=historical_data,
+            current_state=ctx['results'].get('behavior') or {},
+            timestamp=ctx['timestamp']
+        )
+
+    async def _stage_anomalies(self, ctx: Dict[str, Any]) -> List[str]:
+        return await self._detect_anomalies(ctx['results'].get('behavior') or {})
+
+    async def _stage_recommendations(self, ctx: Dict[str, Any]) -> List[str]:
+        results = ctx['results']
+        return await self._generate_recommendations(
+            results.get('behavior') or {},
+            results.get('predictions') or {},
+            results.get('anomalies') or []
+        )
     
     async def process_frame(
         self,
@@ -144,7 +242,7 @@ class SmartAnalyticsEngine:
         timestamp: datetime
     ) -> SmartMetrics:
         """
-        Processar frame com todas as análises de IA
+        Processar frame com as análises de IA devidas neste frame
         
         Args:
             frame: Frame de vídeo
@@ -154,43 +252,24 @@ class SmartAnalyticsEngine:
         Returns:
             SmartMetrics com todas as análises
         """
-        
-        # 1. Identificar pessoas (funcionários vs clientes)
-        person_types = await self._identify_people(frame, detections)
-        
-        # 2. Analisar comportamento (se habilitado)
-        behavior_data = {}
+        if self.scheduler is None:
+            self.scheduler = StageScheduler(self._build_stages())
+
+        # Resolução real da câmera (no-op quando não muda)
         if self.behavior_analyzer:
-            behavior_data = await self.behavior_analyzer.analyze(
-                detections, person_types, timestamp
-            )
+            self.behavior_analyzer.set_frame_size(frame.shape[1], frame.shape[0])
 
-        # 3. Segmentar clientes (se habilitado)
-        segments = {}
-        if self.segmentation:
-            segments = await self.segmentation.segment_customers(
-                self.person_registry, behavior_data
-            )
+        results = await self.scheduler.run({
+            'frame': frame,
+            'detections': detections,
+            'timestamp': timestamp
+        })
 
-        # 4. Gerar predições (se habilitado)
-        predictions = {}
-        if self.predictive:
-            historical_data = await self._get_historical_data()
-            predictions = await self.predictive.generate_predictions(
-                historical_data=historical_data,
-                current_state=behavior_data,
-                timestamp=timestamp
-            )
+        person_types = results.get('identify') or {}
+        behavior_data = results.get('behavior') or {}
+        segments = results.get('segmentation') or {}
+        predictions = results.get('predictions') or {}
         
-        # 5. Detectar anomalias
-        anomalies = await self._detect_anomalies(behavior_data)
-        
-        # 6. Gerar recomendações
-        recommendations = await self._generate_recommendations(
-            behavior_data, predictions, anomalies
-        )
-        
-        # 7. Compilar métricas
         metrics = SmartMetrics(
             total_people=len(detections),
             customers=sum(1 for p in person_types.values() if p == PersonType.CUSTOMER),
@@ -203,8 +282,8 @@ class SmartAnalyticsEngine:
             next_hour_prediction=predictions.get('next_hour', 0),
             conversion_probability=predictions.get('conversion_prob', 0),
             optimal_staff_needed=predictions.get('optimal_staff', 1),
-            anomalies_detected=anomalies,
-            recommendations=recommendations,
+            anomalies_detected=results.get('anomalies') or [],
+            recommendations=results.get('recommendations') or [],
             timestamp=timestamp,
             confidence_score=self._calculate_confidence(detections)
         )
@@ -332,6 +411,8 @@ class SmartAnalyticsEngine:
                 'total_time': 0,
                 'behavior_profile': {}
             }
+            if self.scheduler:
+                self.scheduler.trigger('new_person')
         else:
             self.person_registry[person_id]['last_seen'] = datetime.now()
             self.person_registry[person_id]['visit_count'] += 1
@@ -469,5 +550,6 @@ class SmartAnalyticsEngine:
                 'behavior_analysis': self.behavior_analyzer is not None,
                 'segmentation': self.segmentation is not None,
                 'predictive': self.predictive is not None
-            }
+            },
+            'pipeline': self.scheduler.get_stats() if self.scheduler else {}
         }
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Stage Scheduler - Pipeline de estágios do Smart Analytics Engine
+Cada estágio declara a própria cadência e dependências; por frame só rodam os
+estágios devidos, em ondas concorrentes, e os demais reaproveitam o último
+resultado.
+
+Cadências (combináveis):
+- every_frames=1: todo frame (padrão)
+- every_frames=N: a cada N frames
+- interval_seconds=T: no máximo a cada T segundos (relógio monotônico)
+- events={'nome'}: quando trigger('nome') for chamado, respeitando min_interval_seconds
+
+Estágios com blocking=False rodam em background: o frame usa o último resultado
+concluído e não espera (ex: predições que consultam o banco).
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Stage:
+    """Estágio do pipeline"""
+    name: str
+    func: StageFunc
+    depends_on: List[str] = field(default_factory=list)
+    every_frames: Optional[int] = 1
+    interval_seconds: Optional[float] = None
+    events: Set[str] = field(default_factory=set)
+    min_interval_seconds: float = 0.0
+    blocking: bool = True
+    default: Any = None
+
+
+@dataclass
+class StageStats:
+    """Tempo de execução de um estágio"""
+    runs: int = 0
+    skips: int = 0
+    errors: int = 0
+    last_ms: float = 0.0
+    avg_ms: float = 0.0  # Média móvel exponencial
+    max_ms: float = 0.0
+    total_ms: float = 0.0
+    last_run: Optional[float] = None  # time.monotonic()
+
+
+class StageScheduler:
+    """
+    Executa os estágios devidos em ondas: cada onda contém os estágios cujas
+    dependências já rodaram (ou têm resultado anterior) e roda com asyncio.gather.
+    """
+
+    def __init__(self, stages: List[Stage], ema_alpha: float = 0.1):
+        self.stages: Dict[str, Stage] = {}
+        self.stats: Dict[str, StageStats] = {}
+        self.results: Dict[str, Any] = {}
+        self.ema_alpha = ema_alpha
+
+        self.frame_count = 0
+        self.frame_stats = StageStats()
+        self._pending_events: Set[str] = set()
+        self._background: Dict[str, asyncio.Task] = {}
+
+        for stage in stages:
+            self.add_stage(stage)
+        self._order = self._topological_order()
+
+    def add_stage(self, stage: Stage):
+        """Registrar estágio (dependências precisam existir antes da execução)"""
+        if stage.name in self.stages:
+            raise ValueError(f"Estágio duplicado: {stage.name}")
+        self.stages[stage.name] = stage
+        self.stats[stage.name] = StageStats()
+        self.results[stage.name] = stage.default
+        self._order = None
+
+    def _topological_order(self) -> List[str]:
+        """Ordem estável respeitando dependências (erro em ciclos ou dependência ausente)"""
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visitando, 2 = concluído
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Ciclo de dependências: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Dependência desconhecida: {name} (em {path[-1] if path else '?'})")
+            state[name] = 1
+            for dep in self.stages[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def trigger(self, event: str):
+        """Marcar evento: estágios que o escutam rodam no próximo frame"""
+        self._pending_events.add(event)
+
+    def _is_due(self, stage: Stage, now: float) -> bool:
+        """Verificar se o estágio deve rodar neste frame"""
+        last_run = self.stats[stage.name].last_run
+        if last_run is None:
+            return True
+
+        elapsed = now - last_run
+        if stage.events & self._pending_events and elapsed >= stage.min_interval_seconds:
+            return True
+        if stage.interval_seconds is not None and elapsed >= stage.interval_seconds:
+            return True
+        if stage.every_frames and self.frame_count % stage.every_frames == 0:
+            return True
+        return False
+
+    def _record(self, name: str, started: float, error: bool = False):
+        """Atualizar estatísticas de tempo do estágio"""
+        stats = self.stats[name]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats.runs += 1
+        stats.errors += int(error)
+        stats.last_ms = elapsed_ms
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.avg_ms = elapsed_ms if stats.runs == 1 else (
+            self.ema_alpha * elapsed_ms + (1 - self.ema_alpha) * stats.avg_ms
+        )
+
+    async def _run_stage(self, stage: Stage, context: Dict[str, Any]):
+        """Executar um estágio; em erro mantém o último resultado"""
+        started = time.perf_counter()
+        try:
+            self.results[stage.name] = await stage.func(context)
+            self._record(stage.name, started)
+        except Exception as e:
+            self._record(stage.name, started, error=True)
+            logger.error(f"❌ Erro no estágio {stage.name}: {e}")
+
+    def _start_background(self, stage: Stage, context: Dict[str, Any]) -> bool:
+        """Disparar estágio não bloqueante (um por vez por estágio)"""
+        running = self._background.get(stage.name)
+        if running and not running.done():
+            return False
+
+        task = asyncio.create_task(self._run_stage(stage, dict(context)))
+        self._background[stage.name] = task
+        return True
+
+    async def run(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Executar os estágios devidos para um frame.
+
+        Args:
+            context: Entradas do frame (frame, detections, timestamp...); os
+                estágios leem os resultados anteriores em context['results']
+
+        Returns:
+            Resultados de todos os estágios (atuais ou do último run)
+        """
+        if self._order is None:
+            self._order = self._topological_order()
+
+        frame_started = time.perf_counter()
+        now = time.monotonic()
+        self.frame_count += 1
+
+        due = {name for name in self._order if self._is_due(self.stages[name], now)}
+        for name in self.stages:
+            if name not in due:
+                self.stats[name].skips += 1
+        self._pending_events.clear()
+
+        context = {**context, 'results': self.results}
+        done: Set[str] = set()
+        remaining = [name for name in self._order if name in due]
+
+        while remaining:
+            # Onda: estágios sem dependência devida ainda pendente
+            wave = [
+                name for name in remaining
+                if not any(dep in due and dep not in done for dep in self.stages[name].depends_on)
+            ]
+
+            blocking = []
+            for name in wave:
+                stage = self.stages[name]
+                self.stats[name].last_run = now
+                if stage.blocking:
+                    blocking.append(self._run_stage(stage, context))
+                elif not self._start_background(stage, context):
+                    self.stats[name].skips += 1
+
+            if blocking:
+                await asyncio.gather(*blocking)
+
+            done.update(wave)
+            remaining = [name for name in remaining if name not in done]
+
+        self._record_frame(frame_started)
+        return self.results
+
+    def _record_frame(self, started: float):
+        """Estatísticas do frame completo"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats = self.frame_stats
+        stats.runs += 1
+        stats.last_ms = elapsed_ms
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.avg_ms = elapsed_ms if stats.runs == 1 else (
+            self.ema_alpha * elapsed_ms + (1 - self.ema_alpha) * stats.avg_ms
+        )
+
+    async def close(self):
+        """Aguardar estágios em background"""
+        tasks = [task for task in self._background.values() if not task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._background.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tempo por estágio e por frame (ms)"""
+        def serialize(stats: StageStats) -> Dict[str, Any]:
+            return {
+                'runs': stats.runs,
+                'skips': stats.skips,
+                'errors': stats.errors,
+                'last_ms': round(stats.last_ms, 3),
+                'avg_ms': round(stats.avg_ms, 3),
+                'max_ms': round(stats.max_ms, 3),
+                'total_ms': round(stats.total_ms, 1)
+            }
+
+        return {
+            'frames': self.frame_count,
+            'frame': serialize(self.frame_stats),
+            'stages': {
+                name: {
+                    **serialize(self.stats[name]),
+                    'depends_on': self.stages[name].depends_on,
+                    'blocking': self.stages[name].blocking,
+                    'running': bool(self._background.get(name) and not self._background[name].done())
+                }
+                for name in self._order or self.stages
+            }
+        }
@@ -0,0 +1,473 @@
+"""
+Analytics Store - Camada analítica local (Parquet + DuckDB), opcional
+
+Consultas históricas (90 dias de fluxo para treino, benchmarks de 30 dias)
+via REST do Supabase trafegam linha a linha em JSON. Esta camada guarda uma
+cópia colunar local dos dados de ingestão:
+
+- Ingestão: camera_events, crossings e tracks entram em buffers em memória;
+  o flush grava um Parquet por dataset e dia em
+  <dir>/<dataset>/date=YYYY-MM-DD/part-*.parquet (fora do event loop)
+- Consulta: DuckDB embutido lê os arquivos com partition pruning pela
+  coluna date (range, group by, percentis)
+- Compactação: dias fechados viram um único arquivo
+- Retenção: remove diretórios date=... antigos (sem DELETE nem VACUUM)
+
+Datas em UTC; datetimes sem timezone são tratados como UTC.
+
+Requer duckdb e pyarrow (ANALYTICS_STORE_ENABLED=true). Sem eles o store
+fica indisponível e os consumidores usam o Supabase.
+
+Usage:
+    store = AnalyticsStore(settings.ANALYTICS_STORE_DIR)
+    await store.add_camera_event('camera1', metrics, timestamp)
+    rows = await store.hourly_flow(start, end)
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    duckdb = None
+    pa = None
+    pq = None
+
+
+# Colunas por dataset (nome, tipo DuckDB); a partição "date" é implícita
+DATASETS: Dict[str, Sequence[tuple]] = {
+    "camera_events": (
+        ("timestamp", "TIMESTAMPTZ"),
+        ("camera_id", "VARCHAR"),
+        ("total_people", "INTEGER"),
+        ("employees_count", "INTEGER"),
+        ("groups_count", "INTEGER"),
+        ("potential_customers", "INTEGER"),
+        ("processing_time_ms", "INTEGER"),
+    ),
+    "crossings": (
+        ("timestamp", "TIMESTAMPTZ"),
+        ("camera_id", "VARCHAR"),
+        ("person_id", "VARCHAR"),
+        ("action", "VARCHAR"),
+        ("confidence", "FLOAT"),
+    ),
+    "tracks": (
+        ("timestamp", "TIMESTAMPTZ"),
+        ("camera_id", "VARCHAR"),
+        ("person_id", "VARCHAR"),
+        ("person_type", "VARCHAR"),
+        ("dwell_seconds", "FLOAT"),
+        ("total_distance_m", "FLOAT"),
+        ("avg_speed_mps", "FLOAT"),
+        ("zones_visited", "INTEGER"),
+    ),
+}
+
+
+def _arrow_type(duckdb_type: str):
+    return {
+        "TIMESTAMPTZ": pa.timestamp("us", tz="UTC"),
+        "VARCHAR": pa.string(),
+        "INTEGER": pa.int32(),
+        "FLOAT": pa.float32(),
+    }[duckdb_type]
+
+
+def _arrow_schema(dataset: str):
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in DATASETS[dataset]])
+
+
+def _as_utc(value: Any) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class AnalyticsStore:
+    """Arquivos Parquet particionados por dia + DuckDB para consultas"""
+
+    def __init__(
+        self,
+        base_dir: str,
+        flush_rows: int = 5000,
+        flush_interval: float = 60.0,
+        retention_days: int = 365,
+        maintenance_interval: float = 3600.0
+    ):
+        """
+        Args:
+            base_dir: Diretório raiz dos datasets
+            flush_rows: Linhas em buffer que disparam o flush
+            flush_interval: Segundos máximos entre flushes
+            retention_days: Dias mantidos (0 = manter tudo)
+            maintenance_interval: Segundos entre compactação/retenção
+        """
+        self.base_dir = Path(base_dir)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.maintenance_interval = maintenance_interval
+
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in DATASETS}
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._last_maintenance = 0.0
+        self._flush_lock = asyncio.Lock()
+        # Troca de arquivos (compactação/retenção) x leitura pelo DuckDB
+        self._files_lock = threading.Lock()
+
+        self.stats = {
+            'rows_written': 0,
+            'files_written': 0,
+            'files_compacted': 0,
+            'partitions_dropped': 0,
+            'queries': 0,
+            'write_errors': 0
+        }
+
+    @property
+    def available(self) -> bool:
+        return duckdb is not None and pa is not None
+
+    # ========================================================================
+    # Ingestão
+    # ========================================================================
+
+    async def add_camera_event(self, camera_id: str, metrics: Dict[str, Any], timestamp: datetime):
+        """Evento processado (mesmas contagens gravadas em camera_events)"""
+        await self._append("camera_events", {
+            "timestamp": _as_utc(timestamp),
+            "camera_id": camera_id,
+            "total_people": metrics.get("total_people", 0),
+            "employees_count": metrics.get("employees_count", 0),
+            "groups_count": metrics.get("groups_count", 0),
+            "potential_customers": metrics.get("potential_customers", 0),
+            "processing_time_ms": metrics.get("processing_time_ms"),
+        })
+
+    async def add_crossing(
+        self,
+        camera_id: str,
+        person_id: str,
+        action: str,
+        confidence: float,
+        timestamp: Any
+    ):
+        """Cruzamento da linha de contagem (entrada/saída)"""
+        await self._append("crossings", {
+            "timestamp": _as_utc(timestamp),
+            "camera_id": camera_id,
+            "person_id": str(person_id),
+            "action": action,
+            "confidence": confidence,
+        })
+
+    async def add_track(self, camera_id: str, summary: Dict[str, Any], timestamp: datetime):
+        """Resumo de um track finalizado (visita)"""
+        await self._append("tracks", {
+            "timestamp": _as_utc(timestamp),
+            "camera_id": camera_id,
+            "person_id": str(summary.get("person_id")),
+            "person_type": summary.get("person_type"),
+            "dwell_seconds": summary.get("dwell_seconds"),
+            "total_distance_m": summary.get("total_distance_m"),
+            "avg_speed_mps": summary.get("avg_speed_mps"),
+            "zones_visited": summary.get("zones_visited"),
+        })
+
+    async def _append(self, dataset: str, record: Dict[str, Any]):
+        self._buffers[dataset].append(record)
+        self._buffered += 1
+
+        if (self._buffered >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Grava os buffers em Parquet. Retorna linhas gravadas."""
+        if not self.available:
+            return 0
+
+        async with self._flush_lock:
+            buffers = self._buffers
+            self._buffers = {name: [] for name in DATASETS}
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+
+            if not any(buffers.values()):
+                return 0
+
+            return await asyncio.to_thread(self._write_buffers, buffers)
+
+    def _write_buffers(self, buffers: Dict[str, List[Dict[str, Any]]]) -> int:
+        written = 0
+        for dataset, rows in buffers.items():
+            by_day: Dict[date, List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_day.setdefault(row["timestamp"].date(), []).append(row)
+
+            for day, day_rows in by_day.items():
+                try:
+                    table = pa.Table.from_pylist(day_rows, schema=_arrow_schema(dataset))
+                    self._write_file(dataset, day, table)
+                    written += len(day_rows)
+                except Exception as e:
+                    self.stats['write_errors'] += 1
+                    logger.error(f"Erro ao gravar {dataset} {day} no analytics store: {e}")
+
+        self.stats['rows_written'] += written
+        return written
+
+    def _partition_dir(self, dataset: str, day: date) -> Path:
+        return self.base_dir / dataset / f"date={day.isoformat()}"
+
+    def _write_file(self, dataset: str, day: date, table) -> Path:
+        directory = self._partition_dir(dataset, day)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Grava com outro nome e renomeia: leitores nunca veem arquivo parcial
+        name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        tmp_path = directory / f".{name}.tmp"
+        final_path = directory / f"{name}.parquet"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, final_path)
+
+        self.stats['files_written'] += 1
+        return final_path
+
+    # ========================================================================
+    # Manutenção
+    # ========================================================================
+
+    async def maintain(self, force: bool = False) -> Dict[str, int]:
+        """Compactar dias fechados e aplicar retenção (no máximo 1x por intervalo)"""
+        if not self.available:
+            return {}
+        if not force and time.monotonic() - self._last_maintenance < self.maintenance_interval:
+            return {}
+        self._last_maintenance = time.monotonic()
+
+        dropped = await asyncio.to_thread(self._drop_expired_partitions)
+        compacted = await asyncio.to_thread(self._compact_closed_days)
+        if compacted or dropped:
+            logger.info(f"🗂️ Analytics store: {compacted} dias compactados, {dropped} partições removidas")
+        return {"compacted": compacted, "dropped": dropped}
+
+    def _partitions(self, dataset: str) -> List[tuple]:
+        root = self.base_dir / dataset
+        if not root.exists():
+            return []
+        partitions = []
+        for directory in root.iterdir():
+            if directory.is_dir() and directory.name.startswith("date="):
+                try:
+                    partitions.append((date.fromisoformat(directory.name[5:]), directory))
+                except ValueError:
+                    continue
+        return sorted(partitions)
+
+    def _compact_closed_days(self) -> int:
+        today = datetime.now(timezone.utc).date()
+        compacted = 0
+
+        for dataset in DATASETS:
+            for day, directory in self._partitions(dataset):
+                files = sorted(directory.glob("*.parquet"))
+                if day >= today or len(files) <= 1:
+                    continue
+
+                try:
+                    table = pa.concat_tables([
+                        pq.read_table(path, schema=_arrow_schema(dataset)) for path in files
+                    ]).sort_by("timestamp")
+
+                    name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+                    tmp_path = directory / f".{name}.tmp"
+                    pq.write_table(table, tmp_path, compression="zstd")
+
+                    with self._files_lock:
+                        for path in files:
+                            path.unlink()
+                        os.replace(tmp_path, directory / f"{name}.parquet")
+
+                    self.stats['files_compacted'] += len(files)
+                    compacted += 1
+                except Exception as e:
+                    logger.error(f"Erro ao compactar {dataset} {day}: {e}")
+
+        return compacted
+
+    def _drop_expired_partitions(self) -> int:
+        if not self.retention_days or self.retention_days <= 0:
+            return 0
+
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=self.retention_days)
+        dropped = 0
+
+        for dataset in DATASETS:
+            for day, directory in self._partitions(dataset):
+                if day >= cutoff:
+                    break
+                with self._files_lock:
+                    shutil.rmtree(directory, ignore_errors=True)
+                dropped += 1
+
+        self.stats['partitions_dropped'] += dropped
+        return dropped
+
+    async def close(self):
+        await self.flush()
+
+    # ========================================================================
+    # Consultas
+    # ========================================================================
+
+    async def query(self, sql: str, params: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        SQL DuckDB sobre as views camera_events, crossings e tracks.
+
+        Filtre também pela coluna date (partição) para ler só os dias do
+        período. Parâmetros com ? ou $1.
+        """
+        if not self.available:
+            return []
+        return await asyncio.to_thread(self._query_sync, sql, list(params or []))
+
+    def _query_sync(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        connection = duckdb.connect()
+        try:
+            connection.execute("SET TimeZone = 'UTC'")
+            with self._files_lock:
+                for dataset, columns in DATASETS.items():
+                    if any((self.base_dir / dataset).glob("date=*/*.parquet")):
+                        # DDL não aceita parâmetros: caminho como literal escapado
+                        pattern = str(self.base_dir / dataset / "date=*" / "*.parquet").replace("'", "''")
+                        connection.execute(
+                            f"CREATE VIEW {dataset} AS "
+                            f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)"
+                        )
+                    else:
+                        ddl = ", ".join(f"{name} {kind}" for name, kind in columns)
+                        connection.execute(f"CREATE TABLE {dataset} ({ddl}, date DATE)")
+
+                cursor = connection.execute(sql, params)
+                names = [column[0] for column in cursor.description]
+                rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+
+            self.stats['queries'] += 1
+            return rows
+        finally:
+            connection.close()
+
+    async def hourly_flow(
+        self,
+        start: datetime,
+        end: datetime,
+        camera_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fluxo por hora no formato do treino do PredictiveEngine.
+
+        hour = início da hora (UTC, sem timezone);
+        visitor_count = visitas (tracks finalizados) na hora;
+        avg_crowd_density = ocupação média (pessoas por frame);
+        avg_movement_intensity = velocidade média das visitas (m/s).
+        """
+        start, end = _as_utc(start), _as_utc(end)
+        camera_filter = "AND camera_id = $5" if camera_id else ""
+        params = [start.date(), end.date(), start, end] + ([camera_id] if camera_id else [])
+
+        return await self.query(f"""
+            WITH visits AS (
+                SELECT date_trunc('hour', CAST(timestamp AS TIMESTAMP)) AS hour,
+                       COUNT(*) AS visitor_count,
+                       AVG(avg_speed_mps) AS avg_movement_intensity
+                FROM tracks
+                WHERE date BETWEEN $1 AND $2 AND timestamp >= $3 AND timestamp <= $4 {camera_filter}
+                GROUP BY 1
+            ),
+            occupancy AS (
+                SELECT date_trunc('hour', CAST(timestamp AS TIMESTAMP)) AS hour,
+                       AVG(total_people) AS avg_crowd_density
+                FROM camera_events
+                WHERE date BETWEEN $1 AND $2 AND timestamp >= $3 AND timestamp <= $4 {camera_filter}
+                GROUP BY 1
+            )
+            SELECT COALESCE(v.hour, o.hour) AS hour,
+                   COALESCE(v.visitor_count, 0) AS visitor_count,
+                   o.avg_crowd_density,
+                   v.avg_movement_intensity
+            FROM visits v
+            FULL OUTER JOIN occupancy o ON o.hour = v.hour
+            ORDER BY hour
+        """, params)
+
+    async def daily_summary(
+        self,
+        start: datetime,
+        end: datetime,
+        camera_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Resumo por dia (visitantes, permanência, ocupação e percentis).
+
+        Colunas compatíveis com analytics_summary (total_visitors,
+        avg_dwell_time_minutes); vendas não são registradas pelo backend.
+        """
+        start, end = _as_utc(start), _as_utc(end)
+        camera_filter = "AND camera_id = $5" if camera_id else ""
+        params = [start.date(), end.date(), start, end] + ([camera_id] if camera_id else [])
+
+        return await self.query(f"""
+            WITH visits AS (
+                SELECT date,
+                       COUNT(*) FILTER (WHERE person_type IS DISTINCT FROM 'employee') AS total_visitors,
+                       AVG(dwell_seconds) / 60 AS avg_dwell_time_minutes,
+                       quantile_cont(dwell_seconds, 0.5) / 60 AS median_dwell_time_minutes
+                FROM tracks
+                WHERE date BETWEEN $1 AND $2 AND timestamp >= $3 AND timestamp <= $4 {camera_filter}
+                GROUP BY date
+            ),
+            occupancy AS (
+                SELECT date,
+                       AVG(total_people) AS avg_people,
+                       MAX(total_people) AS peak_people,
+                       quantile_cont(total_people, 0.95) AS p95_people
+                FROM camera_events
+                WHERE date BETWEEN $1 AND $2 AND timestamp >= $3 AND timestamp <= $4 {camera_filter}
+                GROUP BY date
+            )
+            SELECT COALESCE(v.date, o.date) AS date,
+                   COALESCE(v.total_visitors, 0) AS total_visitors,
+                   COALESCE(v.avg_dwell_time_minutes, 0) AS avg_dwell_time_minutes,
+                   v.median_dwell_time_minutes,
+                   o.avg_people, o.peak_people, o.p95_people,
+                   0 AS conversion_rate,
+                   0 AS total_revenue
+            FROM visits v
+            FULL OUTER JOIN occupancy o ON o.date = v.date
+            ORDER BY date
+        """, params)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'available': self.available,
+            'buffered_rows': self._buffered,
+            'base_dir': str(self.base_dir)
+        }
@@ -8,11 +8,15 @@ if TYPE_CHECKING:
     from core.ai.smart_analytics_engine import SmartAnalyticsEngine
     from core.rtsp_processor import RTSPFrameProcessor
     from core.database import SupabaseManager  # Adicionar import
+    from core.event_hub import EventHub
+    from core.analytics_store import AnalyticsStore
 
 # Estado global da aplicação
 smart_engine: Optional['SmartAnalyticsEngine'] = None
 rtsp_processor: Optional['RTSPFrameProcessor'] = None
 supabase_manager: Optional['SupabaseManager'] = None
+event_hub: Optional['EventHub'] = None
+analytics_store: Optional['AnalyticsStore'] = None
 
 def set_smart_engine(engine: 'SmartAnalyticsEngine'):
     """Definir a instância global do Smart Analytics Engine"""
@@ -39,4 +43,22 @@ def set_supabase_manager(db: 'SupabaseManager'):
 
 def get_supabase_manager() -> Optional['SupabaseManager']:
     """Obter a instância global do Supabase Manager"""
-    return supabase_manager
\ No newline at end of file
+    return supabase_manager
+
+def set_event_hub(hub: 'EventHub'):
+    """Definir a instância global do Event Hub"""
+    global event_hub
+    event_hub = hub
+
+def get_event_hub() -> Optional['EventHub']:
+    """Obter a instância global do Event Hub"""
+    return event_hub
+
+def set_analytics_store(store: 'AnalyticsStore'):
+    """Definir a instância global do Analytics Store (Parquet/DuckDB)"""
+    global analytics_store
+    analytics_store = store
+
+def get_analytics_store() -> Optional['AnalyticsStore']:
+    """Obter a instância global do Analytics Store (None se desabilitado)"""
+    return analytics_store
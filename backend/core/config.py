@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = ""
     SUPABASE_SERVICE_KEY: str = ""  # Carregada apenas em runtime seguro
 
+    # Postgres direto (SQL parametrizado dos módulos de IA). Vazio = só PostgREST
+    # Supabase: Settings > Database > Connection string (porta 5432 ou pooler em
+    # modo session; com pooler em modo transaction/6543 use DB_STATEMENT_CACHE_SIZE=0)
+    DATABASE_URL: str = ""  # NUNCA commitar (contém a senha do banco)
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 5
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Prepared statements por conexão
+    DB_COMMAND_TIMEOUT: float = 30.0
+
     # ========================================================================
     # 🌐 CORS & SECURITY - RESTRITIVO POR PADRÃO
     # ========================================================================
@@ -121,6 +130,8 @@ class Settings(BaseSettings):
     CAMERA_FPS_PROCESS: int = 5  # FPS para processamento
     CAMERA_RECONNECT_TIMEOUT: int = 10  # Segundos antes de tentar reconectar
     FACE_RECOGNITION_ENABLED: bool = True  # Habilitar reconhecimento facial
+    SMART_SEGMENTATION_INTERVAL_SECONDS: float = 60.0  # Cadência da segmentação de clientes
+    SMART_PREDICTION_INTERVAL_SECONDS: float = 300.0  # Cadência das predições (roda em background)
 
     # ========================================================================
     # 👥 Tracking
@@ -140,6 +151,9 @@ class Settings(BaseSettings):
     # ========================================================================
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_PASSWORD: str = ""
+    EVENT_BUS_ENABLED: bool = False  # Eventos/estado entre workers via Redis
+    EVENT_BUS_PREFIX: str = "shopflow"
+    EVENT_BUS_LEADER_TTL: int = 10  # Segundos de posse da câmera sem renovação
 
     # ========================================================================
     # 💾 File Storage
@@ -147,6 +161,21 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
     SNAPSHOT_RETENTION_DAYS: int = 7
+    CAMERA_EVENTS_RETENTION_DAYS: int = 90  # Partições de camera_events (0 = manter tudo)
+    CAMERA_EVENTS_PARTITIONS_AHEAD: int = 7  # Dias de partições criados antecipadamente
+
+    # Journal local de eventos (SQLite WAL) sincronizado em background: eventos
+    # de quedas de conexão são enviados depois (requer migration 20251117)
+    EDGE_JOURNAL_ENABLED: bool = False
+    EDGE_JOURNAL_PATH: str = "./data/edge_journal.db"
+    EDGE_JOURNAL_SYNC_SECONDS: float = 5.0  # Intervalo de envio (recua até 60s offline)
+    EDGE_JOURNAL_RETENTION_HOURS: float = 24.0  # Janela de leitura local de eventos enviados
+
+    # Cópia colunar local (Parquet + DuckDB) para consultas históricas
+    ANALYTICS_STORE_ENABLED: bool = False  # Requer duckdb e pyarrow
+    ANALYTICS_STORE_DIR: str = "./data/analytics"
+    ANALYTICS_STORE_RETENTION_DAYS: int = 365  # Partições diárias locais (0 = manter tudo)
+    ANALYTICS_STORE_FLUSH_SECONDS: int = 60  # Intervalo máximo entre gravações
     SAVE_SNAPSHOTS: bool = True
 
     # ========================================================================
@@ -158,9 +187,11 @@ class Settings(BaseSettings):
     # ========================================================================
     # 📊 Monitoring
     # ========================================================================
-    PROMETHEUS_ENABLED: bool = True
-    PROMETHEUS_PORT: int = 8090
+    PROMETHEUS_ENABLED: bool = True  # GET /metrics (requer prometheus-client)
+    PROMETHEUS_PORT: int = 8090  # Exporter separado além de /metrics (0 = desligado)
     HEALTH_CHECK_ENABLED: bool = True
+    PROFILER_ENABLED: bool = False  # POST /api/admin/profile (Bearer API_SECRET_KEY)
+    PROFILER_MAX_SECONDS: float = 60.0  # Janela máxima de amostragem
 
     # ========================================================================
     # 🔌 WebSocket
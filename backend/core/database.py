@@ -2,12 +2,25 @@
 Gerenciador do Supabase para operações no banco
 """
 
-from typing import Dict, List, Any, Optional
-from datetime import datetime, date
+from typing import AsyncIterator, Dict, List, Any, Optional, Sequence, Union
+from datetime import datetime, date, timedelta
 from supabase import create_client, Client
 from loguru import logger
+import asyncio
 import json
 
+from core.app_state import get_analytics_store
+from core.edge_journal import EdgeJournal, PermanentSyncError, get_edge_journal
+from core.metrics import pipeline_metrics, table_from_query
+from core.response_cache import response_cache
+from core.rollups import dwell_histogram_labels, load_rollup_range, summarize_rollups
+from core.sql_executor import SQLExecutor, get_sql_executor
+from core.streaming import RunningStats, TableQuery, keyset_pages
+
+# Intervalo mínimo (s) entre invalidações do cache por inserts diretos
+# (= menor TTL dos leitores de camera_events/people_events)
+EVENT_INVALIDATION_INTERVAL = 2.0
+
 class SupabaseManager:
     def __init__(self, url: str, key: str):
         """
@@ -30,6 +43,9 @@ class SupabaseManager:
         self.url = url
         self.key = key
         self.client: Optional[Client] = None
+        self.sql: Optional[SQLExecutor] = None
+        # Journal local de eventos (EDGE_JOURNAL_ENABLED), compartilhado pelo processo
+        self.journal: Optional[EdgeJournal] = get_edge_journal()
 
     async def initialize(self):
         """
@@ -56,8 +72,10 @@ class SupabaseManager:
                     )
                 logger.info("✅ Validação de ambiente de produção: OK")
 
+            # SQL parametrizado direto no Postgres (pool compartilhado, opcional)
+            self.sql = await get_sql_executor()
+
             # Criar cliente Supabase com retry e backoff exponencial
-            import time
             max_retries = 3
             retry_count = 0
 
@@ -79,7 +97,7 @@ class SupabaseManager:
                     # Backoff exponencial: 2^n segundos
                     wait_time = 2 ** retry_count
                     logger.warning(f"⚠️ Tentativa {retry_count}/{max_retries} falhou [CODE:SUPABASE_RETRY]. Aguardando {wait_time}s... Error: {conn_error}")
-                    time.sleep(wait_time)
+                    await asyncio.sleep(wait_time)
 
             return False
 
@@ -92,10 +110,13 @@ class SupabaseManager:
             logger.error(f"❌ Erro ao conectar Supabase [CODE:SUPABASE_INIT_ERROR]: {e}")
             # Permitir que o sistema funcione sem Supabase se necessário
             logger.warning("⚠️ Sistema funcionando em modo offline (sem banco) [CODE:OFFLINE_MODE]")
+            if self.journal:
+                logger.info("📒 Eventos seguem gravados no edge journal e serão sincronizados depois")
             return False
     
     async def close(self):
-        """Fechar conexão"""
+        """Fechar conexão (o pool SQL é do processo: close_sql_executor no shutdown)"""
+        self.sql = None
         if self.client:
             # Supabase client não precisa de close explícito
             self.client = None
@@ -118,29 +139,41 @@ class SupabaseManager:
         frame_height: int = 0,
         metadata: Dict = None
     ):
-        """Inserir evento de processamento de câmera - suporte a múltiplas câmeras"""
+        """
+        Inserir evento de processamento de câmera - suporte a múltiplas câmeras.
+
+        Colunas de camera_events: people_count -> total_people, customers_count
+        -> potential_customers, metadata["groups_detail"] -> groups_detail
+        (frame_width/frame_height não são persistidos). Com o edge journal, o
+        evento é gravado localmente e sincronizado em background.
+        """
+        event_data = {
+            "camera_id": camera_id,
+            "timestamp": timestamp,
+            "total_people": people_count,
+            "potential_customers": customers_count,
+            "employees_count": employees_count,
+            "groups_count": groups_count,
+            "processing_time_ms": processing_time_ms,
+            "groups_detail": (metadata or {}).get("groups_detail")
+        }
+
+        if self.journal:
+            try:
+                return await self.journal.append("camera_events", event_data, on_conflict="dedupe_key,timestamp")
+            except Exception as e:
+                logger.error(f"Erro ao gravar evento de câmera {camera_id} no journal: {e}")
+
         if not self.client:
             logger.warning("Cliente Supabase não disponível")
             return None
             
         try:
-            event_data = {
-                "camera_id": camera_id,
-                "timestamp": timestamp,
-                "people_count": people_count,
-                "customers_count": customers_count,
-                "employees_count": employees_count,
-                "groups_count": groups_count,
-                "processing_time_ms": processing_time_ms,
-                "frame_width": frame_width,
-                "frame_height": frame_height,
-                "metadata": metadata or {}
-            }
-            
             result = self.client.table("camera_events").insert(event_data).execute()
             
             if result.data:
                 logger.debug(f"Evento de câmera inserido: {camera_id} - {people_count} pessoas")
+                response_cache.invalidate_throttled("camera_events", EVENT_INVALIDATION_INTERVAL)
                 return result.data[0]
             else:
                 raise Exception("Falha ao inserir evento de câmera")
@@ -150,53 +183,49 @@ class SupabaseManager:
             return None
     
     async def get_camera_stats(self, camera_id: str = None, hours: int = 24) -> Dict:
-        """Obter estatísticas de câmera(s)"""
+        """Obter estatísticas de câmera(s) a partir dos rollups"""
         if not self.client:
             return {}
             
         try:
-            from datetime import datetime, timedelta
-            start_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-            
-            query = self.client.table("camera_events")\
-                .select("*")\
-                .gte("timestamp", start_time)
-                
-            if camera_id:
-                query = query.eq("camera_id", camera_id)
-                
-            result = query.execute()
-            
-            events = result.data or []
+            end_time = datetime.now()
+            start_time = end_time - timedelta(hours=hours)
+
+            rows = await load_rollup_range(self, start_time, end_time, camera_id)
+            totals = summarize_rollups(rows)
             
             # Agregar estatísticas
             stats = {
-                "total_events": len(events),
-                "total_people": sum(e.get("people_count", 0) for e in events),
-                "total_customers": sum(e.get("customers_count", 0) for e in events),
-                "total_employees": sum(e.get("employees_count", 0) for e in events),
-                "avg_processing_time": sum(e.get("processing_time_ms", 0) for e in events) / len(events) if events else 0,
-                "cameras_active": len(set(e.get("camera_id") for e in events)),
+                "total_events": totals["samples"],
+                "total_people": totals["people_sum"],
+                "total_customers": totals["customers_sum"],
+                "total_employees": totals["employees_sum"],
+                "avg_people": totals["avg_people"],
+                "peak_people": totals["people_max"],
+                "avg_processing_time": totals["avg_processing_time"],
+                "visits": totals["dwell_count"],
+                "avg_dwell_seconds": totals["avg_dwell_seconds"],
+                "dwell_histogram": dict(zip(dwell_histogram_labels(), totals["dwell_hist"])),
+                "cameras_active": len(set(row.get("camera_id") for row in rows if row.get("samples"))),
                 "period_hours": hours
             }
             
             # Estatísticas por câmera
             if not camera_id:
+                camera_rows: Dict[str, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    camera_rows.setdefault(row.get("camera_id", "unknown"), []).append(row)
+
                 camera_breakdown = {}
-                for event in events:
-                    cam_id = event.get("camera_id", "unknown")
-                    if cam_id not in camera_breakdown:
-                        camera_breakdown[cam_id] = {
-                            "events": 0,
-                            "people": 0,
-                            "customers": 0,
-                            "employees": 0
-                        }
-                    
-                    camera_breakdown[cam_id]["events"] += 1
-                    camera_breakdown[cam_id]["people"] += event.get("people_count", 0)
-                    camera_breakdown[cam_id]["customers"] += event.get("customers_count", 0)
-                    camera_breakdown[cam_id]["employees"] += event.get("employees_count", 0)
+                for cam_id, cam_rows in camera_rows.items():
+                    cam_totals = summarize_rollups(cam_rows)
+                    camera_breakdown[cam_id] = {
+                        "events": cam_totals["samples"],
+                        "people": cam_totals["people_sum"],
+                        "customers": cam_totals["customers_sum"],
+                        "employees": cam_totals["employees_sum"],
+                        "peak_people": cam_totals["people_max"]
+                    }
                 
                 stats["by_camera"] = camera_breakdown
             
@@ -219,27 +248,34 @@ class SupabaseManager:
         timestamp: str = None,
         metadata: Dict = None
     ):
-        """Inserir evento de pessoa (entrada/saída)"""
+        """Inserir evento de pessoa (entrada/saída); via edge journal quando habilitado"""
+        event_data = {
+            "action": action,
+            "person_tracking_id": person_tracking_id,
+            "confidence": confidence,
+            "snapshot_url": snapshot_url,
+            "metadata": metadata or {},
+        }
+
+        if timestamp:
+            event_data["timestamp"] = timestamp
+
+        if self.journal:
+            try:
+                return await self.journal.append("people_events", event_data)
+            except Exception as e:
+                logger.error(f"Erro ao gravar evento no journal: {e}")
+
         if not self.client:
             logger.warning("Cliente Supabase não disponível")
             return None
             
         try:
-            event_data = {
-                "action": action,
-                "person_tracking_id": person_tracking_id,
-                "confidence": confidence,
-                "snapshot_url": snapshot_url,
-                "metadata": metadata or {},
-            }
-            
-            if timestamp:
-                event_data["timestamp"] = timestamp
-            
             result = self.client.table("people_events").insert(event_data).execute()
             
             if result.data:
                 logger.debug(f"Evento inserido: {action} - {person_tracking_id}")
+                response_cache.invalidate_throttled("people_events", EVENT_INVALIDATION_INTERVAL)
                 return result.data[0]
             else:
                 raise Exception("Falha ao inserir evento")
@@ -249,9 +285,13 @@ class SupabaseManager:
             return None
     
     async def get_recent_events(self, limit: int = 50) -> List[Dict]:
-        """Buscar eventos recentes"""
+        """Buscar eventos recentes (do edge journal quando ele cobre o limite)"""
+        local = await self._recent_journal_rows("people_events", limit)
+        if len(local) >= limit:
+            return local
+
         if not self.client:
-            return []
+            return local
             
         try:
             result = self.client.table("people_events")\
@@ -260,11 +300,11 @@ class SupabaseManager:
                 .limit(limit)\
                 .execute()
             
-            return result.data or []
+            return self._merge_journal_rows(result.data or [], local, limit)
             
         except Exception as e:
             logger.error(f"Erro ao buscar eventos recentes: {e}")
-            return []
+            return local
     
     # ========================================================================
     # CURRENT STATS
@@ -346,26 +386,44 @@ class SupabaseManager:
     # ========================================================================
     
     async def get_hourly_stats(self, target_date: date = None) -> List[Dict]:
-        """Buscar estatísticas por hora"""
+        """Buscar estatísticas por hora (rollups de hora de todas as câmeras)"""
         if not self.client:
             return []
             
         try:
             if target_date is None:
                 target_date = date.today()
+
+            day_start = datetime.combine(target_date, datetime.min.time())
+            rows = await self.get_camera_rollups("hour", day_start, day_start + timedelta(days=1))
+
+            rows_by_hour: Dict[int, List[Dict[str, Any]]] = {}
+            for row in rows:
+                hour = datetime.fromisoformat(str(row["bucket_start"]).replace("Z", "+00:00")).hour
+                rows_by_hour.setdefault(hour, []).append(row)
+
+            hourly = []
+            for hour in sorted(rows_by_hour):
+                totals = summarize_rollups(rows_by_hour[hour])
+                hourly.append({
+                    "date": target_date.isoformat(),
+                    "hour": hour,
+                    "samples": totals["samples"],
+                    "avg_people": totals["avg_people"],
+                    "max_people": totals["people_max"],
+                    "avg_customers": totals["avg_customers"],
+                    "max_customers": totals["customers_max"],
+                    "avg_groups": totals["avg_groups"],
+                    "visits": totals["dwell_count"],
+                    "avg_dwell_seconds": totals["avg_dwell_seconds"]
+                })
             
-            result = self.client.table("hourly_stats")\
-                .select("*")\
-                .eq("date", target_date.isoformat())\
-                .order("hour")\
-                .execute()
-            
-            return result.data or []
+            return hourly
             
         except Exception as e:
             logger.error(f"Erro ao buscar stats horárias: {e}")
             return []
-    
+
     async def get_hourly_heatmap(self, target_date: date = None) -> List[Dict]:
         """Buscar dados do heatmap por hora"""
         if not self.client:
@@ -392,23 +450,21 @@ class SupabaseManager:
         try:
             hourly_data = await self.get_hourly_stats(target_date)
             
-            # Criar lista completa de 24 horas
+            # Criar lista completa de 24 horas (intensidade pela ocupação média)
+            by_hour = {item['hour']: item for item in hourly_data}
+            max_people = max([item['avg_people'] for item in hourly_data], default=0)
+
             heatmap_data = []
             for hour in range(24):
-                hour_data = next(
-                    (item for item in hourly_data if item['hour'] == hour), 
-                    {'hour': hour, 'entries': 0, 'exits': 0}
-                )
-                
-                net_traffic = hour_data['entries'] - hour_data['exits']
-                max_entries = max([item['entries'] for item in hourly_data], default=1)
-                intensity = hour_data['entries'] / max_entries if max_entries > 0 else 0
+                avg_people = by_hour.get(hour, {}).get('avg_people', 0)
+                intensity = avg_people / max_people if max_people > 0 else 0
                 
                 heatmap_data.append({
                     'hour': hour,
-                    'entries': hour_data['entries'],
-                    'exits': hour_data['exits'],
-                    'net_traffic': net_traffic,
+                    'entries': 0,
+                    'exits': 0,
+                    'net_traffic': 0,
+                    'avg_people': avg_people,
                     'intensity': round(intensity, 2)
                 })
             
@@ -490,7 +546,45 @@ class SupabaseManager:
         except Exception as e:
             logger.error(f"Erro ao buscar vendas: {e}")
             return []
-    
+
+    async def get_sales_between(self, start: datetime, end: datetime) -> List[Dict]:
+        """Buscar vendas no intervalo [start, end)"""
+        if not self.client:
+            return []
+
+        try:
+            result = self.client.table("sales")\
+                .select("amount, timestamp")\
+                .gte("timestamp", start.isoformat())\
+                .lt("timestamp", end.isoformat())\
+                .execute()
+
+            return result.data or []
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar vendas do período: {e}")
+            return []
+
+    async def count_entries_between(self, start: datetime, end: datetime) -> int:
+        """Contar entradas (cruzamentos 'entry' em people_events) no intervalo [start, end)"""
+        if not self.client:
+            return 0
+
+        try:
+            result = self.client.table("people_events")\
+                .select("id", count="exact")\
+                .eq("action", "entry")\
+                .gte("timestamp", start.isoformat())\
+                .lt("timestamp", end.isoformat())\
+                .limit(1)\
+                .execute()
+
+            return result.count or 0
+
+        except Exception as e:
+            logger.error(f"Erro ao contar entradas do período: {e}")
+            return 0
+
     # ========================================================================
     # CONVERSION RATE
     # ========================================================================
@@ -577,13 +671,19 @@ class SupabaseManager:
             conversion = await self.get_conversion_rate(target_date)
             hourly_stats = await self.get_hourly_stats(target_date)
             
-            # Encontrar horário de pico
+            # Encontrar horário de pico (maior ocupação registrada na hora)
             peak_hour = 0
             peak_count = 0
             if hourly_stats:
-                peak_data = max(hourly_stats, key=lambda x: x.get('entries', 0))
+                peak_data = max(hourly_stats, key=lambda x: x.get('max_people', 0))
                 peak_hour = peak_data.get('hour', 0)
-                peak_count = peak_data.get('entries', 0)
+                peak_count = peak_data.get('max_people', 0)
+
+            # Permanência média das visitas encerradas no dia
+            visits = sum(item.get('visits', 0) for item in hourly_stats)
+            dwell_seconds = sum(item.get('avg_dwell_seconds', 0) * item.get('visits', 0) for item in hourly_stats)
+            avg_seconds = int(dwell_seconds / visits) if visits else 0
+            avg_time_spent = f"{avg_seconds // 3600:02d}:{avg_seconds % 3600 // 60:02d}:{avg_seconds % 60:02d}"
             
             return {
                 "current_people": current_stats.get("people_count", 0),
@@ -592,7 +692,7 @@ class SupabaseManager:
                 "sales_today": conversion.get("sales_count", 0),
                 "revenue_today": conversion.get("total_sales_amount", 0),
                 "conversion_rate": conversion.get("conversion_rate", 0),
-                "avg_time_spent": "00:15:30",  # Placeholder
+                "avg_time_spent": avg_time_spent,
                 "peak_hour": peak_hour,
                 "peak_count": peak_count,
                 "last_updated": current_stats.get("last_updated"),
@@ -704,17 +804,95 @@ class SupabaseManager:
             logger.error(f"Erro ao inserir log do sistema: {e}")
             return None
     
+    # ========================================================================
+    # EDGE JOURNAL
+    # ========================================================================
+
+    async def push_journal_batch(self, table: str, rows: List[Dict[str, Any]], on_conflict: str):
+        """
+        Enviar um lote do edge journal (INSERT ... ON CONFLICT DO NOTHING).
+
+        Raises:
+            PermanentSyncError: Lote rejeitado pelo banco (reenviar não resolve)
+            Exception: Falha de conexão (o journal tenta de novo depois)
+        """
+        if not self.client:
+            raise ConnectionError("Cliente Supabase não disponível")
+
+        try:
+            self.client.table(table)\
+                .upsert(rows, on_conflict=on_conflict, ignore_duplicates=True)\
+                .execute()
+        except Exception as e:
+            # APIError do PostgREST: SQLSTATE/PGRST1xx-2xx = requisição inválida;
+            # PGRST0xx = banco inacessível (transitório)
+            code = getattr(e, "code", None)
+            if isinstance(code, str) and code and not code.startswith("PGRST0"):
+                raise PermanentSyncError(f"{code}: {e}") from e
+            raise
+
+        response_cache.invalidate(table)
+        pipeline_metrics.observe_db_batch(table, len(rows))
+        logger.debug(f"📒 {len(rows)} linhas de {table} sincronizadas")
+
+    async def _recent_journal_rows(
+        self,
+        table: str,
+        limit: int,
+        equals: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        if not self.journal:
+            return []
+        try:
+            return await self.journal.recent(table, limit, equals)
+        except Exception as e:
+            logger.error(f"Erro ao ler {table} do journal: {e}")
+            return []
+
+    @staticmethod
+    def _merge_journal_rows(
+        remote: List[Dict[str, Any]],
+        local: List[Dict[str, Any]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Linhas remotas + locais ainda não vistas no banco, mais recentes primeiro"""
+        if not local:
+            return remote
+        seen = {row.get("dedupe_key") for row in remote if row.get("dedupe_key")}
+        merged = remote + [row for row in local if row.get("dedupe_key") not in seen]
+        merged.sort(key=lambda row: str(row.get("timestamp") or ""), reverse=True)
+        return merged[:limit]
+
     # ========================================================================  
     # GENERIC DATABASE METHODS (for AI compatibility)
     # ========================================================================
     
-    async def fetch_all(self, query: str, params: tuple = None):
-        """Generic fetch all method for AI modules"""
+    async def fetch_all(self, query: str, *params) -> List[Dict[str, Any]]:
+        """
+        Executar um SELECT e retornar as linhas como dicts.
+
+        Aceita placeholders %s ou $1..$n, com parâmetros em varargs ou numa
+        única tupla/lista: fetch_all(q, a, b) == fetch_all(q, (a, b)).
+        Sem DATABASE_URL, cai no modo compatível via PostgREST.
+        """
+        if self.sql:
+            try:
+                return await self.sql.fetch(query, *params)
+            except Exception as e:
+                logger.error(f"Erro em fetch_all: {e}")
+                return []
+
         if not self.client:
             return []
-            
+
+        return await self._fetch_all_postgrest(query)
+
+    async def _fetch_all_postgrest(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Modo compatível: identifica a tabela pelo FROM e lê a tabela inteira
+        (WHERE, GROUP BY, LIMIT e parâmetros são ignorados).
+        """
         try:
-            # Parse simple SELECT queries for compatibility
             if "FROM employees" in query:
                 result = self.client.table("employees").select("*").execute()
                 return result.data or []
@@ -775,31 +953,109 @@ class SupabaseManager:
             logger.error(f"Error in fetch_all: {e}")
             return []
     
-    async def fetch_one(self, query: str, params: tuple = None):
-        """Generic fetch one method for AI modules"""
+    async def fetch_one(self, query: str, *params) -> Optional[Dict[str, Any]]:
+        """Primeira linha de um SELECT (ver fetch_all)"""
+        if self.sql:
+            try:
+                return await self.sql.fetchrow(query, *params)
+            except Exception as e:
+                logger.error(f"Erro em fetch_one: {e}")
+                return None
+
         if not self.client:
             return None
-            
+
         try:
-            results = await self.fetch_all(query, params)
+            results = await self._fetch_all_postgrest(query)
             return results[0] if results else None
         except Exception as e:
             logger.error(f"Error in fetch_one: {e}")
             return None
-    
-    async def execute(self, query: str, params: tuple = None):
-        """Generic execute method for AI modules"""
-        if not self.client:
-            return []
-            
+
+    async def execute(self, query: str, *params) -> Optional[str]:
+        """
+        Executar INSERT/UPDATE/DELETE parametrizado (ver fetch_all).
+
+        Returns:
+            Tag de status do Postgres (ex: 'INSERT 0 1') ou None se falhou
+            ou se não há DATABASE_URL configurada
+        """
+        if not self.sql:
+            self._warn_no_sql("execute")
+            return None
+
         try:
-            logger.warning(f"Generic execute called with query: {query}")
-            # For now, just log and return empty result
-            return []
+            return await self.sql.execute(query, *params)
         except Exception as e:
-            logger.error(f"Error in execute: {e}")
-            return []
-    
+            logger.error(f"Erro em execute: {e}")
+            return None
+
+    async def executemany(self, query: str, rows: List[Sequence[Any]]) -> bool:
+        """
+        Executar o mesmo INSERT/UPDATE para várias linhas (um statement preparado).
+
+        Returns:
+            True se gravou; False se falhou ou se não há DATABASE_URL
+        """
+        if not self.sql:
+            self._warn_no_sql("executemany")
+            return False
+
+        try:
+            await self.sql.executemany(query, rows)
+            pipeline_metrics.observe_db_batch(table_from_query(query), len(rows))
+            return True
+        except Exception as e:
+            logger.error(f"Erro em executemany ({len(rows)} linhas): {e}")
+            return False
+
+    async def stream(
+        self,
+        query: Union[str, TableQuery],
+        *params,
+        chunk: int = 5000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterar um SELECT grande sem materializar o resultado.
+
+        Só `chunk` linhas ficam em memória por vez:
+        - SQL (str): cursor server-side; exige DATABASE_URL
+        - TableQuery: cursor server-side com DATABASE_URL, senão paginação
+          keyset via PostgREST
+
+        Erros são propagados para o consumidor.
+
+        Usage:
+            query = TableQuery("detections", "id, confidence").gte("timestamp", since)
+            async for row in db.stream(query, chunk=5000):
+                ...
+        """
+        if isinstance(query, TableQuery):
+            if self.sql:
+                sql, args = query.to_sql()
+                async for row in self.sql.stream(sql, *args, prefetch=chunk):
+                    yield row
+            elif self.client:
+                async for page in keyset_pages(self.client, query, chunk):
+                    for row in page:
+                        yield row
+            return
+
+        if not self.sql:
+            self._warn_no_sql("stream")
+            return
+
+        async for row in self.sql.stream(query, *params, prefetch=chunk):
+            yield row
+
+    _warned_no_sql: set = set()
+
+    def _warn_no_sql(self, method: str):
+        # Uma vez por processo: os módulos de IA chamam a cada frame
+        if method not in SupabaseManager._warned_no_sql:
+            SupabaseManager._warned_no_sql.add(method)
+            logger.warning(f"⚠️ {method} ignorado: configure DATABASE_URL para SQL direto")
+
     # ========================================================================
     # ALERTS
     # ========================================================================
@@ -956,6 +1212,44 @@ class SupabaseManager:
             logger.error(f"Erro ao atualizar status da câmera {camera_id}: {e}")
             return False
     
+    async def get_camera_calibration(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        """Buscar calibração de perspectiva pelo camera_id do processador (ex: 'camera1')"""
+        if not self.client:
+            return None
+
+        try:
+            result = self.client.table("camera_calibrations")\
+                .select("calibration")\
+                .eq("camera_id", camera_id)\
+                .execute()
+
+            if result.data:
+                return result.data[0].get("calibration")
+            return None
+
+        except Exception as e:
+            logger.error(f"Erro ao buscar calibração da câmera {camera_id}: {e}")
+            return None
+
+    async def update_camera_calibration(self, camera_id: str, calibration: Dict[str, Any]) -> bool:
+        """Salvar calibração de perspectiva (upsert pelo camera_id do processador)"""
+        if not self.client:
+            return False
+
+        try:
+            result = self.client.table("camera_calibrations")\
+                .upsert(
+                    {"camera_id": camera_id, "calibration": calibration, "updated_at": datetime.now().isoformat()},
+                    on_conflict="camera_id"
+                )\
+                .execute()
+
+            return len(result.data) > 0
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar calibração da câmera {camera_id}: {e}")
+            return False
+    
     async def get_camera_events(
         self, 
         camera_id: str, 
@@ -963,9 +1257,15 @@ class SupabaseManager:
         end_date: Optional[str] = None, 
         limit: int = 100
     ) -> List[Dict[str, Any]]:
-        """Buscar eventos de uma câmera específica"""
+        """Buscar eventos de uma câmera específica (recentes: do edge journal)"""
+        local = []
+        if not start_date and not end_date:
+            local = await self._recent_journal_rows("camera_events", limit, {"camera_id": camera_id})
+            if len(local) >= limit:
+                return local
+
         if not self.client:
-            return []
+            return local
             
         try:
             query = self.client.table("camera_events")\
@@ -980,11 +1280,11 @@ class SupabaseManager:
                 query = query.lte("timestamp", end_date)
             
             result = query.execute()
-            return result.data or []
+            return self._merge_journal_rows(result.data or [], local, limit)
             
         except Exception as e:
             logger.error(f"Erro ao buscar eventos da câmera {camera_id}: {e}")
-            return []
+            return local
 
     # ========================================================================
     # ANALYTICS METHODS - SUPORTE COMPLETO AO MÓDULO ANALYTICS
@@ -1097,28 +1397,43 @@ class SupabaseManager:
                 "active_alerts": []
             }
     
-    async def get_flow_visualization_data(self, hours: int = 24) -> Dict[str, Any]:
+    async def get_flow_visualization_data(
+        self,
+        hours: int = 24,
+        camera_id: str = "camera1",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """Buscar dados de visualização de fluxo"""
         if not self.client:
             return {"heatmap_zones": [], "main_paths": [], "bottlenecks": [], "period_stats": {}}
             
         try:
-            # Buscar dados recentes de detecções reais (últimas N horas)
-            current_time = datetime.now()
-            start_time = current_time - timedelta(hours=hours)
+            # Período: explícito (start/end) ou últimas N horas
+            current_time = end or datetime.now()
+            start_time = start or current_time - timedelta(hours=hours)
 
-            detections_result = self.client.table("detections")\
-                .select("*")\
-                .gte("timestamp", start_time.isoformat())\
-                .lte("timestamp", current_time.isoformat())\
-                .execute()
+            # Heatmap a partir dos tiles persistidos (poucos tiles para qualquer período)
+            heatmap_zones = await self._get_heatmap_zones(camera_id, start_time, current_time)
 
-            real_detections = detections_result.data or []
+            # Detecções agregadas em streaming (memória constante para qualquer período)
+            detections = TableQuery("detections", "id, class_name, confidence")\
+                .gte("timestamp", start_time)\
+                .lte("timestamp", current_time)
+
+            confidence = RunningStats()
+            classes = set()
+
+            async for detection in self.stream(detections):
+                confidence.add(detection.get("confidence") or 0)
+                classes.add(detection.get("class_name", ""))
+
+            total_detections = confidence.count
 
             # Se não há detecções reais recentes, retornar dados vazios
-            if not real_detections:
+            if not total_detections:
                 return {
-                    "heatmap_zones": [],
+                    "heatmap_zones": heatmap_zones,
                     "main_paths": [],
                     "bottlenecks": [],
                     "period_stats": {
@@ -1129,21 +1444,14 @@ class SupabaseManager:
                     }
                 }
 
-            # Processar detecções reais para criar estatísticas simples
-            total_detections = len(real_detections)
-            unique_classes = len(set(d.get("class_name", "") for d in real_detections))
-
-            # Calcular média de tempo baseada em detecções
-            avg_confidence = sum(d.get("confidence", 0) for d in real_detections) / total_detections if total_detections > 0 else 0
-
             return {
-                "heatmap_zones": [],
+                "heatmap_zones": heatmap_zones,
                 "main_paths": [],
                 "bottlenecks": [],
                 "period_stats": {
                     "total_visitors": total_detections,
-                    "unique_paths": unique_classes,
-                    "avg_visit_duration": str(round(avg_confidence * 10, 1)),  # Correlação entre confiança e tempo de permanência
+                    "unique_paths": len(classes),
+                    "avg_visit_duration": str(round(confidence.mean * 10, 1)),  # Correlação entre confiança e tempo de permanência
                     "busiest_hour": f"Dados reais coletados ({total_detections} detecções)"
                 }
             }
@@ -1151,6 +1459,221 @@ class SupabaseManager:
             logger.error(f"Erro ao buscar dados de flow visualization: {e}")
             return {"heatmap_zones": [], "main_paths": [], "bottlenecks": [], "period_stats": {}}
 
+    async def _get_heatmap_zones(self, camera_id: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Zonas do heatmap somando os tiles que cobrem o período"""
+        try:
+            from core.heatmap_tiles import HeatmapTileStore, tile_to_zones
+            from core.perspective import PerspectiveCalibration, PerspectiveMap
+
+            counts, info = await HeatmapTileStore(self).load_range(camera_id, start, end)
+            logger.debug(f"Heatmap {camera_id}: {info['tiles_used']} tiles para {start} -> {end}")
+
+            # Densidade por m² quando a câmera tem calibração de perspectiva
+            cell_area_m2 = None
+            calibration = await self.get_camera_calibration(camera_id)
+            if calibration:
+                perspective = PerspectiveMap(PerspectiveCalibration.from_dict(calibration))
+                cell_area_m2 = perspective.cell_area_m2(counts.shape[1], counts.shape[0])
+
+            return tile_to_zones(counts, cell_area_m2=cell_area_m2)
+        except Exception as e:
+            logger.error(f"Erro ao montar heatmap a partir dos tiles: {e}")
+            return []
+
+    async def upsert_heatmap_tiles(self, tiles: List[Dict[str, Any]]) -> bool:
+        """Inserir/atualizar tiles de heatmap (idempotente por câmera, resolução e bucket)"""
+        if not self.client or not tiles:
+            return False
+
+        try:
+            self.client.table("heatmap_tiles")\
+                .upsert(tiles, on_conflict="camera_id,resolution,bucket_start")\
+                .execute()
+            pipeline_metrics.observe_db_batch("heatmap_tiles", len(tiles))
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar tiles de heatmap: {e}")
+            return False
+
+    async def get_heatmap_tiles(
+        self,
+        camera_id: str,
+        resolution: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Buscar tiles de heatmap de uma resolução no intervalo [start, end)"""
+        if not self.client:
+            return []
+
+        try:
+            result = self.client.table("heatmap_tiles")\
+                .select("bucket_start,width,height,dtype,counts,samples")\
+                .eq("camera_id", camera_id)\
+                .eq("resolution", resolution)\
+                .gte("bucket_start", start.isoformat())\
+                .lt("bucket_start", end.isoformat())\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Erro ao buscar tiles de heatmap ({resolution}): {e}")
+            return []
+
+    async def upsert_camera_rollups(self, rollups: List[Dict[str, Any]]) -> bool:
+        """Inserir/atualizar rollups (idempotente por câmera, resolução e bucket)"""
+        if not self.client or not rollups:
+            return False
+
+        try:
+            self.client.table("camera_rollups")\
+                .upsert(rollups, on_conflict="camera_id,resolution,bucket_start")\
+                .execute()
+            response_cache.invalidate("camera_rollups")
+            pipeline_metrics.observe_db_batch("camera_rollups", len(rollups))
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar rollups: {e}")
+            return False
+
+    async def get_camera_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime,
+        camera_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Buscar rollups de uma resolução no intervalo [start, end)"""
+        if not self.client:
+            return []
+
+        try:
+            query = self.client.table("camera_rollups")\
+                .select("*")\
+                .eq("resolution", resolution)\
+                .gte("bucket_start", start.isoformat())\
+                .lt("bucket_start", end.isoformat())\
+                .order("bucket_start")
+
+            if camera_id:
+                query = query.eq("camera_id", camera_id)
+
+            result = query.execute()
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Erro ao buscar rollups ({resolution}): {e}")
+            return []
+
+    async def refresh_camera_rollups(
+        self,
+        resolution: str,
+        start: datetime,
+        end: datetime,
+        camera_id: Optional[str] = None
+    ) -> Optional[int]:
+        """Recalcular no banco os rollups de hora/dia a partir da resolução inferior"""
+        if not self.client:
+            return None
+
+        try:
+            result = self.client.rpc("refresh_camera_rollups", {
+                "p_resolution": resolution,
+                "p_start": start.isoformat(),
+                "p_end": end.isoformat(),
+                "p_camera_id": camera_id
+            }).execute()
+            response_cache.invalidate("camera_rollups")
+            return int(result.data or 0)
+        except Exception as e:
+            logger.error(f"Erro ao recalcular rollups ({resolution}): {e}")
+            return None
+
+    async def rebuild_camera_rollups(
+        self,
+        start: datetime,
+        end: datetime,
+        camera_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Reconstruir no banco os rollups de [start, end) a partir de camera_events.
+
+        Returns:
+            Buckets gravados (minutos + horas + dias) ou None em caso de erro
+        """
+        if not self.client:
+            return None
+
+        try:
+            result = self.client.rpc("rebuild_camera_rollups", {
+                "p_start": start.isoformat(),
+                "p_end": end.isoformat(),
+                "p_camera_id": camera_id
+            }).execute()
+            response_cache.invalidate("camera_rollups")
+            return int(result.data or 0)
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir rollups: {e}")
+            return None
+
+    async def maintain_camera_events_partitions(
+        self,
+        days_ahead: int = 7,
+        retention_days: int = 90
+    ) -> Dict[str, Any]:
+        """
+        Criar partições diárias futuras de camera_events e remover as expiradas.
+
+        Returns:
+            {'created': int, 'dropped': int, 'partitions': int} ou {} em caso de erro
+        """
+        if not self.client:
+            return {}
+
+        try:
+            result = self.client.rpc("maintain_camera_events_partitions", {
+                "p_days_ahead": days_ahead,
+                "p_retention_days": retention_days
+            }).execute()
+            if result.data and result.data.get("dropped"):
+                response_cache.invalidate("camera_events")
+            return result.data or {}
+        except Exception as e:
+            logger.error(f"Erro na manutenção das partições de camera_events: {e}")
+            return {}
+
+    async def get_camera_event_buckets(
+        self,
+        start: datetime,
+        end: datetime,
+        bucket: str = "1h",
+        camera_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Contagens de camera_events agregadas no banco por bucket.
+
+        Args:
+            start: Início do período (inclusivo)
+            end: Fim do período (exclusivo)
+            bucket: '1m', '5m', '1h' ou '1d' (alinhados em UTC)
+            camera_id: Filtrar câmera (None = todas)
+
+        Returns:
+            Uma linha por bucket: bucket_start, samples, avg/max de pessoas e clientes
+        """
+        if not self.client:
+            return []
+
+        try:
+            result = self.client.rpc("get_camera_event_buckets", {
+                "p_start": start.isoformat(),
+                "p_end": end.isoformat(),
+                "p_bucket": bucket,
+                "p_camera_id": camera_id
+            }).execute()
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Erro ao buscar buckets de eventos ({bucket}): {e}")
+            return []
+
     async def get_group_analysis_data(self, days: int = 7) -> Dict[str, Any]:
         """Buscar dados de análise de grupos do Supabase"""
         if not self.client:
@@ -1234,53 +1757,65 @@ class SupabaseManager:
             return {"current_period": {}, "comparison_period": {}, "variations": {}, "insights": [], "statistical_significance": {}}
             
         try:
-            # Parse períodos
-            current_dates = current_period.replace(" to ", "to").split("to")
-            comparison_dates = comparison_period.replace(" to ", "to").split("to")
-            
-            # Buscar dados do período atual
-            current_result = self.client.table("analytics_summary")\
-                .select("*")\
-                .gte("date", current_dates[0].strip())\
-                .lte("date", current_dates[1].strip() if len(current_dates) > 1 else current_dates[0].strip())\
-                .execute()
-                
-            # Buscar dados do período de comparação  
-            comparison_result = self.client.table("analytics_summary")\
-                .select("*")\
-                .gte("date", comparison_dates[0].strip())\
-                .lte("date", comparison_dates[1].strip() if len(comparison_dates) > 1 else comparison_dates[0].strip())\
-                .execute()
-            
-            current_data = current_result.data or []
-            comparison_data = comparison_result.data or []
+            # Parse períodos ("YYYY-MM-DD to YYYY-MM-DD", fim inclusivo)
+            def parse_period(period: str):
+                dates = [part.strip() for part in period.replace(" to ", "to").split("to")]
+                start = datetime.fromisoformat(dates[0])
+                end = datetime.fromisoformat(dates[1] if len(dates) > 1 else dates[0])
+                return start, end + timedelta(days=1)
+
+            # Ocupação e permanência: rollups de hora (24 linhas por dia e câmera).
+            # Visitantes: entradas na linha de contagem; vendas/receita: tabela sales
+            async def load_period(period: str):
+                start, end = parse_period(period)
+                return (
+                    await self.get_camera_rollups("hour", start, end),
+                    await self.count_entries_between(start, end),
+                    await self.get_sales_between(start, end)
+                )
+
+            current_data, current_visitors, current_sales = await load_period(current_period)
+            comparison_data, comparison_visitors, comparison_sales = await load_period(comparison_period)
             
             # Calcular métricas agregadas
-            def calc_metrics(data):
-                if not data:
-                    return {"visitors": 0, "sales": 0, "revenue": 0, "conversion_rate": 0, "avg_time_spent": "0", "peak_hour": "00:00"}
-                    
-                total_visitors = sum(d.get("total_visitors", 0) for d in data)
-                total_purchases = sum(d.get("total_purchases", 0) for d in data)
-                total_revenue = sum(d.get("total_revenue", 0) for d in data)
-                avg_conversion = sum(d.get("conversion_rate", 0) for d in data) / len(data) if data else 0
-                avg_dwell = sum(d.get("avg_dwell_time_minutes", 0) for d in data) / len(data) if data else 0
-                
-                return {
-                    "visitors": total_visitors,
-                    "sales": total_purchases,
-                    "revenue": round(total_revenue, 2),
-                    "conversion_rate": round(avg_conversion * 100, 1),
-                    "avg_time_spent": str(round(avg_dwell, 1)),
-                    "peak_hour": "15:00"
+            def calc_metrics(data, visitors, sales):
+                sales_count = len(sales)
+                revenue = round(sum(float(sale.get("amount") or 0) for sale in sales), 2)
+                metrics = {
+                    "visitors": visitors,
+                    "sales": sales_count,
+                    "revenue": revenue,
+                    "conversion_rate": round(sales_count / visitors * 100, 2) if visitors else 0,
+                    "avg_time_spent": "0", "peak_hour": "00:00", "avg_people": 0, "peak_people": 0
                 }
+                if not data:
+                    return metrics
+
+                totals = summarize_rollups(data)
+
+                # Hora do dia com maior ocupação média no período
+                hour_totals: Dict[int, List[int]] = {}
+                for row in data:
+                    hour = datetime.fromisoformat(str(row["bucket_start"]).replace("Z", "+00:00")).hour
+                    acc = hour_totals.setdefault(hour, [0, 0])
+                    acc[0] += row.get("people_sum") or 0
+                    acc[1] += row.get("samples") or 0
+                peak_hour = max(hour_totals, key=lambda h: hour_totals[h][0] / hour_totals[h][1] if hour_totals[h][1] else 0)
+
+                metrics.update({
+                    "avg_time_spent": str(round(totals["avg_dwell_seconds"] / 60, 1)),
+                    "peak_hour": f"{peak_hour:02d}:00",
+                    "avg_people": totals["avg_people"],
+                    "peak_people": totals["people_max"]
+                })
+                return metrics
             
-            current_metrics = calc_metrics(current_data)
-            comparison_metrics = calc_metrics(comparison_data)
+            current_metrics = calc_metrics(current_data, current_visitors, current_sales)
+            comparison_metrics = calc_metrics(comparison_data, comparison_visitors, comparison_sales)
             
             # Calcular variações
             variations = {}
-            for key in ["visitors", "sales", "revenue", "conversion_rate"]:
+            for key in ["visitors", "sales", "revenue", "conversion_rate", "avg_people", "peak_people"]:
                 current_val = current_metrics[key]
                 comparison_val = comparison_metrics[key]
                 
@@ -1435,13 +1970,21 @@ class SupabaseManager:
             return {"industry_averages": {}, "store_performance": {}, "top_performers": {}, "improvement_opportunities": [], "market_context": {}}
             
         try:
-            # Buscar dados da loja atual
-            store_result = self.client.table("analytics_summary")\
-                .select("*")\
-                .gte("date", "now() - interval '30 days'")\
-                .execute()
-                
-            store_data = store_result.data or []
+            # Buscar dados da loja atual: resumo diário do histórico local
+            # (Parquet/DuckDB) quando habilitado, senão analytics_summary
+            store_data = []
+            analytics_store = get_analytics_store()
+            if analytics_store:
+                end = datetime.now()
+                store_data = await analytics_store.daily_summary(end - timedelta(days=30), end)
+
+            if not store_data:
+                store_result = self.client.table("analytics_summary")\
+                    .select("*")\
+                    .gte("date", "now() - interval '30 days'")\
+                    .execute()
+
+                store_data = store_result.data or []
             
             if not store_data:
                 return {
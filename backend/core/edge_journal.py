@@ -0,0 +1,380 @@
+"""
+Edge Journal - Persistência local primeiro, sincronização com o Supabase depois
+
+Sem o journal, uma queda de rede entre a loja e o Supabase perde os eventos
+do período (a escrita falha e só é logada). Com EDGE_JOURNAL_ENABLED:
+
+- Escritas de eventos (camera_events, people_events) vão para um journal
+  SQLite em modo WAL; as linhas entram num buffer e são gravadas em lote, numa
+  única transação (group commit), a cada `commit_interval` ou `batch_size`
+- Cada linha recebe uma dedupe_key; a sincronização em background envia os
+  pendentes em ordem com INSERT ... ON CONFLICT DO NOTHING sobre a chave, então
+  reenviar um lote (timeout após o commit remoto) não duplica nada
+- Falha de rede: o lote fica pendente e a sincronização recua (backoff)
+- Lote rejeitado pelo banco (erro de dados): tentado `max_attempts` vezes e
+  marcado como falho (fica no journal para inspeção, não bloqueia a fila)
+- Linhas já sincronizadas ficam `retention_hours` no journal e servem as
+  leituras recentes localmente
+
+Usage:
+    journal = get_edge_journal()
+    if journal:
+        row = await journal.append("people_events", {...})
+        await journal.sync(db.push_journal_batch)
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+# Estados de uma linha do journal
+PENDING = 0
+SYNCED = 1
+FAILED = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT NOT NULL UNIQUE,
+    table_name TEXT NOT NULL,
+    on_conflict TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_journal_state ON journal(state, seq);
+CREATE INDEX IF NOT EXISTS idx_journal_table ON journal(table_name, seq);
+"""
+
+
+class PermanentSyncError(Exception):
+    """Lote rejeitado pelo banco (dados inválidos): reenviar não resolve"""
+
+
+# (table, rows, on_conflict) -> envia o lote; levanta exceção se falhar
+SyncSender = Callable[[str, List[Dict[str, Any]], str], Awaitable[None]]
+
+
+class EdgeJournal:
+    """Journal SQLite (WAL) com group commit e sincronização idempotente"""
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        commit_interval: float = 0.5,
+        retention_hours: float = 24.0,
+        max_attempts: int = 5
+    ):
+        """
+        Args:
+            path: Arquivo SQLite do journal
+            batch_size: Linhas por transação local e por lote enviado
+            commit_interval: Segundos máximos de uma linha no buffer em memória
+            retention_hours: Horas que linhas sincronizadas ficam para leitura local
+            max_attempts: Tentativas de um lote rejeitado antes de marcá-lo falho
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.retention_hours = retention_hours
+        self.max_attempts = max_attempts
+
+        self._pending: List[tuple] = []
+        self._last_commit = time.monotonic()
+        self._commit_lock = asyncio.Lock()
+        self._sync_lock = asyncio.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.online: Optional[bool] = None
+        self.stats = {
+            'appended': 0,
+            'commits': 0,
+            'synced': 0,
+            'failed': 0,
+            'sync_errors': 0,
+            'pruned': 0,
+            'last_sync': None,
+            'last_error': None
+        }
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit sem fsync (durável contra crash do processo;
+        # queda de energia perde no máximo as últimas transações)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        logger.info(f"📒 Edge journal aberto: {self.path} ({self.count_pending()} pendentes)")
+
+    async def close(self):
+        await self.commit()
+        with self._db_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # ========================================================================
+    # Escrita
+    # ========================================================================
+
+    async def append(self, table: str, payload: Dict[str, Any], on_conflict: str = "dedupe_key") -> Dict[str, Any]:
+        """
+        Registrar uma linha para envio ao Supabase.
+
+        Preenche dedupe_key e timestamp (o horário do evento, não o do envio).
+        Retorna o payload registrado.
+        """
+        row = dict(payload)
+        row.setdefault("dedupe_key", uuid.uuid4().hex)
+        if not row.get("timestamp"):
+            row["timestamp"] = datetime.now(timezone.utc).isoformat()
+
+        self._pending.append((
+            row["dedupe_key"], table, on_conflict,
+            json.dumps(row, default=str), time.time()
+        ))
+        self.stats['appended'] += 1
+
+        if (len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_commit >= self.commit_interval):
+            await self.commit()
+
+        return row
+
+    async def commit(self) -> int:
+        """Gravar o buffer no SQLite numa única transação"""
+        async with self._commit_lock:
+            rows, self._pending = self._pending, []
+            self._last_commit = time.monotonic()
+            if not rows:
+                return 0
+
+            await asyncio.to_thread(self._insert_rows, rows)
+            self.stats['commits'] += 1
+            return len(rows)
+
+    def _insert_rows(self, rows: List[tuple]):
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO journal (dedupe_key, table_name, on_conflict, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ========================================================================
+    # Sincronização
+    # ========================================================================
+
+    async def sync(self, send: SyncSender) -> int:
+        """
+        Enviar pendentes em ordem até esvaziar ou falhar.
+
+        Retorna linhas sincronizadas. Falha de conexão interrompe a rodada
+        (online=False) e levanta a exceção para o chamador recuar.
+        """
+        await self.commit()
+
+        async with self._sync_lock:
+            total = 0
+            while True:
+                batch = await asyncio.to_thread(self._next_batch)
+                if not batch:
+                    break
+
+                table, on_conflict = batch[0]["table_name"], batch[0]["on_conflict"]
+                seqs = [row["seq"] for row in batch]
+                try:
+                    await send(table, [row["payload"] for row in batch], on_conflict)
+                except PermanentSyncError as e:
+                    failed = await asyncio.to_thread(self._record_failure, seqs, str(e))
+                    self.stats['sync_errors'] += 1
+                    self.stats['failed'] += failed
+                    self.stats['last_error'] = str(e)
+                    logger.error(f"❌ Lote de {table} rejeitado ({len(seqs)} linhas): {e}")
+                    if failed < len(seqs):
+                        break  # nova tentativa na próxima rodada
+                    continue
+                except Exception as e:
+                    self.stats['sync_errors'] += 1
+                    self.stats['last_error'] = str(e)
+                    if self.online is not False:
+                        logger.warning(f"⚠️ Supabase inacessível - eventos ficam no journal local: {e}")
+                    self.online = False
+                    raise
+
+                await asyncio.to_thread(self._mark_synced, seqs)
+                total += len(seqs)
+                self.stats['synced'] += len(seqs)
+
+            if self.online is False:
+                logger.info(f"✅ Supabase acessível - journal sincronizado ({total} linhas)")
+            self.online = True
+            self.stats['last_sync'] = datetime.now(timezone.utc).isoformat()
+            return total
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Próximas linhas pendentes da mesma tabela, em ordem de gravação"""
+        with self._db_lock:
+            first = self._conn.execute(
+                "SELECT table_name FROM journal WHERE state = ? ORDER BY seq LIMIT 1", (PENDING,)
+            ).fetchone()
+            if not first:
+                return []
+
+            rows = self._conn.execute(
+                "SELECT seq, table_name, on_conflict, payload FROM journal "
+                "WHERE state = ? AND table_name = ? ORDER BY seq LIMIT ?",
+                (PENDING, first[0], self.batch_size)
+            ).fetchall()
+
+        return [
+            {"seq": seq, "table_name": table, "on_conflict": on_conflict, "payload": json.loads(payload)}
+            for seq, table, on_conflict, payload in rows
+        ]
+
+    def _mark_synced(self, seqs: List[int]):
+        with self._db_lock:
+            self._conn.executemany(
+                "UPDATE journal SET state = ?, synced_at = ? WHERE seq = ?",
+                [(SYNCED, time.time(), seq) for seq in seqs]
+            )
+
+    def _record_failure(self, seqs: List[int], error: str) -> int:
+        """Conta a tentativa; marca FAILED ao atingir max_attempts. Retorna linhas marcadas."""
+        with self._db_lock:
+            self._conn.executemany(
+                "UPDATE journal SET attempts = attempts + 1, last_error = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE state END WHERE seq = ?",
+                [(error[:500], self.max_attempts, FAILED, seq) for seq in seqs]
+            )
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM journal WHERE state = ? AND seq IN ({','.join('?' * len(seqs))})",
+                (FAILED, *seqs)
+            ).fetchone()[0]
+
+    async def prune(self) -> int:
+        """Remover linhas sincronizadas fora da janela de leitura local"""
+        cutoff = time.time() - self.retention_hours * 3600
+        removed = await asyncio.to_thread(self._prune_sync, cutoff)
+        self.stats['pruned'] += removed
+        return removed
+
+    def _prune_sync(self, cutoff: float) -> int:
+        with self._db_lock:
+            cursor = self._conn.execute(
+                "DELETE FROM journal WHERE state = ? AND created_at < ?", (SYNCED, cutoff)
+            )
+            # Devolve páginas do WAL ao arquivo principal
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            return cursor.rowcount
+
+    # ========================================================================
+    # Leitura local
+    # ========================================================================
+
+    async def recent(
+        self,
+        table: str,
+        limit: int = 50,
+        equals: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Linhas mais recentes de uma tabela (pendentes e sincronizadas).
+
+        `equals` filtra por campos do payload (ex: {"camera_id": "camera1"}).
+        """
+        await self.commit()
+        return await asyncio.to_thread(self._recent_sync, table, limit, equals or {})
+
+    def _recent_sync(self, table: str, limit: int, equals: Dict[str, Any]) -> List[Dict[str, Any]]:
+        sql = "SELECT payload FROM journal WHERE table_name = ? AND state <> ?"
+        params: List[Any] = [table, FAILED]
+        for field, value in equals.items():
+            if not field.isidentifier():
+                raise ValueError(f"Campo inválido: {field!r}")
+            sql += f" AND json_extract(payload, '$.{field}') = ?"
+            params.append(value)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit)
+
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def count_pending(self) -> int:
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM journal WHERE state = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'online': self.online,
+            'buffered': len(self._pending),
+            'pending': self.count_pending(),
+            'path': str(self.path)
+        }
+
+
+# ============================================================================
+# Journal do processo
+# ============================================================================
+
+_journal: Optional[EdgeJournal] = None
+
+
+def get_edge_journal() -> Optional[EdgeJournal]:
+    """Journal compartilhado pelo processo (None com EDGE_JOURNAL_ENABLED=false)"""
+    global _journal
+
+    if _journal is not None:
+        return _journal
+
+    from core.config import settings
+
+    if not settings.EDGE_JOURNAL_ENABLED:
+        return None
+
+    journal = EdgeJournal(
+        settings.EDGE_JOURNAL_PATH,
+        retention_hours=settings.EDGE_JOURNAL_RETENTION_HOURS
+    )
+    try:
+        journal.open()
+    except Exception as e:
+        logger.error(f"❌ Erro ao abrir edge journal {settings.EDGE_JOURNAL_PATH}: {e}")
+        return None
+
+    _journal = journal
+    return _journal
+
+
+async def close_edge_journal():
+    global _journal
+
+    if _journal:
+        await _journal.close()
+        _journal = None
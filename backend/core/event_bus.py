@@ -0,0 +1,520 @@
+"""
+Event Bus - Eventos e estado compartilhados entre workers/pods
+
+Com vários workers uvicorn (ou pods), cada processo tem seu próprio EventHub.
+O EventBus replica os tópicos de câmera/alertas entre processos e guarda o
+último estado por câmera em um key-value:
+
+- Pub/sub: eventos locais (origin=None) vão para o canal <prefix>:events:<tópico>;
+  eventos de outros workers são republicados no hub local (origin=worker);
+  se a assinatura cair, é refeita com backoff exponencial
+- KV: últimas métricas e último JPEG de cada câmera (hidrata workers novos)
+- Leader election: cada câmera é processada por exatamente um worker
+  (lock com TTL renovado periodicamente)
+
+Backends:
+- RedisBackend: redis.asyncio (REDIS_URL)
+- MemoryBackend: fake em memória com a mesma interface (um processo; testes)
+
+Usage:
+    backend = create_backend(settings.REDIS_URL, settings.REDIS_PASSWORD)
+    bus = EventBus(backend, event_hub)
+    await bus.start()
+
+    leadership = CameraLeadership(backend, 'camera1', bus.worker_id,
+                                  on_acquired=processor.start, on_lost=processor.stop)
+    asyncio.create_task(leadership.run())
+"""
+
+import asyncio
+import fnmatch
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from core.event_hub import EventHub, metrics_topic, frames_topic
+from core.message_encoding import dumps, loads
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - depende do ambiente
+    aioredis = None
+
+
+# ============================================================================
+# Backends
+# ============================================================================
+
+class _MemorySubscription:
+    def __init__(self, backend: 'MemoryBackend', pattern: str):
+        self.backend = backend
+        self.pattern = pattern
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def get(self) -> Tuple[str, bytes]:
+        return await self.queue.get()
+
+    async def close(self):
+        listener = (self.pattern, self.queue)
+        if listener in self.backend._listeners:
+            self.backend._listeners.remove(listener)
+
+
+class MemoryBackend:
+    """
+    Backend em memória (fake do Redis).
+
+    Uma instância compartilhada entre vários EventBus simula vários workers.
+    """
+
+    def __init__(self):
+        self._kv: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._listeners: List[Tuple[str, asyncio.Queue]] = []
+
+    async def publish(self, channel: str, payload: bytes) -> int:
+        receivers = 0
+        for pattern, queue in list(self._listeners):
+            if fnmatch.fnmatchcase(channel, pattern):
+                queue.put_nowait((channel, payload))
+                receivers += 1
+        return receivers
+
+    async def subscribe(self, pattern: str) -> '_MemorySubscription':
+        subscription = _MemorySubscription(self, pattern)
+        self._listeners.append((pattern, subscription.queue))
+        return subscription
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._kv.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._kv[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._kv[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._alive(key)
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        current = self._alive(key)
+        if current is None or current == owner.encode():
+            await self.set(key, owner.encode(), ttl)
+            return True
+        return False
+
+    async def release_lock(self, key: str, owner: str):
+        if self._alive(key) == owner.encode():
+            del self._kv[key]
+
+    async def close(self):
+        pass
+
+
+# Renova se o lock é nosso; senão tenta pegar (SET NX)
+_ACQUIRE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub, pattern: str):
+        self.pubsub = pubsub
+        self.pattern = pattern
+
+    async def get(self) -> Tuple[str, bytes]:
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                continue
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            return channel, message['data']
+
+    async def close(self):
+        await self.pubsub.punsubscribe(self.pattern)
+        await self.pubsub.aclose() if hasattr(self.pubsub, 'aclose') else await self.pubsub.close()
+
+
+class RedisBackend:
+    """Backend Redis (pub/sub + KV + locks com TTL)"""
+
+    def __init__(self, url: str, password: str = "", client=None):
+        """
+        Args:
+            url: REDIS_URL
+            password: REDIS_PASSWORD (opcional)
+            client: Cliente redis.asyncio já criado (ex: fakeredis nos testes)
+        """
+        if client is None:
+            if aioredis is None:
+                raise ImportError("redis não instalado")
+            client = aioredis.from_url(url, password=password or None)
+        self.client = client
+
+    async def publish(self, channel: str, payload: bytes) -> int:
+        return await self.client.publish(channel, payload)
+
+    async def subscribe(self, pattern: str) -> '_RedisSubscription':
+        pubsub = self.client.pubsub()
+        await pubsub.psubscribe(pattern)
+        return _RedisSubscription(pubsub, pattern)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        await self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        result = await self.client.eval(_ACQUIRE_SCRIPT, 1, key, owner, int(ttl * 1000))
+        return bool(result)
+
+    async def release_lock(self, key: str, owner: str):
+        await self.client.eval(_RELEASE_SCRIPT, 1, key, owner)
+
+    async def close(self):
+        await self.client.aclose() if hasattr(self.client, 'aclose') else await self.client.close()
+
+
+def create_backend(url: str = "", password: str = ""):
+    """RedisBackend se redis estiver disponível e configurado; senão MemoryBackend"""
+    if url and aioredis is not None:
+        return RedisBackend(url, password)
+
+    logger.warning("Redis indisponível - event bus em memória (apenas este processo)")
+    return MemoryBackend()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# ============================================================================
+# Event bus
+# ============================================================================
+
+def _encode_envelope(topic: str, origin: str, data: Any) -> bytes:
+    """Cabeçalho JSON + '\\n' + corpo (bytes crus para frames, JSON para o resto)"""
+    raw = isinstance(data, (bytes, bytearray))
+    header = dumps({'topic': topic, 'origin': origin, 'raw': raw})
+    return header + b'\n' + (bytes(data) if raw else dumps(data))
+
+
+def _decode_envelope(payload: bytes) -> Tuple[Dict[str, Any], Any]:
+    header_bytes, _, body = payload.partition(b'\n')
+    header = loads(header_bytes)
+    return header, body if header.get('raw') else loads(body)
+
+
+class EventBus:
+    """Replica tópicos do EventHub local entre workers"""
+
+    def __init__(
+        self,
+        backend,
+        hub: EventHub,
+        worker_id: Optional[str] = None,
+        prefix: str = "shopflow",
+        topics: Iterable[str] = ('cameras.*', 'alerts'),
+        state_ttl: float = 60.0,
+        resubscribe_delay: float = 0.5,
+        max_resubscribe_delay: float = 30.0
+    ):
+        """
+        Args:
+            backend: RedisBackend ou MemoryBackend
+            hub: EventHub local
+            worker_id: Identificador único deste worker
+            prefix: Prefixo das chaves/canais
+            topics: Padrões de tópico replicados entre workers
+            state_ttl: TTL (s) das últimas métricas/JPEG no KV
+            resubscribe_delay: Espera inicial (s) para reassinar após erro no pub/sub
+            max_resubscribe_delay: Teto (s) do backoff exponencial
+        """
+        self.backend = backend
+        self.hub = hub
+        self.worker_id = worker_id or default_worker_id()
+        self.prefix = prefix
+        self.topics = list(topics)
+        self.state_ttl = state_ttl
+        self.resubscribe_delay = resubscribe_delay
+        self.max_resubscribe_delay = max_resubscribe_delay
+
+        self._tasks: List[asyncio.Task] = []
+
+        self.stats = {
+            'events_sent': 0,
+            'events_received': 0,
+            'send_errors': 0,
+            'receive_errors': 0,
+            'resubscriptions': 0
+        }
+
+    def _channel(self, topic: str) -> str:
+        return f"{self.prefix}:events:{topic}"
+
+    def _state_key(self, kind: str, camera_id: str) -> str:
+        return f"{self.prefix}:latest:{kind}:{camera_id}"
+
+    @property
+    def _pattern(self) -> str:
+        return f"{self.prefix}:events:*"
+
+    async def start(self):
+        """Inicia as tasks de envio (hub -> bus) e recebimento (bus -> hub)"""
+        remote = await self.backend.subscribe(self._pattern)
+        local = self.hub.subscribe(self.topics, max_queue=1000)
+        self._tasks = [
+            asyncio.create_task(self._forward_local_events(local)),
+            asyncio.create_task(self._receive_remote_events(remote))
+        ]
+        logger.info(f"Event bus iniciado (worker {self.worker_id})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    async def _forward_local_events(self, subscription):
+        try:
+            async for event in subscription:
+                if event.origin is not None:
+                    continue  # Veio de outro worker
+
+                try:
+                    await self.backend.publish(
+                        self._channel(event.topic),
+                        _encode_envelope(event.topic, self.worker_id, event.data)
+                    )
+                    self.stats['events_sent'] += 1
+                    await self._store_latest(event.topic, event.data)
+
+                except Exception as e:
+                    self.stats['send_errors'] += 1
+                    logger.error(f"Erro ao publicar no event bus: {e}")
+        finally:
+            subscription.close()
+
+    async def _store_latest(self, topic: str, data: Any):
+        """Guarda última métrica/JPEG por câmera no KV"""
+        parts = topic.split('.')
+        if len(parts) != 3 or parts[0] != 'cameras':
+            return
+
+        camera_id, kind = parts[1], parts[2]
+        if kind == 'metrics':
+            await self.backend.set(self._state_key('metrics', camera_id), dumps(data), self.state_ttl)
+        elif kind == 'frames':
+            await self.backend.set(self._state_key('jpeg', camera_id), bytes(data), self.state_ttl)
+
+    async def _receive_remote_events(self, remote):
+        """
+        Republica no hub local os eventos de outros workers.
+
+        Erro na assinatura (ex: conexão com o Redis caiu) não encerra a
+        replicação: a assinatura é fechada e refeita com backoff exponencial.
+        Eventos publicados enquanto isso se perdem (pub/sub); o último estado
+        de cada câmera continua no KV.
+        """
+        delay = self.resubscribe_delay
+        while True:
+            try:
+                while True:
+                    _, payload = await remote.get()
+                    delay = self.resubscribe_delay
+                    self._deliver(payload)
+            except Exception as e:
+                self.stats['receive_errors'] += 1
+                logger.warning(f"Assinatura do event bus caiu, reassinando em {delay:.1f}s: {e}")
+            finally:
+                try:
+                    await remote.close()
+                except Exception as e:
+                    logger.debug(f"Erro ao fechar assinatura do event bus: {e}")
+
+            remote = await self._resubscribe(delay)
+            delay = min(delay * 2, self.max_resubscribe_delay)
+
+    async def _resubscribe(self, delay: float):
+        """Nova assinatura do padrão de eventos (tenta até conseguir)"""
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                remote = await self.backend.subscribe(self._pattern)
+                self.stats['resubscriptions'] += 1
+                logger.info(f"Event bus: assinatura restabelecida (worker {self.worker_id})")
+                return remote
+            except Exception as e:
+                delay = min(delay * 2, self.max_resubscribe_delay)
+                logger.warning(f"Falha ao reassinar o event bus, nova tentativa em {delay:.1f}s: {e}")
+
+    def _deliver(self, payload: bytes):
+        try:
+            header, data = _decode_envelope(payload)
+            if header.get('origin') == self.worker_id:
+                return
+            self.hub.publish(header['topic'], data, origin=header.get('origin'))
+            self.stats['events_received'] += 1
+        except Exception as e:
+            logger.error(f"Evento inválido no event bus: {e}")
+
+    async def get_latest_metrics(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        value = await self.backend.get(self._state_key('metrics', camera_id))
+        return loads(value) if value else None
+
+    async def get_latest_jpeg(self, camera_id: str) -> Optional[bytes]:
+        return await self.backend.get(self._state_key('jpeg', camera_id))
+
+    async def hydrate(self, camera_ids: Iterable[str]):
+        """Carrega último estado do KV no hub local (worker recém iniciado)"""
+        for camera_id in camera_ids:
+            try:
+                metrics = await self.get_latest_metrics(camera_id)
+                if metrics is not None and self.hub.latest(metrics_topic(camera_id)) is None:
+                    self.hub.publish(metrics_topic(camera_id), metrics, origin='kv')
+
+                jpeg = await self.get_latest_jpeg(camera_id)
+                if jpeg is not None and self.hub.latest(frames_topic(camera_id)) is None:
+                    self.hub.publish(frames_topic(camera_id), jpeg, origin='kv')
+
+            except Exception as e:
+                logger.error(f"Erro ao hidratar estado da câmera {camera_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'worker_id': self.worker_id,
+            'backend': type(self.backend).__name__
+        }
+
+
+# ============================================================================
+# Leader election
+# ============================================================================
+
+class CameraLeadership:
+    """
+    Garante que cada câmera seja processada por um único worker.
+
+    O líder renova o lock a cada ttl/3; se o worker morre, o lock expira e
+    outro worker assume em até ttl segundos.
+
+    Um erro transitório na renovação (ex: Redis fora por um instante) não
+    derruba o líder: ele só deixa a câmera quando a renovação retorna que o
+    lock é de outro worker, ou quando o TTL do último lock confirmado passa
+    sem renovação bem-sucedida (a partir daí outro worker pode assumir).
+    """
+
+    def __init__(
+        self,
+        backend,
+        camera_id: str,
+        worker_id: str,
+        ttl: float = 10.0,
+        on_acquired: Optional[Callable[[], Awaitable[Any]]] = None,
+        on_lost: Optional[Callable[[], Awaitable[Any]]] = None,
+        prefix: str = "shopflow"
+    ):
+        """
+        Args:
+            backend: RedisBackend ou MemoryBackend
+            camera_id: Câmera disputada
+            worker_id: Identificador deste worker
+            ttl: Validade do lock em segundos
+            on_acquired: Chamado ao virar líder (retornar False devolve o lock)
+            on_lost: Chamado ao perder a liderança
+            prefix: Prefixo das chaves
+        """
+        self.backend = backend
+        self.camera_id = camera_id
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        self.key = f"{prefix}:leader:{camera_id}"
+        self.is_leader = False
+        self.lease_expires_at = 0.0  # monotonic; validade do último lock confirmado
+
+    async def step(self) -> bool:
+        """Uma rodada de aquisição/renovação. Retorna se é líder."""
+        # Validade contada do envio (conservador: o lock pode ter sido renovado depois)
+        started = time.monotonic()
+        try:
+            acquired = await self.backend.acquire_lock(self.key, self.worker_id, self.ttl)
+        except Exception as e:
+            if self.is_leader and time.monotonic() < self.lease_expires_at:
+                # Lock ainda válido: manter a câmera e tentar de novo na próxima rodada
+                logger.warning(
+                    f"Falha ao renovar liderança ({self.camera_id}), lock válido por "
+                    f"mais {self.lease_expires_at - time.monotonic():.1f}s: {e}"
+                )
+                return True
+            logger.error(f"Erro no leader election ({self.camera_id}): {e}")
+            acquired = False
+
+        if acquired:
+            self.lease_expires_at = started + self.ttl
+
+        if acquired and not self.is_leader:
+            self.is_leader = True
+            logger.info(f"Worker {self.worker_id} assumiu a câmera {self.camera_id}")
+            if self.on_acquired is not None and await self.on_acquired() is False:
+                # Não conseguiu iniciar: devolver para outro worker tentar
+                await self.release()
+
+        elif not acquired and self.is_leader:
+            self.is_leader = False
+            logger.warning(f"Worker {self.worker_id} perdeu a câmera {self.camera_id}")
+            if self.on_lost is not None:
+                await self.on_lost()
+
+        return self.is_leader
+
+    async def run(self):
+        """Loop de eleição (cancelar a task para encerrar)"""
+        try:
+            while True:
+                await self.step()
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            if self.is_leader:
+                await self.release()
+
+    async def release(self):
+        try:
+            await self.backend.release_lock(self.key, self.worker_id)
+        except Exception as e:
+            logger.error(f"Erro ao liberar liderança ({self.camera_id}): {e}")
+        self.is_leader = False
+        self.lease_expires_at = 0.0
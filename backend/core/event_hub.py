@@ -0,0 +1,271 @@
+"""
+Event Hub - Pub/sub em processo por tópicos
+
+Desacopla produtores (processador RTSP, engine, alertas) dos consumidores
+(WebSocket, SSE, MJPEG):
+
+- Tópicos nomeados, com histórico recente em ring buffer para quem chega depois
+- Cada assinante tem sua própria fila limitada; publicar nunca bloqueia
+- Assinantes "conflate" (ex: MJPEG) só guardam o evento mais recente
+- Cada evento é serializado uma vez (core.message_encoding) sob demanda
+
+Tópicos:
+    cameras.<camera_id>.metrics   - métricas por frame do processador
+    cameras.<camera_id>.frames    - último frame JPEG anotado
+    cameras.<camera_id>.crossings - cruzamentos de linha
+    store.metrics                 - métricas agregadas da loja (WS legado)
+    store.smart_metrics           - métricas do Smart Analytics Engine
+    alerts                        - alertas
+    system.status                 - status do sistema
+
+Padrões de assinatura no estilo glob (ex: 'cameras.*.metrics').
+
+Usage:
+    hub = EventHub()
+    hub.publish(metrics_topic('camera1'), metrics)
+
+    async with hub.subscribe('cameras.*.metrics', replay=10) as subscription:
+        async for event in subscription:
+            ...
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Union
+
+from loguru import logger
+
+from core.message_encoding import EncodedMessage, encode_message
+
+
+def metrics_topic(camera_id: str) -> str:
+    return f"cameras.{camera_id}.metrics"
+
+
+def frames_topic(camera_id: str) -> str:
+    return f"cameras.{camera_id}.frames"
+
+
+def crossings_topic(camera_id: str) -> str:
+    return f"cameras.{camera_id}.crossings"
+
+
+STORE_METRICS_TOPIC = "store.metrics"
+SMART_METRICS_TOPIC = "store.smart_metrics"
+ALERTS_TOPIC = "alerts"
+SYSTEM_STATUS_TOPIC = "system.status"
+
+
+class HubEvent:
+    """Evento publicado em um tópico"""
+
+    __slots__ = ('topic', 'seq', 'data', 'timestamp', 'origin', '_encoded')
+
+    def __init__(self, topic: str, seq: int, data: Any, timestamp: float, origin: Optional[str] = None):
+        self.topic = topic
+        self.seq = seq
+        self.data = data
+        self.timestamp = timestamp
+        self.origin = origin  # None = publicado neste processo
+        self._encoded: Optional[EncodedMessage] = None
+
+    @property
+    def encoded(self) -> EncodedMessage:
+        """Payload serializado uma única vez e compartilhado entre consumidores"""
+        if self._encoded is None:
+            self._encoded = encode_message(self.data)
+        return self._encoded
+
+
+class Subscription:
+    """Fila de eventos de um assinante"""
+
+    def __init__(self, hub: 'EventHub', patterns: List[str], max_queue: int, conflate: bool):
+        self.hub = hub
+        self.patterns = patterns
+        self.max_queue = max_queue
+        self.conflate = conflate
+        self.queue: Deque[HubEvent] = deque()
+        self.dropped = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._matches: Dict[str, bool] = {}
+
+    def matches(self, topic: str) -> bool:
+        matched = self._matches.get(topic)
+        if matched is None:
+            matched = self._matches[topic] = any(
+                pattern == topic or fnmatchcase(topic, pattern) for pattern in self.patterns
+            )
+        return matched
+
+    def _push(self, event: HubEvent):
+        if self.conflate:
+            self.queue.clear()
+        elif len(self.queue) >= self.max_queue:
+            # Consumidor lento: descartar o mais antigo
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(event)
+        self._wakeup.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[HubEvent]:
+        """Próximo evento (None se timeout ou assinatura encerrada)"""
+        while not self.queue:
+            if self.closed:
+                return None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.queue.popleft()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub._unsubscribe(self)
+            self._wakeup.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> HubEvent:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self) -> 'Subscription':
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class EventHub:
+    """Hub pub/sub em processo com histórico por tópico"""
+
+    def __init__(self, history_size: int = 100, history_sizes: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            history_size: Eventos mantidos por tópico para replay
+            history_sizes: Tamanho por padrão de tópico (ex: {'cameras.*.frames': 1})
+        """
+        self.history_size = history_size
+        self.history_sizes = history_sizes or {'cameras.*.frames': 1}
+
+        self._history: Dict[str, Deque[HubEvent]] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self._seq = itertools.count(1)
+
+        self.stats = {
+            'events_published': 0,
+            'events_delivered': 0,
+            'subscriptions_opened': 0
+        }
+
+    def _history_for(self, topic: str) -> Deque[HubEvent]:
+        history = self._history.get(topic)
+        if history is None:
+            size = self.history_size
+            for pattern, pattern_size in self.history_sizes.items():
+                if fnmatchcase(topic, pattern):
+                    size = pattern_size
+                    break
+            history = self._history[topic] = deque(maxlen=size)
+        return history
+
+    def publish(self, topic: str, data: Any, origin: Optional[str] = None) -> HubEvent:
+        """
+        Publica evento no tópico (não bloqueia; chamar do event loop).
+
+        Args:
+            topic: Tópico
+            data: Payload (dict, dataclass, bytes...)
+            origin: Worker de origem quando o evento veio do event bus
+
+        Returns:
+            HubEvent publicado
+        """
+        event = HubEvent(topic, next(self._seq), data, time.time(), origin)
+        self._history_for(topic).append(event)
+        self.stats['events_published'] += 1
+
+        for subscription in self._subscriptions:
+            if subscription.matches(topic):
+                subscription._push(event)
+                self.stats['events_delivered'] += 1
+
+        return event
+
+    def subscribe(
+        self,
+        patterns: Union[str, Iterable[str]],
+        replay: int = 0,
+        max_queue: int = 100,
+        conflate: bool = False
+    ) -> Subscription:
+        """
+        Assina um ou mais tópicos.
+
+        Args:
+            patterns: Tópico ou padrões com '*'
+            replay: Quantos eventos recentes do histórico entregar primeiro
+            max_queue: Eventos pendentes antes de descartar os mais antigos
+            conflate: Guardar só o evento mais recente (frames, estado atual)
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        subscription = Subscription(self, list(patterns), max_queue, conflate)
+
+        if replay > 0:
+            for event in self.history(subscription.patterns, limit=replay):
+                subscription._push(event)
+
+        self._subscriptions.add(subscription)
+        self.stats['subscriptions_opened'] += 1
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def history(self, patterns: Union[str, Iterable[str]], limit: int = 100) -> List[HubEvent]:
+        """Eventos recentes dos tópicos casados, em ordem de publicação"""
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        events = []
+        for topic, history in self._history.items():
+            if any(pattern == topic or fnmatchcase(topic, pattern) for pattern in patterns):
+                events.extend(history)
+
+        events.sort(key=lambda event: event.seq)
+        return events[-limit:] if limit > 0 else []
+
+    def latest(self, topic: str) -> Optional[HubEvent]:
+        history = self._history.get(topic)
+        return history[-1] if history else None
+
+    def has_subscribers(self, topic: str) -> bool:
+        return any(subscription.matches(topic) for subscription in self._subscriptions)
+
+    def pending_events(self) -> int:
+        """Eventos aguardando consumo somados entre as assinaturas"""
+        return sum(len(subscription.queue) for subscription in list(self._subscriptions))
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            return {
+                **self.stats,
+                'active_subscriptions': len(self._subscriptions),
+                'dropped_events': sum(s.dropped for s in self._subscriptions),
+                'topics': {topic: len(history) for topic, history in self._history.items()}
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter stats do event hub: {e}")
+            return {'error': str(e)}
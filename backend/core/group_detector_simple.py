@@ -13,11 +13,13 @@ Version: 1.0
 """
 
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
-from sklearn.cluster import DBSCAN
 from loguru import logger
 
+from core.ai.group_detection.spatial_clustering import adaptive_eps, grid_dbscan
+from core.perspective import PerspectiveMap
+
 
 @dataclass
 class Detection:
@@ -34,6 +36,12 @@ class Detection:
         x1, y1, x2, y2 = self.bbox
         return ((x1 + x2) / 2, (y1 + y2) / 2)
 
+    @property
+    def foot(self) -> Tuple[float, float]:
+        """Ponto de contato com o chão (base da bounding box)"""
+        x1, _, x2, y2 = self.bbox
+        return ((x1 + x2) / 2, y2)
+
     @property
     def height(self) -> float:
         """Altura da bounding box em pixels"""
@@ -67,10 +75,11 @@ class GroupInfo:
 
 class GroupDetectorSimple:
     """
-    Detector de grupos simplificado usando DBSCAN.
+    Detector de grupos simplificado usando clustering espacial (equivalente ao DBSCAN).
 
     Funcionalidades:
     - Clustering espacial de pessoas próximas
+    - eps por pessoa baseado na altura da bbox (perspectiva)
     - Cálculo de clientes potenciais baseado no tamanho do grupo
     - Exclusão de funcionários da contagem
 
@@ -85,7 +94,8 @@ class GroupDetectorSimple:
         max_distance: float = 1.5,
         min_group_size: int = 2,
         reference_height_pixels: float = 160.0,
-        reference_height_meters: float = 1.7
+        reference_height_meters: float = 1.7,
+        adaptive_eps: bool = True
     ):
         """
         Inicializa o detector de grupos.
@@ -95,11 +105,16 @@ class GroupDetectorSimple:
             min_group_size: Tamanho mínimo para considerar um cluster como grupo
             reference_height_pixels: Altura de referência em pixels (pessoa média)
             reference_height_meters: Altura de referência em metros (1.7m = pessoa média)
+            adaptive_eps: Se True, usa eps por pessoa (altura da bbox); senão eps único do frame
         """
         self.max_distance = max_distance
         self.min_group_size = min_group_size
         self.reference_height_pixels = reference_height_pixels
         self.reference_height_meters = reference_height_meters
+        self.adaptive_eps = adaptive_eps
+
+        # Calibração de perspectiva da câmera (quando disponível, tem prioridade)
+        self.perspective: Optional[PerspectiveMap] = None
 
         # Fator de conversão pixel -> metros (será ajustado por frame baseado nas pessoas)
         self.pixels_per_meter = reference_height_pixels / reference_height_meters
@@ -144,9 +159,24 @@ class GroupDetectorSimple:
         """Converte distância em pixels para metros"""
         return pixels / pixels_per_meter
 
+    def _eps_pixels(self, detections: List[Detection]):
+        """eps em pixels: calibração da câmera, por pessoa (altura da bbox) ou único"""
+        if self.perspective is not None:
+            feet = np.array([d.foot for d in detections])
+            return self.max_distance * self.perspective.ppm_at_points(feet)
+
+        if self.adaptive_eps:
+            return adaptive_eps(
+                [d.height for d in detections],
+                self.max_distance,
+                self.reference_height_meters
+            )
+
+        return self.max_distance * self._estimate_pixels_per_meter(detections)
+
     def detect_groups(self, detections: List[Detection]) -> List[GroupInfo]:
         """
-        Detecta grupos de pessoas usando clustering DBSCAN.
+        Detecta grupos de pessoas usando clustering espacial (mesmos rótulos do DBSCAN).
 
         Args:
             detections: Lista de detecções de pessoas
@@ -167,18 +197,14 @@ class GroupDetectorSimple:
                 for i, d in enumerate(detections)
             ]
 
-        # Estimar fator de conversão pixels->metros
-        pixels_per_meter = self._estimate_pixels_per_meter(detections)
-
         # Extrair posições centrais
         positions = np.array([d.center for d in detections])
 
         # Calcular eps em pixels (max_distance em metros)
-        eps_pixels = self.max_distance * pixels_per_meter
+        eps_pixels = self._eps_pixels(detections)
 
-        # Aplicar DBSCAN
-        clustering = DBSCAN(eps=eps_pixels, min_samples=self.min_group_size)
-        labels = clustering.fit_predict(positions)
+        # Clustering (grade + union-find, sem custo de setup do sklearn)
+        labels = grid_dbscan(positions, eps_pixels, self.min_group_size)
 
         # Processar clusters
         groups = []
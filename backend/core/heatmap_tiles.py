@@ -0,0 +1,454 @@
+"""
+Heatmap Tiles - Heatmaps persistidos em múltiplas resoluções temporais
+Guarda contagens de posições em grades compactas (64x48) por minuto, hora e dia,
+para que o heatmap de qualquer período seja a soma de poucos tiles.
+
+Resoluções:
+- minute: uint16, gravado ao fechar cada minuto
+- hour: uint32, rollup dos minutos, gravado ao fechar cada hora
+- day: uint32, rollup das horas, gravado ao fechar cada dia
+
+Consulta de um período [start, end):
+- Minutos soltos nas pontas, horas completas, dias completos no meio
+- Um período de 30 dias é respondido com ~30 dias + ~24 horas + ~60 minutos
+- Tiles de rollup ausentes (ex: servidor fora do ar na virada) são
+  reconstruídos somando os tiles da resolução inferior
+- O primeiro minuto após o start é somado ao tile já gravado (restart no
+  meio do minuto não sobrescreve as contagens anteriores)
+
+Author: ShopFlow MVP
+Version: 1.0
+"""
+
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+TILE_WIDTH = 64
+TILE_HEIGHT = 48
+
+# Da menor para a maior resolução
+RESOLUTIONS: Tuple[str, ...] = ('minute', 'hour', 'day')
+
+_RESOLUTION_DELTA = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+_CHILD_RESOLUTION = {'hour': 'minute', 'day': 'hour'}
+
+# Tiles de minuto são pequenos; rollups precisam de mais faixa
+_RESOLUTION_DTYPE = {
+    'minute': np.uint16,
+    'hour': np.uint32,
+    'day': np.uint32,
+}
+
+
+def floor_time(ts: datetime, resolution: str) -> datetime:
+    """Início do bucket da resolução que contém `ts`"""
+    if resolution == 'minute':
+        return ts.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Resolução de tile desconhecida: {resolution}")
+
+
+def ceil_time(ts: datetime, resolution: str) -> datetime:
+    """Menor início de bucket >= `ts`"""
+    floored = floor_time(ts, resolution)
+    if floored == ts:
+        return floored
+    return floored + _RESOLUTION_DELTA[resolution]
+
+
+def plan_tile_ranges(start: datetime, end: datetime) -> List[Tuple[str, datetime, datetime]]:
+    """
+    Decompõe [start, end) no menor conjunto de faixas de tiles.
+
+    Returns:
+        Lista de (resolução, início, fim) sem sobreposição, cobrindo o período
+        com minutos nas pontas e a maior resolução possível no meio.
+    """
+    cursor = floor_time(start, 'minute')
+    end = ceil_time(end, 'minute')
+    if cursor >= end:
+        return []
+
+    ranges: List[Tuple[str, datetime, datetime]] = []
+
+    # Subida: usar a resolução atual até alinhar com a resolução superior
+    top = len(RESOLUTIONS) - 1
+    for level in range(len(RESOLUTIONS) - 1):
+        resolution, parent = RESOLUTIONS[level], RESOLUTIONS[level + 1]
+        boundary = ceil_time(cursor, parent)
+        if boundary >= floor_time(end, parent):
+            # Nenhum bucket completo da resolução superior cabe no período
+            top = level
+            break
+        if cursor < boundary:
+            ranges.append((resolution, cursor, boundary))
+        cursor = boundary
+
+    # Descida: maior resolução possível até o fim, depois as menores
+    for level in range(top, -1, -1):
+        resolution = RESOLUTIONS[level]
+        stop = floor_time(end, resolution)
+        if cursor < stop:
+            ranges.append((resolution, cursor, stop))
+            cursor = stop
+
+    return ranges
+
+
+def encode_tile(counts: np.ndarray) -> str:
+    """Codifica a grade para coluna bytea (zlib + hex no formato do PostgREST)"""
+    return '\\x' + zlib.compress(np.ascontiguousarray(counts).tobytes(), 1).hex()
+
+
+def decode_tile(value: str, dtype: str, width: int = TILE_WIDTH, height: int = TILE_HEIGHT) -> np.ndarray:
+    """Decodifica uma grade vinda da coluna bytea"""
+    if value.startswith('\\x'):
+        value = value[2:]
+    raw = zlib.decompress(bytes.fromhex(value))
+    return np.frombuffer(raw, dtype=np.dtype(dtype)).reshape(height, width)
+
+
+def _parse_bucket(value: Any) -> datetime:
+    """Converte bucket_start do banco para datetime ingênuo (mesmo relógio da escrita)"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+@dataclass
+class HeatmapTile:
+    """Tile de heatmap de uma câmera em um bucket de tempo"""
+    camera_id: str
+    resolution: str
+    bucket_start: datetime
+    counts: np.ndarray
+    samples: int = 0  # Frames acumulados no tile
+    complete: bool = True  # False se o processo não viu o bucket inteiro
+
+    def to_record(self) -> Dict[str, Any]:
+        """Registro para upsert na tabela heatmap_tiles"""
+        dtype = _RESOLUTION_DTYPE[self.resolution]
+        limit = np.iinfo(dtype).max
+        counts = np.minimum(self.counts, limit).astype(dtype)
+        return {
+            "camera_id": self.camera_id,
+            "resolution": self.resolution,
+            "bucket_start": self.bucket_start.isoformat(),
+            "width": int(counts.shape[1]),
+            "height": int(counts.shape[0]),
+            "dtype": np.dtype(dtype).name,
+            "counts": encode_tile(counts),
+            "samples": int(self.samples),
+            "total": int(self.counts.sum())
+        }
+
+
+@dataclass
+class _CameraTiles:
+    """Tiles abertos de uma câmera (um por resolução)"""
+    open: Dict[str, HeatmapTile] = field(default_factory=dict)
+
+
+class HeatmapTileAccumulator:
+    """
+    Acumula posições por câmera no tile de minuto aberto e faz o rollup
+    para hora/dia quando os buckets fecham.
+
+    Usage:
+        accumulator = HeatmapTileAccumulator()
+        closed = accumulator.add_frame("camera1", [(320, 240)], (480, 640), datetime.now())
+        # closed: tiles finalizados (minuto, hora, dia) prontos para persistir
+    """
+
+    def __init__(self, width: int = TILE_WIDTH, height: int = TILE_HEIGHT):
+        self.width = width
+        self.height = height
+        self._cameras: Dict[str, _CameraTiles] = {}
+
+    def _new_tile(self, camera_id: str, resolution: str, bucket_start: datetime, complete: bool) -> HeatmapTile:
+        return HeatmapTile(
+            camera_id=camera_id,
+            resolution=resolution,
+            bucket_start=bucket_start,
+            counts=np.zeros((self.height, self.width), dtype=np.uint32),
+            complete=complete
+        )
+
+    def _roll(self, camera_id: str, timestamp: datetime) -> List[HeatmapTile]:
+        """Fecha os buckets que terminaram e abre os novos"""
+        camera = self._cameras.setdefault(camera_id, _CameraTiles())
+        closed: List[HeatmapTile] = []
+
+        for level, resolution in enumerate(RESOLUTIONS):
+            bucket_start = floor_time(timestamp, resolution)
+            tile = camera.open.get(resolution)
+
+            if tile is not None and tile.bucket_start == bucket_start:
+                break  # Resoluções superiores também continuam abertas
+
+            if tile is not None:
+                closed.append(tile)
+                parent = RESOLUTIONS[level + 1] if level + 1 < len(RESOLUTIONS) else None
+                parent_tile = camera.open.get(parent) if parent else None
+                if parent_tile is not None and floor_time(tile.bucket_start, parent) == parent_tile.bucket_start:
+                    parent_tile.counts += tile.counts
+                    parent_tile.samples += tile.samples
+                    parent_tile.complete = parent_tile.complete and tile.complete
+
+            # Bucket completo só se o processo o acompanha desde o início: o
+            # primeiro minuto após o start pode já ter contagens gravadas (restart)
+            if level == 0:
+                complete = tile is not None
+            else:
+                child = RESOLUTIONS[level - 1]
+                complete = tile is not None and floor_time(timestamp, child) == bucket_start
+
+            camera.open[resolution] = self._new_tile(camera_id, resolution, bucket_start, complete)
+
+        return closed
+
+    def add_frame(
+        self,
+        camera_id: str,
+        points: Sequence[Tuple[float, float]],
+        frame_shape: Tuple[int, ...],
+        timestamp: datetime
+    ) -> List[HeatmapTile]:
+        """
+        Adiciona as posições (em pixels) de um frame.
+
+        Args:
+            camera_id: ID da câmera
+            points: Posições das pessoas no frame
+            frame_shape: Shape do frame (altura, largura, ...)
+            timestamp: Momento do frame
+
+        Returns:
+            Tiles fechados por este frame (vazio na maior parte do tempo)
+        """
+        closed = self._roll(camera_id, timestamp)
+        tile = self._cameras[camera_id].open['minute']
+        tile.samples += 1
+
+        if len(points):
+            frame_height, frame_width = frame_shape[0], frame_shape[1]
+            positions = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+            cols = (positions[:, 0] * (self.width / float(frame_width))).astype(np.int64)
+            rows = (positions[:, 1] * (self.height / float(frame_height))).astype(np.int64)
+            inside = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+            np.add.at(tile.counts, (rows[inside], cols[inside]), 1)
+
+        return closed
+
+    def drain(self) -> List[HeatmapTile]:
+        """Retorna os tiles de minuto abertos (parciais) para gravação no shutdown"""
+        tiles = [camera.open['minute'] for camera in self._cameras.values() if 'minute' in camera.open]
+        self._cameras.clear()
+        return tiles
+
+
+class HeatmapTileStore:
+    """
+    Persistência e consulta de tiles de heatmap.
+
+    Usage:
+        store = HeatmapTileStore(supabase_manager)
+        await store.add_frame("camera1", points, frame.shape, datetime.now())
+        counts, info = await store.load_range("camera1", start, end)
+    """
+
+    def __init__(self, database, width: int = TILE_WIDTH, height: int = TILE_HEIGHT):
+        self.database = database
+        self.width = width
+        self.height = height
+        self.accumulator = HeatmapTileAccumulator(width, height)
+
+        self.stats = {
+            "tiles_written": 0,
+            "tiles_rebuilt": 0,
+            "write_errors": 0
+        }
+
+    async def add_frame(
+        self,
+        camera_id: str,
+        points: Sequence[Tuple[float, float]],
+        frame_shape: Tuple[int, ...],
+        timestamp: datetime
+    ):
+        """Acumula um frame e grava os tiles que fecharem"""
+        closed = self.accumulator.add_frame(camera_id, points, frame_shape, timestamp)
+        if closed:
+            await self._persist(closed)
+
+    async def flush(self):
+        """Grava os tiles de minuto abertos (chamar ao parar o processamento)"""
+        tiles = self.accumulator.drain()
+        if tiles:
+            await self._persist(tiles)
+
+    async def _persist(self, tiles: List[HeatmapTile]):
+        """Grava tiles em ordem (minuto antes de hora, hora antes de dia)"""
+        for tile in tiles:
+            try:
+                if not tile.complete:
+                    if tile.resolution in _CHILD_RESOLUTION:
+                        await self._rebuild_from_children(tile)
+                    else:
+                        await self._merge_stored(tile)
+
+                if await self.database.upsert_heatmap_tiles([tile.to_record()]):
+                    self.stats["tiles_written"] += 1
+                else:
+                    self.stats["write_errors"] += 1
+
+            except Exception as e:
+                self.stats["write_errors"] += 1
+                logger.error(f"Erro ao gravar tile de heatmap {tile.resolution} {tile.bucket_start}: {e}")
+
+    async def _merge_stored(self, tile: HeatmapTile):
+        """Soma no minuto parcial o que já foi gravado dele (ex: antes de um restart)"""
+        end = tile.bucket_start + _RESOLUTION_DELTA[tile.resolution]
+        rows = await self.database.get_heatmap_tiles(tile.camera_id, tile.resolution, tile.bucket_start, end)
+
+        counts = tile.counts.astype(np.uint64)
+        for row in rows:
+            if _parse_bucket(row["bucket_start"]) != tile.bucket_start:
+                continue
+            counts += decode_tile(row["counts"], row["dtype"], row["width"], row["height"])
+            tile.samples += row.get("samples") or 0
+
+        tile.counts = counts
+        tile.complete = True
+
+    async def _rebuild_from_children(self, tile: HeatmapTile):
+        """Recalcula um rollup parcial somando os tiles já gravados da resolução inferior"""
+        child = _CHILD_RESOLUTION[tile.resolution]
+        end = tile.bucket_start + _RESOLUTION_DELTA[tile.resolution]
+        rows = await self.database.get_heatmap_tiles(tile.camera_id, child, tile.bucket_start, end)
+
+        counts = np.zeros((self.height, self.width), dtype=np.uint64)
+        samples = 0
+        for row in rows:
+            counts += decode_tile(row["counts"], row["dtype"], row["width"], row["height"])
+            samples += row.get("samples") or 0
+
+        tile.counts = counts
+        tile.samples = samples
+        tile.complete = True
+        self.stats["tiles_rebuilt"] += 1
+
+    async def load_range(
+        self,
+        camera_id: str,
+        start: datetime,
+        end: datetime
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Soma os tiles que cobrem [start, end).
+
+        Returns:
+            Tupla (grade uint64, info com samples e tiles usados)
+        """
+        total = np.zeros((self.height, self.width), dtype=np.uint64)
+        info = {"samples": 0, "tiles_used": 0}
+
+        for resolution, range_start, range_end in plan_tile_ranges(start, end):
+            await self._sum_range(camera_id, resolution, range_start, range_end, total, info)
+
+        return total, info
+
+    async def _sum_range(
+        self,
+        camera_id: str,
+        resolution: str,
+        start: datetime,
+        end: datetime,
+        total: np.ndarray,
+        info: Dict[str, Any]
+    ):
+        rows = await self.database.get_heatmap_tiles(camera_id, resolution, start, end)
+
+        found = set()
+        for row in rows:
+            total += decode_tile(row["counts"], row["dtype"], row["width"], row["height"])
+            info["samples"] += row.get("samples") or 0
+            info["tiles_used"] += 1
+            found.add(_parse_bucket(row["bucket_start"]))
+
+        child = _CHILD_RESOLUTION.get(resolution)
+        if child is None:
+            return
+
+        # Rollups ausentes: somar a resolução inferior em faixas contíguas
+        delta = _RESOLUTION_DELTA[resolution]
+        missing_start: Optional[datetime] = None
+        bucket = start
+        while bucket < end:
+            if bucket in found:
+                if missing_start is not None:
+                    await self._sum_range(camera_id, child, missing_start, bucket, total, info)
+                    missing_start = None
+            elif missing_start is None:
+                missing_start = bucket
+            bucket += delta
+
+        if missing_start is not None:
+            await self._sum_range(camera_id, child, missing_start, end, total, info)
+
+
+def tile_to_zones(
+    counts: np.ndarray,
+    limit: int = 50,
+    cell_area_m2: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Converte a grade somada nas zonas do heatmap esperadas pelo frontend.
+
+    Args:
+        counts: Grade somada
+        limit: Máximo de zonas retornadas
+        cell_area_m2: Área no chão de cada célula (calibração de perspectiva)
+
+    Returns:
+        Lista de {zone, x, y, intensity, visits} com x/y em % do frame,
+        ordenada pelas células mais visitadas (+ visits_per_m2 se calibrado)
+    """
+    peak = int(counts.max()) if counts.size else 0
+    if peak <= 0:
+        return []
+
+    height, width = counts.shape
+    flat = counts.ravel()
+    nonzero = int(np.count_nonzero(flat))
+    top = np.argpartition(flat, -min(limit, nonzero))[-min(limit, nonzero):]
+    top = top[np.argsort(flat[top])[::-1]]
+
+    zones = []
+    for index in top:
+        row, col = divmod(int(index), width)
+        visits = int(flat[index])
+        zone = {
+            "zone": f"cell_{col}_{row}",
+            "x": round((col + 0.5) * 100.0 / width, 2),
+            "y": round((row + 0.5) * 100.0 / height, 2),
+            "intensity": round(visits / peak, 4),
+            "visits": visits
+        }
+        if cell_area_m2 is not None:
+            zone["visits_per_m2"] = round(visits / float(cell_area_m2[row, col]), 2)
+        zones.append(zone)
+    return zones
@@ -0,0 +1,145 @@
+"""
+Live State - Estado ao vivo por câmera em memória
+
+O loop de processamento publica, a cada frame, um snapshot imutável com as
+últimas métricas e estatísticas de processamento; leitores pegam a referência
+atual (troca atômica, sem locks) e nunca veem métricas de um frame com
+estatísticas de outro. Um ring buffer guarda as últimas N amostras compactas.
+
+Endpoints de tempo real leem daqui sem acessar o banco; o banco só é
+consultado quando a câmera é processada em outro processo/nó (sem event bus)
+ou quando o estado está velho.
+
+Usage:
+    live_state.publish('camera1', metrics, stats)
+    snapshot = live_state.get('camera1', max_age=10)
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Campos guardados em cada amostra do ring buffer
+SAMPLE_FIELDS: Tuple[str, ...] = (
+    'timestamp', 'total_people', 'potential_customers', 'employees_count', 'groups_count'
+)
+
+
+@dataclass(frozen=True)
+class CameraSnapshot:
+    """Último estado publicado de uma câmera (imutável)"""
+    camera_id: str
+    metrics: Dict[str, Any]
+    stats: Dict[str, Any]
+    updated_at: float
+    origin: str = 'local'  # 'local' ou worker remoto (event bus)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.updated_at
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self.age <= max_age
+
+
+@dataclass
+class _CameraSlot:
+    snapshot: CameraSnapshot
+    samples: Deque[Dict[str, Any]] = field(default_factory=deque)
+
+
+class LiveStateRegistry:
+    """Registro do estado ao vivo de todas as câmeras deste processo"""
+
+    def __init__(self, sample_size: int = 300, sample_fields: Tuple[str, ...] = SAMPLE_FIELDS):
+        """
+        Args:
+            sample_size: Amostras mantidas por câmera no ring buffer
+            sample_fields: Campos das métricas copiados para cada amostra
+        """
+        self.sample_size = sample_size
+        self.sample_fields = sample_fields
+        self._slots: Dict[str, _CameraSlot] = {}
+
+    def publish(
+        self,
+        camera_id: str,
+        metrics: Dict[str, Any],
+        stats: Optional[Dict[str, Any]] = None,
+        origin: str = 'local',
+        updated_at: Optional[float] = None
+    ) -> CameraSnapshot:
+        """
+        Publica novo estado da câmera (substitui o snapshot de uma vez).
+
+        Args:
+            camera_id: Câmera
+            metrics: Métricas do frame
+            stats: Estatísticas de processamento no momento do frame
+            origin: 'local' ou id do worker que processou
+            updated_at: Momento da medição (padrão: agora)
+        """
+        snapshot = CameraSnapshot(
+            camera_id=camera_id,
+            metrics=dict(metrics),
+            stats=dict(stats or {}),
+            updated_at=updated_at if updated_at is not None else time.time(),
+            origin=origin
+        )
+
+        slot = self._slots.get(camera_id)
+        if slot is None:
+            slot = self._slots[camera_id] = _CameraSlot(
+                snapshot=snapshot, samples=deque(maxlen=self.sample_size)
+            )
+        else:
+            slot.snapshot = snapshot
+
+        slot.samples.append({key: metrics.get(key) for key in self.sample_fields})
+        return snapshot
+
+    def get(self, camera_id: str, max_age: Optional[float] = None) -> Optional[CameraSnapshot]:
+        """Snapshot da câmera (None se não existe ou mais velho que max_age)"""
+        slot = self._slots.get(camera_id)
+        if slot is None:
+            return None
+        snapshot = slot.snapshot
+        if max_age is not None and not snapshot.is_fresh(max_age):
+            return None
+        return snapshot
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[CameraSnapshot]:
+        """Snapshot mais recente entre todas as câmeras"""
+        snapshots = [slot.snapshot for slot in list(self._slots.values())]
+        if not snapshots:
+            return None
+        snapshot = max(snapshots, key=lambda item: item.updated_at)
+        if max_age is not None and not snapshot.is_fresh(max_age):
+            return None
+        return snapshot
+
+    def samples(self, camera_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Últimas amostras da câmera (mais antigas primeiro)"""
+        slot = self._slots.get(camera_id)
+        if slot is None:
+            return []
+        samples = list(slot.samples)
+        return samples[-limit:] if limit else samples
+
+    def cameras(self) -> List[str]:
+        return list(self._slots)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            camera_id: {
+                'age_seconds': round(slot.snapshot.age, 3),
+                'origin': slot.snapshot.origin,
+                'samples': len(slot.samples)
+            }
+            for camera_id, slot in list(self._slots.items())
+        }
+
+
+# Instância compartilhada (processador publica, rotas leem)
+live_state = LiveStateRegistry()
@@ -0,0 +1,144 @@
+"""
+Message Encoding - Camada central de serialização das mensagens em tempo real
+
+Cada mensagem de saída é serializada uma única vez e o resultado é
+compartilhado por todos os destinatários (WebSocket, SSE, etc).
+
+- JSON via orjson (fallback para json da stdlib se não instalado)
+- msgpack opcional para clientes que aceitam frames binários
+- Suporte a dataclasses, datetime/date, numpy (arrays e escalares), Enum, set
+
+Usage:
+    encoded = encode_message({'type': 'metrics_update', 'data': metrics})
+    await websocket.send_text(encoded.text)      # mesmo objeto para todos
+    await websocket.send_bytes(encoded.msgpack)  # clientes binários
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgpack = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Conversão de tipos não suportados nativamente pelo encoder"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    raise TypeError(f"Tipo não serializável: {type(obj).__name__}")
+
+
+def to_plain(obj: Any) -> Any:
+    """Converte recursivamente para tipos básicos (usado pelo msgpack)"""
+    if isinstance(obj, dict):
+        return {str(k) if not isinstance(k, (str, int)) else k: to_plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [to_plain(v) for v in obj]
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return to_plain(_default(obj))
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa para JSON (bytes UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_text(obj: Any) -> str:
+    """Serializa para JSON (str)"""
+    return dumps(obj).decode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Desserializa JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class EncodedMessage:
+    """
+    Mensagem serializada uma vez e compartilhada entre destinatários.
+
+    As representações text/msgpack são calculadas sob demanda e cacheadas,
+    então N clientes custam uma única serialização por formato.
+    """
+
+    __slots__ = ('payload', 'json', '_text', '_msgpack')
+
+    def __init__(self, payload: Any = None, json_bytes: Optional[bytes] = None):
+        self.payload = payload
+        self.json = json_bytes if json_bytes is not None else dumps(payload)
+        self._text: Optional[str] = None
+        self._msgpack: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.json.decode('utf-8')
+        return self._text
+
+    @property
+    def msgpack(self) -> Optional[bytes]:
+        """Frame msgpack (None se msgpack não estiver instalado ou sem payload original)"""
+        if self._msgpack is None and msgpack is not None:
+            payload = self.payload if self.payload is not None else loads(self.json)
+            self._msgpack = msgpack.packb(to_plain(payload), use_bin_type=True)
+        return self._msgpack
+
+    def __len__(self) -> int:
+        return len(self.json)
+
+
+def encode_message(message: Any) -> EncodedMessage:
+    """
+    Normaliza qualquer mensagem de saída para EncodedMessage.
+
+    Aceita dict/dataclass (serializa), str/bytes já em JSON (reaproveita)
+    ou EncodedMessage (retorna como está).
+    """
+    if isinstance(message, EncodedMessage):
+        return message
+    if isinstance(message, str):
+        encoded = EncodedMessage(json_bytes=message.encode('utf-8'))
+        encoded._text = message
+        return encoded
+    if isinstance(message, (bytes, bytearray)):
+        return EncodedMessage(json_bytes=bytes(message))
+    return EncodedMessage(message)
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
@@ -0,0 +1,238 @@
+"""
+Pipeline Metrics - Instrumentação Prometheus do processamento
+
+Histogramas por estágio e por câmera do caminho quente (captura -> YOLO ->
+face -> grupos -> banco -> desenho -> encode -> publicação), profundidade de
+filas, frames descartados, tamanho dos lotes gravados no banco e atraso de
+envio dos clientes WebSocket. Exposto em GET /metrics (e opcionalmente num
+exporter separado em PROMETHEUS_PORT).
+
+Custo no caminho quente: os filhos com labels são resolvidos uma vez por
+câmera/estágio e guardados; cada medição é um observe() direto (~1-2µs).
+Gauges de fila usam set_function e só são lidos no scrape. Desabilitado
+(PROMETHEUS_ENABLED=false ou prometheus-client ausente), camera() devolve
+um objeto nulo e as chamadas não fazem nada.
+
+Usage:
+    pipeline_metrics.configure(enabled=True)
+    camera_metrics = pipeline_metrics.camera('camera1')
+
+    started = time.perf_counter()
+    detections = await detector.detect_persons(frame)
+    camera_metrics.observe('yolo', time.perf_counter() - started)
+"""
+
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, ProcessCollector,
+        CONTENT_TYPE_LATEST, generate_latest, start_http_server
+    )
+except ImportError:
+    CollectorRegistry = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Estágios instrumentados do processador RTSP
+STAGES = (
+    'capture_wait', 'decode', 'yolo', 'face', 'group',
+    'draw', 'encode', 'db_write', 'broadcast'
+)
+
+# 0.5ms .. 5s: de encode/publicação (sub-ms) até YOLO em CPU
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_TABLE_PATTERN = re.compile(r'\b(?:INTO|UPDATE)\s+(?:public\.)?"?(\w+)', re.IGNORECASE)
+
+
+def table_from_query(query: str) -> str:
+    """Nome da tabela de um INSERT/UPDATE (label dos lotes via executemany)"""
+    match = _TABLE_PATTERN.search(query)
+    return match.group(1) if match else 'unknown'
+
+
+class CameraMetrics:
+    """Medições de uma câmera (filhos de labels já resolvidos)"""
+
+    __slots__ = ('camera_id', '_parent', '_stages', '_frame', '_processed', '_dropped')
+
+    def __init__(self, parent: 'PipelineMetrics', camera_id: str):
+        self.camera_id = camera_id
+        self._parent = parent
+        self._stages = {
+            stage: parent.stage_duration.labels(camera=camera_id, stage=stage)
+            for stage in STAGES
+        }
+        self._frame = parent.frame_duration.labels(camera=camera_id)
+        self._processed = parent.frames_processed.labels(camera=camera_id)
+        self._dropped = parent.frames_dropped.labels(camera=camera_id)
+
+    def observe(self, stage: str, seconds: float):
+        """Duração de um estágio (segundos)"""
+        child = self._stages.get(stage)
+        if child is None:
+            child = self._stages[stage] = self._parent.stage_duration.labels(camera=self.camera_id, stage=stage)
+        child.observe(seconds)
+
+    def frame(self, seconds: float):
+        """Frame completo processado"""
+        self._frame.observe(seconds)
+        self._processed.inc()
+
+    def dropped(self, count: int = 1):
+        """Frames descartados (fila de captura cheia)"""
+        self._dropped.inc(count)
+
+    def track_queue(self, queue: str, depth: Callable[[], float]):
+        """Profundidade de fila lida no scrape"""
+        self._parent.track_queue(queue, depth, camera=self.camera_id)
+
+
+class _NullCameraMetrics:
+    """Métricas desabilitadas: todas as chamadas são no-op"""
+
+    __slots__ = ()
+
+    def observe(self, stage: str, seconds: float):
+        pass
+
+    def frame(self, seconds: float):
+        pass
+
+    def dropped(self, count: int = 1):
+        pass
+
+    def track_queue(self, queue: str, depth: Callable[[], float]):
+        pass
+
+
+NULL_CAMERA_METRICS = _NullCameraMetrics()
+
+
+class PipelineMetrics:
+    """Registry próprio com as métricas do pipeline (desabilitado até configure)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.registry = None
+        self._cameras: Dict[str, CameraMetrics] = {}
+        self._exporter_port: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        return CollectorRegistry is not None
+
+    def configure(self, enabled: bool = True, port: int = 0) -> bool:
+        """
+        Criar as métricas (chamar no startup, antes do processador).
+
+        Args:
+            enabled: PROMETHEUS_ENABLED
+            port: Se > 0, também sobe um exporter HTTP separado nessa porta
+
+        Returns:
+            True se a instrumentação ficou ativa
+        """
+        if not enabled:
+            return False
+        if not self.available:
+            logger.warning("⚠️ PROMETHEUS_ENABLED sem prometheus-client instalado - métricas desabilitadas")
+            return False
+        if self.enabled:
+            return True
+
+        registry = CollectorRegistry()
+        ProcessCollector(registry=registry)
+
+        self.stage_duration = Histogram(
+            'shopflow_stage_duration_seconds', 'Duração de cada estágio do processamento',
+            ['camera', 'stage'], buckets=STAGE_BUCKETS, registry=registry
+        )
+        self.frame_duration = Histogram(
+            'shopflow_frame_duration_seconds', 'Duração do processamento de um frame',
+            ['camera'], buckets=STAGE_BUCKETS, registry=registry
+        )
+        self.frames_processed = Counter(
+            'shopflow_frames_processed', 'Frames processados',
+            ['camera'], registry=registry
+        )
+        self.frames_dropped = Counter(
+            'shopflow_frames_dropped', 'Frames descartados com a fila de captura cheia',
+            ['camera'], registry=registry
+        )
+        self.queue_depth = Gauge(
+            'shopflow_queue_depth', 'Itens pendentes por fila',
+            ['queue', 'camera'], registry=registry
+        )
+        self.db_batch_size = Histogram(
+            'shopflow_db_batch_rows', 'Linhas por lote gravado no banco',
+            ['table'], buckets=BATCH_BUCKETS, registry=registry
+        )
+        self.ws_send_lag = Histogram(
+            'shopflow_websocket_send_lag_seconds', 'Tempo entre enfileirar e enviar uma mensagem WebSocket',
+            buckets=LAG_BUCKETS, registry=registry
+        )
+
+        self.registry = registry
+        self.enabled = True
+
+        if port > 0:
+            try:
+                start_http_server(port, registry=registry)
+                self._exporter_port = port
+            except Exception as e:
+                logger.error(f"❌ Erro ao iniciar exporter Prometheus na porta {port}: {e}")
+
+        exporter = f" e na porta {self._exporter_port}" if self._exporter_port else ""
+        logger.success(f"📈 Métricas Prometheus ativas em /metrics{exporter}")
+        return True
+
+    def camera(self, camera_id: str):
+        """Medições de uma câmera (objeto nulo se desabilitado)"""
+        if not self.enabled:
+            return NULL_CAMERA_METRICS
+        metrics = self._cameras.get(camera_id)
+        if metrics is None:
+            metrics = self._cameras[camera_id] = CameraMetrics(self, camera_id)
+        return metrics
+
+    def track_queue(self, queue: str, depth: Callable[[], float], camera: str = ''):
+        """Registrar profundidade de fila (função chamada só no scrape)"""
+        if not self.enabled:
+            return
+
+        def read() -> float:
+            try:
+                return float(depth())
+            except Exception:
+                return 0.0
+
+        self.queue_depth.labels(queue=queue, camera=camera).set_function(read)
+
+    def observe_db_batch(self, table: str, rows: int):
+        """Tamanho de um lote gravado"""
+        if self.enabled:
+            self.db_batch_size.labels(table=table).observe(rows)
+
+    def observe_ws_lag(self, seconds: float):
+        """Atraso de envio de uma mensagem WebSocket"""
+        if self.enabled:
+            self.ws_send_lag.observe(seconds)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Exposição em texto para o endpoint /metrics"""
+        if not self.enabled:
+            return b'', CONTENT_TYPE_LATEST
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+# Instância compartilhada (configurada no startup)
+pipeline_metrics = PipelineMetrics()
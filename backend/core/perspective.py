@@ -0,0 +1,396 @@
+"""
+Perspective Calibration - Calibração de perspectiva por câmera
+Converte distâncias em pixels para metros com uma tabela pré-calculada
+de pixels-por-metro para cada região do frame.
+
+Métodos de calibração:
+- height_fit: ajustado automaticamente a partir das detecções acumuladas
+  (altura aparente da pessoa varia linearmente com o y do pé no chão)
+- homography: ajustado a partir de >= 4 pontos marcados pelo usuário
+  (pixel -> posição no chão em metros)
+
+A calibração fica salva em `camera_calibrations`, chaveada pelo camera_id do
+processador (ex: 'camera1'), e é carregada em um PerspectiveMap; cada consulta é um único acesso ao array.
+A tabela fica na resolução da calibração; posições de um stream com outra
+resolução são reescaladas na consulta (set_frame_size).
+
+Author: ShopFlow MVP
+Version: 1.0
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from loguru import logger
+
+DEFAULT_PERSON_HEIGHT_M = 1.7
+
+# Menor escala aceita (evita divisão por ~0 em regiões muito distantes)
+_MIN_PIXELS_PER_METER = 5.0
+
+
+@dataclass
+class PerspectiveCalibration:
+    """Calibração persistida de uma câmera"""
+    method: str  # 'height_fit' | 'homography'
+    frame_width: int
+    frame_height: int
+    params: Dict[str, Any]
+    samples: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "frame_width": self.frame_width,
+            "frame_height": self.frame_height,
+            "params": self.params,
+            "samples": self.samples,
+            "created_at": self.created_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PerspectiveCalibration':
+        return cls(
+            method=data["method"],
+            frame_width=int(data["frame_width"]),
+            frame_height=int(data["frame_height"]),
+            params=data.get("params", {}),
+            samples=int(data.get("samples", 0)),
+            created_at=data.get("created_at") or datetime.now().isoformat()
+        )
+
+    @classmethod
+    def from_points(
+        cls,
+        image_points: Sequence[Tuple[float, float]],
+        ground_points: Sequence[Tuple[float, float]],
+        frame_width: int,
+        frame_height: int
+    ) -> 'PerspectiveCalibration':
+        """
+        Calibração por homografia a partir de pontos marcados.
+
+        Args:
+            image_points: Pontos no frame (pixels), ao nível do chão
+            ground_points: Mesmos pontos no chão da loja (metros)
+            frame_width: Largura do frame usado na marcação
+            frame_height: Altura do frame usado na marcação
+
+        Raises:
+            ValueError: Menos de 4 pontos ou pontos degenerados
+        """
+        if len(image_points) < 4 or len(image_points) != len(ground_points):
+            raise ValueError("São necessários pelo menos 4 pares de pontos (imagem, chão)")
+
+        src = np.asarray(image_points, dtype=np.float64).reshape(-1, 2)
+        dst = np.asarray(ground_points, dtype=np.float64).reshape(-1, 2)
+        homography, _ = cv2.findHomography(src, dst, 0)
+        if homography is None:
+            raise ValueError("Pontos degenerados: não foi possível calcular a homografia")
+
+        return cls(
+            method="homography",
+            frame_width=frame_width,
+            frame_height=frame_height,
+            params={"homography": homography.tolist()},
+            samples=len(src)
+        )
+
+
+class PerspectiveMap:
+    """
+    Tabela pré-calculada de pixels-por-metro.
+
+    Usage:
+        perspective = PerspectiveMap(calibration)
+        ppm = perspective.ppm_at(320, 400)
+        meters = perspective.distance_m((100, 400), (180, 410))
+    """
+
+    def __init__(
+        self,
+        calibration: PerspectiveCalibration,
+        cell_size: int = 8,
+        frame_size: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Args:
+            calibration: Calibração (a tabela é montada na resolução dela)
+            cell_size: Lado da célula da tabela em pixels da calibração
+            frame_size: (largura, altura) do frame consultado, se diferente
+        """
+        self.calibration = calibration
+        self.cell_size = cell_size
+
+        self.cols = max(1, int(np.ceil(calibration.frame_width / cell_size)))
+        self.rows = max(1, int(np.ceil(calibration.frame_height / cell_size)))
+        self.grid = self._build_grid()
+
+        self.set_frame_size(*(frame_size or (calibration.frame_width, calibration.frame_height)))
+
+    def set_frame_size(self, frame_width: int, frame_height: int):
+        """
+        Resolução do frame consultado (ex: snapshot marcado em outra resolução
+        ou stream que mudou de resolução). Posições são levadas para a
+        resolução da calibração antes da consulta e o pixels-por-metro volta
+        em pixels do frame.
+        """
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self._scale_x = self.calibration.frame_width / float(frame_width)
+        self._scale_y = self.calibration.frame_height / float(frame_height)
+        # Pixels da calibração por pixel do frame (média geométrica dos eixos)
+        self._ppm_scale = 1.0 / float(np.sqrt(self._scale_x * self._scale_y))
+
+    def _cell_centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        xs = (np.arange(self.cols, dtype=np.float64) + 0.5) * self.cell_size
+        ys = (np.arange(self.rows, dtype=np.float64) + 0.5) * self.cell_size
+        return np.meshgrid(xs, ys)
+
+    def _build_grid(self) -> np.ndarray:
+        xs, ys = self._cell_centers()
+        method = self.calibration.method
+        params = self.calibration.params
+
+        if method == "height_fit":
+            # Altura aparente (px) de uma pessoa com o pé em y
+            person_px = params["slope"] * ys + params["intercept"]
+            ppm = person_px / params.get("reference_height_m", DEFAULT_PERSON_HEIGHT_M)
+
+        elif method == "homography":
+            # Escala local = 1 / sqrt(|det J|) do mapeamento pixel -> chão
+            homography = np.asarray(params["homography"], dtype=np.float64)
+            ground = self._project(homography, xs, ys)
+            ground_dx = self._project(homography, xs + 1.0, ys)
+            ground_dy = self._project(homography, xs, ys + 1.0)
+            jx = ground_dx - ground
+            jy = ground_dy - ground
+            det = np.abs(jx[..., 0] * jy[..., 1] - jx[..., 1] * jy[..., 0])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ppm = 1.0 / np.sqrt(det)
+
+        else:
+            raise ValueError(f"Método de calibração desconhecido: {method}")
+
+        ppm = np.nan_to_num(ppm, nan=_MIN_PIXELS_PER_METER, posinf=_MIN_PIXELS_PER_METER)
+        return np.maximum(ppm, _MIN_PIXELS_PER_METER).astype(np.float32)
+
+    @staticmethod
+    def _project(homography: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        points = np.stack([xs, ys, np.ones_like(xs)], axis=-1) @ homography.T
+        return points[..., :2] / points[..., 2:3]
+
+    def ppm_at(self, x: float, y: float) -> float:
+        """Pixels (do frame) por metro na posição (x, y) do frame"""
+        col = min(max(int(x * self._scale_x) // self.cell_size, 0), self.cols - 1)
+        row = min(max(int(y * self._scale_y) // self.cell_size, 0), self.rows - 1)
+        return float(self.grid[row, col]) * self._ppm_scale
+
+    def ppm_at_points(self, points: np.ndarray) -> np.ndarray:
+        """Pixels (do frame) por metro para um array (N, 2) de posições"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cols = np.clip((points[:, 0] * self._scale_x).astype(np.int64) // self.cell_size, 0, self.cols - 1)
+        rows = np.clip((points[:, 1] * self._scale_y).astype(np.int64) // self.cell_size, 0, self.rows - 1)
+        return self.grid[rows, cols].astype(np.float64) * self._ppm_scale
+
+    def distance_m(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
+        """Distância em metros entre duas posições próximas do frame"""
+        # Na resolução da calibração (escala por eixo exata)
+        pixels = float(np.hypot((p2[0] - p1[0]) * self._scale_x, (p2[1] - p1[1]) * self._scale_y))
+        ppm = (self.ppm_at(p1[0], p1[1]) + self.ppm_at(p2[0], p2[1])) * 0.5 / self._ppm_scale
+        return pixels / ppm
+
+    def cell_area_m2(self, grid_width: int, grid_height: int) -> np.ndarray:
+        """Área no chão (m²) de cada célula de uma grade de heatmap (cobre o frame inteiro)"""
+        cell_w = self.calibration.frame_width / float(grid_width)
+        cell_h = self.calibration.frame_height / float(grid_height)
+        ppm = cv2.resize(self.grid, (grid_width, grid_height), interpolation=cv2.INTER_AREA)
+        return (cell_w * cell_h) / (ppm.astype(np.float64) ** 2)
+
+
+class PerspectiveCalibrator:
+    """
+    Ajusta a calibração height_fit a partir das detecções acumuladas.
+
+    Amostras: (y do pé, altura da bbox). A mediana da altura por faixa de y
+    é ajustada por uma reta, robusta a pessoas agachadas/oclusas.
+    """
+
+    def __init__(
+        self,
+        max_samples: int = 5000,
+        min_samples: int = 300,
+        bands: int = 12,
+        reference_height_m: float = DEFAULT_PERSON_HEIGHT_M
+    ):
+        self.samples: deque = deque(maxlen=max_samples)
+        self.min_samples = min_samples
+        self.bands = bands
+        self.reference_height_m = reference_height_m
+
+    def add_boxes(self, boxes: Sequence[Tuple[float, float, float, float]]):
+        """Acumula bboxes (x1, y1, x2, y2) de um frame"""
+        for x1, y1, x2, y2 in boxes:
+            height = y2 - y1
+            if height > 0:
+                self.samples.append((y2, height))
+
+    def fit(self, frame_width: int, frame_height: int) -> Optional[PerspectiveCalibration]:
+        """Retorna a calibração ajustada ou None se não houver dados suficientes"""
+        if len(self.samples) < self.min_samples:
+            return None
+
+        data = np.asarray(self.samples, dtype=np.float64)
+        foot_y, heights = data[:, 0], data[:, 1]
+
+        edges = np.linspace(0, frame_height, self.bands + 1)
+        band_index = np.clip(np.digitize(foot_y, edges) - 1, 0, self.bands - 1)
+
+        ys, medians, weights = [], [], []
+        for band in range(self.bands):
+            in_band = band_index == band
+            count = int(in_band.sum())
+            if count >= 5:
+                ys.append(float(np.median(foot_y[in_band])))
+                medians.append(float(np.median(heights[in_band])))
+                weights.append(count)
+
+        if len(ys) < 3:
+            return None
+
+        slope, intercept = np.polyfit(ys, medians, 1, w=np.sqrt(weights))
+
+        # Perspectiva de câmera de teto: quem está mais perto (y maior) aparece maior
+        if slope < 0:
+            logger.warning("Calibração automática descartada: altura diminui em direção à câmera")
+            return None
+
+        return PerspectiveCalibration(
+            method="height_fit",
+            frame_width=frame_width,
+            frame_height=frame_height,
+            params={
+                "slope": float(slope),
+                "intercept": float(intercept),
+                "reference_height_m": self.reference_height_m
+            },
+            samples=len(self.samples)
+        )
+
+
+class CameraPerspective:
+    """
+    Estado de perspectiva de uma câmera: calibração salva + ajuste automático.
+
+    Usage:
+        perspective = CameraPerspective("camera1")
+        await perspective.load(db)
+        perspective.observe(boxes, frame.shape)   # a cada frame
+        if perspective.map: ppm = perspective.map.ppm_at(x, y)
+    """
+
+    def __init__(self, camera_id: str, auto_fit_every: int = 500):
+        self.camera_id = camera_id
+        self.auto_fit_every = auto_fit_every
+        self.calibrator = PerspectiveCalibrator()
+        self.calibration: Optional[PerspectiveCalibration] = None
+        self.map: Optional[PerspectiveMap] = None
+        self.frame_size: Optional[Tuple[int, int]] = None  # (largura, altura) observada
+        self._frames_since_fit = 0
+        self._dirty = False
+
+    @property
+    def is_manual(self) -> bool:
+        return self.calibration is not None and self.calibration.method == "homography"
+
+    def apply(self, calibration: PerspectiveCalibration):
+        """Aplica uma calibração (recalcula a tabela)"""
+        self.calibration = calibration
+        self.map = PerspectiveMap(calibration, frame_size=self.frame_size)
+        logger.info(
+            f"Perspectiva da câmera {self.camera_id}: {calibration.method} "
+            f"({calibration.samples} amostras)"
+        )
+
+    async def load(self, db) -> bool:
+        """Carrega a calibração salva da câmera"""
+        try:
+            data = await db.get_camera_calibration(self.camera_id)
+            if data:
+                self.apply(PerspectiveCalibration.from_dict(data))
+                return True
+        except Exception as e:
+            logger.error(f"Erro ao carregar calibração da câmera {self.camera_id}: {e}")
+        return False
+
+    async def save(self, db) -> bool:
+        """Salva a calibração atual da câmera"""
+        if self.calibration is None:
+            return False
+        saved = await db.update_camera_calibration(self.camera_id, self.calibration.to_dict())
+        if saved:
+            self._dirty = False
+        return saved
+
+    def observe(self, boxes: Sequence[Tuple[float, float, float, float]], frame_shape: Tuple[int, ...]) -> bool:
+        """
+        Acumula detecções e reajusta periodicamente (apenas sem calibração manual).
+
+        Returns:
+            True se a calibração foi atualizada neste frame
+        """
+        self.set_frame_size(frame_shape[1], frame_shape[0])
+        if self.is_manual:
+            return False
+
+        self.calibrator.add_boxes(boxes)
+        self._frames_since_fit += 1
+        if self._frames_since_fit < self.auto_fit_every:
+            return False
+
+        self._frames_since_fit = 0
+        calibration = self.calibrator.fit(frame_shape[1], frame_shape[0])
+        if calibration is None:
+            return False
+
+        self.apply(calibration)
+        self._dirty = True
+        return True
+
+    def set_frame_size(self, frame_width: int, frame_height: int):
+        """
+        Acompanha a resolução do stream: o mapa atual passa a reescalar as
+        consultas e, no ajuste automático, as amostras da resolução anterior
+        são descartadas (o próximo ajuste usa só a nova).
+        """
+        if self.frame_size == (frame_width, frame_height):
+            return
+
+        if self.frame_size is not None:
+            logger.info(
+                f"📐 Câmera {self.camera_id}: resolução {self.frame_size[0]}x{self.frame_size[1]} "
+                f"-> {frame_width}x{frame_height}"
+            )
+            if not self.is_manual:
+                self.calibrator.samples.clear()
+                self._frames_since_fit = 0
+
+        self.frame_size = (frame_width, frame_height)
+        if self.map is not None:
+            self.map.set_frame_size(frame_width, frame_height)
+
+    @property
+    def needs_save(self) -> bool:
+        return self._dirty
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calibrated": self.calibration is not None,
+            "method": self.calibration.method if self.calibration else None,
+            "pending_samples": len(self.calibrator.samples)
+        }
@@ -0,0 +1,385 @@
+"""
+Sampling Profiler - Perfil sob demanda do processo em produção
+
+Uma thread amostra, a cada interval, as pilhas das threads escolhidas via
+sys._current_frames() por um tempo limitado e devolve:
+- speedscope: JSON para https://www.speedscope.app (um perfil por thread)
+- collapsed: "thread;func (arquivo:linha);... contagem" (flamegraph.pl, inferno)
+- summary: JSON com as funções mais frequentes (self/total)
+
+Threads (papéis):
+- event_loop: thread do event loop (processamento, rotas, WebSocket)
+- capture: thread de captura RTSP (leitura/decodificação)
+- executor: threads de asyncio.to_thread/run_in_executor
+- 'all' inclui também as demais threads
+
+Com memory=True liga tracemalloc durante a janela e inclui os pontos de
+alocação (bytes ainda vivos alocados na janela) no speedscope/summary.
+
+Inativo não custa nada: não há thread, hook nem tracemalloc rodando.
+A amostragem depende do GIL: código C que não o solta (ex: parte do encode)
+aparece como amostras mais espaçadas, com o peso real de cada intervalo.
+
+Usage:
+    result = await profiler.profile(seconds=10, interval=0.005, memory=True)
+    content, media_type = result.render('speedscope')
+"""
+
+import asyncio
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+THREAD_ROLES = ('event_loop', 'capture', 'executor')
+FORMATS = ('speedscope', 'collapsed', 'summary')
+MAX_STACK_DEPTH = 128
+
+# Prefixos removidos dos caminhos (site-packages, raiz do backend, stdlib)
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_STDLIB_ROOT = sysconfig.get_paths()['stdlib'] + os.sep
+
+
+def _short_path(path: str) -> str:
+    marker = 'site-packages' + os.sep
+    index = path.rfind(marker)
+    if index >= 0:
+        return path[index + len(marker):]
+    for root in (_BACKEND_ROOT, _STDLIB_ROOT):
+        if path.startswith(root):
+            return path[len(root):]
+    return path
+
+
+@dataclass
+class ProfileResult:
+    """Amostras de uma janela de profiling"""
+    started_at: float
+    duration: float
+    interval: float
+    frames: List[Tuple[str, str, int]]  # (função, arquivo, linha)
+    # thread -> pilha (índices em frames, da raiz para a folha) -> segundos amostrados
+    stacks: Dict[str, Counter] = field(default_factory=dict)
+    samples: Dict[str, int] = field(default_factory=dict)
+    allocations: List[Tuple[Tuple[int, ...], int, int]] = field(default_factory=list)  # (pilha, bytes, blocos)
+
+    def render(self, fmt: str = 'speedscope') -> Tuple[bytes, str]:
+        """Serializar no formato pedido (conteúdo, media type)"""
+        if fmt == 'collapsed':
+            return self.to_collapsed().encode(), 'text/plain; charset=utf-8'
+        if fmt == 'summary':
+            return json.dumps(self.to_summary()).encode(), 'application/json'
+        return json.dumps(self.to_speedscope()).encode(), 'application/json'
+
+    def _frame_label(self, index: int) -> str:
+        name, path, line = self.frames[index]
+        return f"{name} ({path}:{line})" if name else f"{path}:{line}"
+
+    def to_collapsed(self) -> str:
+        """Formato de pilhas colapsadas (contagem = amostras)"""
+        lines = []
+        for thread, stacks in sorted(self.stacks.items()):
+            for stack, seconds in stacks.most_common():
+                labels = ';'.join(self._frame_label(i).replace(';', ',') for i in stack)
+                count = max(1, round(seconds / self.interval))
+                lines.append(f"{thread};{labels} {count}" if labels else f"{thread} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """Arquivo speedscope (perfis 'sampled' em segundos e, com memória, em bytes)"""
+        profiles = []
+        for thread, stacks in sorted(self.stacks.items()):
+            items = stacks.most_common()
+            total = sum(seconds for _, seconds in items)
+            profiles.append({
+                'type': 'sampled',
+                'name': f"{thread} ({self.samples.get(thread, 0)} amostras)",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': total,
+                'samples': [list(stack) for stack, _ in items],
+                'weights': [seconds for _, seconds in items]
+            })
+
+        if self.allocations:
+            total = sum(size for _, size, _ in self.allocations)
+            profiles.append({
+                'type': 'sampled',
+                'name': 'alocações (tracemalloc)',
+                'unit': 'bytes',
+                'startValue': 0,
+                'endValue': total,
+                'samples': [list(stack) for stack, _, _ in self.allocations],
+                'weights': [size for _, size, _ in self.allocations]
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"shopflow {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}",
+            'exporter': 'shopflow-profiler',
+            'activeProfileIndex': 0,
+            'shared': {
+                'frames': [{'name': name, 'file': path, 'line': line} for name, path, line in self.frames]
+            },
+            'profiles': profiles
+        }
+
+    def to_summary(self, limit: int = 30) -> Dict[str, Any]:
+        """Funções mais caras por thread (self = na folha, total = em qualquer ponto da pilha)"""
+        threads = {}
+        for thread, stacks in self.stacks.items():
+            own: Counter = Counter()
+            inclusive: Counter = Counter()
+            total = 0.0
+            for stack, seconds in stacks.items():
+                total += seconds
+                if stack:
+                    own[stack[-1]] += seconds
+                for index in set(stack):
+                    inclusive[index] += seconds
+            threads[thread] = {
+                'samples': self.samples.get(thread, 0),
+                'seconds': round(total, 4),
+                'top_self': [
+                    {'frame': self._frame_label(i), 'seconds': round(s, 4), 'share': round(s / total, 4) if total else 0}
+                    for i, s in own.most_common(limit)
+                ],
+                'top_total': [
+                    {'frame': self._frame_label(i), 'seconds': round(s, 4), 'share': round(s / total, 4) if total else 0}
+                    for i, s in inclusive.most_common(limit)
+                ]
+            }
+
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(self.duration, 3),
+            'interval_ms': round(self.interval * 1000, 3),
+            'threads': threads,
+            'allocations': [
+                {
+                    'frame': self._frame_label(stack[-1]) if stack else '?',
+                    'stack': [self._frame_label(i) for i in stack],
+                    'bytes': size,
+                    'blocks': blocks
+                }
+                for stack, size, blocks in self.allocations[:limit]
+            ]
+        }
+
+
+class SamplingProfiler:
+    """Profiler por amostragem de pilhas (um profile por vez)"""
+
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._running = False
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(
+        self,
+        seconds: float = 10.0,
+        interval: float = 0.005,
+        threads: Optional[Iterable[str]] = None,
+        memory: bool = False,
+        memory_frames: int = 16,
+        memory_limit: int = 50
+    ) -> ProfileResult:
+        """
+        Amostrar as threads por `seconds` (chamar do event loop).
+
+        Args:
+            seconds: Duração da janela (limitada a max_seconds)
+            interval: Intervalo entre amostras (s)
+            threads: Papéis amostrados (padrão: event_loop, capture, executor; 'all' = todas)
+            memory: Registrar alocações com tracemalloc durante a janela
+            memory_frames: Profundidade das pilhas do tracemalloc
+            memory_limit: Pontos de alocação mantidos (maiores primeiro)
+
+        Raises:
+            RuntimeError: Já existe um profile em andamento
+        """
+        with self._lock:
+            if self._running:
+                raise RuntimeError("Já existe um profile em andamento")
+            self._running = True
+
+        roles: Set[str] = set(threads or THREAD_ROLES)
+        seconds = max(0.1, min(float(seconds), self.max_seconds))
+        interval = max(0.001, min(float(interval), 1.0))
+
+        loop_thread = threading.get_ident()
+        stop = threading.Event()
+        sampler = _Sampler(roles, loop_thread, interval)
+        thread = threading.Thread(target=sampler.run, args=(stop,), name='shopflow-profiler', daemon=True)
+
+        started_tracemalloc = False
+        try:
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start(memory_frames)
+                started_tracemalloc = True
+            if memory:
+                tracemalloc.clear_traces()
+
+            logger.info(f"🔬 Profiling por {seconds:.1f}s (intervalo {interval * 1000:.1f}ms, threads: {', '.join(sorted(roles))})")
+            started_at = time.time()
+            thread.start()
+            await asyncio.sleep(seconds)
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            duration = time.time() - started_at
+
+            allocations = []
+            if memory:
+                # Snapshot e agregação fora do event loop (podem levar segundos)
+                snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                    started_tracemalloc = False
+                statistics = await asyncio.to_thread(self._allocation_statistics, snapshot, memory_limit)
+                allocations = [
+                    (tuple(sampler.intern(frame.filename, '', frame.lineno) for frame in traceback), size, count)
+                    for traceback, size, count in statistics
+                ]
+
+            result = ProfileResult(
+                started_at=started_at,
+                duration=duration,
+                interval=interval,
+                frames=sampler.frames,
+                stacks=sampler.stacks,
+                samples=sampler.samples,
+                allocations=allocations
+            )
+            self.last_run = {
+                'started_at': started_at,
+                'duration_seconds': round(result.duration, 3),
+                'samples': sum(sampler.samples.values()),
+                'sampler_seconds': round(sampler.busy, 4),
+                'memory': memory
+            }
+            logger.info(
+                f"🔬 Profile concluído: {self.last_run['samples']} amostras "
+                f"(amostrador ocupado {sampler.busy * 1000:.0f}ms)"
+            )
+            return result
+
+        finally:
+            stop.set()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            with self._lock:
+                self._running = False
+
+    @staticmethod
+    def _allocation_statistics(snapshot, limit: int) -> List[Tuple[Any, int, int]]:
+        """Maiores pontos de alocação (pilha, bytes, blocos), sem o próprio profiler"""
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        return [(stat.traceback, stat.size, stat.count) for stat in snapshot.statistics('traceback')[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'running': self._running, 'max_seconds': self.max_seconds, 'last_run': self.last_run}
+
+
+class _Sampler:
+    """Laço de amostragem (roda na thread do profiler)"""
+
+    def __init__(self, roles: Set[str], loop_thread: int, interval: float):
+        self.roles = roles
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.frames: List[Tuple[str, str, int]] = []
+        self.stacks: Dict[str, Counter] = {}
+        self.samples: Dict[str, int] = {}
+        self.busy = 0.0
+        self._frame_index: Dict[Any, int] = {}
+        self._thread_names: Dict[int, Optional[str]] = {}
+
+    def intern(self, path: str, name: str, line: int) -> int:
+        key = (path, name, line)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append((name, _short_path(path), line))
+        return index
+
+    def _code_index(self, code) -> int:
+        index = self._frame_index.get(code)
+        if index is None:
+            index = self._frame_index[code] = self.intern(code.co_filename, code.co_name, code.co_firstlineno)
+        return index
+
+    def _thread_label(self, ident: int) -> Optional[str]:
+        """Nome do perfil da thread (None = fora dos papéis pedidos)"""
+        if ident in self._thread_names:
+            return self._thread_names[ident]
+
+        thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+        name = thread.name if thread else str(ident)
+        if ident == self.loop_thread:
+            role = 'event_loop'
+        elif name.startswith('rtsp-capture'):
+            role = 'capture'
+        elif name.startswith(('asyncio_', 'ThreadPoolExecutor')):
+            role = 'executor'
+        else:
+            role = None
+
+        if role and (role in self.roles or 'all' in self.roles):
+            label = role if role == 'event_loop' else f"{role}:{name}"
+        elif 'all' in self.roles:
+            label = name
+        else:
+            label = None
+
+        self._thread_names[ident] = label
+        return label
+
+    def run(self, stop: threading.Event):
+        own = threading.get_ident()
+        last = time.perf_counter()
+
+        while not stop.wait(self.interval):
+            started = time.perf_counter()
+            weight = started - last
+            last = started
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                label = self._thread_label(ident)
+                if label is None:
+                    continue
+
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(self._code_index(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+
+                stacks = self.stacks.get(label)
+                if stacks is None:
+                    stacks = self.stacks[label] = Counter()
+                stacks[tuple(stack)] += weight
+                self.samples[label] = self.samples.get(label, 0) + 1
+
+            self.busy += time.perf_counter() - started
+
+
+# Instância compartilhada (endpoint de admin)
+profiler = SamplingProfiler()
@@ -0,0 +1,470 @@
+"""
+Replay Source - Vídeo gravado ou cena sintética pela interface do RTSPCameraManager
+
+Alimenta o RTSPFrameProcessor (e benchmarks) sem câmera ao vivo, com a mesma
+API do RTSPCameraManager (connect, get_frame, get_latest_frame, get_stats,
+is_healthy, disconnect) e a mesma thread de captura ("rtsp-capture").
+
+Fontes (create_camera_manager escolhe pela URL):
+    rtsp://...                                   -> RTSPCameraManager (câmera real)
+    file:///dados/loja.mp4?rate=5&loop=1          -> vídeo gravado
+    /dados/loja.mp4                               -> vídeo gravado (caminho local)
+    synthetic://?people=8&width=1280&height=720&frames=3000&seed=42
+
+Cadência:
+- rate > 0: frames entregues nesse ritmo (como a câmera); fila cheia descarta o mais antigo
+- rate = 0: o mais rápido possível, sem descarte (a thread espera a fila)
+
+A cena sintética é determinística (seed): pessoas são retângulos de cor fixa
+andando com velocidade constante (parte em duplas, para formar grupos), e o
+SyntheticDetector as encontra por cor, no formato do YOLOPersonDetector.
+InMemoryDatabase substitui o SupabaseManager (eventos, rollups, tiles e
+calibração) nos benchmarks e testes.
+
+Usage:
+    manager = create_camera_manager("synthetic://?people=8&frames=500", target_fps=5)
+    processor = RTSPFrameProcessor(url, detector=SyntheticDetector(), ..., camera_manager=manager)
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from core.metrics import NULL_CAMERA_METRICS
+from core.rtsp_capture import CameraStats, RTSPCameraManager
+
+# Cor (BGR) das pessoas na cena sintética e tolerância do detector
+PERSON_COLOR = (60, 180, 75)
+COLOR_TOLERANCE = 12
+OUTLINE_COLOR = (20, 20, 20)
+
+
+class SyntheticScene:
+    """Cena determinística com pessoas andando (retângulos de cor fixa)"""
+
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        people: int = 8,
+        seed: int = 42,
+        group_ratio: float = 0.5
+    ):
+        self.width = width
+        self.height = height
+        self.people = people
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+
+        # Fundo fixo com textura (o encode JPEG não fica artificialmente barato)
+        gradient = np.linspace(40, 110, width, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 6, (height, width, 1)).astype(np.float32)
+        self._background = np.clip(gradient + noise, 0, 255).astype(np.uint8).repeat(3, axis=2)
+
+        # Pessoas: posição (centro dos pés), velocidade (px/frame), largura
+        self._positions = np.column_stack([
+            rng.uniform(0.1, 0.9, people) * width,
+            rng.uniform(0.35, 0.95, people) * height
+        ])
+        self._velocities = rng.uniform(-6, 6, (people, 2))
+        self._widths = rng.uniform(0.8, 1.2, people)
+
+        # Duplas andando juntas (mesma velocidade, lado a lado sem se sobrepor)
+        paired = int(people * group_ratio) // 2 * 2
+        for i in range(0, paired, 2):
+            x1, _, x2, _ = self._box(i)
+            gap = (x2 - x1) + rng.uniform(10, 25)
+            self._positions[i + 1] = self._positions[i] + (gap, 0)
+            self._velocities[i + 1] = self._velocities[i]
+
+        self.index = 0
+
+    def _box(self, i: int) -> Tuple[int, int, int, int]:
+        x, y = self._positions[i]
+        # Perspectiva simples: mais perto da base do frame = maior
+        height = (0.12 + 0.28 * y / self.height) * self.height
+        width = height * 0.38 * self._widths[i]
+        return (int(x - width / 2), int(y - height), int(x + width / 2), int(y))
+
+    def _boxes(self) -> List[Tuple[int, int, int, int]]:
+        return [self._box(i) for i in range(self.people)]
+
+    def _step(self):
+        self._positions += self._velocities
+        for axis, limit in ((0, self.width), (1, self.height)):
+            low = 0.05 * limit if axis == 0 else 0.3 * limit
+            out = (self._positions[:, axis] < low) | (self._positions[:, axis] > 0.97 * limit)
+            self._velocities[out, axis] *= -1
+            self._positions[:, axis] = np.clip(self._positions[:, axis], low, 0.97 * limit)
+
+    def next_frame(self) -> Tuple[np.ndarray, List[Tuple[int, int, int, int]]]:
+        """Próximo frame BGR e as bboxes verdadeiras"""
+        frame = self._background.copy()
+        boxes = self._boxes()
+        for x1, y1, x2, y2 in boxes:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), PERSON_COLOR, -1)
+            # Contorno escuro: pessoas sobrepostas continuam separáveis (oclusão parcial)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), OUTLINE_COLOR, 2)
+        self._step()
+        self.index += 1
+        return frame, boxes
+
+
+class SyntheticDetector:
+    """Detector por cor para a cena sintética (mesmo formato do YOLOPersonDetector)"""
+
+    def __init__(self, confidence: float = 0.9, min_area: int = 400):
+        self.confidence = confidence
+        self.min_area = min_area
+        self.model = "synthetic"
+        lower = np.array(PERSON_COLOR, dtype=np.int16) - COLOR_TOLERANCE
+        upper = np.array(PERSON_COLOR, dtype=np.int16) + COLOR_TOLERANCE
+        self._lower = np.clip(lower, 0, 255).astype(np.uint8)
+        self._upper = np.clip(upper, 0, 255).astype(np.uint8)
+
+    async def load_model(self):
+        pass
+
+    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        mask = cv2.inRange(frame, self._lower, self._upper)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        detections = []
+        for contour in contours:
+            x, y, width, height = cv2.boundingRect(contour)
+            if width * height < self.min_area:
+                continue
+            detections.append({
+                'bbox': [x, y, x + width, y + height],
+                'center': [x + width // 2, y + height // 2],
+                'confidence': self.confidence,
+                'width': width,
+                'height': height,
+                'area': width * height,
+                'class': 'person'
+            })
+        return detections
+
+    async def detect_persons(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        return self.detect(frame)
+
+
+class ReplayCameraManager:
+    """
+    Fonte de frames gravada/sintética com a interface do RTSPCameraManager.
+
+    A thread de captura lê o vídeo (reduzindo para target_fps pelo índice do
+    frame, de forma determinística) ou gera a cena, e enfileira no ritmo `rate`.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, SyntheticScene],
+        target_fps: int = 5,
+        rate: Optional[float] = None,
+        loop: bool = False,
+        max_frames: Optional[int] = None,
+        frame_queue_size: int = 30
+    ):
+        """
+        Args:
+            source: Caminho do vídeo ou SyntheticScene
+            target_fps: FPS de processamento (vídeo é reduzido para ele)
+            rate: Frames por segundo entregues (None = target_fps, 0 = sem limite)
+            loop: Recomeçar o vídeo ao terminar
+            max_frames: Parar após N frames entregues (obrigatório se loop na cena sintética)
+            frame_queue_size: Tamanho da fila (igual à câmera)
+        """
+        self.source = source
+        self.rtsp_url = source if isinstance(source, str) else f"synthetic://?people={source.people}&seed={source.seed}"
+        self.target_fps = target_fps
+        self.rate = target_fps if rate is None else rate
+        self.loop = loop
+        self.max_frames = max_frames
+        self.frame_queue_size = frame_queue_size
+
+        self.capture: Optional[cv2.VideoCapture] = None
+        self.is_running = False
+        self.capture_thread: Optional[threading.Thread] = None
+        self.frame_queue: queue.Queue = queue.Queue(maxsize=frame_queue_size)
+        self.exhausted = False
+
+        self.stats = CameraStats(
+            is_connected=False,
+            fps_received=0.0,
+            fps_processed=0.0,
+            frames_dropped=0,
+            last_frame_time=None,
+            reconnection_attempts=0,
+            total_frames_captured=0
+        )
+        self.last_queue_latency: Optional[float] = None  # s entre enfileirar e get_frame
+        self.metrics = NULL_CAMERA_METRICS
+        self._lock = threading.Lock()
+
+    def _sanitize_url(self, url: str) -> str:
+        return url
+
+    @property
+    def finished(self) -> bool:
+        """Fonte esgotada e fila vazia"""
+        return self.exhausted and self.frame_queue.empty()
+
+    def connect(self) -> bool:
+        """Abrir a fonte e iniciar a thread de captura"""
+        try:
+            if isinstance(self.source, str):
+                self.capture = cv2.VideoCapture(self.source)
+                if not self.capture.isOpened():
+                    logger.error(f"Failed to open replay source: {self.source}")
+                    return False
+
+            self.is_running = True
+            self.exhausted = False
+            self.stats.is_connected = True
+            self.capture_thread = threading.Thread(target=self._capture_loop, name="rtsp-capture", daemon=True)
+            self.capture_thread.start()
+
+            logger.info(f"Replay started: {self.rtsp_url} (rate: {self.rate or 'max'} fps)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error opening replay source {self.rtsp_url}: {e}")
+            return False
+
+    def _frames(self):
+        """Gerador de frames na cadência de processamento"""
+        if isinstance(self.source, SyntheticScene):
+            while True:
+                frame, _ = self.source.next_frame()
+                yield frame
+
+        source_fps = self.capture.get(cv2.CAP_PROP_FPS) or self.target_fps
+        step = max(source_fps / self.target_fps, 1.0)
+        while True:
+            index = 0
+            next_kept = 0.0
+            while True:
+                started = time.perf_counter()
+                ret, frame = self.capture.read()
+                self.metrics.observe('decode', time.perf_counter() - started)
+                if not ret or frame is None:
+                    break
+                if index >= next_kept:
+                    next_kept += step
+                    yield frame
+                index += 1
+
+            if not self.loop:
+                return
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _capture_loop(self):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        next_due = time.perf_counter()
+        delivered = 0
+
+        for frame in self._frames():
+            if not self.is_running or (self.max_frames is not None and delivered >= self.max_frames):
+                break
+
+            if interval:
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_due = max(next_due + interval, time.perf_counter() - interval)
+
+            item = (frame, datetime.now(), time.perf_counter())
+            if interval:
+                # Ritmo de câmera: fila cheia descarta o mais antigo
+                try:
+                    self.frame_queue.put_nowait(item)
+                except queue.Full:
+                    try:
+                        self.frame_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    self.frame_queue.put_nowait(item)
+                    with self._lock:
+                        self.stats.frames_dropped += 1
+                    self.metrics.dropped()
+            else:
+                # Sem limite: espera o consumidor (nenhum frame descartado)
+                while self.is_running:
+                    try:
+                        self.frame_queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+            delivered += 1
+            with self._lock:
+                self.stats.total_frames_captured += 1
+                self.stats.last_frame_time = item[1]
+
+        self.exhausted = True
+        logger.info(f"Replay finished: {delivered} frames delivered")
+
+    def get_frame(self, timeout: float = 1.0) -> Optional[np.ndarray]:
+        """Próximo frame da fila (None se timeout)"""
+        try:
+            frame, _, enqueued = self.frame_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.last_queue_latency = time.perf_counter() - enqueued
+        return frame
+
+    def get_latest_frame(self) -> Optional[Tuple[np.ndarray, datetime]]:
+        """Frame mais recente, descartando os anteriores"""
+        item = None
+        try:
+            while True:
+                item = self.frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        return (item[0], item[1]) if item else None
+
+    def get_stats(self) -> CameraStats:
+        with self._lock:
+            return CameraStats(**self.stats.__dict__)
+
+    def is_healthy(self) -> bool:
+        return self.is_running and not self.exhausted
+
+    def disconnect(self):
+        self.is_running = False
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=5.0)
+        if self.capture is not None:
+            self.capture.release()
+        with self._lock:
+            self.stats.is_connected = False
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+
+class InMemoryDatabase:
+    """Banco falso com os métodos usados pelo processador (latência opcional por chamada)"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.events: List[Dict[str, Any]] = []
+        self.rollups: Dict[tuple, Dict[str, Any]] = {}
+        self.tiles: Dict[tuple, Dict[str, Any]] = {}
+        self.calibrations: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {}
+
+    async def _call(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def insert_camera_event_simple(self, event_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        await self._call('insert_camera_event_simple')
+        self.events.append(event_data)
+        return event_data
+
+    async def upsert_camera_rollups(self, rollups: List[Dict[str, Any]]) -> bool:
+        await self._call('upsert_camera_rollups')
+        for row in rollups:
+            self.rollups[(row['camera_id'], row['resolution'], row['bucket_start'])] = row
+        return True
+
+    async def refresh_camera_rollups(self, *args, **kwargs) -> int:
+        await self._call('refresh_camera_rollups')
+        return 0
+
+    async def rebuild_camera_rollups(self, *args, **kwargs) -> int:
+        await self._call('rebuild_camera_rollups')
+        return 0
+
+    async def get_camera_rollups(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        await self._call('get_camera_rollups')
+        return []
+
+    async def upsert_heatmap_tiles(self, tiles: List[Dict[str, Any]]) -> bool:
+        await self._call('upsert_heatmap_tiles')
+        for row in tiles:
+            self.tiles[(row['camera_id'], row['resolution'], row['bucket_start'])] = row
+        return True
+
+    async def get_heatmap_tiles(
+        self, camera_id: str, resolution: str, start: datetime, end: datetime
+    ) -> List[Dict[str, Any]]:
+        await self._call('get_heatmap_tiles')
+        return [
+            row for (camera, res, bucket), row in sorted(self.tiles.items())
+            if camera == camera_id and res == resolution
+            and start <= datetime.fromisoformat(bucket) < end
+        ]
+
+    async def get_all_employees(self) -> List[Dict[str, Any]]:
+        return []
+
+    async def get_camera_calibration(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        return self.calibrations.get(camera_id)
+
+    async def update_camera_calibration(self, camera_id: str, calibration: Dict[str, Any]) -> bool:
+        await self._call('update_camera_calibration')
+        self.calibrations[camera_id] = calibration
+        return True
+
+
+def create_camera_manager(
+    url: str,
+    target_fps: int = 5,
+    reconnect_timeout: int = 10,
+    frame_queue_size: int = 30
+) -> Union[RTSPCameraManager, ReplayCameraManager]:
+    """Câmera RTSP ou fonte de replay conforme a URL (ver docstring do módulo)"""
+    parsed = urlparse(url)
+    params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    if parsed.scheme == 'synthetic':
+        scene = SyntheticScene(
+            width=int(params.get('width', 1280)),
+            height=int(params.get('height', 720)),
+            people=int(params.get('people', 8)),
+            seed=int(params.get('seed', 42))
+        )
+        frames = params.get('frames')
+        return ReplayCameraManager(
+            scene,
+            target_fps=target_fps,
+            rate=float(params['rate']) if 'rate' in params else None,
+            max_frames=int(frames) if frames else None,
+            frame_queue_size=frame_queue_size
+        )
+
+    path = parsed.path if parsed.scheme == 'file' else (url if not parsed.scheme and os.path.exists(url) else None)
+    if path:
+        frames = params.get('frames')
+        return ReplayCameraManager(
+            path,
+            target_fps=target_fps,
+            rate=float(params['rate']) if 'rate' in params else None,
+            loop=params.get('loop', '0') in ('1', 'true'),
+            max_frames=int(frames) if frames else None,
+            frame_queue_size=frame_queue_size
+        )
+
+    return RTSPCameraManager(
+        rtsp_url=url,
+        target_fps=target_fps,
+        reconnect_timeout=reconnect_timeout,
+        frame_queue_size=frame_queue_size
+    )
@@ -0,0 +1,240 @@
+"""
+Response Cache - Cache TTL com single-flight para endpoints de leitura
+
+- TTL curto por endpoint; entradas marcadas com tags ('camera_events', ...)
+  e invalidadas pelo caminho de escrita (por lote do journal; inserts
+  diretos com invalidate_throttled, no máximo uma vez por TTL)
+- Single-flight: requisições idênticas simultâneas aguardam a mesma consulta
+- Corpo serializado uma vez, com ETag; If-None-Match responde 304
+- Estatísticas: hit rate e consultas ao banco economizadas
+
+Usage:
+    return await response_cache.respond(
+        request, lambda: _compute_metrics(), ttl=2.0, tags=('camera_events',)
+    )
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from fastapi import Request, Response
+from loguru import logger
+
+from core.message_encoding import dumps
+
+
+class CacheEntry:
+    """Resposta cacheada (corpo JSON já serializado)"""
+
+    __slots__ = ('body', 'etag', 'expires_at', 'tags')
+
+    def __init__(self, body: bytes, ttl: float, tags: Iterable[str]):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.expires_at = time.monotonic() + ttl
+        self.tags = tuple(tags)
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """Cache em memória por processo"""
+
+    def __init__(self, max_entries: int = 1024, enabled: bool = True):
+        """
+        Args:
+            max_entries: Máximo de entradas (LRU)
+            enabled: Desligado = sempre consulta (útil para depuração)
+        """
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._generation: Dict[str, int] = {}
+        self._last_invalidation: Dict[str, float] = {}
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'not_modified': 0,
+            'invalidations': 0,
+            'db_queries': 0
+        }
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        params = sorted(request.query_params.multi_items())
+        return request.url.path + '?' + '&'.join(f"{k}={v}" for k, v in params)
+
+    def _tag_generation(self, tags: Iterable[str]) -> tuple:
+        return tuple(self._generation.get(tag, 0) for tag in tags)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        tags: Iterable[str] = (),
+        cache_if: Optional[Callable[[Any], bool]] = None
+    ) -> CacheEntry:
+        """
+        Retorna a entrada do cache ou executa compute (uma vez por chave).
+
+        Args:
+            key: Chave da resposta
+            compute: Corrotina que consulta o banco e retorna o payload
+            ttl: Validade em segundos
+            tags: Tags para invalidação pelo caminho de escrita
+            cache_if: Predicado; False = não guardar (ex: respostas de erro)
+        """
+        tags = tuple(tags)
+
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None and entry.fresh:
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Requisição líder cancelada (cliente desconectou): tentar de novo
+                return await self.get_or_compute(key, compute, ttl, tags, cache_if)
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            generation = self._tag_generation(tags)
+            self.stats['db_queries'] += 1
+            payload = await compute()
+            entry = CacheEntry(dumps(payload), ttl, tags)
+
+            # Não guardar se houve invalidação durante a consulta
+            storable = cache_if is None or cache_if(payload)
+            if self.enabled and storable and generation == self._tag_generation(tags):
+                self._store(key, entry)
+
+            future.set_result(entry)
+            return entry
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Evita "exception was never retrieved" sem aguardantes
+            raise
+
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: str, entry: CacheEntry):
+        self._discard(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, *tags: str):
+        """Remove entradas com as tags (chamado após escritas)"""
+        for tag in tags:
+            self._generation[tag] = self._generation.get(tag, 0) + 1
+            keys = self._tags.pop(tag, set())
+            for key in list(keys):
+                self._discard(key)
+            if keys:
+                self.stats['invalidations'] += len(keys)
+            self._last_invalidation[tag] = time.monotonic()
+
+    def invalidate_throttled(self, tag: str, min_interval: float) -> bool:
+        """
+        Invalidar no máximo uma vez por min_interval (escritas de alta frequência).
+
+        Invalidar a cada insert (~5 Hz) apagaria entradas de TTL curto logo
+        após criadas e descartaria toda consulta mais lenta que o intervalo
+        entre escritas. Com min_interval igual ao menor TTL dos leitores, a
+        defasagem continua limitada ao TTL.
+
+        Returns:
+            True se invalidou
+        """
+        last = self._last_invalidation.get(tag)
+        if last is not None and time.monotonic() - last < min_interval:
+            return False
+        self.invalidate(tag)
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    async def respond(
+        self,
+        request: Request,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        tags: Iterable[str] = (),
+        cache_if: Optional[Callable[[Any], bool]] = None
+    ) -> Response:
+        """Resposta HTTP cacheada com ETag / If-None-Match"""
+        entry = await self.get_or_compute(self.key_for(request), compute, ttl, tags, cache_if)
+
+        headers = {
+            'ETag': entry.etag,
+            'Cache-Control': f"private, max-age={max(int(ttl), 0)}"
+        }
+
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.stats['not_modified'] += 1
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=entry.body, media_type='application/json', headers=headers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            requests = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+            saved = self.stats['hits'] + self.stats['coalesced']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'inflight': len(self._inflight),
+                'requests': requests,
+                'db_queries_saved': saved,
+                'hit_rate': round(saved / requests, 4) if requests else 0.0
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter stats do cache: {e}")
+            return {'error': str(e)}
+
+
+# Instância compartilhada (rotas de leitura + invalidação no caminho de escrita)
+response_cache = ResponseCache()
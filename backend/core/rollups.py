@@ -0,0 +1,423 @@
+"""
+Camera Rollups - Agregados de camera_events por minuto, hora e dia
+
+Mantidos incrementalmente no caminho de escrita: cada evento gravado pelo
+processador é somado no bucket de minuto aberto da câmera; ao fechar o minuto
+ele é somado na hora e no dia abertos (mesmo esquema dos heatmap tiles).
+
+Cada bucket guarda:
+- Amostras (frames), somas e máximos de pessoas, clientes, funcionários e grupos
+- Membros em grupos e tempo de processamento somado
+- Histograma de permanência (dwell) das visitas encerradas no bucket
+
+Gravação idempotente (upsert por câmera/resolução/bucket com o valor
+completo do bucket, nunca incremento):
+- Minuto fechado: gravado uma vez
+- Hora e dia abertos: regravados a cada minuto fechado, então dashboards
+  enxergam o período corrente com no máximo um minuto de atraso
+- Buckets que o processo não acompanhou desde o início (reinício no meio da
+  hora) são recalculados no banco a partir da resolução inferior
+
+Consultas de período usam plan_tile_ranges: minutos nas pontas, horas e dias
+completos no meio (poucas linhas por consulta, independente do volume bruto).
+
+Backfill: backfill_rollups() reconstrói os agregados a partir de camera_events
+em janelas de tempo; a agregação roda no banco e a memória não cresce com o
+histórico.
+
+Usage:
+    store = RollupStore(supabase_manager)
+    await store.add_event("camera1", metrics, datetime.now())
+    rows = await load_rollup_range(supabase_manager, start, end)
+    totals = summarize_rollups(rows)
+"""
+
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from core.heatmap_tiles import RESOLUTIONS, floor_time, plan_tile_ranges
+
+# Limites superiores (segundos) das faixas do histograma de permanência;
+# a última faixa (acima de 1h) fica implícita
+DWELL_BINS_SECONDS: Tuple[int, ...] = (30, 60, 120, 300, 600, 900, 1800, 3600)
+
+_RESOLUTION_DELTA = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# Colunas somadas ao combinar buckets
+_SUM_FIELDS = (
+    'samples', 'people_sum', 'customers_sum', 'employees_sum',
+    'groups_sum', 'group_members_sum', 'processing_ms_sum', 'dwell_count'
+)
+_MAX_FIELDS = ('people_max', 'customers_max', 'groups_max')
+
+
+def dwell_bin(seconds: float) -> int:
+    """Índice da faixa do histograma para uma permanência"""
+    for index, limit in enumerate(DWELL_BINS_SECONDS):
+        if seconds < limit:
+            return index
+    return len(DWELL_BINS_SECONDS)
+
+
+def _empty_histogram() -> List[int]:
+    return [0] * (len(DWELL_BINS_SECONDS) + 1)
+
+
+def _group_members(groups_detail: Any) -> int:
+    if not isinstance(groups_detail, list):
+        return 0
+    return sum(int(group.get('size') or 0) for group in groups_detail if isinstance(group, dict))
+
+
+@dataclass
+class RollupBucket:
+    """Agregado de uma câmera em um bucket de tempo"""
+    camera_id: str
+    resolution: str
+    bucket_start: datetime
+    samples: int = 0
+    people_sum: int = 0
+    people_max: int = 0
+    customers_sum: int = 0
+    customers_max: int = 0
+    employees_sum: int = 0
+    groups_sum: int = 0
+    groups_max: int = 0
+    group_members_sum: int = 0
+    processing_ms_sum: int = 0
+    dwell_hist: List[int] = field(default_factory=_empty_histogram)
+    dwell_count: int = 0
+    dwell_seconds_sum: float = 0.0
+    complete: bool = True  # False se o processo não viu o bucket inteiro
+
+    @property
+    def empty(self) -> bool:
+        return self.samples == 0 and self.dwell_count == 0
+
+    def add_event(self, metrics: Dict[str, Any]):
+        """Soma as métricas de um frame"""
+        people = int(metrics.get('total_people') or 0)
+        customers = int(metrics.get('potential_customers') or 0)
+        groups = int(metrics.get('groups_count') or 0)
+
+        self.samples += 1
+        self.people_sum += people
+        self.people_max = max(self.people_max, people)
+        self.customers_sum += customers
+        self.customers_max = max(self.customers_max, customers)
+        self.employees_sum += int(metrics.get('employees_count') or 0)
+        self.groups_sum += groups
+        self.groups_max = max(self.groups_max, groups)
+        self.group_members_sum += _group_members(metrics.get('groups_detail'))
+        self.processing_ms_sum += int(metrics.get('processing_time_ms') or 0)
+
+    def add_dwell(self, seconds: float):
+        """Registra uma visita encerrada"""
+        self.dwell_hist[dwell_bin(seconds)] += 1
+        self.dwell_count += 1
+        self.dwell_seconds_sum += seconds
+
+    def merge(self, other: 'RollupBucket'):
+        """Soma outro bucket (resolução inferior) neste"""
+        for name in _SUM_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in _MAX_FIELDS:
+            setattr(self, name, max(getattr(self, name), getattr(other, name)))
+        self.dwell_hist = [a + b for a, b in zip(self.dwell_hist, other.dwell_hist)]
+        self.dwell_seconds_sum += other.dwell_seconds_sum
+        self.complete = self.complete and other.complete
+
+    def to_record(self) -> Dict[str, Any]:
+        """Registro para upsert na tabela camera_rollups"""
+        return {
+            "camera_id": self.camera_id,
+            "resolution": self.resolution,
+            "bucket_start": self.bucket_start.isoformat(),
+            "samples": self.samples,
+            "people_sum": self.people_sum,
+            "people_max": self.people_max,
+            "customers_sum": self.customers_sum,
+            "customers_max": self.customers_max,
+            "employees_sum": self.employees_sum,
+            "groups_sum": self.groups_sum,
+            "groups_max": self.groups_max,
+            "group_members_sum": self.group_members_sum,
+            "processing_ms_sum": self.processing_ms_sum,
+            "dwell_hist": list(self.dwell_hist),
+            "dwell_count": self.dwell_count,
+            "dwell_seconds_sum": round(self.dwell_seconds_sum, 3)
+        }
+
+
+class RollupAccumulator:
+    """
+    Mantém os buckets abertos (minuto, hora, dia) de cada câmera.
+
+    Usage:
+        accumulator = RollupAccumulator()
+        closed = accumulator.add_event("camera1", metrics, datetime.now())
+        # closed: buckets finalizados prontos para persistir
+    """
+
+    def __init__(self):
+        self._cameras: Dict[str, Dict[str, RollupBucket]] = {}
+
+    def _roll(self, camera_id: str, timestamp: datetime) -> List[RollupBucket]:
+        """Fecha os buckets que terminaram (somando no pai) e abre os novos"""
+        camera = self._cameras.setdefault(camera_id, {})
+        closed: List[RollupBucket] = []
+
+        for level, resolution in enumerate(RESOLUTIONS):
+            bucket_start = floor_time(timestamp, resolution)
+            bucket = camera.get(resolution)
+
+            if bucket is not None and bucket.bucket_start == bucket_start:
+                break  # Resoluções superiores também continuam abertas
+
+            if bucket is not None:
+                closed.append(bucket)
+                parent = RESOLUTIONS[level + 1] if level + 1 < len(RESOLUTIONS) else None
+                parent_bucket = camera.get(parent) if parent else None
+                if parent_bucket is not None and floor_time(bucket.bucket_start, parent) == parent_bucket.bucket_start:
+                    parent_bucket.merge(bucket)
+
+            # Bucket completo só se o processo o acompanha desde o início
+            if level == 0:
+                complete = bucket is not None
+            else:
+                child = RESOLUTIONS[level - 1]
+                complete = bucket is not None and floor_time(timestamp, child) == bucket_start
+
+            camera[resolution] = RollupBucket(camera_id, resolution, bucket_start, complete=complete)
+
+        return closed
+
+    def add_event(self, camera_id: str, metrics: Dict[str, Any], timestamp: datetime) -> List[RollupBucket]:
+        """
+        Soma o evento no minuto aberto.
+
+        Returns:
+            Buckets fechados por este evento (vazio na maior parte do tempo)
+        """
+        closed = self._roll(camera_id, timestamp)
+        self._cameras[camera_id]['minute'].add_event(metrics)
+        return closed
+
+    def add_dwell(self, camera_id: str, seconds: float, timestamp: datetime) -> List[RollupBucket]:
+        """Registra uma visita encerrada no minuto aberto da câmera"""
+        closed = [] if camera_id in self._cameras else self._roll(camera_id, timestamp)
+        self._cameras[camera_id]['minute'].add_dwell(seconds)
+        return closed
+
+    def _cumulative(self, camera_id: str, include_minute: bool) -> List[RollupBucket]:
+        """
+        Cópias dos buckets abertos com as resoluções inferiores abertas somadas
+        (a hora aberta só recebe minutos fechados, o dia só horas fechadas).
+        """
+        camera = self._cameras.get(camera_id, {})
+        views: List[RollupBucket] = []
+        child: Optional[RollupBucket] = camera.get('minute') if include_minute else None
+        if child is not None:
+            views.append(child)
+
+        for resolution in RESOLUTIONS[1:]:
+            bucket = camera.get(resolution)
+            if bucket is None:
+                break
+            view = replace(bucket, dwell_hist=list(bucket.dwell_hist))
+            if child is not None:
+                view.merge(child)
+            views.append(view)
+            child = view
+        return views
+
+    def open_parents(self, camera_id: str) -> List[RollupBucket]:
+        """Hora e dia abertos até o último minuto fechado (regravados a cada minuto)"""
+        return self._cumulative(camera_id, include_minute=False)
+
+    def drain(self) -> List[RollupBucket]:
+        """Retorna os buckets abertos de todas as câmeras, incluindo o minuto parcial"""
+        buckets: List[RollupBucket] = []
+        for camera_id in list(self._cameras):
+            buckets.extend(self._cumulative(camera_id, include_minute=True))
+        self._cameras.clear()
+        return buckets
+
+
+class RollupStore:
+    """
+    Persistência incremental dos rollups de uma ou mais câmeras.
+
+    Usage:
+        store = RollupStore(supabase_manager)
+        await store.add_event("camera1", metrics, datetime.now())
+        await store.flush()  # ao parar o processamento
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.accumulator = RollupAccumulator()
+
+        self.stats = {
+            "buckets_written": 0,
+            "buckets_refreshed": 0,
+            "write_errors": 0
+        }
+
+    async def add_event(self, camera_id: str, metrics: Dict[str, Any], timestamp: datetime):
+        """Acumula um evento; ao fechar um minuto grava o minuto e os pais abertos"""
+        closed = self.accumulator.add_event(camera_id, metrics, timestamp)
+        if closed:
+            await self._persist(closed + self.accumulator.open_parents(camera_id))
+
+    def add_dwell(self, camera_id: str, seconds: float, timestamp: datetime):
+        """Registra a permanência de uma visita encerrada (gravada no próximo minuto fechado)"""
+        self.accumulator.add_dwell(camera_id, seconds, timestamp)
+
+    async def flush(self):
+        """Grava os buckets abertos (chamar ao parar o processamento)"""
+        buckets = self.accumulator.drain()
+        if buckets:
+            await self._persist(buckets)
+
+    async def _persist(self, buckets: List[RollupBucket]):
+        """
+        Grava buckets completos em um único upsert; incompletos são
+        recalculados no banco (minuto a partir de camera_events, hora/dia a
+        partir da resolução inferior), do menor para o maior.
+        """
+        complete = [bucket for bucket in buckets if bucket.complete and not bucket.empty]
+        partial = sorted(
+            (bucket for bucket in buckets if not bucket.complete),
+            key=lambda bucket: RESOLUTIONS.index(bucket.resolution)
+        )
+
+        try:
+            if complete:
+                if await self.database.upsert_camera_rollups([bucket.to_record() for bucket in complete]):
+                    self.stats["buckets_written"] += len(complete)
+                else:
+                    self.stats["write_errors"] += 1
+
+            for bucket in partial:
+                end = bucket.bucket_start + _RESOLUTION_DELTA[bucket.resolution]
+                if bucket.resolution == 'minute':
+                    refreshed = await self.database.rebuild_camera_rollups(bucket.bucket_start, end, bucket.camera_id)
+                else:
+                    refreshed = await self.database.refresh_camera_rollups(
+                        bucket.resolution, bucket.bucket_start, end, bucket.camera_id
+                    )
+                if refreshed is None:
+                    self.stats["write_errors"] += 1
+                else:
+                    self.stats["buckets_refreshed"] += 1
+
+        except Exception as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"Erro ao gravar rollups: {e}")
+
+
+async def load_rollup_range(
+    database,
+    start: datetime,
+    end: datetime,
+    camera_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Linhas de rollup que cobrem [start, end) sem sobreposição.
+
+    Minutos nas pontas, horas e dias completos no meio: no máximo cinco
+    consultas pequenas para qualquer período.
+    """
+    rows: List[Dict[str, Any]] = []
+    for resolution, range_start, range_end in plan_tile_ranges(start, end):
+        rows.extend(await database.get_camera_rollups(resolution, range_start, range_end, camera_id))
+    return rows
+
+
+def summarize_rollups(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combina linhas de rollup em totais do período.
+
+    Returns:
+        Somas, máximos, médias por frame, histograma de permanência e
+        permanência média (segundos)
+    """
+    totals: Dict[str, Any] = {name: 0 for name in _SUM_FIELDS + _MAX_FIELDS}
+    totals["dwell_hist"] = _empty_histogram()
+    totals["dwell_seconds_sum"] = 0.0
+
+    for row in rows:
+        for name in _SUM_FIELDS:
+            totals[name] += row.get(name) or 0
+        for name in _MAX_FIELDS:
+            totals[name] = max(totals[name], row.get(name) or 0)
+        for index, count in enumerate((row.get("dwell_hist") or [])[:len(totals["dwell_hist"])]):
+            totals["dwell_hist"][index] += count or 0
+        totals["dwell_seconds_sum"] += row.get("dwell_seconds_sum") or 0.0
+
+    samples = totals["samples"]
+    totals["avg_people"] = round(totals["people_sum"] / samples, 2) if samples else 0.0
+    totals["avg_customers"] = round(totals["customers_sum"] / samples, 2) if samples else 0.0
+    totals["avg_employees"] = round(totals["employees_sum"] / samples, 2) if samples else 0.0
+    totals["avg_groups"] = round(totals["groups_sum"] / samples, 2) if samples else 0.0
+    totals["avg_processing_time"] = round(totals["processing_ms_sum"] / samples, 2) if samples else 0.0
+    totals["avg_dwell_seconds"] = (
+        round(totals["dwell_seconds_sum"] / totals["dwell_count"], 1) if totals["dwell_count"] else 0.0
+    )
+    return totals
+
+
+def dwell_histogram_labels() -> List[str]:
+    """Rótulos das faixas do histograma (ex: '<30s', '30s-1m', '>1h')"""
+    def label(seconds: int) -> str:
+        return f"{seconds // 60}m" if seconds >= 60 and seconds % 60 == 0 else f"{seconds}s"
+
+    labels = [f"<{label(DWELL_BINS_SECONDS[0])}"]
+    for low, high in zip(DWELL_BINS_SECONDS, DWELL_BINS_SECONDS[1:]):
+        labels.append(f"{label(low)}-{label(high)}")
+    labels.append(f">{label(DWELL_BINS_SECONDS[-1])}")
+    return labels
+
+
+async def backfill_rollups(
+    database,
+    start: datetime,
+    end: datetime,
+    camera_id: Optional[str] = None,
+    chunk: timedelta = timedelta(hours=6)
+) -> Dict[str, Any]:
+    """
+    Reconstrói os rollups de [start, end) a partir de camera_events.
+
+    Processa janelas alinhadas em hora de tamanho `chunk`; cada janela é
+    agregada no banco (rebuild_camera_rollups) e só o contador volta para
+    o Python. Reexecutar é seguro (upserts).
+
+    Returns:
+        Resumo com janelas processadas, buckets gravados e falhas
+    """
+    cursor = floor_time(start, 'hour')
+    chunk = max(chunk, timedelta(hours=1))
+    summary = {"chunks": 0, "buckets": 0, "failed_chunks": 0}
+
+    while cursor < end:
+        window_end = min(cursor + chunk, end)
+        written = await database.rebuild_camera_rollups(cursor, window_end, camera_id)
+        if written is None:
+            summary["failed_chunks"] += 1
+            logger.error(f"Falha no backfill de rollups: {cursor.isoformat()} -> {window_end.isoformat()}")
+        else:
+            summary["chunks"] += 1
+            summary["buckets"] += written
+            logger.info(f"Rollups reconstruídos: {cursor.isoformat()} -> {window_end.isoformat()} ({written} buckets)")
+        cursor = window_end
+
+    return summary
@@ -20,6 +20,8 @@ from loguru import logger
 from dataclasses import dataclass
 from datetime import datetime
 
+from core.metrics import NULL_CAMERA_METRICS
+
 
 @dataclass
 class CameraStats:
@@ -101,6 +103,9 @@ class RTSPCameraManager:
         # Lock para thread safety
         self._lock = threading.Lock()
 
+        # Histogramas do processador (definido por RTSPFrameProcessor)
+        self.metrics = NULL_CAMERA_METRICS
+
         logger.info(f"RTSPCameraManager initialized for {self._sanitize_url(rtsp_url)}")
 
     def _sanitize_url(self, url: str) -> str:
@@ -156,7 +161,7 @@ class RTSPCameraManager:
             # Iniciar thread de captura
             self.is_running = True
             self.stats.is_connected = True
-            self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.capture_thread = threading.Thread(target=self._capture_loop, name="rtsp-capture", daemon=True)
             self.capture_thread.start()
 
             logger.info(f"Capture thread started. Target FPS: {self.target_fps}")
@@ -187,8 +192,10 @@ class RTSPCameraManager:
                     last_successful_read = time.time()
                     continue
 
-                # Ler frame da câmera
+                # Ler frame da câmera (recebe e decodifica)
+                read_started = time.perf_counter()
                 ret, frame = self.capture.read()
+                self.metrics.observe('decode', time.perf_counter() - read_started)
 
                 if not ret or frame is None:
                     logger.warning("Failed to read frame from camera")
@@ -220,6 +227,7 @@ class RTSPCameraManager:
                         self.frame_queue.put_nowait((frame.copy(), datetime.now()))
                         with self._lock:
                             self.stats.frames_dropped += 1
+                        self.metrics.dropped()
                     except Exception:
                         pass
 
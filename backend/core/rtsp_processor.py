@@ -9,6 +9,7 @@ Pipeline:
 4. Reconhecer funcionários (facial)
 5. Salvar métricas no database
 6. Manter último frame para stream MJPEG
+7. Publicar métricas e frames no event hub (WS/SSE/MJPEG)
 
 Author: ShopFlow MVP
 Version: 1.0
@@ -22,10 +23,16 @@ from datetime import datetime
 from typing import Optional, Dict, Any, List
 from loguru import logger
 
-from core.rtsp_capture import RTSPCameraManager
+from core.replay_source import create_camera_manager
 from core.detector import YOLOPersonDetector
 from core.group_detector_simple import GroupDetectorSimple, Detection
 from core.database import SupabaseManager
+from core.heatmap_tiles import HeatmapTileStore
+from core.rollups import RollupStore
+from core.perspective import CameraPerspective
+from core.event_hub import EventHub, metrics_topic, frames_topic
+from core.live_state import live_state
+from core.metrics import pipeline_metrics
 
 
 class RTSPFrameProcessor:
@@ -47,7 +54,10 @@ class RTSPFrameProcessor:
         detector: YOLOPersonDetector,
         database: SupabaseManager,
         target_fps: int = 5,
-        face_recognition_enabled: bool = True
+        face_recognition_enabled: bool = True,
+        camera_id: str = "camera1",
+        event_hub: Optional[EventHub] = None,
+        camera_manager=None
     ):
         """
         Inicializa o processador RTSP.
@@ -58,16 +68,22 @@ class RTSPFrameProcessor:
             database: Gerenciador de database já inicializado
             target_fps: FPS alvo para processamento
             face_recognition_enabled: Se deve usar reconhecimento facial
+            camera_id: ID da câmera usado nas métricas e heatmaps
+            event_hub: Hub pub/sub onde métricas e frames são publicados
+            camera_manager: Fonte de frames já criada (ex: replay em benchmarks);
+                padrão = conforme a URL (RTSP, arquivo de vídeo ou synthetic://)
         """
         self.rtsp_url = rtsp_url
+        self.camera_id = camera_id
         self.detector = detector
         self.database = database
+        self.event_hub = event_hub
         self.target_fps = target_fps
         self.face_recognition_enabled = face_recognition_enabled
 
-        # Gerenciador de câmera
-        self.camera_manager = RTSPCameraManager(
-            rtsp_url=rtsp_url,
+        # Gerenciador de câmera (RTSP ou replay de vídeo/cena sintética)
+        self.camera_manager = camera_manager or create_camera_manager(
+            rtsp_url,
             target_fps=target_fps,
             reconnect_timeout=10,
             frame_queue_size=30
@@ -79,12 +95,26 @@ class RTSPFrameProcessor:
             min_group_size=2
         )
 
+        # Heatmap persistido em tiles (minuto -> hora -> dia)
+        self.heatmap_tiles = HeatmapTileStore(database)
+
+        # Agregados por minuto/hora/dia mantidos a cada evento gravado
+        self.rollups = RollupStore(database)
+
+        # Cópia colunar local do histórico (AnalyticsStore), definida no startup
+        self.analytics_store = None
+
+        # Calibração de perspectiva (salva por camera_id) e quem usa o mapa
+        self.perspective = CameraPerspective(camera_id)
+        self._perspective_consumers: List[Any] = [self.group_detector]
+
         # Estado do processamento
         self.is_running = False
         self.processing_task: Optional[asyncio.Task] = None
 
         # Último frame processado (para MJPEG stream)
         self.last_processed_frame: Optional[np.ndarray] = None
+        self._last_jpeg: Optional[bytes] = None
         self.last_frame_timestamp: Optional[datetime] = None
         self.last_metrics: Optional[Dict[str, Any]] = None
 
@@ -92,6 +122,11 @@ class RTSPFrameProcessor:
         self.face_recognizer = None
         self._employee_embeddings: Dict[str, Any] = {}
 
+        # Histogramas por estágio (no-op sem PROMETHEUS_ENABLED)
+        self.metrics = pipeline_metrics.camera(camera_id)
+        self.camera_manager.metrics = self.metrics
+        self.metrics.track_queue('capture', self.camera_manager.frame_queue.qsize)
+
         # Estatísticas
         self.stats = {
             "frames_processed": 0,
@@ -105,6 +140,10 @@ class RTSPFrameProcessor:
         """Inicializa componentes (face recognition, etc)"""
         logger.info("Initializing RTSP processor...")
 
+        # Carregar calibração de perspectiva da câmera
+        if await self.perspective.load(self.database):
+            self._apply_perspective_map()
+
         # Inicializar reconhecimento facial se habilitado
         if self.face_recognition_enabled:
             try:
@@ -178,6 +217,10 @@ class RTSPFrameProcessor:
             except asyncio.CancelledError:
                 pass
 
+        # Gravar tile de minuto parcial e buckets de rollup abertos
+        await self.heatmap_tiles.flush()
+        await self.rollups.flush()
+
         # Desconectar câmera
         self.camera_manager.disconnect()
 
@@ -190,6 +233,7 @@ class RTSPFrameProcessor:
         while self.is_running:
             try:
                 # Obter próximo frame
+                wait_started = time.perf_counter()
                 frame = self.camera_manager.get_frame(timeout=1.0)
 
                 if frame is None:
@@ -197,10 +241,14 @@ class RTSPFrameProcessor:
                     await asyncio.sleep(0.1)
                     continue
 
+                self.metrics.observe('capture_wait', time.perf_counter() - wait_started)
+
                 # Processar frame
-                start_time = time.time()
+                start_time = time.perf_counter()
                 await self._process_frame(frame)
-                processing_time = (time.time() - start_time) * 1000  # ms
+                elapsed = time.perf_counter() - start_time
+                processing_time = elapsed * 1000  # ms
+                self.metrics.frame(elapsed)
 
                 # Atualizar estatísticas
                 self.stats["frames_processed"] += 1
@@ -209,6 +257,14 @@ class RTSPFrameProcessor:
                     (processing_time * 0.1)
                 )
 
+                # Estado ao vivo: métricas + stats do mesmo frame
+                if self.last_metrics is not None:
+                    live_state.publish(
+                        self.camera_id,
+                        self.last_metrics,
+                        stats={**self.stats, "processing_time_ms": round(processing_time, 2)}
+                    )
+
                 # Log periódico
                 if self.stats["frames_processed"] % 100 == 0:
                     logger.info(
@@ -236,18 +292,20 @@ class RTSPFrameProcessor:
         6. Update last frame (for MJPEG stream)
         """
         timestamp = datetime.now()
+        observe = self.metrics.observe
 
         # 1. Detectar pessoas com YOLO
+        started = time.perf_counter()
         yolo_detections = await self.detector.detect_persons(frame)
+        observe('yolo', time.perf_counter() - started)
 
         # Converter para formato Detection do group detector
         detections = []
         for i, det in enumerate(yolo_detections):
-            # Extrair coordenadas do formato YOLO11 (com validação)
-            x1 = int(det.get('x1', 0))
-            y1 = int(det.get('y1', 0))
-            x2 = int(det.get('x2', 0))
-            y2 = int(det.get('y2', 0))
+            # Extrair coordenadas do formato YOLO11 ('bbox' = [x1, y1, x2, y2])
+            x1, y1, x2, y2 = (int(v) for v in det.get('bbox') or (
+                det.get('x1', 0), det.get('y1', 0), det.get('x2', 0), det.get('y2', 0)
+            ))
             confidence = float(det.get('confidence', 0))
 
             detection = Detection(
@@ -258,29 +316,76 @@ class RTSPFrameProcessor:
             )
             detections.append(detection)
 
+        # Ajuste automático da perspectiva (reajusta a cada N frames)
+        await self._update_perspective(frame, detections)
+
         # 2. Reconhecimento facial (se habilitado)
         if self.face_recognition_enabled and len(self._employee_embeddings) > 0:
+            started = time.perf_counter()
             await self._recognize_employees(frame, detections)
+            observe('face', time.perf_counter() - started)
 
         # 3. Detectar grupos
+        started = time.perf_counter()
         groups = self.group_detector.detect_groups(detections)
 
         # 4. Calcular métricas
         metrics = self.group_detector.calculate_potential_customers(groups, detections)
+        observe('group', time.perf_counter() - started)
 
         # Adicionar timestamp
         metrics["timestamp"] = timestamp.isoformat()
-        metrics["camera_id"] = "camera1"
+        metrics["camera_id"] = self.camera_id
 
         # 5. Salvar no database
+        started = time.perf_counter()
         await self._save_metrics(metrics)
+        await self._update_rollups(metrics, timestamp)
+        await self._archive_event(metrics, timestamp)
+        await self._update_heatmap_tiles(frame, detections, timestamp)
+        observe('db_write', time.perf_counter() - started)
 
         # 6. Atualizar último frame para stream MJPEG
+        started = time.perf_counter()
         annotated_frame = self._draw_visualizations(frame, detections, groups, metrics)
+        observe('draw', time.perf_counter() - started)
         self.last_processed_frame = annotated_frame
+        self._last_jpeg = None
         self.last_frame_timestamp = timestamp
         self.last_metrics = metrics
 
+        # 7. Publicar para consumidores em tempo real (encode medido à parte)
+        started = time.perf_counter()
+        encode_seconds = self._publish(metrics)
+        observe('broadcast', time.perf_counter() - started - encode_seconds)
+
+    def _publish(self, metrics: Dict[str, Any]) -> float:
+        """
+        Publica métricas e (se alguém assiste) o frame JPEG no event hub.
+
+        Returns:
+            Segundos gastos no encode JPEG (descontados do estágio broadcast)
+        """
+        if self.event_hub is None:
+            return 0.0
+
+        encode_seconds = 0.0
+        try:
+            self.event_hub.publish(metrics_topic(self.camera_id), metrics)
+
+            topic = frames_topic(self.camera_id)
+            if self.event_hub.has_subscribers(topic):
+                started = time.perf_counter()
+                frame_bytes = self.get_latest_frame()
+                encode_seconds = time.perf_counter() - started
+                if frame_bytes is not None:
+                    self.event_hub.publish(topic, frame_bytes)
+
+        except Exception as e:
+            logger.error(f"Error publishing to event hub: {e}")
+
+        return encode_seconds
+
     async def _recognize_employees(self, frame: np.ndarray, detections: List[Detection]):
         """
         Reconhece funcionários usando face recognition.
@@ -338,6 +443,62 @@ class RTSPFrameProcessor:
         except Exception as e:
             logger.error(f"Error saving metrics to database: {e}")
 
+    async def _update_rollups(self, metrics: Dict[str, Any], timestamp: datetime):
+        """Soma o evento nos rollups (grava apenas quando um minuto fecha)"""
+        try:
+            await self.rollups.add_event(self.camera_id, metrics, timestamp)
+
+        except Exception as e:
+            logger.error(f"Error updating rollups: {e}")
+
+    async def _archive_event(self, metrics: Dict[str, Any], timestamp: datetime):
+        """Copia o evento para o histórico local em Parquet (se habilitado)"""
+        if self.analytics_store is None:
+            return
+        try:
+            await self.analytics_store.add_camera_event(self.camera_id, metrics, timestamp)
+
+        except Exception as e:
+            logger.error(f"Error archiving event to analytics store: {e}")
+
+    async def _update_perspective(self, frame: np.ndarray, detections: List[Detection]):
+        """Acumula bboxes para a calibração automática e salva quando reajustar"""
+        try:
+            if self.perspective.observe([d.bbox for d in detections], frame.shape):
+                self._apply_perspective_map()
+                await self.perspective.save(self.database)
+
+        except Exception as e:
+            logger.error(f"Error updating perspective calibration: {e}")
+
+    def apply_calibration(self, calibration):
+        """Aplica calibração definida pelo usuário sem reiniciar o processador"""
+        self.perspective.apply(calibration)
+        self._apply_perspective_map()
+
+    def add_perspective_consumer(self, consumer):
+        """
+        Registra um componente com atributo `perspective` (ex: BehaviorAnalyzer,
+        BehaviorReID) para receber o PerspectiveMap atual e os recalibrados.
+        """
+        if consumer not in self._perspective_consumers:
+            self._perspective_consumers.append(consumer)
+        consumer.perspective = self.perspective.map
+
+    def _apply_perspective_map(self):
+        """Propaga o PerspectiveMap atual para todos os consumidores"""
+        for consumer in self._perspective_consumers:
+            consumer.perspective = self.perspective.map
+
+    async def _update_heatmap_tiles(self, frame: np.ndarray, detections: List[Detection], timestamp: datetime):
+        """Acumula posições no tile de minuto (grava apenas quando um bucket fecha)"""
+        try:
+            points = [d.center for d in detections]
+            await self.heatmap_tiles.add_frame(self.camera_id, points, frame.shape, timestamp)
+
+        except Exception as e:
+            logger.error(f"Error updating heatmap tiles: {e}")
+
     def _draw_visualizations(
         self,
         frame: np.ndarray,
@@ -425,11 +586,18 @@ class RTSPFrameProcessor:
         if self.last_processed_frame is None:
             return None
 
+        # Mesmo frame já codificado (um encode por frame, não por cliente)
+        if self._last_jpeg is not None:
+            return self._last_jpeg
+
         try:
             # Codificar como JPEG
+            started = time.perf_counter()
             ret, jpeg = cv2.imencode('.jpg', self.last_processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            self.metrics.observe('encode', time.perf_counter() - started)
             if ret:
-                return jpeg.tobytes()
+                self._last_jpeg = jpeg.tobytes()
+                return self._last_jpeg
             return None
 
         except Exception as e:
@@ -441,6 +609,9 @@ class RTSPFrameProcessor:
         return {
             **self.stats,
             "is_running": self.is_running,
+            "heatmap_tiles": self.heatmap_tiles.stats,
+            "rollups": self.rollups.stats,
+            "perspective": self.perspective.get_stats(),
             "camera_healthy": self.camera_manager.is_healthy(),
             "camera_stats": self.camera_manager.get_stats().__dict__,
             "last_metrics": self.last_metrics
@@ -0,0 +1,151 @@
+"""
+State Sync - Protocolo versionado de sincronização de estado (snapshot + deltas)
+
+Cada stream de estado (ex: 'metrics', 'smart_metrics') por câmera tem um
+número de sequência. Clientes inscritos recebem:
+
+    {'type': 'state_snapshot', 'stream', 'camera_id', 'seq', 'data'}
+    {'type': 'state_delta', 'stream', 'camera_id', 'seq', 'prev_seq',
+     'changes': {...}, 'removed': [[chave, subchave], ...]}
+
+O cliente aplica um delta apenas se prev_seq == último seq recebido daquele
+stream; caso contrário envia {'type': 'resync', 'stream', 'camera_id'} e
+recebe um novo snapshot.
+
+'changes' é um patch aninhado: dicts são mesclados recursivamente, qualquer
+outro valor (listas inclusive) substitui o anterior.
+"""
+
+import copy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+Path = List[str]
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Path]]:
+    """
+    Calcula o patch que transforma old em new.
+
+    Returns:
+        (changes, removed) - patch aninhado e caminhos removidos
+    """
+    changes: Dict[str, Any] = {}
+    removed: List[Path] = []
+
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+            continue
+
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub_changes, sub_removed = diff_state(previous, value)
+            if sub_changes:
+                changes[key] = sub_changes
+            removed.extend([key] + path for path in sub_removed)
+        elif value != previous or type(value) is not type(previous):
+            changes[key] = value
+
+    for key in old:
+        if key not in new:
+            removed.append([key])
+
+    return changes, removed
+
+
+def apply_delta(state: Dict[str, Any], changes: Dict[str, Any], removed: Iterable[Path]) -> Dict[str, Any]:
+    """Aplica um delta (referência do lado cliente; retorna novo dict)"""
+    result = copy.deepcopy(state)
+
+    for path in removed:
+        target = result
+        for key in path[:-1]:
+            target = target.get(key)
+            if not isinstance(target, dict):
+                break
+        else:
+            target.pop(path[-1], None)
+
+    def merge(target: Dict[str, Any], patch: Dict[str, Any]):
+        for key, value in patch.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                merge(target[key], value)
+            else:
+                target[key] = copy.deepcopy(value)
+
+    merge(result, changes)
+    return result
+
+
+def filter_fields(data: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """Mantém apenas os campos de primeiro nível pedidos (None = todos)"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+
+class StateStream:
+    """Estado atual e sequência de um stream (stream, câmera)"""
+
+    def __init__(self, name: str, camera_id: str, volatile: Iterable[str] = ('timestamp',)):
+        """
+        Args:
+            name: Nome do stream ('metrics', 'smart_metrics', ...)
+            camera_id: Câmera de origem
+            volatile: Campos de primeiro nível que mudam sempre (ex: timestamp) e
+                      só acompanham um delta quando outro campo mudou
+        """
+        self.name = name
+        self.camera_id = camera_id
+        self.volatile = frozenset(volatile)
+        self.seq = 0
+        self.state: Dict[str, Any] = {}
+
+    def update(self, new_state: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], List[Path]]]:
+        """
+        Atualiza o estado.
+
+        Returns:
+            (changes, removed) se houve mudança relevante (seq incrementado), senão None
+        """
+        changes, removed = diff_state(self.state, new_state)
+
+        if self.seq > 0 and not removed and self.volatile.issuperset(changes):
+            return None
+
+        self.state = new_state
+        self.seq += 1
+        return changes, removed
+
+    def snapshot_message(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        return {
+            'type': 'state_snapshot',
+            'stream': self.name,
+            'camera_id': self.camera_id,
+            'seq': self.seq,
+            'data': filter_fields(self.state, fields)
+        }
+
+    def delta_message(
+        self,
+        changes: Dict[str, Any],
+        removed: List[Path],
+        prev_seq: int,
+        fields: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Mensagem de delta filtrada (None se nada relevante para os campos pedidos)"""
+        if fields is not None:
+            changes = filter_fields(changes, fields)
+            removed = [path for path in removed if path[0] in fields]
+            if not removed and self.volatile.issuperset(changes):
+                return None
+
+        return {
+            'type': 'state_delta',
+            'stream': self.name,
+            'camera_id': self.camera_id,
+            'seq': self.seq,
+            'prev_seq': prev_seq,
+            'changes': changes,
+            'removed': removed
+        }
@@ -0,0 +1,181 @@
+"""
+Streaming - Leitura incremental de resultados grandes
+
+`async for row in db.stream(...)` entrega linhas em blocos de `chunk`, sem
+materializar o resultado:
+
+- Com pool SQL (DATABASE_URL): cursor server-side (SQL ou TableQuery)
+- Só PostgREST: paginação keyset de um TableQuery
+  (WHERE key > último ORDER BY key LIMIT chunk). Custo constante por página,
+  ao contrário de OFFSET, que relê as linhas puladas
+
+Os agregadores abaixo consomem o stream em memória O(1) (ou O(grupos)).
+
+Usage:
+    query = TableQuery("detections", "id, class_name, confidence")\\
+        .gte("timestamp", start).lte("timestamp", end)
+
+    confidence = RunningStats()
+    async for row in db.stream(query, chunk=5000):
+        confidence.add(row.get("confidence"))
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Operadores PostgREST -> SQL
+_OPERATORS = {
+    "eq": "=",
+    "neq": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+}
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Identificador inválido: {name!r}")
+    return name
+
+
+@dataclass
+class TableQuery:
+    """
+    SELECT simples de uma tabela, paginável por uma chave única crescente.
+
+    Tabela, colunas e chave são identificadores do código (validados), nunca
+    entrada do usuário; valores dos filtros sempre vão como parâmetros.
+    """
+    table: str
+    columns: str = "*"
+    key: str = "id"
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)
+
+    def __post_init__(self):
+        _identifier(self.table)
+        _identifier(self.key)
+        for column in self._column_list():
+            _identifier(column)
+
+    def _column_list(self) -> List[str]:
+        if self.columns.strip() == "*":
+            return []
+        return [column.strip() for column in self.columns.split(",") if column.strip()]
+
+    def _filter(self, op: str, column: str, value: Any) -> 'TableQuery':
+        self.filters.append((op, _identifier(column), value))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("eq", column, value)
+
+    def neq(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("neq", column, value)
+
+    def gt(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("gt", column, value)
+
+    def gte(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("gte", column, value)
+
+    def lt(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("lt", column, value)
+
+    def lte(self, column: str, value: Any) -> 'TableQuery':
+        return self._filter("lte", column, value)
+
+    def select_list(self) -> str:
+        """Colunas pedidas + chave (necessária para a próxima página)"""
+        columns = self._column_list()
+        if not columns:
+            return "*"
+        if self.key not in columns:
+            columns.append(self.key)
+        return ", ".join(columns)
+
+    def to_sql(self) -> Tuple[str, List[Any]]:
+        """SQL parametrizado ($1..$n) equivalente, ordenado pela chave"""
+        conditions = []
+        params: List[Any] = []
+        for op, column, value in self.filters:
+            params.append(value)
+            conditions.append(f"{column} {_OPERATORS[op]} ${len(params)}")
+
+        sql = f"SELECT {self.select_list()} FROM {self.table}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {self.key}"
+        return sql, params
+
+
+def _postgrest_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def keyset_pages(client, query: TableQuery, chunk: int = 5000) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Páginas de `chunk` linhas via PostgREST, ordenadas pela chave.
+
+    Cada página filtra key > última chave vista, então o banco usa o índice
+    da chave e nenhuma linha é relida.
+    """
+    last_key = None
+    while True:
+        builder = client.table(query.table).select(query.select_list())
+        for op, column, value in query.filters:
+            builder = getattr(builder, op)(column, _postgrest_value(value))
+        if last_key is not None:
+            builder = builder.gt(query.key, _postgrest_value(last_key))
+
+        result = builder.order(query.key).limit(chunk).execute()
+        rows = result.data or []
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < chunk:
+            return
+        last_key = rows[-1][query.key]
+
+
+# ============================================================================
+# Agregadores
+# ============================================================================
+
+@dataclass
+class RunningStats:
+    """Contagem, soma, mínimo, máximo e média sem guardar os valores"""
+    count: int = 0
+    total: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+    def add(self, value: Optional[float]):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self, digits: int = 2) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, digits),
+            "min": self.minimum,
+            "max": self.maximum,
+            "avg": round(self.mean, digits)
+        }
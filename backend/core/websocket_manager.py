@@ -1,99 +1,386 @@
 """
 Gerenciador de WebSocket para comunicação em tempo real
+
+Fan-out com fila por conexão:
+- Cada conexão tem uma fila de saída limitada e uma task escritora própria
+- broadcast() apenas enfileira e retorna imediatamente
+- Mensagens de "estado atual" (métricas, status) são coalescidas: um cliente
+  lento recebe só a versão mais recente de cada tipo
+- Eventos (alertas, eventos de câmera) não são descartados; se a fila de um
+  cliente encher ou um envio travar, o cliente é desconectado
+- Cada mensagem é serializada uma vez (core.message_encoding) e o mesmo
+  frame é compartilhado por todos os clientes (JSON ou msgpack)
+- Streams de estado (métricas) com snapshot + deltas versionados para quem
+  se inscreve via 'subscribe' (core.state_sync), com filtro por câmera/métrica
 """
 
 import json
 import asyncio
-from typing import List, Dict, Any
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Tuple
 from fastapi import WebSocket, WebSocketDisconnect
 from loguru import logger
 import time
+from datetime import datetime
+
+from core.message_encoding import EncodedMessage, encode_message, msgpack_available, to_plain
+from core.metrics import pipeline_metrics
+from core.state_sync import StateStream
+
+
+@dataclass
+class _ClientChannel:
+    """Estado de saída de uma conexão"""
+    websocket: WebSocket
+    queue: deque = field(default_factory=deque)  # (enfileirado_em, mensagem)
+    latest: "OrderedDict[str, Tuple[float, EncodedMessage]]" = field(default_factory=OrderedDict)
+    binary: bool = False  # Cliente pediu msgpack
+    # Sincronização de estado (None = cliente legado, recebe mensagens completas)
+    streams: Optional[Set[str]] = None
+    cameras: Optional[Set[str]] = None
+    metrics: Optional[Set[str]] = None
+    sync_seq: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    writer: Optional[asyncio.Task] = None
+    closed: bool = False  # Desconectada: a escritora sai mesmo se o cancel se perder
+    sent: int = 0
+    coalesced: int = 0
+    last_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self.queue) + len(self.latest)
+
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, max_queue_size: int = 100, send_timeout: float = 5.0):
+        """
+        Args:
+            max_queue_size: Máximo de eventos pendentes por conexão antes de desconectar
+            send_timeout: Tempo máximo (s) de um envio antes de considerar o cliente travado
+        """
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
+
+        self.channels: Dict[WebSocket, _ClientChannel] = {}
         self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
-        
+        self.state_streams: Dict[Tuple[str, str], StateStream] = {}
+
+        self.stats = {
+            'messages_enqueued': 0,
+            'messages_sent': 0,
+            'messages_coalesced': 0,
+            'slow_consumer_disconnects': 0,
+            'send_errors': 0,
+            'messages_encoded': 0,
+            'bytes_encoded': 0,
+            'state_snapshots_sent': 0,
+            'state_deltas_sent': 0,
+            'state_resyncs': 0
+        }
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.channels)
+
     async def connect(self, websocket: WebSocket):
         """Aceitar nova conexão WebSocket"""
         try:
             await websocket.accept()
-            self.active_connections.append(websocket)
-            
+
+            channel = _ClientChannel(websocket=websocket)
+            self.channels[websocket] = channel
+
             # Armazenar info da conexão
             self.connection_info[websocket] = {
                 'connected_at': time.time(),
                 'last_ping': time.time(),
                 'client_info': None
             }
-            
-            logger.info(f"Nova conexão WebSocket: {len(self.active_connections)} ativa(s)")
-            
+
+            channel.writer = asyncio.create_task(self._writer(channel))
+
+            logger.info(f"Nova conexão WebSocket: {len(self.channels)} ativa(s)")
+
             # Enviar mensagem de boas-vindas
-            await self.send_personal_message(json.dumps({
+            await self.send_personal_message({
                 'type': 'connection_established',
                 'message': 'Conectado ao Shop Flow',
                 'timestamp': time.time()
-            }), websocket)
-            
+            }, websocket)
+
         except Exception as e:
             logger.error(f"Erro ao conectar WebSocket: {e}")
-            await self.disconnect(websocket)
-    
+            self.disconnect(websocket)
+
     def disconnect(self, websocket: WebSocket):
         """Desconectar WebSocket"""
         try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-            
-            if websocket in self.connection_info:
-                del self.connection_info[websocket]
-            
-            logger.info(f"Conexão WebSocket removida: {len(self.active_connections)} ativa(s)")
-            
+            channel = self.channels.pop(websocket, None)
+            self.connection_info.pop(websocket, None)
+
+            if channel is None:
+                return
+
+            # Encerrar a task escritora (exceto quando é ela mesma desconectando).
+            # wait_for pode engolir o cancel se o envio terminar no mesmo instante:
+            # closed + wakeup garantem que ela saia do laço
+            channel.closed = True
+            channel.wakeup.set()
+            if channel.writer is not None and channel.writer is not asyncio.current_task():
+                channel.writer.cancel()
+
+            logger.info(f"Conexão WebSocket removida: {len(self.channels)} ativa(s)")
+
         except Exception as e:
             logger.error(f"Erro ao desconectar WebSocket: {e}")
-    
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Enviar mensagem para conexão específica"""
+
+    def is_connected(self, websocket: WebSocket) -> bool:
+        return websocket in self.channels
+
+    def _encode(self, message: Any) -> EncodedMessage:
+        """Serializa uma única vez (dict/dataclass) ou reaproveita JSON já pronto"""
+        if isinstance(message, EncodedMessage):
+            return message
+        encoded = encode_message(message)
+        self.stats['messages_encoded'] += 1
+        self.stats['bytes_encoded'] += len(encoded)
+        return encoded
+
+    def _enqueue(self, channel: _ClientChannel, message: EncodedMessage, coalesce_key: Optional[str] = None) -> bool:
+        """Enfileira mensagem na conexão (não bloqueia)"""
+        now = time.perf_counter()
+
+        if coalesce_key is not None:
+            # Estado atual: substituir versão ainda não enviada
+            if coalesce_key in channel.latest:
+                channel.coalesced += 1
+                self.stats['messages_coalesced'] += 1
+                del channel.latest[coalesce_key]
+            channel.latest[coalesce_key] = (now, message)
+        else:
+            if len(channel.queue) >= self.max_queue_size:
+                self.stats['slow_consumer_disconnects'] += 1
+                logger.warning(
+                    f"Cliente WebSocket lento desconectado ({len(channel.queue)} eventos pendentes)"
+                )
+                self._close_slow_consumer(channel)
+                return False
+            channel.queue.append((now, message))
+
+        self.stats['messages_enqueued'] += 1
+        channel.wakeup.set()
+        return True
+
+    def _close_slow_consumer(self, channel: _ClientChannel):
+        websocket = channel.websocket
+        self.disconnect(websocket)
+
+        async def _close():
+            try:
+                await asyncio.wait_for(websocket.close(code=1013), timeout=self.send_timeout)
+            except Exception:
+                pass
+
+        asyncio.create_task(_close())
+
+    async def _writer(self, channel: _ClientChannel):
+        """Task escritora de uma conexão: esvazia eventos e depois estados coalescidos"""
+        websocket = channel.websocket
         try:
-            await websocket.send_text(message)
+            while not channel.closed:
+                await channel.wakeup.wait()
+                channel.wakeup.clear()
+
+                while (channel.queue or channel.latest) and not channel.closed:
+                    if channel.queue:
+                        enqueued_at, message = channel.queue.popleft()
+                    else:
+                        _, (enqueued_at, message) = channel.latest.popitem(last=False)
+
+                    if channel.binary and message.msgpack is not None:
+                        send = websocket.send_bytes(message.msgpack)
+                    else:
+                        send = websocket.send_text(message.text)
+                    await asyncio.wait_for(send, timeout=self.send_timeout)
+
+                    lag_ms = (time.perf_counter() - enqueued_at) * 1000
+                    channel.sent += 1
+                    channel.last_lag_ms = lag_ms
+                    channel.max_lag_ms = max(channel.max_lag_ms, lag_ms)
+                    self.stats['messages_sent'] += 1
+                    pipeline_metrics.observe_ws_lag(lag_ms / 1000)
+
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.stats['slow_consumer_disconnects'] += 1
+            logger.warning("Envio WebSocket travado, desconectando cliente")
+            self._close_slow_consumer(channel)
         except WebSocketDisconnect:
-            await self.disconnect(websocket)
+            self.disconnect(websocket)
         except Exception as e:
-            logger.error(f"Erro ao enviar mensagem pessoal: {e}")
-            await self.disconnect(websocket)
-    
-    async def broadcast(self, message: str):
-        """Enviar mensagem para todas as conexões ativas"""
-        if not self.active_connections:
-            return
-        
-        disconnected = []
-        
-        for websocket in self.active_connections:
-            try:
-                await websocket.send_text(message)
-            except WebSocketDisconnect:
-                disconnected.append(websocket)
-            except Exception as e:
-                logger.error(f"Erro no broadcast: {e}")
-                disconnected.append(websocket)
-        
-        # Remover conexões perdidas
-        for websocket in disconnected:
+            self.stats['send_errors'] += 1
+            logger.error(f"Erro ao enviar mensagem WebSocket: {e}")
             self.disconnect(websocket)
-    
-    async def broadcast_metrics(self, metrics: Dict[str, Any]):
+
+    async def send_personal_message(
+        self,
+        message: Any,
+        websocket: WebSocket,
+        coalesce_key: Optional[str] = None
+    ) -> bool:
+        """
+        Enviar mensagem para conexão específica.
+
+        Args:
+            message: dict/dataclass (serializado aqui) ou JSON já serializado
+
+        Returns:
+            False se a conexão não está mais ativa
+        """
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return False
+        return self._enqueue(channel, self._encode(message), coalesce_key)
+
+    async def broadcast(self, message: Any, coalesce_key: Optional[str] = None):
+        """
+        Enviar mensagem para todas as conexões ativas.
+
+        Apenas enfileira (retorna imediatamente); cada conexão envia na sua task.
+        A mensagem é serializada uma vez e o frame é compartilhado entre clientes.
+
+        Args:
+            message: dict/dataclass (serializado aqui) ou JSON já serializado
+            coalesce_key: Se definido, clientes lentos recebem só a última mensagem com essa chave
+        """
+        if not self.channels:
+            return
+
+        encoded = self._encode(message)
+        for channel in list(self.channels.values()):
+            self._enqueue(channel, encoded, coalesce_key)
+
+    def is_subscribed(self, websocket: WebSocket, stream: str) -> bool:
+        """Conexão recebe o stream via snapshot/deltas (e não mensagens completas)"""
+        channel = self.channels.get(websocket)
+        return channel is not None and channel.streams is not None and stream in channel.streams
+
+    def _wants_stream(self, channel: _ClientChannel, stream: str, camera_id: str) -> bool:
+        if channel.streams is None or stream not in channel.streams:
+            return False
+        return channel.cameras is None or camera_id in channel.cameras
+
+    def _send_snapshot(self, channel: _ClientChannel, state_stream: StateStream, cache: Optional[Dict] = None):
+        """Enfileira snapshot do stream (substitui delta ainda não enviado)"""
+        fields_key = frozenset(channel.metrics) if channel.metrics is not None else None
+        encoded = cache.get(('snapshot', fields_key)) if cache is not None else None
+        if encoded is None:
+            message = state_stream.snapshot_message(channel.metrics)
+            message['timestamp'] = time.time()
+            encoded = self._encode(message)
+            if cache is not None:
+                cache[('snapshot', fields_key)] = encoded
+
+        key = (state_stream.name, state_stream.camera_id)
+        if self._enqueue(channel, encoded, coalesce_key=f"state:{key[0]}:{key[1]}"):
+            channel.sync_seq[key] = state_stream.seq
+            self.stats['state_snapshots_sent'] += 1
+
+    async def update_state(self, stream: str, camera_id: str, data: Any):
+        """
+        Atualiza um stream de estado e envia deltas aos inscritos.
+
+        Chamadas sem mudança (além de campos voláteis como timestamp) não geram
+        mensagens, então vários produtores podem chamar periodicamente.
+
+        Args:
+            stream: Nome do stream ('metrics', 'smart_metrics', ...)
+            camera_id: Câmera de origem
+            data: Estado completo atual (dict ou dataclass)
+        """
+        key = (stream, camera_id)
+        state_stream = self.state_streams.get(key)
+        if state_stream is None:
+            state_stream = self.state_streams[key] = StateStream(stream, camera_id)
+
+        delta = state_stream.update(to_plain(data))
+        if delta is None:
+            return
+        changes, removed = delta
+
+        coalesce_key = f"state:{stream}:{camera_id}"
+        cache: Dict[Any, EncodedMessage] = {}
+        now = time.time()
+
+        for channel in list(self.channels.values()):
+            if not self._wants_stream(channel, stream, camera_id):
+                continue
+
+            prev_seq = channel.sync_seq.get(key)
+
+            # Sem base ou delta anterior ainda na fila (cliente lento): snapshot
+            if prev_seq is None or coalesce_key in channel.latest:
+                self._send_snapshot(channel, state_stream, cache)
+                continue
+
+            fields_key = frozenset(channel.metrics) if channel.metrics is not None else None
+            cache_key = ('delta', fields_key, prev_seq)
+            if cache_key not in cache:
+                message = state_stream.delta_message(changes, removed, prev_seq, channel.metrics)
+                if message is not None:
+                    message['timestamp'] = now
+                cache[cache_key] = self._encode(message) if message is not None else None
+
+            encoded = cache[cache_key]
+            if encoded is None:
+                continue  # Nada mudou nas métricas que o cliente pediu
+
+            if self._enqueue(channel, encoded, coalesce_key=coalesce_key):
+                channel.sync_seq[key] = state_stream.seq
+                self.stats['state_deltas_sent'] += 1
+
+    async def broadcast_metrics(self, metrics: Dict[str, Any], camera_id: str = "camera1"):
         """Broadcast específico para métricas"""
         message = {
             'type': 'metrics_update',
+            'camera_id': camera_id,
             'data': metrics,
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(message))
-    
+
+        # Última versão por câmera (uma câmera não substitui a outra na fila)
+        await self._broadcast_legacy(message, 'metrics', coalesce_key=f'metrics_update:{camera_id}')
+        await self.update_state('metrics', camera_id, metrics)
+
+    async def broadcast_smart_metrics(self, metrics: Any, camera_id: str = "camera1"):
+        """Broadcast das métricas do Smart Analytics Engine"""
+        message = {
+            'type': 'smart_metrics_update',
+            'camera_id': camera_id,
+            'data': metrics,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        await self._broadcast_legacy(message, 'smart_metrics', coalesce_key=f'smart_metrics_update:{camera_id}')
+        await self.update_state('smart_metrics', camera_id, metrics)
+
+    async def _broadcast_legacy(self, message: Dict[str, Any], stream: str, coalesce_key: str):
+        """Mensagem completa só para clientes não inscritos no stream"""
+        channels = [
+            channel for channel in self.channels.values()
+            if channel.streams is None or stream not in channel.streams
+        ]
+        if not channels:
+            return
+
+        encoded = self._encode(message)
+        for channel in channels:
+            self._enqueue(channel, encoded, coalesce_key)
+
     async def broadcast_camera_event(self, camera_id: str, event_data: Dict[str, Any]):
         """Broadcast específico para eventos de câmera"""
         message = {
@@ -102,9 +389,9 @@ class WebSocketManager:
             'data': event_data,
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(message))
-        
+
+        await self.broadcast(message)
+
     async def broadcast_multi_camera_stats(self, stats_by_camera: Dict[str, Any]):
         """Broadcast de estatísticas agregadas de múltiplas câmeras"""
         message = {
@@ -113,8 +400,8 @@ class WebSocketManager:
             'total_cameras': len(stats_by_camera),
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(message))
+
+        await self.broadcast(message, coalesce_key='multi_camera_stats')
 
     async def broadcast_event(self, event_type: str, data: Dict[str, Any]):
         """Broadcast de eventos específicos"""
@@ -123,9 +410,9 @@ class WebSocketManager:
             'data': data,
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(message))
-    
+
+        await self.broadcast(message)
+
     async def broadcast_alert(self, alert_type: str, title: str, message: str, severity: str = "info"):
         """Broadcast de alertas"""
         alert_message = {
@@ -136,100 +423,180 @@ class WebSocketManager:
             'severity': severity,
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(alert_message))
-    
+
+        await self.broadcast(alert_message)
+
     async def handle_client_message(self, websocket: WebSocket, message: str):
         """Processar mensagem recebida do cliente"""
         try:
             data = json.loads(message)
             message_type = data.get('type', 'unknown')
-            
+
             if message_type == 'ping':
                 # Atualizar last_ping
                 if websocket in self.connection_info:
                     self.connection_info[websocket]['last_ping'] = time.time()
-                
+
                 # Responder com pong
-                await self.send_personal_message(json.dumps({
+                await self.send_personal_message({
                     'type': 'pong',
                     'timestamp': time.time()
-                }), websocket)
-            
+                }, websocket)
+
             elif message_type == 'client_info':
                 # Armazenar informações do cliente
                 if websocket in self.connection_info:
-                    self.connection_info[websocket]['client_info'] = data.get('data', {})
-                    logger.info(f"Info do cliente recebida: {data.get('data', {})}")
-            
+                    client_info = data.get('data', {})
+                    self.connection_info[websocket]['client_info'] = client_info
+
+                    # Cliente binário: {'encoding': 'msgpack'}
+                    channel = self.channels.get(websocket)
+                    if channel is not None:
+                        channel.binary = client_info.get('encoding') == 'msgpack' and msgpack_available()
+
+                    logger.info(f"Info do cliente recebida: {client_info}")
+
             elif message_type == 'subscribe':
                 # Cliente se inscrevendo em tipos específicos de eventos
                 subscriptions = data.get('events', [])
                 if websocket in self.connection_info:
                     self.connection_info[websocket]['subscriptions'] = subscriptions
                     logger.info(f"Cliente inscrito em: {subscriptions}")
-            
+
+                # Streams de estado: {'streams': [...], 'cameras': [...], 'metrics': [...]}
+                if 'streams' in data:
+                    self._subscribe_streams(websocket, data)
+
+            elif message_type == 'resync':
+                # Cliente detectou lacuna de sequência
+                channel = self.channels.get(websocket)
+                state_stream = self.state_streams.get((data.get('stream'), data.get('camera_id')))
+                if channel is not None and state_stream is not None:
+                    self.stats['state_resyncs'] += 1
+                    self._send_snapshot(channel, state_stream)
+
             else:
                 logger.warning(f"Tipo de mensagem desconhecido: {message_type}")
-                
+
         except json.JSONDecodeError:
             logger.error(f"Mensagem inválida recebida: {message}")
         except Exception as e:
             logger.error(f"Erro ao processar mensagem do cliente: {e}")
-    
+
+    def _subscribe_streams(self, websocket: WebSocket, data: Dict[str, Any]):
+        """Configura filtros de stream e envia snapshot de cada stream casado"""
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return
+
+        streams = data.get('streams')
+        cameras = data.get('cameras')
+        metrics = data.get('metrics')
+
+        channel.streams = set(streams) if streams else None
+        channel.cameras = set(cameras) if cameras else None
+        channel.metrics = set(metrics) if metrics else None
+        channel.sync_seq.clear()
+
+        if websocket in self.connection_info:
+            self.connection_info[websocket]['streams'] = {
+                'streams': streams,
+                'cameras': cameras,
+                'metrics': metrics
+            }
+
+        if channel.streams is None:
+            return
+
+        for (stream, camera_id), state_stream in list(self.state_streams.items()):
+            if self._wants_stream(channel, stream, camera_id):
+                self._send_snapshot(channel, state_stream)
+
+        logger.info(f"Cliente inscrito em streams: {streams} (câmeras: {cameras or 'todas'})")
+
+    async def listen(self, websocket: WebSocket):
+        """Lê mensagens do cliente (ping, subscribe, resync...) até desconectar"""
+        try:
+            while self.is_connected(websocket):
+                message = await websocket.receive_text()
+                await self.handle_client_message(websocket, message)
+        except WebSocketDisconnect:
+            self.disconnect(websocket)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Leitura WebSocket encerrada: {e}")
+            self.disconnect(websocket)
+
     async def cleanup_stale_connections(self, timeout: int = 300):
         """Limpar conexões inativas"""
         current_time = time.time()
         stale_connections = []
-        
+
         for websocket, info in self.connection_info.items():
             if current_time - info['last_ping'] > timeout:
                 stale_connections.append(websocket)
-        
+
         for websocket in stale_connections:
             logger.info("Removendo conexão inativa")
             self.disconnect(websocket)
-    
+
     def get_connection_stats(self) -> Dict[str, Any]:
         """Obter estatísticas das conexões"""
         try:
             current_time = time.time()
-            
+
             stats = {
-                'active_connections': len(self.active_connections),
+                'active_connections': len(self.channels),
                 'total_connections': len(self.connection_info),
+                'broadcaster': dict(self.stats),
+                'state_streams': {
+                    f"{name}:{camera_id}": state_stream.seq
+                    for (name, camera_id), state_stream in self.state_streams.items()
+                },
                 'connections': []
             }
-            
+
             for websocket, info in self.connection_info.items():
+                channel = self.channels.get(websocket)
                 connection_stats = {
                     'connected_duration': round(current_time - info['connected_at'], 2),
                     'last_ping_ago': round(current_time - info['last_ping'], 2),
                     'client_info': info.get('client_info'),
-                    'subscriptions': info.get('subscriptions', [])
+                    'subscriptions': info.get('subscriptions', []),
+                    'streams': info.get('streams')
                 }
+                if channel is not None:
+                    connection_stats.update({
+                        'pending': channel.pending,
+                        'encoding': 'msgpack' if channel.binary else 'json',
+                        'sent': channel.sent,
+                        'coalesced': channel.coalesced,
+                        'last_lag_ms': round(channel.last_lag_ms, 2),
+                        'max_lag_ms': round(channel.max_lag_ms, 2)
+                    })
                 stats['connections'].append(connection_stats)
-            
+
             return stats
-            
+
         except Exception as e:
             logger.error(f"Erro ao obter stats das conexões: {e}")
             return {'active_connections': 0, 'error': str(e)}
-    
+
     async def send_system_status(self):
         """Enviar status do sistema para todos os clientes"""
         status = {
             'type': 'system_status',
             'data': {
-                'active_connections': len(self.active_connections),
+                'active_connections': len(self.channels),
                 'uptime': time.time(),
                 'status': 'online'
             },
             'timestamp': time.time()
         }
-        
-        await self.broadcast(json.dumps(status))
-    
+
+        await self.broadcast(status, coalesce_key='system_status')
+
     async def start_heartbeat_task(self, interval: int = 30):
         """Iniciar task de heartbeat"""
         while True:
@@ -239,7 +606,7 @@ class WebSocketManager:
                 await self.cleanup_stale_connections()
             except Exception as e:
                 logger.error(f"Erro no heartbeat task: {e}")
-    
+
     async def send_real_time_data(self, data_type: str, data: Dict[str, Any]):
         """Enviar dados em tempo real com tipo específico"""
         message = {
@@ -248,25 +615,21 @@ class WebSocketManager:
             'data': data,
             'timestamp': time.time()
         }
-        
+
         # Filtrar por assinatura se necessário
-        targeted_connections = []
-        
-        for websocket in self.active_connections:
+        targeted_channels = []
+
+        for websocket, channel in list(self.channels.items()):
             info = self.connection_info.get(websocket, {})
             subscriptions = info.get('subscriptions', [])
-            
+
             # Se não tem assinatura ou está inscrito no tipo
             if not subscriptions or data_type in subscriptions:
-                targeted_connections.append(websocket)
-        
-        # Enviar para conexões específicas
-        if targeted_connections:
-            message_str = json.dumps(message)
-            
-            for websocket in targeted_connections:
-                try:
-                    await websocket.send_text(message_str)
-                except Exception as e:
-                    logger.error(f"Erro ao enviar dados em tempo real: {e}")
-                    self.disconnect(websocket)
\ No newline at end of file
+                targeted_channels.append(channel)
+
+        # Enfileirar para conexões específicas (última versão por tipo)
+        if targeted_channels:
+            encoded = self._encode(message)
+
+            for channel in targeted_channels:
+                self._enqueue(channel, encoded, coalesce_key=f"real_time_data:{data_type}")
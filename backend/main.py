@@ -12,7 +12,7 @@ os.environ['YOLO_CONFIG_DIR'] = '/tmp/Ultralytics'  # Configurar diretório YOLO
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import asyncio
@@ -32,9 +32,20 @@ from dotenv import load_dotenv
 # Importar módulos locais
 from core.config import settings
 from core.database import SupabaseManager
+from core.sql_executor import close_sql_executor
+from core.edge_journal import EdgeJournal, close_edge_journal
+from core.analytics_store import AnalyticsStore
+from core.app_state import set_analytics_store, get_analytics_store
 from core.detector import YOLOPersonDetector
 from core.tracker import PersonTracker
 from core.websocket_manager import WebSocketManager
+from core.event_hub import (
+    EventHub, crossings_topic, STORE_METRICS_TOPIC, SMART_METRICS_TOPIC,
+    ALERTS_TOPIC, SYSTEM_STATUS_TOPIC
+)
+from core.event_bus import EventBus, CameraLeadership, create_backend
+from core.live_state import live_state
+from core.metrics import pipeline_metrics
 from models.api_models import *
 from utils.helpers import *
 
@@ -53,17 +64,32 @@ supabase_manager = None
 detector = None
 tracker = None
 websocket_manager = WebSocketManager()
+event_hub = EventHub()
+event_bus = None  # Só com EVENT_BUS_ENABLED (vários workers/pods)
 smart_engine = None
 rtsp_processor = None  # RTSP processor para MVP
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle management para inicializar/limpar recursos"""
-    global supabase_manager, detector, tracker, smart_engine, rtsp_processor
+    global supabase_manager, detector, tracker, smart_engine, rtsp_processor, event_bus
 
     logger.info("🚀 Iniciando Shop Flow Backend MVP (RTSP direto)...")
 
+    background_tasks = []
+
     try:
+        # Hub pub/sub em processo (produtores -> WS/SSE/MJPEG)
+        from core.app_state import set_event_hub
+        set_event_hub(event_hub)
+
+        # Métricas Prometheus (antes do processador, que resolve os histogramas da câmera)
+        if pipeline_metrics.configure(settings.PROMETHEUS_ENABLED, settings.PROMETHEUS_PORT):
+            pipeline_metrics.track_queue('event_hub', event_hub.pending_events)
+            pipeline_metrics.track_queue(
+                'websocket', lambda: sum(channel.pending for channel in list(websocket_manager.channels.values()))
+            )
+
         # Inicializar Supabase
         supabase_manager = SupabaseManager(
             url=settings.SUPABASE_URL,
@@ -96,7 +122,9 @@ async def lifespan(app: FastAPI):
             enable_face_recognition=settings.FACE_RECOGNITION_ENABLED,
             enable_behavior_analyzer=False,  # Desabilitado para MVP (-500MB RAM)
             enable_customer_segmentation=False,  # Desabilitado para MVP
-            enable_predictive_insights=False  # Desabilitado para MVP
+            enable_predictive_insights=False,  # Desabilitado para MVP
+            segmentation_interval=settings.SMART_SEGMENTATION_INTERVAL_SECONDS,
+            prediction_interval=settings.SMART_PREDICTION_INTERVAL_SECONDS
         )
         await smart_engine.initialize()
 
@@ -118,19 +146,79 @@ async def lifespan(app: FastAPI):
             detector=detector,
             database=supabase_manager,
             target_fps=settings.CAMERA_FPS_PROCESS,
-            face_recognition_enabled=settings.FACE_RECOGNITION_ENABLED
+            face_recognition_enabled=settings.FACE_RECOGNITION_ENABLED,
+            event_hub=event_hub
         )
 
         await rtsp_processor.initialize()
 
-        # Iniciar processamento contínuo
-        await rtsp_processor.start()
+        # Visitas encerradas pelo analisador de comportamento entram no histograma de permanência
+        if smart_engine and smart_engine.behavior_analyzer:
+            smart_engine.behavior_analyzer.rollups = rtsp_processor.rollups
+            smart_engine.behavior_analyzer.camera_id = rtsp_processor.camera_id
+            # Velocidade, passada e distância em metros com a calibração da câmera
+            rtsp_processor.add_perspective_consumer(smart_engine.behavior_analyzer)
+
+        # Histórico colunar local (Parquet + DuckDB) para consultas longas
+        if settings.ANALYTICS_STORE_ENABLED:
+            analytics_store = AnalyticsStore(
+                settings.ANALYTICS_STORE_DIR,
+                flush_interval=settings.ANALYTICS_STORE_FLUSH_SECONDS,
+                retention_days=settings.ANALYTICS_STORE_RETENTION_DAYS
+            )
+            if analytics_store.available:
+                rtsp_processor.analytics_store = analytics_store
+                if smart_engine and smart_engine.behavior_analyzer:
+                    smart_engine.behavior_analyzer.analytics_store = analytics_store
+                set_analytics_store(analytics_store)
+                background_tasks.append(asyncio.create_task(maintain_analytics_store(analytics_store)))
+                logger.success(f"✅ Analytics store local em {settings.ANALYTICS_STORE_DIR}")
+            else:
+                logger.warning("⚠️ ANALYTICS_STORE_ENABLED sem duckdb/pyarrow instalados - store desabilitado")
+
+        if settings.EVENT_BUS_ENABLED:
+            # Vários workers: eventos compartilhados e um único worker processa a câmera
+            event_bus = EventBus(
+                create_backend(settings.REDIS_URL, settings.REDIS_PASSWORD),
+                event_hub,
+                prefix=settings.EVENT_BUS_PREFIX
+            )
+            await event_bus.start()
+            await event_bus.hydrate([rtsp_processor.camera_id])
+
+            leadership = CameraLeadership(
+                event_bus.backend,
+                rtsp_processor.camera_id,
+                event_bus.worker_id,
+                ttl=settings.EVENT_BUS_LEADER_TTL,
+                on_acquired=rtsp_processor.start,
+                on_lost=rtsp_processor.stop,
+                prefix=settings.EVENT_BUS_PREFIX
+            )
+            background_tasks.append(asyncio.create_task(leadership.run()))
+            logger.success(f"✅ Event bus ativo (worker {event_bus.worker_id})")
+        else:
+            # Iniciar processamento contínuo
+            await rtsp_processor.start()
 
         # Definir no estado global
         set_rtsp_processor(rtsp_processor)
 
         logger.success("✅ RTSP Processor iniciado - processamento ao vivo ativo!")
 
+        # Publicação compartilhada das métricas ao vivo + ponte hub -> WebSocket
+        background_tasks.append(asyncio.create_task(publish_live_metrics()))
+        background_tasks.append(asyncio.create_task(bridge_hub_to_websocket()))
+
+        # Partições diárias de camera_events (criação antecipada + retenção)
+        background_tasks.append(asyncio.create_task(maintain_event_partitions()))
+
+        # Envio dos eventos gravados no edge journal local
+        if supabase_manager.journal:
+            background_tasks.append(asyncio.create_task(
+                sync_edge_journal(supabase_manager.journal, settings.EDGE_JOURNAL_SYNC_SECONDS)
+            ))
+
         logger.success("🎯 Backend MVP iniciado com sucesso! Câmera conectada via RTSP.")
 
     except Exception as e:
@@ -142,13 +230,37 @@ async def lifespan(app: FastAPI):
     # Cleanup
     logger.info("🔄 Finalizando backend...")
 
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    if event_bus:
+        await event_bus.stop()
+        await event_bus.backend.close()
+
     # Parar RTSP processor
     if rtsp_processor:
         await rtsp_processor.stop()
         logger.info("✅ RTSP Processor finalizado")
 
+    if smart_engine:
+        await smart_engine.close()
+
+    analytics_store = get_analytics_store()
+    if analytics_store:
+        await analytics_store.close()
+
+    # Última rodada de envio; o que não subir fica no journal para o próximo start
+    if supabase_manager and supabase_manager.journal:
+        try:
+            await asyncio.wait_for(supabase_manager.journal.sync(supabase_manager.push_journal_batch), timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️ Journal não sincronizado no shutdown ({e}); envio continua no próximo start")
+    await close_edge_journal()
+
     if supabase_manager:
         await supabase_manager.close()
+    await close_sql_executor()
 
     logger.info("✅ Backend finalizado")
 
@@ -211,6 +323,10 @@ from api.routes.employees import router as employees_router
 app.include_router(analytics_router)
 app.include_router(employees_router)
 
+# Diagnóstico sob demanda (profiling)
+from api.routes.admin import router as admin_router
+app.include_router(admin_router)
+
 # ============================================================================
 # CAMERA STATS ENDPOINT
 # ============================================================================
@@ -230,6 +346,9 @@ async def camera_stats():
     return {
         "status": "ok",
         "camera_stats": stats,
+        "event_hub": event_hub.get_stats(),
+        "live_state": live_state.get_stats(),
+        "event_bus": event_bus.get_stats() if event_bus else None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -255,8 +374,10 @@ async def health_check():
         # Check database
         if supabase_manager:
             try:
-                await supabase_manager.execute("SELECT 1", [])
-                health_status["services"]["database"] = True
+                if supabase_manager.sql:
+                    health_status["services"]["database"] = await supabase_manager.execute("SELECT 1") is not None
+                else:
+                    health_status["services"]["database"] = supabase_manager.client is not None
             except:
                 pass
         
@@ -479,44 +600,172 @@ async def export_audit_logs(days: int = 30):
 @app.websocket("/ws/smart-metrics")
 async def websocket_smart_metrics(websocket: WebSocket):
     """WebSocket para métricas inteligentes em tempo real"""
-    await websocket_manager.connect(websocket)
-    try:
-        while True:
-            # Enviar métricas inteligentes a cada 3 segundos
-            if smart_engine and smart_engine.last_metrics:
-                metrics_data = {
-                    'type': 'smart_metrics_update',
-                    'data': smart_engine.last_metrics.__dict__,
-                    'timestamp': datetime.now().isoformat()
-                }
-            else:
-                metrics_data = {
-                    'type': 'smart_metrics_update',
-                    'data': {'status': 'no_metrics_available'},
-                    'timestamp': datetime.now().isoformat()
-                }
-            await websocket_manager.send_personal_message(json.dumps(metrics_data), websocket)
-            await asyncio.sleep(3)
-    except WebSocketDisconnect:
-        websocket_manager.disconnect(websocket)
+    await forward_topic_to_websocket(websocket, SMART_METRICS_TOPIC, 'smart_metrics', 'smart_metrics_update')
 
 @app.websocket("/ws/metrics")
 async def websocket_metrics(websocket: WebSocket):
     """WebSocket para métricas básicas (compatibilidade)"""
+    await forward_topic_to_websocket(websocket, STORE_METRICS_TOPIC, 'metrics', 'metrics_update')
+
+async def forward_topic_to_websocket(websocket: WebSocket, topic: str, stream: str, coalesce_key: str):
+    """
+    Encaminha um tópico do event hub para a conexão.
+
+    Clientes inscritos no stream de estado recebem deltas (via publish_live_metrics);
+    os demais recebem a mensagem completa já serializada pelo hub.
+    """
     await websocket_manager.connect(websocket)
+    listener = asyncio.create_task(websocket_manager.listen(websocket))
+    subscription = event_hub.subscribe(topic, replay=1, conflate=True)
     try:
-        while True:
-            # Enviar métricas atuais a cada 2 segundos
-            metrics = await get_current_metrics()
-            await websocket_manager.send_personal_message(json.dumps(metrics), websocket)
-            await asyncio.sleep(2)
+        while websocket_manager.is_connected(websocket):
+            event = await subscription.get(timeout=5.0)
+            if event is None or websocket_manager.is_subscribed(websocket, stream):
+                continue
+            if not await websocket_manager.send_personal_message(
+                event.encoded, websocket, coalesce_key=coalesce_key
+            ):
+                break
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
+    finally:
+        subscription.close()
+        listener.cancel()
+
+async def publish_live_metrics(interval: float = 2.0):
+    """
+    Publica métricas da loja e do Smart Engine no hub.
+
+    Uma consulta ao banco por intervalo (e só com assinantes), em vez de uma
+    por conexão WebSocket.
+    """
+    while True:
+        try:
+            if event_hub.has_subscribers(STORE_METRICS_TOPIC):
+                metrics = await get_current_metrics()
+                event_hub.publish(STORE_METRICS_TOPIC, metrics)
+                if metrics.get('type') == 'metrics_update':
+                    await websocket_manager.update_state('metrics', 'camera1', metrics['data'])
+
+            if event_hub.has_subscribers(SMART_METRICS_TOPIC):
+                if smart_engine and smart_engine.last_metrics:
+                    await websocket_manager.update_state('smart_metrics', 'camera1', smart_engine.last_metrics)
+                    data = smart_engine.last_metrics
+                else:
+                    data = {'status': 'no_metrics_available'}
+                event_hub.publish(SMART_METRICS_TOPIC, {
+                    'type': 'smart_metrics_update',
+                    'data': data,
+                    'timestamp': datetime.now().isoformat()
+                })
+
+        except Exception as e:
+            logger.error(f"Erro ao publicar métricas ao vivo: {e}")
+
+        await asyncio.sleep(interval)
+
+async def maintain_event_partitions(interval: float = 6 * 3600):
+    """
+    Mantém as partições diárias de camera_events.
+
+    Idempotente: com pg_cron no banco esta rotina só confirma o estado;
+    sem ele, garante as partições futuras e aplica a retenção.
+    """
+    while True:
+        try:
+            if supabase_manager:
+                result = await supabase_manager.maintain_camera_events_partitions(
+                    days_ahead=settings.CAMERA_EVENTS_PARTITIONS_AHEAD,
+                    retention_days=settings.CAMERA_EVENTS_RETENTION_DAYS
+                )
+                if result.get("created") or result.get("dropped"):
+                    logger.info(
+                        f"🗂️ Partições camera_events: {result['created']} criadas, "
+                        f"{result['dropped']} removidas ({result.get('partitions')} ativas)"
+                    )
+        except Exception as e:
+            logger.error(f"Erro na manutenção das partições: {e}")
+
+        await asyncio.sleep(interval)
+
+async def sync_edge_journal(journal: EdgeJournal, interval: float = 5.0, max_interval: float = 60.0):
+    """
+    Envia os eventos do edge journal ao Supabase.
+
+    Sem conexão, recua exponencialmente até max_interval (e recria o cliente,
+    se o startup ficou em modo offline). Linhas sincronizadas antigas são
+    removidas do journal 1x por hora.
+    """
+    delay = interval
+    last_prune = time.monotonic()
+
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            if not supabase_manager.client:
+                await supabase_manager.initialize()
+
+            await journal.sync(supabase_manager.push_journal_batch)
+            delay = interval
+
+            if time.monotonic() - last_prune >= 3600:
+                await journal.prune()
+                last_prune = time.monotonic()
+        except Exception:
+            # Falha já registrada pelo journal (log só na transição online -> offline)
+            delay = min(delay * 2, max_interval)
+
+async def maintain_analytics_store(store: AnalyticsStore):
+    """Grava buffers parados no Parquet e roda compactação/retenção (1x por hora)"""
+    while True:
+        await asyncio.sleep(store.flush_interval)
+        try:
+            await store.flush()
+            await store.maintain()
+        except Exception as e:
+            logger.error(f"Erro na manutenção do analytics store: {e}")
+
+async def bridge_hub_to_websocket():
+    """Encaminha eventos do hub (câmeras, alertas, status) para o WebSocketManager"""
+    subscription = event_hub.subscribe(
+        ['cameras.*.metrics', 'cameras.*.crossings', ALERTS_TOPIC, SYSTEM_STATUS_TOPIC],
+        max_queue=1000
+    )
+    try:
+        async for event in subscription:
+            try:
+                if event.topic.endswith('.metrics'):
+                    # Câmera processada em outro worker: estado ao vivo vem pelo event bus
+                    if event.origin not in (None, 'kv'):
+                        live_state.publish(
+                            event.data.get('camera_id'), event.data,
+                            origin=event.origin, updated_at=event.timestamp
+                        )
+                    # Métricas por frame: só para inscritos no stream 'camera_metrics'
+                    await websocket_manager.update_state('camera_metrics', event.data.get('camera_id'), event.data)
+                elif event.topic.endswith('.crossings'):
+                    await websocket_manager.broadcast_camera_event(event.topic.split('.')[1], event.data)
+                elif event.topic == ALERTS_TOPIC:
+                    await websocket_manager.broadcast_alert(**event.data)
+                elif event.topic == SYSTEM_STATUS_TOPIC:
+                    await websocket_manager.broadcast_event('system_status', event.data)
+            except Exception as e:
+                logger.error(f"Erro ao encaminhar evento {event.topic}: {e}")
+    finally:
+        subscription.close()
 
 # ============================================================================
 # API ENDPOINTS EXISTENTES (Mantidos para compatibilidade)
 # ============================================================================
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métricas Prometheus do pipeline (PROMETHEUS_ENABLED)"""
+    if not pipeline_metrics.enabled:
+        raise HTTPException(status_code=404, detail="Métricas Prometheus desabilitadas")
+    content, content_type = pipeline_metrics.render()
+    return Response(content=content, media_type=content_type)
+
 @app.get("/api/health")
 async def health_check():
     """Health check expandido do sistema"""
@@ -542,6 +791,16 @@ async def health_check():
         except Exception as e:
             db_status = {"status": "error", "latency_ms": None, "error": str(e)}
             overall_status = "unhealthy"
+
+        # Eventos gravados localmente aguardando envio
+        if supabase_manager.journal:
+            journal_stats = supabase_manager.journal.get_stats()
+            db_status["journal"] = {
+                "online": journal_stats["online"],
+                "pending": journal_stats["pending"],
+                "failed": journal_stats["failed"],
+                "last_sync": journal_stats["last_sync"]
+            }
     services["database"] = db_status
 
     # Check camera/RTSP
@@ -634,12 +893,11 @@ async def process_smart_frame(frame_array, timestamp: str):
             
         # Broadcast métricas via WebSocket
         if smart_engine and smart_engine.last_metrics:
-            metrics_message = {
+            event_hub.publish(SMART_METRICS_TOPIC, {
                 'type': 'smart_metrics_update',
-                'data': smart_engine.last_metrics.__dict__,
+                'data': smart_engine.last_metrics,
                 'timestamp': datetime.now().isoformat()
-            }
-            await websocket_manager.broadcast(json.dumps(metrics_message))
+            })
         
         # Cleanup periódico
         if smart_engine:
@@ -689,6 +947,20 @@ async def handle_smart_crossing(crossing: Dict[str, Any], timestamp: str, frame_
             timestamp=timestamp,
             metadata=metadata
         )
+
+        analytics_store = get_analytics_store()
+        if analytics_store:
+            await analytics_store.add_crossing(
+                'camera1', person_id, crossing['action'], crossing['confidence'], timestamp
+            )
+
+        event_hub.publish(crossings_topic('camera1'), {
+            'action': crossing['action'],
+            'person_id': person_id,
+            'confidence': crossing['confidence'],
+            'timestamp': timestamp,
+            'metadata': metadata
+        })
         
         # Log específico baseado em métricas inteligentes
         if smart_metrics and smart_metrics.employees > 0:
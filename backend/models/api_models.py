@@ -130,6 +130,12 @@ class CameraConfigData(BaseModel):
     )
     confidence_threshold: float = Field(default=0.5, ge=0.1, le=1.0)
 
+class CameraCalibrationRequest(BaseModel):
+    image_points: List[List[float]] = Field(..., min_length=4, description="Pontos no frame [x, y] em pixels, ao nível do chão")
+    ground_points: List[List[float]] = Field(..., min_length=4, description="Mesmos pontos no chão [x, y] em metros")
+    frame_width: int = Field(..., gt=0, description="Largura do frame usado na marcação")
+    frame_height: int = Field(..., gt=0, description="Altura do frame usado na marcação")
+
 class CameraConfig(CameraConfigData):
     id: str
     created_at: datetime
@@ -0,0 +1,63 @@
+"""
+Backfill de rollups a partir do histórico de camera_events
+
+Reconstrói a tabela camera_rollups (minuto -> hora -> dia) em janelas de
+poucas horas. A agregação roda no banco; o script só percorre as janelas,
+então o uso de memória não depende do tamanho do histórico. Pode ser
+reexecutado com segurança (upserts).
+
+Usage (a partir de backend/):
+    python scripts/backfill_rollups.py --days 30
+    python scripts/backfill_rollups.py --start 2025-11-01 --end 2025-11-14 --camera camera1
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from core.config import settings
+from core.database import SupabaseManager
+from core.rollups import backfill_rollups
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconstrói camera_rollups a partir de camera_events")
+    parser.add_argument("--days", type=int, default=7, help="Dias para trás a partir de agora (padrão: 7)")
+    parser.add_argument("--start", type=str, help="Início ISO (sobrescreve --days)")
+    parser.add_argument("--end", type=str, help="Fim ISO (padrão: agora)")
+    parser.add_argument("--camera", type=str, default=None, help="Apenas esta câmera")
+    parser.add_argument("--chunk-hours", type=int, default=6, help="Horas por janela (padrão: 6)")
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+
+    end = datetime.fromisoformat(args.end) if args.end else datetime.now()
+    start = datetime.fromisoformat(args.start) if args.start else end - timedelta(days=args.days)
+
+    database = SupabaseManager(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    if not await database.initialize():
+        logger.error("❌ Supabase indisponível - backfill cancelado")
+        return 1
+
+    logger.info(f"🔄 Backfill de rollups: {start.isoformat()} -> {end.isoformat()} (câmera: {args.camera or 'todas'})")
+    summary = await backfill_rollups(
+        database, start, end, camera_id=args.camera, chunk=timedelta(hours=args.chunk_hours)
+    )
+
+    logger.success(
+        f"✅ Backfill concluído: {summary['chunks']} janelas, {summary['buckets']} buckets, "
+        f"{summary['failed_chunks']} falhas"
+    )
+    return 1 if summary["failed_chunks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,163 @@
+"""
+Benchmark das métricas de movimento do BehaviorAnalyzer
+
+Compara, com N pessoas simultâneas, o custo por frame de:
+- incremental: BehaviorAnalyzer._calculate_movement_metrics (O(1) por pessoa)
+- releitura: algoritmo anterior, que percorria as até 100 posições do deque
+  de cada pessoa três vezes por frame (distância/velocidades, complexidade
+  e paradas) com scipy euclidean
+
+Enquanto a visita cabe no deque (100 posições) os dois calculam a mesma
+coisa; o script confere os valores nesse trecho. A equivalência na visita
+inteira é coberta por tests/test_movement_metrics.py.
+
+Usage (a partir de backend/):
+    python scripts/benchmark_movement_metrics.py
+    python scripts/benchmark_movement_metrics.py --tracks 50 --frames 1500
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from scipy.spatial.distance import euclidean
+
+from core.ai.behavior_analyzer import BehaviorAnalyzer, PersonTrack
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark das métricas de movimento (incremental x releitura)")
+    parser.add_argument("--tracks", type=int, default=50, help="Pessoas simultâneas (padrão: 50)")
+    parser.add_argument("--frames", type=int, default=1500, help="Frames simulados (padrão: 1500 = 5min a 5 FPS)")
+    parser.add_argument("--fps", type=float, default=5.0, help="FPS simulado (padrão: 5)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def full_walk_metrics(positions: List[Tuple], movement_threshold: float, stop_threshold: int) -> Dict[str, float]:
+    """Algoritmo anterior (referência): três passadas completas pelo histórico"""
+    total_distance = 0.0
+    speeds = []
+    for i in range(1, len(positions)):
+        prev_x, prev_y, prev_time = positions[i - 1]
+        curr_x, curr_y, curr_time = positions[i]
+        distance = euclidean((prev_x, prev_y), (curr_x, curr_y))
+        total_distance += distance
+        time_diff = (curr_time - prev_time).total_seconds()
+        if time_diff > 0:
+            speeds.append(distance / time_diff)
+
+    complexity = 0.0
+    if len(positions) >= 3:
+        walked = 0.0
+        for i in range(1, len(positions)):
+            walked += euclidean(positions[i - 1][:2], positions[i][:2])
+        direct = euclidean(positions[0][:2], positions[-1][:2])
+        complexity = 1.0 if direct == 0 else min((walked - direct) / walked, 1.0)
+
+    stops = 0
+    consecutive_low_speed = 0
+    for i in range(1, len(positions)):
+        distance = euclidean(positions[i - 1][:2], positions[i][:2])
+        time_diff = (positions[i][2] - positions[i - 1][2]).total_seconds()
+        if time_diff > 0:
+            if distance / time_diff < movement_threshold:
+                consecutive_low_speed += 1
+            else:
+                if consecutive_low_speed >= stop_threshold:
+                    stops += 1
+                consecutive_low_speed = 0
+
+    return {
+        "total_distance": total_distance,
+        "avg_speed": float(np.mean(speeds)) if speeds else 0.0,
+        "max_speed": max(speeds) if speeds else 0.0,
+        "trajectory_complexity": complexity,
+        "stops_count": stops
+    }
+
+
+def simulate(tracks: int, frames: int, fps: float, seed: int) -> List[List[Tuple[float, float, datetime]]]:
+    """Posições por frame: passeio aleatório com paradas ocasionais"""
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 18, 10, 0, 0)
+    state = [[rng.uniform(0, 640), rng.uniform(0, 480), 0.0, 0.0] for _ in range(tracks)]
+    timeline = []
+    for frame in range(frames):
+        timestamp = start + timedelta(seconds=frame / fps)
+        points = []
+        for person in state:
+            if rng.random() < 0.05:
+                person[2], person[3] = (0.0, 0.0) if rng.random() < 0.5 else (rng.uniform(-8, 8), rng.uniform(-8, 8))
+            person[0] = min(max(person[0] + person[2] + rng.gauss(0, 0.5), 0), 640)
+            person[1] = min(max(person[1] + person[3] + rng.gauss(0, 0.5), 0), 480)
+            points.append((person[0], person[1], timestamp))
+        timeline.append(points)
+    return timeline
+
+
+async def main() -> int:
+    args = parse_args()
+    analyzer = BehaviorAnalyzer()
+    timeline = simulate(args.tracks, args.frames, args.fps, args.seed)
+
+    tracks = [
+        PersonTrack(
+            person_id=i,
+            positions=deque(maxlen=analyzer.max_track_history),
+            first_seen=timeline[0][i][2],
+            last_seen=timeline[0][i][2],
+            person_type="customer",
+            identity_id=None
+        )
+        for i in range(args.tracks)
+    ]
+
+    incremental_time = 0.0
+    full_walk_time = 0.0
+    max_error = 0.0
+
+    for frame, points in enumerate(timeline):
+        for track, point in zip(tracks, points):
+            track.last_seen = point[2]
+            track.positions.append(point)
+
+        started = time.perf_counter()
+        for track in tracks:
+            await analyzer._calculate_movement_metrics(track)
+        incremental_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        reference = [
+            full_walk_metrics(list(track.positions), analyzer.movement_threshold, analyzer.stop_threshold)
+            for track in tracks
+        ]
+        full_walk_time += time.perf_counter() - started
+
+        # Mesma janela enquanto a visita cabe no deque
+        if frame < analyzer.max_track_history:
+            for track, expected in zip(tracks, reference):
+                for key, value in expected.items():
+                    max_error = max(max_error, abs(getattr(track, key) - value))
+
+    per_frame_incremental = incremental_time / args.frames * 1e6
+    per_frame_full_walk = full_walk_time / args.frames * 1e6
+    print(f"Pessoas simultâneas: {args.tracks} | frames: {args.frames} | histórico: {analyzer.max_track_history} posições")
+    print(f"Releitura (anterior): {per_frame_full_walk:10.1f} µs/frame")
+    print(f"Incremental:          {per_frame_incremental:10.1f} µs/frame")
+    print(f"Ganho:                {per_frame_full_walk / per_frame_incremental:10.1f}x")
+    print(f"Maior diferença nos primeiros {analyzer.max_track_history} frames: {max_error:.2e}")
+    return 0 if max_error < 1e-6 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,277 @@
+"""
+Benchmark do pipeline de processamento (atalho para a suíte pytest-benchmark)
+
+Componentes: roda tests/test_pipeline_benchmark.py (pytest-benchmark sobre a
+cena sintética determinística, banco em memória) e converte o JSON para o
+relatório abaixo (média, p50, p95, p99 e ops/s):
+detect, track, group, heatmap, db_write, encode e pipeline
+(detect -> group -> heatmap -> encode). Direto pelo pytest:
+    python -m pytest tests/test_pipeline_benchmark.py --benchmark-json bench.json
+
+Ponta a ponta (e2e): RTSPFrameProcessor lendo do replay (cena sintética ou
+vídeo gravado, detector sintético ou YOLO), FPS sustentado e latência (fila de
+captura + processamento) por frame.
+
+O relatório JSON (--output) guarda o commit e os parâmetros; --compare imprime a
+variação em relação a um relatório anterior (ex: gerado no commit base).
+
+Usage (a partir de backend/):
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --frames 500 --people 12 --output bench.json
+    python scripts/benchmark_pipeline.py --compare bench.json
+    python scripts/benchmark_pipeline.py --only e2e --video /dados/loja.mp4 --yolo
+    python scripts/benchmark_pipeline.py --only detect encode
+    python scripts/benchmark_pipeline.py --rate 5 --db-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import numpy as np
+from loguru import logger
+
+from core.replay_source import InMemoryDatabase, ReplayCameraManager, SyntheticDetector, SyntheticScene
+
+SUITE = "tests/test_pipeline_benchmark.py"
+COMPONENTS = ("detect", "track", "group", "heatmap", "db_write", "encode", "pipeline")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de processamento")
+    parser.add_argument("--frames", type=int, default=300, help="Frames do ponta a ponta (padrão: 300)")
+    parser.add_argument("--warmup", type=int, default=20, help="Frames descartados antes de medir o ponta a ponta (padrão: 20)")
+    parser.add_argument("--people", type=int, default=8, help="Pessoas na cena sintética do ponta a ponta (padrão: 8)")
+    parser.add_argument("--width", type=int, default=1280, help="Largura do frame sintético (padrão: 1280)")
+    parser.add_argument("--height", type=int, default=720, help="Altura do frame sintético (padrão: 720)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed da cena sintética (padrão: 42)")
+    parser.add_argument("--video", help="Vídeo gravado no lugar da cena sintética (ponta a ponta)")
+    parser.add_argument("--yolo", action="store_true", help="Usar YOLOPersonDetector no ponta a ponta")
+    parser.add_argument("--fps", type=int, default=5, help="FPS de processamento / redução do vídeo (padrão: 5)")
+    parser.add_argument("--rate", type=float, default=0, help="Ritmo do replay no ponta a ponta (0 = máximo, padrão; a latência inclui a fila cheia)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Latência simulada por chamada ao banco (ponta a ponta)")
+    parser.add_argument("--only", nargs="+", help=f"Rodar só estes benchmarks ({', '.join(COMPONENTS)}, e2e)")
+    parser.add_argument("--output", help="Salvar relatório JSON")
+    parser.add_argument("--compare", help="Relatório JSON anterior para comparar")
+    return parser.parse_args()
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Estatísticas em ms de uma lista de durações (s)"""
+    values = np.asarray(samples) * 1000
+    mean = float(values.mean())
+    return {
+        "n": len(values),
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "ops_per_s": round(1000 / mean, 1) if mean > 0 else None
+    }
+
+
+def create_detector(args: argparse.Namespace):
+    if not args.yolo:
+        return SyntheticDetector()
+    from core.config import settings
+    from core.detector import YOLOPersonDetector
+    return YOLOPersonDetector(model_path=settings.YOLO_MODEL, conf_threshold=settings.YOLO_CONFIDENCE)
+
+
+def create_processor(args: argparse.Namespace, detector, database, camera_manager=None):
+    from core.rtsp_processor import RTSPFrameProcessor
+    return RTSPFrameProcessor(
+        rtsp_url=args.video or f"synthetic://?people={args.people}&seed={args.seed}",
+        detector=detector,
+        database=database,
+        target_fps=args.fps,
+        face_recognition_enabled=False,
+        camera_id="bench",
+        camera_manager=camera_manager or ReplayCameraManager(
+            SyntheticScene(args.width, args.height, args.people, args.seed), max_frames=0
+        )
+    )
+
+
+def run_suite(names: List[str]) -> Dict[str, Any]:
+    """Roda a suíte pytest-benchmark e converte o JSON para o formato do relatório"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "benchmark.json"
+        command = [
+            sys.executable, "-m", "pytest", SUITE, "-q", "-p", "no:cacheprovider",
+            "-k", " or ".join(f"test_{name}" for name in names),
+            "--benchmark-json", str(output), "--benchmark-save-data"
+        ]
+        completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+        if completed.returncode != 0 or not output.exists():
+            raise RuntimeError(f"Suíte de benchmark falhou:\n{completed.stdout[-2000:]}{completed.stderr[-2000:]}")
+        data = json.loads(output.read_text())
+
+    return {
+        bench["name"][len("test_"):]: summarize(bench["stats"]["data"])
+        for bench in data["benchmarks"]
+    }
+
+
+async def bench_end_to_end(args: argparse.Namespace) -> Dict[str, Any]:
+    """Processador completo lendo do replay (mesmo laço do _processing_loop)"""
+    total = args.frames + args.warmup
+    source = args.video or SyntheticScene(args.width, args.height, args.people, args.seed)
+    manager = ReplayCameraManager(source, target_fps=args.fps, rate=args.rate, max_frames=total, loop=bool(args.video))
+
+    detector = create_detector(args)
+    await detector.load_model()
+    database = InMemoryDatabase(args.db_latency_ms)
+    processor = create_processor(args, detector, database, camera_manager=manager)
+
+    processing, latency = [], []
+    processed = 0
+    manager.connect()
+    try:
+        while not manager.finished:
+            frame = manager.get_frame(timeout=1.0)
+            if frame is None:
+                continue
+            queue_latency = manager.last_queue_latency
+            started = time.perf_counter()
+            await processor._process_frame(frame)
+            processor.get_latest_frame()  # Encode do stream MJPEG (um por frame)
+            elapsed = time.perf_counter() - started
+
+            processed += 1
+            if processed == args.warmup:
+                measured_since = time.perf_counter()
+            if processed > args.warmup:
+                processing.append(elapsed)
+                latency.append(queue_latency + elapsed)
+        wall = time.perf_counter() - measured_since if processed > args.warmup else 0.0
+    finally:
+        await processor.heatmap_tiles.flush()
+        await processor.rollups.flush()
+        manager.disconnect()
+
+    stats = manager.get_stats()
+    return {
+        "frames": len(processing),
+        "fps": round(len(processing) / wall, 2) if wall else None,
+        "frames_dropped": stats.frames_dropped,
+        "processing": summarize(processing) if processing else None,
+        "latency": summarize(latency) if latency else None,
+        "db_calls": dict(database.calls)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    def delta(current: float, previous: Optional[float]) -> str:
+        if not previous:
+            return ""
+        return f"  ({(current - previous) / previous * 100:+.1f}%)"
+
+    base_components = (baseline or {}).get("components", {})
+    print(f"Commit: {report['commit']} | {report['params']['source']} | {report['params']['frames']} frames")
+    if baseline:
+        print(f"Comparando com: {baseline.get('commit')} ({baseline.get('created_at')})")
+        changed = [
+            key for key, value in report["params"].items()
+            if baseline.get("params", {}).get(key) != value
+        ]
+        if changed:
+            print(f"⚠️ Parâmetros diferentes do relatório base: {', '.join(changed)}")
+
+    print(f"\n{'componente':<12} {'média':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'ops/s':>10}")
+    for name, result in report["components"].items():
+        previous = base_components.get(name, {}).get("mean_ms")
+        print(
+            f"{name:<12} {result['mean_ms']:>8.3f}ms {result['p50_ms']:>8.3f}ms "
+            f"{result['p95_ms']:>8.3f}ms {result['p99_ms']:>8.3f}ms {result['ops_per_s'] or 0:>10.1f}"
+            f"{delta(result['mean_ms'], previous)}"
+        )
+
+    e2e = report.get("end_to_end")
+    if e2e and e2e["processing"]:
+        previous = (baseline or {}).get("end_to_end") or {}
+        print(f"\nPonta a ponta: {e2e['fps']} FPS{delta(e2e['fps'], previous.get('fps'))}"
+              f" | {e2e['frames']} frames | descartados: {e2e['frames_dropped']}")
+        for key in ("processing", "latency"):
+            result = e2e[key]
+            print(
+                f"  {key:<11} média {result['mean_ms']:.2f}ms p50 {result['p50_ms']:.2f}ms "
+                f"p95 {result['p95_ms']:.2f}ms p99 {result['p99_ms']:.2f}ms"
+                f"{delta(result['mean_ms'], (previous.get(key) or {}).get('mean_ms'))}"
+            )
+
+
+def main() -> int:
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = json.loads(Path(args.compare).read_text())
+        except Exception as e:
+            print(f"Erro ao ler relatório base {args.compare}: {e}")
+            return 1
+
+    def selected(name: str) -> bool:
+        return not args.only or name in args.only
+
+    names = [name for name in COMPONENTS if selected(name)]
+    try:
+        components = run_suite(names) if names else {}
+    except RuntimeError as e:
+        print(e)
+        return 1
+    end_to_end = asyncio.run(bench_end_to_end(args)) if selected("e2e") else None
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {
+            "source": args.video or f"synthetic {args.width}x{args.height} people={args.people} seed={args.seed}",
+            "detector": "yolo" if args.yolo else "synthetic",
+            "suite": SUITE,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "fps": args.fps,
+            "rate": args.rate,
+            "db_latency_ms": args.db_latency_ms
+        },
+        "components": components,
+        "end_to_end": end_to_end
+    }
+
+    print_report(report, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nRelatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Configuração compartilhada dos testes unitários (pytest)
+
+Os testes importam os módulos como o backend (`from core...`), então a
+raiz do backend entra no sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
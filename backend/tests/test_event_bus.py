@@ -0,0 +1,291 @@
+"""
+EventBus / CameraLeadership entre workers simulados
+
+Cada "worker" é um EventHub + EventBus no mesmo processo, compartilhando um
+backend: MemoryBackend ou RedisBackend sobre fakeredis (que executa os
+scripts Lua de renovação e compare-and-delete).
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from core.event_bus import CameraLeadership, EventBus, MemoryBackend, RedisBackend
+from core.event_hub import EventHub, frames_topic, metrics_topic
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("fakeredis.aioredis")
+
+
+def make_backend(kind: str):
+    if kind == "memory":
+        return MemoryBackend()
+    return RedisBackend("", client=fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()))
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def backend(request):
+    backend = make_backend(request.param)
+    yield backend
+    await backend.close()
+
+
+@pytest_asyncio.fixture
+async def workers(backend):
+    """Inicia workers sob demanda e encerra todos no fim"""
+    started = []
+
+    async def start(name: str):
+        hub = EventHub()
+        bus = EventBus(backend, hub, worker_id=name, state_ttl=30.0)
+        await bus.start()
+        started.append(bus)
+        await asyncio.sleep(0.05)  # Inscrição no pub/sub ativa
+        return hub, bus
+
+    yield start
+    for bus in started:
+        await bus.stop()
+
+
+async def wait_for(predicate, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condição não atingida")
+        await asyncio.sleep(0.01)
+
+
+# ============================================================================
+# Replicação
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_events_replicate_to_other_workers_without_self_echo(workers):
+    hub_a, bus_a = await workers("worker-a")
+    hub_b, bus_b = await workers("worker-b")
+
+    hub_a.publish(metrics_topic("camera1"), {"total_people": 3})
+    await wait_for(lambda: hub_b.latest(metrics_topic("camera1")) is not None)
+
+    remote = hub_b.latest(metrics_topic("camera1"))
+    assert remote.data == {"total_people": 3}
+    assert remote.origin == "worker-a"
+
+    # Evento recebido não volta para o bus (nem eco no worker de origem)
+    await asyncio.sleep(0.1)
+    assert len(hub_a.history(metrics_topic("camera1"))) == 1
+    assert len(hub_b.history(metrics_topic("camera1"))) == 1
+    assert bus_a.stats["events_received"] == 0
+    assert bus_b.stats["events_sent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_binary_frames_replicate_unchanged(workers):
+    hub_a, _ = await workers("worker-a")
+    hub_b, _ = await workers("worker-b")
+
+    jpeg = bytes(range(256)) * 4
+    hub_a.publish(frames_topic("camera1"), jpeg)
+    await wait_for(lambda: hub_b.latest(frames_topic("camera1")) is not None)
+
+    assert hub_b.latest(frames_topic("camera1")).data == jpeg
+
+
+@pytest.mark.asyncio
+async def test_late_worker_hydrates_latest_state(workers):
+    hub_a, bus_a = await workers("worker-a")
+    for count in (1, 2, 5):
+        hub_a.publish(metrics_topic("camera1"), {"total_people": count})
+    hub_a.publish(frames_topic("camera1"), b"\xff\xd8jpeg")
+    await wait_for(lambda: bus_a.stats["events_sent"] == 4)
+
+    # Worker novo: não viu os eventos, lê o último estado do KV
+    hub_c, bus_c = await workers("worker-c")
+    assert hub_c.latest(metrics_topic("camera1")) is None
+    await bus_c.hydrate(["camera1", "camera2"])
+
+    metrics = hub_c.latest(metrics_topic("camera1"))
+    assert metrics.data == {"total_people": 5}
+    assert metrics.origin == "kv"
+    assert hub_c.latest(frames_topic("camera1")).data == b"\xff\xd8jpeg"
+    assert hub_c.latest(metrics_topic("camera2")) is None
+
+
+# ============================================================================
+# Leader election
+# ============================================================================
+
+class Callbacks:
+    def __init__(self):
+        self.acquired = 0
+        self.lost = 0
+
+    async def on_acquired(self):
+        self.acquired += 1
+
+    async def on_lost(self):
+        self.lost += 1
+
+
+def leadership(backend, worker_id: str, callbacks: Callbacks, ttl: float = 0.3) -> CameraLeadership:
+    return CameraLeadership(
+        backend, "camera1", worker_id, ttl=ttl,
+        on_acquired=callbacks.on_acquired, on_lost=callbacks.on_lost
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_leader_and_failover_after_lease_expires(backend):
+    a_calls, b_calls = Callbacks(), Callbacks()
+    a = leadership(backend, "worker-a", a_calls)
+    b = leadership(backend, "worker-b", b_calls)
+
+    assert await a.step() is True
+    assert await b.step() is False
+
+    # Renovação mantém o lock além do TTL original
+    for _ in range(3):
+        await asyncio.sleep(a.ttl / 2)
+        assert await a.step() is True
+        assert await b.step() is False
+
+    # Worker A morre (para de renovar): B assume depois do TTL
+    await asyncio.sleep(a.ttl * 1.2)
+    assert await b.step() is True
+    assert b_calls.acquired == 1
+
+    # A volta: a renovação falha porque o lock é de B
+    assert await a.step() is False
+    assert a_calls.acquired == 1 and a_calls.lost == 1
+
+
+@pytest.mark.asyncio
+async def test_release_only_deletes_own_lock(backend):
+    a = leadership(backend, "worker-a", Callbacks())
+    b = leadership(backend, "worker-b", Callbacks())
+    assert await a.step() is True
+
+    # Compare-and-delete: B não remove o lock de A
+    await backend.release_lock(a.key, "worker-b")
+    assert await b.step() is False
+
+    await a.release()
+    assert a.is_leader is False
+    assert await b.step() is True
+
+
+@pytest.mark.asyncio
+async def test_renew_extends_lease_only_for_owner(backend):
+    assert await backend.acquire_lock("shopflow:leader:x", "worker-a", 0.2) is True
+    assert await backend.acquire_lock("shopflow:leader:x", "worker-b", 5.0) is False
+
+    await asyncio.sleep(0.15)
+    assert await backend.acquire_lock("shopflow:leader:x", "worker-a", 0.5) is True
+    await asyncio.sleep(0.15)  # Passou do TTL original, não do renovado
+    assert await backend.acquire_lock("shopflow:leader:x", "worker-b", 5.0) is False
+    assert await backend.get("shopflow:leader:x") == b"worker-a"
+
+
+class FlakyBackend:
+    """Backend cujo acquire_lock falha enquanto `failing` estiver ligado"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.failing = False
+
+    async def acquire_lock(self, key, owner, ttl):
+        if self.failing:
+            raise ConnectionError("redis indisponível")
+        return await self.backend.acquire_lock(key, owner, ttl)
+
+    async def release_lock(self, key, owner):
+        return await self.backend.release_lock(key, owner)
+
+
+@pytest.mark.asyncio
+async def test_transient_renew_error_keeps_leadership_until_lease_expires():
+    flaky = FlakyBackend(MemoryBackend())
+    calls = Callbacks()
+    leader = leadership(flaky, "worker-a", calls, ttl=0.3)
+    assert await leader.step() is True
+
+    # Uma falha de ida e volta não para o processador
+    flaky.failing = True
+    await asyncio.sleep(0.05)
+    assert await leader.step() is True
+    assert calls.lost == 0
+
+    # Volta a renovar normalmente
+    flaky.failing = False
+    assert await leader.step() is True
+
+    # Sem renovação bem-sucedida até o TTL passar: deixa a câmera
+    flaky.failing = True
+    await asyncio.sleep(0.35)
+    assert await leader.step() is False
+    assert calls.lost == 1
+
+
+class FlakySubscription:
+    def __init__(self, subscription, owner: "FlakyPubSubBackend"):
+        self.subscription = subscription
+        self.owner = owner
+
+    async def get(self):
+        if self.owner.get_failures:
+            self.owner.get_failures -= 1
+            raise ConnectionError("conexão com o redis perdida")
+        return await self.subscription.get()
+
+    async def close(self):
+        self.owner.closed += 1
+        await self.subscription.close()
+
+
+class FlakyPubSubBackend:
+    """MemoryBackend cujas assinaturas falham um número configurável de vezes"""
+
+    def __init__(self, backend: MemoryBackend):
+        self.backend = backend
+        self.get_failures = 0
+        self.subscribe_failures = 0
+        self.closed = 0
+
+    async def subscribe(self, pattern):
+        if self.subscribe_failures:
+            self.subscribe_failures -= 1
+            raise ConnectionError("redis indisponível")
+        return FlakySubscription(await self.backend.subscribe(pattern), self)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+@pytest.mark.asyncio
+async def test_receive_resubscribes_after_transient_pubsub_error():
+    shared = MemoryBackend()
+    flaky = FlakyPubSubBackend(shared)
+    hub_a, hub_b = EventHub(), EventHub()
+    bus_a = EventBus(shared, hub_a, worker_id="worker-a")
+    bus_b = EventBus(flaky, hub_b, worker_id="worker-b", resubscribe_delay=0.01)
+    await bus_a.start()
+
+    # Primeira leitura falha e a primeira reassinatura também
+    flaky.get_failures = 1
+    await bus_b.start()
+    flaky.subscribe_failures = 1
+    try:
+        await wait_for(lambda: bus_b.stats["resubscriptions"] == 1)
+        assert bus_b.stats["receive_errors"] == 1
+        assert flaky.closed == 1  # Assinatura antiga fechada
+
+        hub_a.publish(metrics_topic("camera1"), {"total_people": 4})
+        await wait_for(lambda: bus_b.stats["events_received"] == 1)
+        assert hub_b.latest(metrics_topic("camera1")).data == {"total_people": 4}
+        assert all(not task.done() for task in bus_b._tasks)
+    finally:
+        await bus_a.stop()
+        await bus_b.stop()
+    assert flaky.closed == 2
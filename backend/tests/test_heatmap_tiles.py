@@ -0,0 +1,78 @@
+"""
+HeatmapTileStore: fechamento de minutos, rollups e restart no meio do minuto
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.heatmap_tiles import HeatmapTileStore, decode_tile
+from core.replay_source import InMemoryDatabase
+
+SHAPE = (480, 640, 3)
+START = datetime(2026, 1, 5, 10, 0)
+
+
+def stored_minute(database: InMemoryDatabase, bucket: datetime):
+    row = database.tiles[("camera1", "minute", bucket.isoformat())]
+    return decode_tile(row["counts"], row["dtype"], row["width"], row["height"]), row["samples"]
+
+
+async def feed(store: HeatmapTileStore, start: datetime, seconds: int, point=(320, 240)):
+    for second in range(seconds):
+        await store.add_frame("camera1", [point], SHAPE, start + timedelta(seconds=second))
+
+
+@pytest.mark.asyncio
+async def test_minute_written_when_it_closes():
+    database = InMemoryDatabase()
+    store = HeatmapTileStore(database)
+
+    await feed(store, START, 61)
+
+    counts, samples = stored_minute(database, START)
+    assert samples == 60
+    assert counts.sum() == 60
+
+
+@pytest.mark.asyncio
+async def test_restart_within_minute_keeps_earlier_counts():
+    database = InMemoryDatabase()
+
+    # Processo anterior: 20 frames e shutdown no meio do minuto
+    before = HeatmapTileStore(database)
+    await feed(before, START, 20, point=(0, 0))
+    await before.flush()
+    assert stored_minute(database, START)[1] == 20
+
+    # Processo novo no mesmo minuto: soma ao tile gravado ao fechar
+    after = HeatmapTileStore(database)
+    await feed(after, START + timedelta(seconds=30), 31, point=(639, 479))
+
+    counts, samples = stored_minute(database, START)
+    assert samples == 50
+    assert counts.sum() == 50
+    assert counts[0, 0] == 20 and counts[-1, -1] == 30
+
+    # Minutos seguintes são acompanhados desde o início: sobrescrevem normalmente
+    await feed(after, START + timedelta(minutes=1, seconds=1), 60)
+    assert stored_minute(database, START + timedelta(minutes=1))[1] == 60
+
+
+@pytest.mark.asyncio
+async def test_partial_hour_rebuilt_from_stored_minutes():
+    database = InMemoryDatabase()
+    before = HeatmapTileStore(database)
+    await feed(before, START, 20)
+    await before.flush()
+
+    after = HeatmapTileStore(database)
+    await feed(after, START + timedelta(seconds=30), 30)
+    await feed(after, START + timedelta(hours=1), 1)  # Fecha o minuto e a hora
+
+    row = database.tiles[("camera1", "hour", START.isoformat())]
+    counts = decode_tile(row["counts"], row["dtype"], row["width"], row["height"])
+    assert row["samples"] == 50
+    assert counts.sum() == 50
+    assert np.count_nonzero(counts) == 1
@@ -0,0 +1,58 @@
+"""
+Perspectiva: consultas reescaladas quando o frame difere da resolução da calibração
+"""
+
+import pytest
+
+from core.perspective import CameraPerspective, PerspectiveCalibration, PerspectiveMap
+
+# Calibração marcada num snapshot 1280x720: 1 m no chão = 100 px (escala uniforme)
+CALIBRATION = PerspectiveCalibration.from_points(
+    [(0, 0), (1280, 0), (1280, 720), (0, 720)],
+    [(0, 0), (12.8, 0), (12.8, 7.2), (0, 7.2)],
+    1280, 720
+)
+
+
+def test_lookups_at_calibration_resolution():
+    perspective = PerspectiveMap(CALIBRATION)
+
+    assert perspective.ppm_at(640, 360) == pytest.approx(100.0, rel=1e-3)
+    assert perspective.distance_m((100, 400), (400, 400)) == pytest.approx(3.0, rel=1e-3)
+
+
+def test_lookups_scaled_to_smaller_frame():
+    """Stream 640x360: mesma cena com metade dos pixels"""
+    perspective = PerspectiveMap(CALIBRATION, frame_size=(640, 360))
+
+    assert perspective.ppm_at(320, 180) == pytest.approx(50.0, rel=1e-3)
+    assert perspective.ppm_at_points([[320, 180], [600, 350]]) == pytest.approx([50.0, 50.0], rel=1e-3)
+    assert perspective.distance_m((50, 200), (200, 200)) == pytest.approx(3.0, rel=1e-3)
+    # Grade de heatmap cobre a cena inteira: área total igual nas duas resoluções
+    assert perspective.cell_area_m2(64, 36).sum() == pytest.approx(12.8 * 7.2, rel=1e-3)
+
+
+def test_camera_perspective_follows_stream_resolution():
+    perspective = CameraPerspective("camera1")
+    perspective.apply(CALIBRATION)
+    shared_map = perspective.map
+
+    perspective.observe([], (360, 640, 3))
+
+    # Consumidores guardam a referência do mapa: a escala muda no mesmo objeto
+    assert perspective.map is shared_map
+    assert shared_map.ppm_at(320, 180) == pytest.approx(50.0, rel=1e-3)
+
+    # Nova calibração aplicada depois já nasce na resolução observada
+    perspective.apply(CALIBRATION)
+    assert perspective.map.ppm_at(320, 180) == pytest.approx(50.0, rel=1e-3)
+
+
+def test_auto_fit_discards_samples_from_previous_resolution():
+    perspective = CameraPerspective("camera1", auto_fit_every=1000)
+    perspective.observe([(100, 300, 140, 400)] * 10, (720, 1280, 3))
+    assert len(perspective.calibrator.samples) == 10
+
+    perspective.observe([(50, 150, 70, 200)], (360, 640, 3))
+
+    assert list(perspective.calibrator.samples) == [(200, 50)]
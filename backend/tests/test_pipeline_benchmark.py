@@ -0,0 +1,195 @@
+"""
+Benchmarks do pipeline (pytest-benchmark) sobre a cena sintética determinística
+
+Frames do ReplayCameraManager (SyntheticScene, seed fixa), banco em memória.
+Etapas medidas isoladamente (detect, track, group, heatmap, db_write, encode)
+e encadeadas como no processador: detect -> group -> heatmap -> encode
+(JPEG q85 do stream MJPEG). scripts/benchmark_pipeline.py roda esta suíte e
+acrescenta o ponta a ponta com o RTSPFrameProcessor.
+
+Usage (a partir de backend/):
+    python -m pytest tests/test_pipeline_benchmark.py
+    python -m pytest tests/test_pipeline_benchmark.py --benchmark-json bench.json
+    python -m pytest tests/test_pipeline_benchmark.py --benchmark-compare
+    python -m pytest tests --benchmark-skip   # só os testes funcionais
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from itertools import cycle, count
+
+import cv2
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from core.group_detector_simple import Detection, GroupDetectorSimple
+from core.heatmap_tiles import HeatmapTileStore
+from core.replay_source import InMemoryDatabase, ReplayCameraManager, SyntheticDetector, SyntheticScene
+from core.rollups import RollupStore
+from core.tracker import PersonTracker
+
+FRAMES = 150
+PEOPLE = 8
+FPS = 5
+WIDTH, HEIGHT = 1280, 720
+SEED = 42
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+START = datetime(2026, 1, 5, 10, 0)
+
+
+def to_detections(detections):
+    return [
+        Detection(bbox=tuple(det['bbox']), confidence=det['confidence'], person_id=f"person_{i}")
+        for i, det in enumerate(detections)
+    ]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    manager = ReplayCameraManager(
+        SyntheticScene(WIDTH, HEIGHT, PEOPLE, SEED), target_fps=FPS, rate=0, max_frames=FRAMES
+    )
+    frames = []
+    with manager:
+        while len(frames) < FRAMES and not manager.finished:
+            frame = manager.get_frame(timeout=1.0)
+            if frame is not None:
+                frames.append(frame)
+    assert len(frames) == FRAMES
+    return frames
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return SyntheticDetector()
+
+
+@pytest.fixture(scope="module")
+def raw_detections(frames, detector):
+    return [detector.detect(frame) for frame in frames]
+
+
+@pytest.fixture(scope="module")
+def detections(raw_detections):
+    return [to_detections(dets) for dets in raw_detections]
+
+
+@pytest.fixture
+def group_detector():
+    return GroupDetectorSimple(max_distance=1.5, min_group_size=2)
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def run_rounds(benchmark, step, inputs):
+    """Uma rodada por entrada (frames diferentes a cada rodada)"""
+    items = cycle(inputs)
+    return benchmark.pedantic(
+        step, setup=lambda: ((next(items),), {}), rounds=len(inputs), warmup_rounds=10
+    )
+
+
+def test_detect(benchmark, frames, detector):
+    result = run_rounds(benchmark, detector.detect, frames)
+    assert 0 < len(result) <= PEOPLE
+
+
+def test_track(benchmark, raw_detections):
+    tracker = PersonTracker()
+    result = run_rounds(benchmark, tracker.update, raw_detections)
+    assert len(result) > 0
+
+
+def test_group(benchmark, detections, group_detector):
+    def step(dets):
+        groups = group_detector.detect_groups(dets)
+        return group_detector.calculate_potential_customers(groups, dets)
+
+    result = run_rounds(benchmark, step, detections)
+    assert result['total_people'] > 0
+
+
+def test_heatmap(benchmark, frames, detections, loop):
+    database = InMemoryDatabase()
+    store = HeatmapTileStore(database)
+    clock = count()
+
+    # Relógio simulado na cadência do processamento: minutos fecham e gravam tiles
+    def step(item):
+        frame, dets = item
+        timestamp = START + timedelta(seconds=next(clock) * 60 / FPS)
+        loop.run_until_complete(store.add_frame("bench", [d.center for d in dets], frame.shape, timestamp))
+
+    run_rounds(benchmark, step, list(zip(frames, detections)))
+
+
+def test_db_write(benchmark, frames, detections, group_detector, loop):
+    """Evento + rollups + tiles de heatmap, como o processador (flush ao fechar minuto)"""
+    database = InMemoryDatabase()
+    rollups = RollupStore(database)
+    tiles = HeatmapTileStore(database)
+    clock = count()
+    inputs = [
+        (group_detector.calculate_potential_customers(group_detector.detect_groups(dets), dets), dets, frame.shape)
+        for frame, dets in zip(frames, detections)
+    ]
+
+    async def write(event, dets, shape, timestamp):
+        await database.insert_camera_event_simple({**event, "camera_id": "bench"})
+        await rollups.add_event("bench", event, timestamp)
+        await tiles.add_frame("bench", [d.center for d in dets], shape, timestamp)
+
+    def step(item):
+        timestamp = START + timedelta(seconds=next(clock) * 60 / FPS)
+        loop.run_until_complete(write(*item, timestamp))
+
+    run_rounds(benchmark, step, inputs)
+
+
+def test_db_write_closes_minute_buckets(frames, detections, group_detector, loop):
+    """Funcional (sem benchmark): frames atravessando a virada do minuto gravam tiles e rollups"""
+    database = InMemoryDatabase()
+    rollups = RollupStore(database)
+    tiles = HeatmapTileStore(database)
+
+    async def feed():
+        for i, (frame, dets) in enumerate(zip(frames, detections)):
+            timestamp = START + timedelta(seconds=50 + i / FPS)  # cruza 10:01
+            event = group_detector.calculate_potential_customers(group_detector.detect_groups(dets), dets)
+            await rollups.add_event("bench", event, timestamp)
+            await tiles.add_frame("bench", [d.center for d in dets], frame.shape, timestamp)
+
+    loop.run_until_complete(feed())
+    assert database.calls.get('upsert_heatmap_tiles', 0) > 0
+    assert database.calls.get('upsert_camera_rollups', 0) + database.calls.get('rebuild_camera_rollups', 0) > 0
+    assert ("bench", "minute", START.isoformat()) in database.tiles
+
+
+def test_encode(benchmark, frames):
+    ok, buffer = run_rounds(benchmark, lambda frame: cv2.imencode('.jpg', frame, JPEG_PARAMS), frames)
+    assert ok and buffer.size > 0
+
+
+def test_pipeline(benchmark, frames, detector, group_detector, loop):
+    """detect -> group -> heatmap -> encode por frame"""
+    database = InMemoryDatabase()
+    store = HeatmapTileStore(database)
+    clock = count()
+
+    def step(frame):
+        dets = to_detections(detector.detect(frame))
+        groups = group_detector.detect_groups(dets)
+        metrics = group_detector.calculate_potential_customers(groups, dets)
+        timestamp = START + timedelta(seconds=next(clock) / FPS)
+        loop.run_until_complete(store.add_frame("bench", [d.center for d in dets], frame.shape, timestamp))
+        ok, buffer = cv2.imencode('.jpg', frame, JPEG_PARAMS)
+        return metrics, buffer
+
+    metrics, buffer = run_rounds(benchmark, step, frames)
+    assert metrics['total_people'] > 0 and buffer.size > 0
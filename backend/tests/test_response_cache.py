@@ -0,0 +1,106 @@
+"""
+ResponseCache: invalidação por tags e invalidação limitada por intervalo
+(inserts diretos de camera_events a ~5 Hz)
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core import response_cache as response_cache_module
+from core.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Só o módulo vê o relógio falso (o event loop continua no time.monotonic real)
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache_module, "time", SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+def counter():
+    calls = {"n": 0}
+
+    async def compute():
+        calls["n"] += 1
+        return {"n": calls["n"]}
+
+    return calls, compute
+
+
+@pytest.mark.asyncio
+async def test_entry_served_until_invalidated(clock):
+    cache = ResponseCache()
+    calls, compute = counter()
+
+    await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+    await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+    assert calls["n"] == 1
+
+    cache.invalidate("camera_events")
+    await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+    assert calls["n"] == 2
+
+
+@pytest.mark.asyncio
+async def test_throttled_invalidation_keeps_entry_between_inserts(clock):
+    cache = ResponseCache()
+    calls, compute = counter()
+
+    assert cache.invalidate_throttled("camera_events", 2.0)
+    await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+
+    # Inserts a 5 Hz dentro do intervalo não apagam a entrada
+    for _ in range(9):
+        clock.now += 0.2
+        assert not cache.invalidate_throttled("camera_events", 2.0)
+        await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+    assert calls["n"] == 1
+
+    clock.now += 0.2
+    assert cache.invalidate_throttled("camera_events", 2.0)
+    await cache.get_or_compute("k", compute, ttl=2.0, tags=("camera_events",))
+    assert calls["n"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_query_cached_despite_concurrent_inserts(clock):
+    cache = ResponseCache()
+    cache.invalidate_throttled("camera_events", 2.0)
+    release = asyncio.Event()
+
+    async def slow_compute():
+        await release.wait()
+        return {"ok": True}
+
+    task = asyncio.create_task(
+        cache.get_or_compute("k", slow_compute, ttl=2.0, tags=("camera_events",))
+    )
+    await asyncio.sleep(0)
+
+    # Inserts durante a consulta (dentro do intervalo) não descartam o resultado
+    for _ in range(4):
+        clock.now += 0.2
+        cache.invalidate_throttled("camera_events", 2.0)
+
+    release.set()
+    await task
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_throttle_is_per_tag(clock):
+    cache = ResponseCache()
+    assert cache.invalidate_throttled("camera_events", 2.0)
+    assert cache.invalidate_throttled("people_events", 2.0)
+    assert not cache.invalidate_throttled("camera_events", 2.0)
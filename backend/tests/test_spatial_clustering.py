@@ -0,0 +1,86 @@
+"""
+grid_dbscan x DBSCAN do sklearn: mesmos rótulos num corpus determinístico
+
+Cobre a matriz densa (<= 64 pontos) e o hash espacial (> 64), pontos de
+borda alcançáveis por mais de um cluster e pontos duplicados.
+"""
+
+import numpy as np
+import pytest
+
+from core.ai.group_detection.spatial_clustering import _DENSE_MAX_POINTS, grid_dbscan
+
+sklearn_cluster = pytest.importorskip("sklearn.cluster")
+
+
+def sklearn_labels(positions, eps, min_samples):
+    return sklearn_cluster.DBSCAN(eps=eps, min_samples=min_samples).fit_predict(positions)
+
+
+def random_cases(count: int, seed: int = 1234):
+    """Cenas aleatórias: tamanhos dos dois lados do limite denso/grade"""
+    rng = np.random.default_rng(seed)
+    for case in range(count):
+        points = int(rng.choice([1, 2, 3, 5, 10, 30, _DENSE_MAX_POINTS, _DENSE_MAX_POINTS + 1, 150, 400]))
+        extent = float(rng.choice([200, 800, 1920]))
+        # Coordenadas inteiras geram empates exatos em dist == eps
+        if case % 3 == 0:
+            positions = rng.integers(0, int(extent), (points, 2)).astype(np.float64)
+        else:
+            positions = rng.uniform(0, extent, (points, 2))
+        eps = float(rng.choice([5.0, 25.0, 60.0, 150.0]))
+        min_samples = int(rng.integers(1, 6))
+        yield positions, eps, min_samples
+
+
+@pytest.mark.parametrize("positions,eps,min_samples", list(random_cases(500)))
+def test_random_corpus_matches_sklearn(positions, eps, min_samples):
+    expected = sklearn_labels(positions, eps, min_samples)
+    np.testing.assert_array_equal(grid_dbscan(positions, eps, min_samples), expected)
+
+
+def test_border_point_between_two_clusters():
+    # Dois clusters com um ponto de borda (não core) a eps de ambos
+    positions = np.array([
+        [0, 0], [10, 0], [20, 0],        # cluster 0
+        [50, 0], [60, 0], [70, 0],       # cluster 1
+        [35, 0],                          # borda: alcança 20 e 50, só 2 vizinhos
+    ], dtype=np.float64)
+    labels = grid_dbscan(positions, eps=15.0, min_samples=3)
+
+    np.testing.assert_array_equal(labels, sklearn_labels(positions, 15.0, 3))
+    assert labels[6] == 0
+
+
+def test_border_point_ordering_follows_first_core():
+    # Cluster com menor índice de core aparece depois na lista
+    positions = np.array([
+        [100, 0], [35, 0], [110, 0], [0, 0], [10, 0], [20, 0], [120, 0], [50, 0]
+    ], dtype=np.float64)
+    for min_samples in (2, 3, 4):
+        np.testing.assert_array_equal(
+            grid_dbscan(positions, 15.0, min_samples),
+            sklearn_labels(positions, 15.0, min_samples)
+        )
+
+
+@pytest.mark.parametrize("points", [5, _DENSE_MAX_POINTS + 10])
+def test_duplicate_points(points):
+    rng = np.random.default_rng(points)
+    base = rng.uniform(0, 300, (points, 2))
+    positions = np.vstack([base, base[: points // 2], base[:3]])
+    for min_samples in (1, 2, 3, 4):
+        np.testing.assert_array_equal(
+            grid_dbscan(positions, 20.0, min_samples),
+            sklearn_labels(positions, 20.0, min_samples)
+        )
+
+
+def test_all_points_identical():
+    positions = np.zeros((10, 2))
+    np.testing.assert_array_equal(grid_dbscan(positions, 0.0, 3), sklearn_labels(positions, 1e-9, 3))
+    assert set(grid_dbscan(positions, 0.0, 3).tolist()) == {0}
+
+
+def test_empty_input():
+    assert grid_dbscan(np.empty((0, 2)), 10.0).shape == (0,)
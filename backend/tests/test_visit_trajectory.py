@@ -0,0 +1,55 @@
+"""
+Trajetória da visita inteira no resumo de tracks (além do deque de 100 posições)
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.ai.trajectory_codec import decode_trajectory, simplify_visit_path
+
+START = datetime(2025, 11, 18, 10, 0, 0)
+
+
+def test_simplify_visit_path_keeps_original_tuples_and_endpoints():
+    path = [(float(i), 0.0, START + timedelta(seconds=i)) for i in range(50)]
+    path += [(49.0, float(i), START + timedelta(seconds=50 + i)) for i in range(1, 50)]
+
+    simplified = simplify_visit_path(path, epsilon=2.0)
+
+    assert simplified[0] == path[0] and simplified[-1] == path[-1]
+    assert (49.0, 0.0, START + timedelta(seconds=49)) in simplified  # Esquina
+    assert len(simplified) == 3
+    assert set(simplified) <= set(path)
+
+
+def test_visit_summary_covers_whole_visit():
+    pytest.importorskip("pandas")
+    pytest.importorskip("supabase")
+    from core.ai.behavior_analyzer import BehaviorAnalyzer
+
+    analyzer = BehaviorAnalyzer()
+    # 2 min a 5 FPS (600 posições): entra à esquerda, vai à direita e desce
+    points = [(20.0 + i, 100.0) for i in range(400)] + [(419.0, 100.0 + i * 0.5) for i in range(1, 201)]
+    for i, (x, y) in enumerate(points):
+        detection = {'id': 7, 'bbox': [x - 10, y - 20, x + 10, y + 20]}
+        asyncio.run(analyzer._update_person_tracks([detection], {}, START + timedelta(seconds=i / 5)))
+
+    track = analyzer.person_tracks[7]
+    assert len(track.positions) == analyzer.max_track_history
+    asyncio.run(analyzer._finalize_person_track(track))
+
+    row = analyzer._pending_rows[-1]
+    metadata = json.loads(row[7])
+    assert metadata['entry_point'] == [20.0, 100.0]
+    assert metadata['exit_point'] == [419.0, 200.0]
+    assert metadata['trajectory_format']['start'] == START.isoformat()
+    assert metadata['trajectory_format']['raw_points'] == 600
+
+    decoded = decode_trajectory(row[4], analyzer.frame_width, analyzer.frame_height, START)
+    assert decoded[0]['x'] == pytest.approx(20.0, abs=0.5)
+    assert decoded[-1]['y'] == pytest.approx(200.0, abs=0.5)
+    last = datetime.fromisoformat(decoded[-1]['timestamp'])
+    assert (last - START).total_seconds() == pytest.approx(599 / 5, abs=0.1)  # float16
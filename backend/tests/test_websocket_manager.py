@@ -0,0 +1,200 @@
+"""
+WebSocketManager: coalescência, desconexão de cliente lento e carga
+
+Clientes simulados (FakeWebSocket) no mesmo event loop; um cliente "lento"
+só completa envios quando o teste libera.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+import pytest_asyncio
+
+from core.websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """WebSocket em memória (envios bloqueiam enquanto `gate` estiver fechado)"""
+
+    def __init__(self, slow: bool = False):
+        self.sent = []
+        self.closed_code = None
+        self.gate = asyncio.Event()
+        if not slow:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data: bytes):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+    def of_type(self, message_type: str):
+        return [m for m in self.sent if m.get('type') == message_type]
+
+
+async def settle(manager: WebSocketManager, timeout: float = 5.0):
+    """Espera as tasks escritoras esvaziarem as filas dos clientes ativos"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0)
+        if all(channel.pending == 0 for channel in manager.channels.values()):
+            await asyncio.sleep(0)
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("clientes não esvaziaram a fila")
+
+
+async def close_all(manager: WebSocketManager):
+    """Encerra as tasks escritoras ainda ativas"""
+    writers = [channel.writer for channel in manager.channels.values()]
+    for websocket in list(manager.channels):
+        manager.disconnect(websocket)
+    await asyncio.gather(*writers, return_exceptions=True)
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = WebSocketManager(max_queue_size=10, send_timeout=0.2)
+    yield manager
+    await close_all(manager)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_gets_only_latest_metrics_per_camera(manager):
+    slow = FakeWebSocket(slow=True)
+    await manager.connect(slow)
+
+    for i in range(20):
+        await manager.broadcast_metrics({'total_people': i}, camera_id='camera1')
+        await manager.broadcast_metrics({'total_people': 100 + i}, camera_id='camera2')
+
+    slow.gate.set()
+    await settle(manager)
+
+    updates = slow.of_type('metrics_update')
+    assert [(m['camera_id'], m['data']['total_people']) for m in updates] == [
+        ('camera1', 19), ('camera2', 119)
+    ]
+    assert manager.stats['messages_coalesced'] == 38
+
+
+@pytest.mark.asyncio
+async def test_fast_client_receives_every_update(manager):
+    fast = FakeWebSocket()
+    await manager.connect(fast)
+
+    for i in range(5):
+        await manager.broadcast_metrics({'total_people': i}, camera_id='camera1')
+        await settle(manager)
+
+    assert [m['data']['total_people'] for m in fast.of_type('metrics_update')] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_events_are_not_coalesced_and_keep_order(manager):
+    slow = FakeWebSocket(slow=True)
+    await manager.connect(slow)
+
+    for i in range(5):
+        await manager.broadcast_event('customer_entered', {'n': i})
+
+    slow.gate.set()
+    await settle(manager)
+
+    assert [m['data']['n'] for m in slow.of_type('customer_entered')] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_disconnected_when_event_queue_fills(manager):
+    slow = FakeWebSocket(slow=True)
+    fast = FakeWebSocket()
+    await manager.connect(slow)
+    await manager.connect(fast)
+
+    for i in range(manager.max_queue_size + 5):
+        await manager.broadcast_event('camera_event', {'n': i})
+        await asyncio.sleep(0.001)  # Escritor do cliente rápido acompanha
+    await settle(manager)
+
+    assert not manager.is_connected(slow)
+    assert manager.is_connected(fast)
+    assert slow.closed_code == 1013
+    assert manager.stats['slow_consumer_disconnects'] == 1
+    assert len(fast.of_type('camera_event')) == manager.max_queue_size + 5
+
+
+@pytest.mark.asyncio
+async def test_stalled_send_disconnects_after_timeout(manager):
+    stalled = FakeWebSocket(slow=True)
+    await manager.connect(stalled)
+
+    await asyncio.sleep(manager.send_timeout * 2)
+
+    assert not manager.is_connected(stalled)
+    assert manager.stats['slow_consumer_disconnects'] == 1
+
+
+@pytest.mark.asyncio
+async def test_load_500_clients():
+    """500 clientes locais (10% lentos): broadcast não bloqueia e serializa uma vez"""
+    manager = WebSocketManager(max_queue_size=100, send_timeout=5.0)
+    clients = [FakeWebSocket(slow=(i % 10 == 0)) for i in range(500)]
+    for client in clients:
+        await manager.connect(client)
+
+    rounds = 50
+    started = time.perf_counter()
+    for i in range(rounds):
+        await manager.broadcast_metrics({'total_people': i}, camera_id='camera1')
+        await manager.broadcast_event('camera_event', {'n': i})
+        await asyncio.sleep(0)
+    broadcast_seconds = time.perf_counter() - started
+
+    for client in clients:
+        client.gate.set()
+    await settle(manager, timeout=30.0)
+
+    # Um encode por broadcast (boas-vindas: uma por cliente)
+    assert manager.stats['messages_encoded'] == len(clients) + 2 * rounds
+    assert len(manager.channels) == len(clients)
+
+    for client in clients:
+        assert [m['data']['n'] for m in client.of_type('camera_event')] == list(range(rounds))
+        metrics = client.of_type('metrics_update')
+        assert metrics[-1]['data']['total_people'] == rounds - 1
+
+    slow_metrics = [len(c.of_type('metrics_update')) for c in clients[::10]]
+    assert max(slow_metrics) == 1
+
+    # Enfileirar para 500 clientes em 100 broadcasts: folga larga para CI lento
+    assert broadcast_seconds < 5.0
+
+    await close_all(manager)
+
+
+@pytest.mark.asyncio
+async def test_writer_exits_when_cancel_is_swallowed():
+    """Cancel perdido (wait_for terminando junto com o envio) não deixa a escritora viva"""
+    manager = WebSocketManager(max_queue_size=10, send_timeout=1.0)
+    client = FakeWebSocket()
+    await manager.connect(client)
+    await settle(manager)
+
+    channel = manager.channels[client]
+    writer = channel.writer
+    channel.writer = None  # Simula o cancel engolido: disconnect não cancela a task
+    manager.disconnect(client)
+
+    await asyncio.wait_for(writer, timeout=1.0)
+    assert writer.done() and not writer.cancelled()
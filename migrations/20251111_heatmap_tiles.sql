@@ -0,0 +1,104 @@
+-- ============================================================================
+-- ShopFlow - Heatmap Tiles Migration
+-- Date: 2025-11-11
+-- Description: Tiles de heatmap persistidos em múltiplas resoluções (minuto/hora/dia)
+-- ============================================================================
+
+BEGIN;
+
+-- ============================================================================
+-- TABLE: heatmap_tiles
+-- ============================================================================
+-- Cada linha é uma grade compacta (padrão 64x48) de contagens de posições
+-- de uma câmera em um bucket de tempo. O backend soma poucos tiles para
+-- montar o heatmap de qualquer período (dias inteiros + horas + minutos).
+
+CREATE TABLE IF NOT EXISTS public.heatmap_tiles (
+    -- Identificação do tile
+    camera_id TEXT NOT NULL,
+    resolution TEXT NOT NULL CHECK (resolution IN ('minute', 'hour', 'day')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+
+    -- Grade (contagens brutas, zlib, row-major)
+    width SMALLINT NOT NULL DEFAULT 64,
+    height SMALLINT NOT NULL DEFAULT 48,
+    dtype TEXT NOT NULL CHECK (dtype IN ('uint16', 'uint32')),
+    counts BYTEA NOT NULL,
+
+    -- Agregados
+    samples INTEGER NOT NULL DEFAULT 0,
+    total BIGINT NOT NULL DEFAULT 0,
+
+    -- Timestamps
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Upsert idempotente por câmera/resolução/bucket
+    PRIMARY KEY (camera_id, resolution, bucket_start)
+);
+
+-- Comentários
+COMMENT ON TABLE public.heatmap_tiles IS 'Heatmaps persistidos por câmera em tiles de minuto/hora/dia';
+COMMENT ON COLUMN public.heatmap_tiles.counts IS 'Grade de contagens (height x width, dtype) comprimida com zlib';
+COMMENT ON COLUMN public.heatmap_tiles.samples IS 'Número de frames acumulados no tile';
+COMMENT ON COLUMN public.heatmap_tiles.total IS 'Soma das contagens da grade';
+
+-- Retenção: minutos podem ser descartados depois de consolidados em horas/dias
+CREATE INDEX IF NOT EXISTS idx_heatmap_tiles_resolution_bucket
+    ON public.heatmap_tiles(resolution, bucket_start);
+
+-- ============================================================================
+-- TRIGGER: Auto-update updated_at
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_heatmap_tiles_updated_at ON public.heatmap_tiles;
+CREATE TRIGGER update_heatmap_tiles_updated_at
+    BEFORE UPDATE ON public.heatmap_tiles
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_updated_at_column();
+
+-- ============================================================================
+-- ROW LEVEL SECURITY (RLS)
+-- ============================================================================
+
+ALTER TABLE public.heatmap_tiles ENABLE ROW LEVEL SECURITY;
+
+-- Permite acesso completo apenas para service_role (backend)
+DROP POLICY IF EXISTS "service_role_access" ON public.heatmap_tiles;
+CREATE POLICY "service_role_access" ON public.heatmap_tiles
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT ALL ON public.heatmap_tiles TO service_role;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_name = 'heatmap_tiles'
+    )), 'Heatmap tiles table not created';
+
+    RAISE NOTICE '✅ Heatmap tiles migration completed successfully';
+    RAISE NOTICE '   - heatmap_tiles table created';
+    RAISE NOTICE '   - RLS policies applied';
+END $$;
+
+COMMIT;
@@ -0,0 +1,92 @@
+-- ============================================================================
+-- ShopFlow - Camera Calibration Migration
+-- Date: 2025-11-12
+-- Description: Calibração de perspectiva (pixels -> metros) por câmera
+-- ============================================================================
+
+BEGIN;
+
+-- ============================================================================
+-- TABLE: camera_calibrations
+-- ============================================================================
+-- Calibração usada pelo backend para converter distâncias do frame em metros
+-- (grupos, velocidades, passada, densidade do heatmap). Chaveada pelo mesmo
+-- camera_id (TEXT) do processador gravado em camera_events, heatmap_tiles e
+-- camera_rollups (ex: 'camera1'), não pelo UUID de cameras.id.
+--
+-- Formato de calibration:
+-- {
+--   "method": "height_fit" | "homography",
+--   "frame_width": 1920, "frame_height": 1080,
+--   "params": {"slope": .., "intercept": .., "reference_height_m": 1.7}
+--             | {"homography": [[..], [..], [..]]},
+--   "samples": 1234,
+--   "created_at": "2025-11-12T10:00:00"
+-- }
+
+CREATE TABLE IF NOT EXISTS public.camera_calibrations (
+    camera_id TEXT PRIMARY KEY,
+    calibration JSONB NOT NULL,
+
+    -- Timestamps
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE public.camera_calibrations IS 'Calibração de perspectiva por câmera (height_fit automático ou homografia por pontos marcados)';
+COMMENT ON COLUMN public.camera_calibrations.camera_id IS 'camera_id do processador (mesma chave de camera_events/heatmap_tiles/camera_rollups)';
+
+-- ============================================================================
+-- TRIGGER: Auto-update updated_at
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION public.update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_camera_calibrations_updated_at ON public.camera_calibrations;
+CREATE TRIGGER update_camera_calibrations_updated_at
+    BEFORE UPDATE ON public.camera_calibrations
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_updated_at_column();
+
+-- ============================================================================
+-- ROW LEVEL SECURITY (RLS)
+-- ============================================================================
+
+ALTER TABLE public.camera_calibrations ENABLE ROW LEVEL SECURITY;
+
+-- Permite acesso completo apenas para service_role (backend)
+DROP POLICY IF EXISTS "service_role_access" ON public.camera_calibrations;
+CREATE POLICY "service_role_access" ON public.camera_calibrations
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT ALL ON public.camera_calibrations TO service_role;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_name = 'camera_calibrations'
+    )), 'Camera calibrations table not created';
+
+    RAISE NOTICE '✅ Camera calibration migration completed successfully';
+    RAISE NOTICE '   - camera_calibrations table created';
+END $$;
+
+COMMIT;
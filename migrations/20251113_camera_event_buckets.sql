@@ -0,0 +1,114 @@
+-- ============================================================================
+-- ShopFlow - Camera Event Buckets Migration
+-- Date: 2025-11-13
+-- Description: Agregação por intervalo de tempo (1m/5m/1h/1d) feita no banco
+-- ============================================================================
+
+BEGIN;
+
+-- ============================================================================
+-- INDEXES: camera_events
+-- ============================================================================
+-- Consultas por período (com ou sem câmera) viram range scan no índice em
+-- vez de varrer a tabela inteira.
+
+CREATE INDEX IF NOT EXISTS idx_camera_events_timestamp
+    ON public.camera_events(timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_camera_events_camera_time
+    ON public.camera_events(camera_id, timestamp);
+
+-- ============================================================================
+-- FUNCTION: camera_bucket_interval
+-- ============================================================================
+-- Converte o parâmetro da API ('1m', '5m', '1h', '1d') em intervalo.
+
+CREATE OR REPLACE FUNCTION public.camera_bucket_interval(p_bucket TEXT)
+RETURNS INTERVAL AS $$
+BEGIN
+    RETURN CASE p_bucket
+        WHEN '1m' THEN INTERVAL '1 minute'
+        WHEN '5m' THEN INTERVAL '5 minutes'
+        WHEN '1h' THEN INTERVAL '1 hour'
+        WHEN '1d' THEN INTERVAL '1 day'
+        ELSE NULL
+    END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- ============================================================================
+-- FUNCTION: get_camera_event_buckets
+-- ============================================================================
+-- Retorna uma linha por bucket (buckets alinhados em UTC). A API recebe
+-- poucas linhas agregadas em vez de todos os eventos do período.
+
+CREATE OR REPLACE FUNCTION public.get_camera_event_buckets(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_bucket TEXT DEFAULT '1h',
+    p_camera_id TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket_start TIMESTAMPTZ,
+    samples BIGINT,
+    avg_people NUMERIC,
+    max_people INTEGER,
+    avg_customers NUMERIC,
+    max_customers INTEGER,
+    avg_employees NUMERIC,
+    avg_groups NUMERIC
+) AS $$
+DECLARE
+    v_interval INTERVAL := public.camera_bucket_interval(p_bucket);
+BEGIN
+    IF v_interval IS NULL THEN
+        RAISE EXCEPTION 'Bucket inválido: % (use 1m, 5m, 1h ou 1d)', p_bucket;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        date_bin(v_interval, e.timestamp, TIMESTAMPTZ '2000-01-01 00:00:00+00') AS bucket_start,
+        COUNT(*) AS samples,
+        ROUND(AVG(e.total_people), 2) AS avg_people,
+        MAX(e.total_people) AS max_people,
+        ROUND(AVG(e.potential_customers), 2) AS avg_customers,
+        MAX(e.potential_customers) AS max_customers,
+        ROUND(AVG(e.employees_count), 2) AS avg_employees,
+        ROUND(AVG(e.groups_count), 2) AS avg_groups
+    FROM public.camera_events e
+    WHERE e.timestamp >= p_start
+      AND e.timestamp < p_end
+      AND (p_camera_id IS NULL OR e.camera_id = p_camera_id)
+    GROUP BY 1
+    ORDER BY 1;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+COMMENT ON FUNCTION public.get_camera_event_buckets IS 'Contagens de camera_events agregadas por bucket (1m/5m/1h/1d)';
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT EXECUTE ON FUNCTION public.camera_bucket_interval(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_camera_event_buckets(TIMESTAMPTZ, TIMESTAMPTZ, TEXT, TEXT) TO service_role;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM pg_proc
+        WHERE proname = 'get_camera_event_buckets'
+    )), 'get_camera_event_buckets function not created';
+
+    ASSERT public.camera_bucket_interval('5m') = INTERVAL '5 minutes', 'Bucket interval mapping broken';
+
+    RAISE NOTICE '✅ Camera event buckets migration completed successfully';
+    RAISE NOTICE '   - camera_events indexes created';
+    RAISE NOTICE '   - get_camera_event_buckets function created';
+END $$;
+
+COMMIT;
@@ -0,0 +1,283 @@
+-- ============================================================================
+-- ShopFlow - Camera Rollups Migration
+-- Date: 2025-11-14
+-- Description: Agregados de camera_events por minuto/hora/dia mantidos no ingest
+-- ============================================================================
+
+BEGIN;
+
+-- ============================================================================
+-- TABLE: camera_rollups
+-- ============================================================================
+-- Uma linha por câmera/resolução/bucket com somas e máximos. O backend grava
+-- os buckets incrementalmente (upsert com o valor completo do bucket) e os
+-- dashboards leem só esta tabela: minutos nas pontas do período, horas e
+-- dias completos no meio.
+
+CREATE TABLE IF NOT EXISTS public.camera_rollups (
+    -- Identificação do bucket
+    camera_id TEXT NOT NULL,
+    resolution TEXT NOT NULL CHECK (resolution IN ('minute', 'hour', 'day')),
+    bucket_start TIMESTAMPTZ NOT NULL,
+
+    -- Contagens por frame
+    samples INTEGER NOT NULL DEFAULT 0,
+    people_sum BIGINT NOT NULL DEFAULT 0,
+    people_max INTEGER NOT NULL DEFAULT 0,
+    customers_sum BIGINT NOT NULL DEFAULT 0,
+    customers_max INTEGER NOT NULL DEFAULT 0,
+    employees_sum BIGINT NOT NULL DEFAULT 0,
+    groups_sum BIGINT NOT NULL DEFAULT 0,
+    groups_max INTEGER NOT NULL DEFAULT 0,
+    group_members_sum BIGINT NOT NULL DEFAULT 0,
+    processing_ms_sum BIGINT NOT NULL DEFAULT 0,
+
+    -- Permanência das visitas encerradas no bucket
+    dwell_hist INTEGER[] NOT NULL DEFAULT '{}',
+    dwell_count INTEGER NOT NULL DEFAULT 0,
+    dwell_seconds_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    -- Timestamps
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Upsert idempotente por câmera/resolução/bucket
+    PRIMARY KEY (camera_id, resolution, bucket_start)
+);
+
+-- Comentários
+COMMENT ON TABLE public.camera_rollups IS 'Agregados de camera_events por câmera em buckets de minuto/hora/dia';
+COMMENT ON COLUMN public.camera_rollups.samples IS 'Número de frames (eventos) agregados no bucket';
+COMMENT ON COLUMN public.camera_rollups.dwell_hist IS 'Visitas por faixa de permanência: <30s, 30s-1m, 1m-2m, 2m-5m, 5m-10m, 10m-15m, 15m-30m, 30m-60m, >60m';
+
+-- Consultas de período sem filtro de câmera
+CREATE INDEX IF NOT EXISTS idx_camera_rollups_resolution_bucket
+    ON public.camera_rollups(resolution, bucket_start);
+
+-- ============================================================================
+-- TRIGGER: Auto-update updated_at
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS update_camera_rollups_updated_at ON public.camera_rollups;
+CREATE TRIGGER update_camera_rollups_updated_at
+    BEFORE UPDATE ON public.camera_rollups
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_updated_at_column();
+
+-- ============================================================================
+-- FUNCTION: refresh_camera_rollups
+-- ============================================================================
+-- Recalcula os buckets de hora (ou dia) que tocam [p_start, p_end) somando
+-- as linhas da resolução inferior já gravadas. Usado quando o backend não
+-- acompanhou o bucket inteiro (reinício no meio da hora) e pelo backfill.
+
+CREATE OR REPLACE FUNCTION public.refresh_camera_rollups(
+    p_resolution TEXT,
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_camera_id TEXT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_child TEXT;
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_rows INTEGER;
+BEGIN
+    v_child := CASE p_resolution WHEN 'hour' THEN 'minute' WHEN 'day' THEN 'hour' END;
+    IF v_child IS NULL THEN
+        RAISE EXCEPTION 'Resolução inválida para refresh: % (use hour ou day)', p_resolution;
+    END IF;
+
+    -- Buckets inteiros que tocam o intervalo (alinhados em UTC)
+    v_start := date_trunc(p_resolution, p_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    v_end := date_trunc(p_resolution, (p_end - INTERVAL '1 microsecond') AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        + CASE p_resolution WHEN 'hour' THEN INTERVAL '1 hour' ELSE INTERVAL '1 day' END;
+
+    WITH children AS (
+        SELECT
+            r.*,
+            date_trunc(p_resolution, r.bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS parent_start
+        FROM public.camera_rollups r
+        WHERE r.resolution = v_child
+          AND r.bucket_start >= v_start
+          AND r.bucket_start < v_end
+          AND (p_camera_id IS NULL OR r.camera_id = p_camera_id)
+    ),
+    dwell AS (
+        SELECT camera_id, parent_start, array_agg(total ORDER BY ord) AS dwell_hist
+        FROM (
+            SELECT c.camera_id, c.parent_start, d.ord, SUM(d.value)::INTEGER AS total
+            FROM children c
+            CROSS JOIN LATERAL unnest(c.dwell_hist) WITH ORDINALITY AS d(value, ord)
+            GROUP BY c.camera_id, c.parent_start, d.ord
+        ) bins
+        GROUP BY camera_id, parent_start
+    )
+    INSERT INTO public.camera_rollups (
+        camera_id, resolution, bucket_start, samples,
+        people_sum, people_max, customers_sum, customers_max, employees_sum,
+        groups_sum, groups_max, group_members_sum, processing_ms_sum,
+        dwell_hist, dwell_count, dwell_seconds_sum
+    )
+    SELECT
+        c.camera_id,
+        p_resolution,
+        c.parent_start,
+        SUM(c.samples),
+        SUM(c.people_sum),
+        MAX(c.people_max),
+        SUM(c.customers_sum),
+        MAX(c.customers_max),
+        SUM(c.employees_sum),
+        SUM(c.groups_sum),
+        MAX(c.groups_max),
+        SUM(c.group_members_sum),
+        SUM(c.processing_ms_sum),
+        COALESCE(MAX(d.dwell_hist), '{}'),
+        SUM(c.dwell_count),
+        SUM(c.dwell_seconds_sum)
+    FROM children c
+    LEFT JOIN dwell d ON d.camera_id = c.camera_id AND d.parent_start = c.parent_start
+    GROUP BY c.camera_id, c.parent_start
+    ON CONFLICT (camera_id, resolution, bucket_start) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        people_sum = EXCLUDED.people_sum,
+        people_max = EXCLUDED.people_max,
+        customers_sum = EXCLUDED.customers_sum,
+        customers_max = EXCLUDED.customers_max,
+        employees_sum = EXCLUDED.employees_sum,
+        groups_sum = EXCLUDED.groups_sum,
+        groups_max = EXCLUDED.groups_max,
+        group_members_sum = EXCLUDED.group_members_sum,
+        processing_ms_sum = EXCLUDED.processing_ms_sum,
+        dwell_hist = EXCLUDED.dwell_hist,
+        dwell_count = EXCLUDED.dwell_count,
+        dwell_seconds_sum = EXCLUDED.dwell_seconds_sum;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.refresh_camera_rollups IS 'Recalcula rollups de hora/dia a partir da resolução inferior';
+
+-- ============================================================================
+-- FUNCTION: rebuild_camera_rollups
+-- ============================================================================
+-- Reconstrói os minutos que tocam [p_start, p_end) a partir de camera_events e
+-- depois as horas e dias que os contêm. Idempotente; o backfill chama em
+-- janelas de poucas horas para limitar o trabalho por chamada. O histograma
+-- de permanência dos minutos existentes é preservado (não vem de camera_events).
+
+CREATE OR REPLACE FUNCTION public.rebuild_camera_rollups(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_camera_id TEXT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_start TIMESTAMPTZ := date_trunc('minute', p_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    v_end TIMESTAMPTZ := date_trunc('minute', (p_end - INTERVAL '1 microsecond') AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+        + INTERVAL '1 minute';
+    v_rows INTEGER;
+    v_total INTEGER := 0;
+BEGIN
+    INSERT INTO public.camera_rollups (
+        camera_id, resolution, bucket_start, samples,
+        people_sum, people_max, customers_sum, customers_max, employees_sum,
+        groups_sum, groups_max, group_members_sum, processing_ms_sum
+    )
+    SELECT
+        e.camera_id,
+        'minute',
+        date_trunc('minute', e.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        COUNT(*),
+        SUM(e.total_people),
+        MAX(e.total_people),
+        SUM(e.potential_customers),
+        MAX(e.potential_customers),
+        SUM(e.employees_count),
+        SUM(e.groups_count),
+        MAX(e.groups_count),
+        SUM(COALESCE((
+            SELECT SUM((g->>'size')::INTEGER)
+            FROM jsonb_array_elements(
+                CASE WHEN jsonb_typeof(e.groups_detail) = 'array' THEN e.groups_detail ELSE '[]'::jsonb END
+            ) g
+        ), 0)),
+        SUM(COALESCE(e.processing_time_ms, 0))
+    FROM public.camera_events e
+    WHERE e.timestamp >= v_start
+      AND e.timestamp < v_end
+      AND (p_camera_id IS NULL OR e.camera_id = p_camera_id)
+    GROUP BY 1, 3
+    ON CONFLICT (camera_id, resolution, bucket_start) DO UPDATE SET
+        samples = EXCLUDED.samples,
+        people_sum = EXCLUDED.people_sum,
+        people_max = EXCLUDED.people_max,
+        customers_sum = EXCLUDED.customers_sum,
+        customers_max = EXCLUDED.customers_max,
+        employees_sum = EXCLUDED.employees_sum,
+        groups_sum = EXCLUDED.groups_sum,
+        groups_max = EXCLUDED.groups_max,
+        group_members_sum = EXCLUDED.group_members_sum,
+        processing_ms_sum = EXCLUDED.processing_ms_sum;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_total := v_total + v_rows;
+
+    v_total := v_total + public.refresh_camera_rollups('hour', v_start, v_end, p_camera_id);
+    v_total := v_total + public.refresh_camera_rollups('day', v_start, v_end, p_camera_id);
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION public.rebuild_camera_rollups IS 'Reconstrói rollups (minuto -> hora -> dia) a partir de camera_events';
+
+-- ============================================================================
+-- ROW LEVEL SECURITY (RLS)
+-- ============================================================================
+
+ALTER TABLE public.camera_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Permite acesso completo apenas para service_role (backend)
+DROP POLICY IF EXISTS "service_role_access" ON public.camera_rollups;
+CREATE POLICY "service_role_access" ON public.camera_rollups
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT ALL ON public.camera_rollups TO service_role;
+GRANT EXECUTE ON FUNCTION public.refresh_camera_rollups(TEXT, TIMESTAMPTZ, TIMESTAMPTZ, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.rebuild_camera_rollups(TIMESTAMPTZ, TIMESTAMPTZ, TEXT) TO service_role;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_name = 'camera_rollups'
+    )), 'Camera rollups table not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM pg_proc
+        WHERE proname = 'rebuild_camera_rollups'
+    )), 'rebuild_camera_rollups function not created';
+
+    RAISE NOTICE '✅ Camera rollups migration completed successfully';
+    RAISE NOTICE '   - camera_rollups table created';
+    RAISE NOTICE '   - refresh/rebuild functions created';
+    RAISE NOTICE '   - RLS policies applied';
+END $$;
+
+COMMIT;
@@ -0,0 +1,329 @@
+-- ============================================================================
+-- ShopFlow - Camera Events Partitioning Migration
+-- Date: 2025-11-15
+-- Description: camera_events particionada por dia (criação e retenção automáticas)
+-- ============================================================================
+
+-- A câmera grava ~5 eventos/s (≈430 mil linhas/dia por câmera). Com partições
+-- diárias:
+-- - Consultas por período só tocam as partições do intervalo (partition pruning)
+-- - Retenção é DROP TABLE da partição antiga, sem DELETE em massa nem VACUUM
+-- - Índices por partição ficam pequenos
+--
+-- A tabela existente NÃO é copiada: ela vira a partição "legacy" cobrindo
+-- todo o histórico até o fim do dia atual (MINVALUE -> amanhã). Os rollups
+-- (camera_rollups) não são afetados pela retenção dos eventos brutos.
+
+BEGIN;
+
+-- ============================================================================
+-- CONVERSÃO: camera_events -> tabela particionada por RANGE(timestamp)
+-- ============================================================================
+
+DO $$
+DECLARE
+    v_max_id BIGINT;
+    v_max_ts TIMESTAMPTZ;
+    v_upper TIMESTAMPTZ;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'public.camera_events'::regclass) = 'p' THEN
+        RAISE NOTICE 'camera_events já é particionada - conversão ignorada';
+        RETURN;
+    END IF;
+
+    -- Tabela atual vira a partição legacy
+    ALTER TABLE public.camera_events RENAME TO camera_events_legacy;
+    ALTER TABLE public.camera_events_legacy RENAME CONSTRAINT camera_events_pkey TO camera_events_legacy_pkey;
+    ALTER INDEX IF EXISTS public.idx_camera_events_timestamp RENAME TO idx_camera_events_legacy_timestamp;
+    ALTER INDEX IF EXISTS public.idx_camera_events_camera_time RENAME TO idx_camera_events_legacy_camera_time;
+    DROP POLICY IF EXISTS "service_role_access" ON public.camera_events_legacy;
+
+    SELECT COALESCE(MAX(id), 0), MAX(timestamp) INTO v_max_id, v_max_ts FROM public.camera_events_legacy;
+
+    -- Partições não podem ter identity próprio; a sequência passa para a tabela pai.
+    -- A PK (id) dá lugar à PK (id, timestamp) criada pelo ATTACH; os índices
+    -- existentes são reaproveitados como partições dos índices da tabela pai.
+    ALTER TABLE public.camera_events_legacy ALTER COLUMN id DROP IDENTITY IF EXISTS;
+    ALTER TABLE public.camera_events_legacy DROP CONSTRAINT camera_events_legacy_pkey;
+
+    CREATE TABLE public.camera_events (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+        timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        camera_id TEXT NOT NULL DEFAULT 'camera1',
+        total_people INTEGER NOT NULL DEFAULT 0,
+        employees_count INTEGER NOT NULL DEFAULT 0,
+        groups_count INTEGER NOT NULL DEFAULT 0,
+        potential_customers INTEGER NOT NULL DEFAULT 0,
+        groups_detail JSONB,
+        processing_time_ms INTEGER,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+
+        -- Chave de partição precisa fazer parte da PK
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+
+    EXECUTE format('ALTER TABLE public.camera_events ALTER COLUMN id RESTART WITH %s', v_max_id + 1);
+
+    -- Índices na tabela pai são criados em todas as partições
+    CREATE INDEX idx_camera_events_timestamp ON public.camera_events(timestamp);
+    CREATE INDEX idx_camera_events_camera_time ON public.camera_events(camera_id, timestamp);
+
+    IF v_max_ts IS NULL THEN
+        DROP TABLE public.camera_events_legacy;
+    ELSE
+        -- Histórico até o fim do dia atual (ou do último evento, se no futuro)
+        v_upper := date_trunc('day', GREATEST(NOW(), v_max_ts) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + INTERVAL '1 day';
+        EXECUTE format(
+            'ALTER TABLE public.camera_events ATTACH PARTITION public.camera_events_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+            v_upper
+        );
+        ALTER TABLE public.camera_events_legacy ENABLE ROW LEVEL SECURITY;
+    END IF;
+
+    -- Rede de segurança: eventos fora das partições existentes nunca falham
+    CREATE TABLE public.camera_events_default PARTITION OF public.camera_events DEFAULT;
+    ALTER TABLE public.camera_events_default ENABLE ROW LEVEL SECURITY;
+END $$;
+
+COMMENT ON TABLE public.camera_events IS 'Eventos processados pela câmera com detecções de IA (particionada por dia)';
+COMMENT ON COLUMN public.camera_events.total_people IS 'Total de pessoas detectadas no frame';
+COMMENT ON COLUMN public.camera_events.employees_count IS 'Funcionários identificados';
+COMMENT ON COLUMN public.camera_events.groups_count IS 'Número de grupos detectados';
+COMMENT ON COLUMN public.camera_events.potential_customers IS 'Clientes potenciais calculados';
+COMMENT ON COLUMN public.camera_events.groups_detail IS 'Array JSON com detalhes de cada grupo';
+
+-- ============================================================================
+-- FUNCTION: camera_events_partitions
+-- ============================================================================
+-- Partições de camera_events com os limites do range (NULL = DEFAULT).
+
+CREATE OR REPLACE FUNCTION public.camera_events_partitions()
+RETURNS TABLE (
+    partition_name TEXT,
+    range_start TIMESTAMPTZ,
+    range_end TIMESTAMPTZ,
+    is_default BOOLEAN
+) AS $$
+    SELECT
+        c.relname::TEXT,
+        CASE WHEN b.bounds IS NULL THEN NULL
+             WHEN b.bounds[1] = 'MINVALUE' THEN '-infinity'::TIMESTAMPTZ
+             ELSE trim(both '''' from b.bounds[1])::TIMESTAMPTZ END,
+        CASE WHEN b.bounds IS NULL THEN NULL
+             WHEN b.bounds[2] = 'MAXVALUE' THEN 'infinity'::TIMESTAMPTZ
+             ELSE trim(both '''' from b.bounds[2])::TIMESTAMPTZ END,
+        b.bounds IS NULL
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    CROSS JOIN LATERAL (
+        SELECT regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \((.*)\) TO \((.*)\)') AS bounds
+    ) b
+    WHERE i.inhparent = 'public.camera_events'::regclass
+    ORDER BY 2 NULLS LAST;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- FUNCTION: create_camera_events_partitions
+-- ============================================================================
+-- Cria as partições diárias (UTC) de hoje até hoje + p_days_ahead, e dos
+-- dias que tenham caído na partição DEFAULT (ex: manutenção parada por dias).
+-- Linhas da DEFAULT são movidas para a partição nova antes do ATTACH.
+
+CREATE OR REPLACE FUNCTION public.create_camera_events_partitions(p_days_ahead INTEGER DEFAULT 7)
+RETURNS INTEGER AS $$
+DECLARE
+    v_day DATE;
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_name TEXT;
+    v_created INTEGER := 0;
+BEGIN
+    FOR v_day IN
+        SELECT d::DATE FROM generate_series(
+            (NOW() AT TIME ZONE 'UTC')::DATE,
+            (NOW() AT TIME ZONE 'UTC')::DATE + GREATEST(p_days_ahead, 0),
+            INTERVAL '1 day'
+        ) AS d
+        UNION
+        SELECT DISTINCT (e.timestamp AT TIME ZONE 'UTC')::DATE FROM public.camera_events_default e
+        ORDER BY 1
+    LOOP
+        v_start := v_day::TIMESTAMP AT TIME ZONE 'UTC';
+        v_end := v_start + INTERVAL '1 day';
+
+        -- Dia já coberto (partição diária ou legacy)
+        CONTINUE WHEN EXISTS (
+            SELECT 1 FROM public.camera_events_partitions() p
+            WHERE NOT p.is_default AND p.range_start < v_end AND p.range_end > v_start
+        );
+
+        v_name := 'camera_events_p' || to_char(v_day, 'YYYYMMDD');
+
+        EXECUTE format('CREATE TABLE public.%I (LIKE public.camera_events INCLUDING DEFAULTS)', v_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM public.camera_events_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+            'INSERT INTO public.%I SELECT * FROM moved',
+            v_start, v_end, v_name
+        );
+        EXECUTE format(
+            'ALTER TABLE public.camera_events ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+
+        -- Partições só são acessadas pela tabela pai
+        EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+        EXECUTE format('REVOKE ALL ON public.%I FROM anon, authenticated', v_name);
+
+        v_created := v_created + 1;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.create_camera_events_partitions IS 'Cria partições diárias de camera_events (hoje + N dias e dias na DEFAULT)';
+
+-- ============================================================================
+-- FUNCTION: drop_camera_events_partitions
+-- ============================================================================
+-- Remove partições que terminam antes de hoje - p_retention_days
+-- (0 ou NULL = manter tudo). Também limpa linhas antigas da DEFAULT.
+
+CREATE OR REPLACE FUNCTION public.drop_camera_events_partitions(p_retention_days INTEGER DEFAULT 90)
+RETURNS INTEGER AS $$
+DECLARE
+    v_cutoff TIMESTAMPTZ;
+    v_partition RECORD;
+    v_dropped INTEGER := 0;
+BEGIN
+    IF p_retention_days IS NULL OR p_retention_days <= 0 THEN
+        RETURN 0;
+    END IF;
+
+    v_cutoff := date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' - make_interval(days => p_retention_days);
+
+    FOR v_partition IN
+        SELECT * FROM public.camera_events_partitions() p
+        WHERE NOT p.is_default AND p.range_end <= v_cutoff
+    LOOP
+        EXECUTE format('DROP TABLE public.%I', v_partition.partition_name);
+        v_dropped := v_dropped + 1;
+    END LOOP;
+
+    DELETE FROM public.camera_events_default WHERE timestamp < v_cutoff;
+
+    RETURN v_dropped;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.drop_camera_events_partitions IS 'Retenção de camera_events: remove partições mais antigas que N dias';
+
+-- ============================================================================
+-- FUNCTION: maintain_camera_events_partitions
+-- ============================================================================
+-- Chamada diariamente (pg_cron, se disponível, e pelo backend).
+
+CREATE OR REPLACE FUNCTION public.maintain_camera_events_partitions(
+    p_days_ahead INTEGER DEFAULT 7,
+    p_retention_days INTEGER DEFAULT 90
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_created INTEGER;
+    v_dropped INTEGER;
+BEGIN
+    v_created := public.create_camera_events_partitions(p_days_ahead);
+    v_dropped := public.drop_camera_events_partitions(p_retention_days);
+
+    RETURN jsonb_build_object(
+        'created', v_created,
+        'dropped', v_dropped,
+        'partitions', (SELECT COUNT(*) FROM public.camera_events_partitions() WHERE NOT is_default)
+    );
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+COMMENT ON FUNCTION public.maintain_camera_events_partitions IS 'Cria partições futuras e aplica a retenção de camera_events';
+
+-- Partições iniciais
+SELECT public.create_camera_events_partitions(7);
+
+-- ============================================================================
+-- ROW LEVEL SECURITY (RLS)
+-- ============================================================================
+
+ALTER TABLE public.camera_events ENABLE ROW LEVEL SECURITY;
+
+-- Permite acesso completo apenas para service_role (backend)
+DROP POLICY IF EXISTS "service_role_access" ON public.camera_events;
+CREATE POLICY "service_role_access" ON public.camera_events
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT ALL ON public.camera_events TO service_role;
+GRANT USAGE ON SEQUENCE public.camera_events_id_seq TO service_role;
+
+REVOKE ALL ON public.camera_events_default FROM anon, authenticated;
+DO $$
+BEGIN
+    IF to_regclass('public.camera_events_legacy') IS NOT NULL THEN
+        REVOKE ALL ON public.camera_events_legacy FROM anon, authenticated;
+    END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION public.create_camera_events_partitions(INTEGER) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.drop_camera_events_partitions(INTEGER) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION public.maintain_camera_events_partitions(INTEGER, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.camera_events_partitions() TO service_role;
+GRANT EXECUTE ON FUNCTION public.maintain_camera_events_partitions(INTEGER, INTEGER) TO service_role;
+
+-- ============================================================================
+-- AGENDAMENTO (pg_cron)
+-- ============================================================================
+-- Sem pg_cron o backend chama maintain_camera_events_partitions na
+-- inicialização e a cada 6 horas.
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule(
+            'camera-events-partitions',
+            '10 0 * * *',
+            'SELECT public.maintain_camera_events_partitions()'
+        );
+        RAISE NOTICE '   - pg_cron: manutenção diária agendada (00:10 UTC)';
+    ELSE
+        RAISE NOTICE '   - pg_cron indisponível: manutenção feita pelo backend';
+    END IF;
+END $$;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT relkind FROM pg_class WHERE oid = 'public.camera_events'::regclass) = 'p',
+           'camera_events is not partitioned';
+
+    ASSERT (SELECT COUNT(*) FROM public.camera_events_partitions() WHERE NOT is_default) >= 8,
+           'Daily partitions not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM pg_indexes
+        WHERE schemaname = 'public'
+        AND indexname = 'idx_camera_events_camera_time'
+    )), 'camera_events indexes missing';
+
+    RAISE NOTICE '✅ Camera events partitioning migration completed successfully';
+    RAISE NOTICE '   - camera_events particionada por dia (UTC)';
+    RAISE NOTICE '   - partições de hoje + 7 dias criadas';
+    RAISE NOTICE '   - funções de manutenção e retenção criadas';
+END $$;
+
+COMMIT;
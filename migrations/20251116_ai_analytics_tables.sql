@@ -0,0 +1,214 @@
+-- ============================================================================
+-- ShopFlow - AI Analytics Tables Migration
+-- Date: 2025-11-16
+-- Description: Tabelas e colunas usadas pelo SQL dos módulos de IA
+-- ============================================================================
+
+-- Os módulos de IA (BehaviorAnalyzer, CustomerSegmentation, PredictiveEngine,
+-- FaceRecognitionManager) e as rotas de funcionários executam SQL direto via
+-- pool asyncpg (DATABASE_URL). Esta migration cria o que esse SQL espera:
+-- - behavior_analytics: tracks finalizados e snapshots de comportamento
+-- - customer_segments: perfis/segmentos de clientes
+-- - predictions: predições e accuracy
+-- - employees: colunas is_active, registered_at, last_seen, removed_at, face_encoding
+
+BEGIN;
+
+-- ============================================================================
+-- EMPLOYEES: colunas usadas pelo reconhecimento facial e rotas
+-- ============================================================================
+
+ALTER TABLE public.employees
+    ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT true,
+    ADD COLUMN IF NOT EXISTS registered_at TIMESTAMPTZ DEFAULT NOW(),
+    ADD COLUMN IF NOT EXISTS last_seen TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS removed_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS face_encoding JSONB;
+
+-- Cadastro pelo FaceRecognitionManager grava face_encoding (JSON) em vez de embedding
+ALTER TABLE public.employees ALTER COLUMN embedding DROP NOT NULL;
+
+UPDATE public.employees
+SET is_active = (status = 'active'),
+    registered_at = COALESCE(registered_at, created_at);
+
+COMMENT ON COLUMN public.employees.is_active IS 'Ativo (sincronizado com status)';
+COMMENT ON COLUMN public.employees.face_encoding IS 'Encoding facial em JSON (FaceRecognitionManager)';
+
+-- Mantém status ('active'/'inactive') e is_active coerentes
+CREATE OR REPLACE FUNCTION public.sync_employee_status()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.status IS DISTINCT FROM OLD.status
+       AND NEW.is_active IS NOT DISTINCT FROM OLD.is_active THEN
+        NEW.is_active := (NEW.status = 'active');
+    ELSIF TG_OP = 'INSERT' AND NEW.status <> 'active' THEN
+        NEW.is_active := false;
+    ELSE
+        NEW.status := CASE WHEN NEW.is_active THEN 'active' ELSE 'inactive' END;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_employee_status ON public.employees;
+CREATE TRIGGER sync_employee_status
+    BEFORE INSERT OR UPDATE ON public.employees
+    FOR EACH ROW
+    EXECUTE FUNCTION public.sync_employee_status();
+
+-- ============================================================================
+-- TABLE: behavior_analytics
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.behavior_analytics (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    person_id TEXT,
+        -- NULL em snapshots agregados
+    person_type TEXT,
+        -- customer | employee
+
+    dwell_time_minutes REAL,
+    trajectory_data JSONB,
+        -- [{"x": 0.5, "y": 0.3, "timestamp": "..."}, ...]
+    zone_visits JSONB,
+    behavior_pattern TEXT,
+    metadata JSONB,
+
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_behavior_analytics_timestamp
+    ON public.behavior_analytics(timestamp);
+
+-- Presença de funcionários (rotas /employees/*/analytics e /presence)
+CREATE INDEX IF NOT EXISTS idx_behavior_analytics_employee
+    ON public.behavior_analytics((metadata->>'employee_id'), timestamp)
+    WHERE person_type = 'employee';
+
+COMMENT ON TABLE public.behavior_analytics IS 'Tracks finalizados e snapshots do BehaviorAnalyzer';
+
+-- ============================================================================
+-- TABLE: customer_segments
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.customer_segments (
+    customer_id TEXT PRIMARY KEY,
+    segment TEXT NOT NULL DEFAULT 'new',
+
+    first_visit TIMESTAMPTZ,
+    last_visit TIMESTAMPTZ,
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    avg_dwell_time REAL,
+    conversion_rate REAL,
+    profile_data JSONB,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_customer_segments_last_visit
+    ON public.customer_segments(last_visit);
+
+DROP TRIGGER IF EXISTS update_customer_segments_updated_at ON public.customer_segments;
+CREATE TRIGGER update_customer_segments_updated_at
+    BEFORE UPDATE ON public.customer_segments
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_updated_at_column();
+
+COMMENT ON TABLE public.customer_segments IS 'Perfis e segmentos de clientes (CustomerSegmentation)';
+
+-- ============================================================================
+-- TABLE: predictions
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.predictions (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    prediction_type TEXT NOT NULL,
+        -- hourly_flow | conversion | staffing | ...
+    prediction_value JSONB,
+    actual_value JSONB,
+    confidence_score REAL,
+    accuracy_score REAL,
+
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_predictions_type_time
+    ON public.predictions(prediction_type, timestamp);
+
+COMMENT ON TABLE public.predictions IS 'Predições do PredictiveEngine e accuracy observada';
+
+-- ============================================================================
+-- ROW LEVEL SECURITY (RLS)
+-- ============================================================================
+
+ALTER TABLE public.behavior_analytics ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.customer_segments ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.predictions ENABLE ROW LEVEL SECURITY;
+
+-- Permite acesso completo apenas para service_role (backend)
+DROP POLICY IF EXISTS "service_role_access" ON public.behavior_analytics;
+CREATE POLICY "service_role_access" ON public.behavior_analytics
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "service_role_access" ON public.customer_segments;
+CREATE POLICY "service_role_access" ON public.customer_segments
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "service_role_access" ON public.predictions;
+CREATE POLICY "service_role_access" ON public.predictions
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+-- ============================================================================
+-- GRANTS
+-- ============================================================================
+
+GRANT ALL ON public.behavior_analytics TO service_role;
+GRANT ALL ON public.customer_segments TO service_role;
+GRANT ALL ON public.predictions TO service_role;
+GRANT USAGE ON SEQUENCE public.behavior_analytics_id_seq TO service_role;
+GRANT USAGE ON SEQUENCE public.predictions_id_seq TO service_role;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name = 'behavior_analytics'
+    )), 'Table behavior_analytics not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name = 'customer_segments'
+    )), 'Table customer_segments not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name = 'predictions'
+    )), 'Table predictions not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'employees' AND column_name = 'is_active'
+    )), 'employees.is_active not created';
+
+    RAISE NOTICE '✅ AI analytics tables migration completed successfully';
+    RAISE NOTICE '   - behavior_analytics, customer_segments, predictions criadas';
+    RAISE NOTICE '   - employees: is_active, registered_at, last_seen, removed_at, face_encoding';
+END $$;
+
+COMMIT;
@@ -0,0 +1,103 @@
+-- ============================================================================
+-- ShopFlow - Edge Journal Sync Migration
+-- Date: 2025-11-17
+-- Description: Chaves de deduplicação para eventos sincronizados pelo journal local
+-- ============================================================================
+
+-- Com EDGE_JOURNAL_ENABLED o backend grava camera_events e people_events
+-- primeiro num journal SQLite local e envia depois, em lotes, quando o
+-- Supabase responde. Um lote pode ser reenviado (timeout após o commit, queda
+-- no meio do envio), então cada linha leva uma dedupe_key gerada no backend e
+-- o envio é INSERT ... ON CONFLICT DO NOTHING sobre ela.
+--
+-- Linhas antigas ficam com dedupe_key NULL (NULLs não conflitam entre si).
+-- Em camera_events (particionada por dia) o índice único precisa incluir a
+-- chave de partição: (dedupe_key, timestamp). O timestamp vem do backend e é o
+-- mesmo em todo reenvio.
+--
+-- Cria também people_events (entradas/saídas pela linha de contagem), gravada
+-- pelo backend mas ausente do schema inicial.
+
+BEGIN;
+
+-- ============================================================================
+-- TABLE: people_events
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.people_events (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    action TEXT NOT NULL,
+        -- entry | exit
+    person_tracking_id TEXT,
+    confidence REAL,
+    snapshot_url TEXT,
+    metadata JSONB,
+
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_people_events_timestamp
+    ON public.people_events(timestamp);
+
+COMMENT ON TABLE public.people_events IS 'Cruzamentos da linha de contagem (entrada/saída)';
+
+ALTER TABLE public.people_events ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "service_role_access" ON public.people_events;
+CREATE POLICY "service_role_access" ON public.people_events
+    FOR ALL
+    TO public
+    USING ((SELECT auth.role()) = 'service_role');
+
+GRANT ALL ON public.people_events TO service_role;
+GRANT USAGE ON SEQUENCE public.people_events_id_seq TO service_role;
+
+-- ============================================================================
+-- DEDUPE KEYS
+-- ============================================================================
+
+ALTER TABLE public.camera_events
+    ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+-- Índice na tabela pai: criado em todas as partições (inclusive as futuras)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_camera_events_dedupe
+    ON public.camera_events(dedupe_key, timestamp);
+
+ALTER TABLE public.people_events
+    ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_people_events_dedupe
+    ON public.people_events(dedupe_key);
+
+COMMENT ON COLUMN public.camera_events.dedupe_key IS 'Chave do journal local (reenvio idempotente)';
+COMMENT ON COLUMN public.people_events.dedupe_key IS 'Chave do journal local (reenvio idempotente)';
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.tables
+        WHERE table_schema = 'public' AND table_name = 'people_events'
+    )), 'Table people_events not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM pg_indexes
+        WHERE schemaname = 'public' AND indexname = 'idx_camera_events_dedupe'
+    )), 'Index idx_camera_events_dedupe not created';
+
+    ASSERT (SELECT EXISTS (
+        SELECT FROM pg_indexes
+        WHERE schemaname = 'public' AND indexname = 'idx_people_events_dedupe'
+    )), 'Index idx_people_events_dedupe not created';
+
+    RAISE NOTICE '✅ Edge journal sync migration completed successfully';
+    RAISE NOTICE '   - people_events criada';
+    RAISE NOTICE '   - dedupe_key única em camera_events (com timestamp) e people_events';
+END $$;
+
+COMMIT;
@@ -0,0 +1,45 @@
+-- ============================================================================
+-- ShopFlow - Behavior Track Summaries Migration
+-- Date: 2025-11-18
+-- Description: Trajetória binária compacta nos resumos de visitas
+-- ============================================================================
+
+-- O BehaviorAnalyzer deixa de gravar uma linha por frame. Agora behavior_analytics
+-- recebe, em lote:
+-- - um resumo por visita finalizada (person_id preenchido) com estatísticas em
+--   metadata e a trajetória simplificada (Douglas-Peucker) em trajectory:
+--   float16 little-endian, 3 valores por ponto (x/largura, y/altura, segundos
+--   desde metadata.trajectory_format.start)
+-- - um snapshot agregado por minuto (person_id NULL)
+--
+-- trajectory_data (JSON) continua nas linhas antigas. Pontos de entrada e
+-- saída ficam em metadata (entry_point / exit_point) para filtros em SQL.
+
+BEGIN;
+
+ALTER TABLE public.behavior_analytics
+    ADD COLUMN IF NOT EXISTS trajectory BYTEA;
+
+COMMENT ON COLUMN public.behavior_analytics.trajectory IS 'Trajetória simplificada: float16 LE (x, y, t) por ponto; formato em metadata.trajectory_format';
+
+-- Visitas por período (treino do PredictiveEngine, relatórios)
+CREATE INDEX IF NOT EXISTS idx_behavior_analytics_tracks
+    ON public.behavior_analytics(timestamp)
+    WHERE person_id IS NOT NULL;
+
+-- ============================================================================
+-- VALIDATION
+-- ============================================================================
+
+DO $$
+BEGIN
+    ASSERT (SELECT EXISTS (
+        SELECT FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'behavior_analytics' AND column_name = 'trajectory'
+    )), 'behavior_analytics.trajectory not created';
+
+    RAISE NOTICE '✅ Behavior track summaries migration completed successfully';
+    RAISE NOTICE '   - behavior_analytics.trajectory (BYTEA float16)';
+END $$;
+
+COMMIT;
@@ -0,0 +1,94 @@
+-- ============================================================================
+-- ShopFlow - Camera Events Query Plan Check
+-- Verifica partition pruning e uso de índices em camera_events
+-- Executar APÓS 20251115_camera_events_partitioning.sql
+-- ============================================================================
+
+-- Popula ~1,2 milhão de eventos (1/s, 2 câmeras, 7 dias a partir de amanhã),
+-- roda EXPLAIN nas consultas do dashboard e falha se o plano regredir
+-- (varredura de partições fora do período ou Seq Scan). Tudo é desfeito
+-- no ROLLBACK final; rode em staging/local, não em produção.
+
+BEGIN;
+
+DO $$
+DECLARE
+    v_day0 TIMESTAMPTZ := date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + INTERVAL '1 day';
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_plan JSONB;
+    v_partitions TEXT[];
+    v_nodes TEXT[];
+    v_rows BIGINT;
+BEGIN
+    RAISE NOTICE E'\n============================================';
+    RAISE NOTICE '🔍 ShopFlow - camera_events Query Plan Check';
+    RAISE NOTICE E'============================================\n';
+
+    PERFORM public.create_camera_events_partitions(8);
+
+    INSERT INTO public.camera_events (timestamp, camera_id, total_people, employees_count, groups_count, potential_customers)
+    SELECT ts, cam, (random() * 12)::INT, (random() * 2)::INT, (random() * 3)::INT, (random() * 8)::INT
+    FROM generate_series(v_day0, v_day0 + INTERVAL '7 days' - INTERVAL '1 second', INTERVAL '1 second') AS ts
+    CROSS JOIN (VALUES ('camera1'), ('camera2')) AS c(cam);
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RAISE NOTICE '📊 % eventos inseridos', v_rows;
+
+    ANALYZE public.camera_events;
+
+    -- 1. Última hora de uma câmera: 1 partição, via índice
+    v_start := v_day0 + INTERVAL '3 days 14 hours';
+    v_end := v_start + INTERVAL '1 hour';
+    EXECUTE format(
+        'EXPLAIN (FORMAT JSON) SELECT * FROM public.camera_events '
+        'WHERE camera_id = %L AND timestamp >= %L AND timestamp < %L ORDER BY timestamp DESC',
+        'camera1', v_start, v_end
+    ) INTO v_plan;
+
+    SELECT array_agg(DISTINCT r #>> '{}') INTO v_partitions FROM jsonb_path_query(v_plan, 'strict $.**."Relation Name"') r;
+    SELECT array_agg(DISTINCT n #>> '{}') INTO v_nodes FROM jsonb_path_query(v_plan, 'strict $.**."Node Type"') n;
+
+    IF v_partitions <> ARRAY['camera_events_p' || to_char(v_start AT TIME ZONE 'UTC', 'YYYYMMDD')] THEN
+        RAISE EXCEPTION '❌ Última hora: partições varridas %', v_partitions;
+    END IF;
+    IF 'Seq Scan' = ANY(v_nodes) THEN
+        RAISE EXCEPTION '❌ Última hora: Seq Scan no plano %', v_nodes;
+    END IF;
+    RAISE NOTICE '✅ Última hora: % via %', v_partitions, v_nodes;
+
+    -- 2. Período de 36h (todas as câmeras): só as 2 partições do intervalo
+    v_start := v_day0 + INTERVAL '2 days 6 hours';
+    v_end := v_start + INTERVAL '36 hours';
+    EXECUTE format(
+        'EXPLAIN (FORMAT JSON) SELECT date_trunc(''hour'', timestamp), AVG(total_people) FROM public.camera_events '
+        'WHERE timestamp >= %L AND timestamp < %L GROUP BY 1',
+        v_start, v_end
+    ) INTO v_plan;
+
+    SELECT array_agg(DISTINCT r #>> '{}') INTO v_partitions FROM jsonb_path_query(v_plan, 'strict $.**."Relation Name"') r;
+
+    IF cardinality(v_partitions) <> 2 THEN
+        RAISE EXCEPTION '❌ Período 36h: esperadas 2 partições, varridas %', v_partitions;
+    END IF;
+    RAISE NOTICE '✅ Período 36h: %', v_partitions;
+
+    -- 3. Evento mais recente da câmera (dashboard em tempo real): sem Seq Scan
+    EXECUTE format(
+        'EXPLAIN (FORMAT JSON) SELECT * FROM public.camera_events WHERE camera_id = %L ORDER BY timestamp DESC LIMIT 1',
+        'camera2'
+    ) INTO v_plan;
+
+    SELECT array_agg(DISTINCT n #>> '{}') INTO v_nodes FROM jsonb_path_query(v_plan, 'strict $.**."Node Type"') n;
+
+    IF 'Seq Scan' = ANY(v_nodes) OR NOT ('Merge Append' = ANY(v_nodes)) THEN
+        RAISE EXCEPTION '❌ Último evento: plano inesperado %', v_nodes;
+    END IF;
+    RAISE NOTICE '✅ Último evento: %', v_nodes;
+
+    RAISE NOTICE E'\n============================================';
+    RAISE NOTICE '🎉 Planos de consulta OK';
+    RAISE NOTICE E'============================================\n';
+END $$;
+
+ROLLBACK;